@@ -4,57 +4,106 @@ Avatar Server - Serves a pre-configured avatar_menu_chat.html with environment v
 """
 
 import os
+import re
+import argparse
+import json
+import gzip
+import hashlib
+import mimetypes
+import posixpath
 import socket
 import sys
 import webbrowser
 import threading
 import time
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
+from chat_proxy import ChatProxy, ChatProxyError, load_prewarm_queries
+from local_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Brotli variants are skipped; gzip is always available
 
 # Load environment variables from .env file
 load_dotenv()
 
-class AvatarRequestHandler(SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/avatar_menu_chat.html' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            # Read the original avatar_menu_chat.html
-            with open('avatar_menu_chat.html', 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # Read the system message content
-            system_message = ""
-            try:
-                with open('voice_avatar_system_message.txt', 'r', encoding='utf-8') as f:
-                    system_message = f.read().strip()
-            except FileNotFoundError:
-                system_message = "You are an AI assistant that helps people find information."
-            
-            # Get environment variables
-            region = os.getenv('RESTAURANT_EVALUATION_MODEL_REGION', 'eastus2')
-            api_key = os.getenv('RESTAURANT_API_KEY', '')
-            openai_endpoint = os.getenv('RESTAURANT_EVALUATION_MODEL_ENDPOINT', '')
-            openai_api_key = os.getenv('RESTAURANT_API_KEY', '')
-            deployment_name = os.getenv('RESTAURANT_EVALUATION_MODEL', 'gpt-4')
-            
-            # JavaScript to auto-fill the form
-            # Escape the system message for JavaScript
-            escaped_system_message = system_message.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
-            
-            auto_fill_script = f"""
+PAGE_TEMPLATE = 'avatar_menu_chat.html'
+SYSTEM_MESSAGE_FILE = 'voice_avatar_system_message.txt'
+DEFAULT_SYSTEM_MESSAGE = "You are an AI assistant that helps people find information."
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+# Directories whose files are preloaded, hashed and precompressed at startup
+STATIC_DIRECTORIES = ('css', 'js', 'image', 'menu', 'video', 'assets')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'application/xml')
+STREAM_CHUNK_SIZE = 64 * 1024
+# Pages embed every asset's version; the assets are re-checked on disk at most this often
+ASSET_CHECK_SECONDS = 2.0
+
+# Fingerprinted URLs (?v=<hash> or name.<hash>.ext) never change, so browsers may keep them forever.
+# Everything else is revalidated with its ETag, which costs a 304 instead of a download.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+FINGERPRINTED_NAME = re.compile(r'\.[0-9a-f]{8,}\.[A-Za-z0-9]+$')
+ASSET_REFERENCE = re.compile(r'\b(src|href)="([^"?#:]+)"')
+
+# Responsive image variants written by build_assets.py
+ASSET_MANIFEST = '/assets/manifest.json'
+IMAGE_TAG = re.compile(r'<img\b([^>]*?)\bsrc="([^"?#:]+)"([^>]*)>')
+# Menu images fill the content column, which tops out a little under 1200px
+IMAGE_SIZES = '(max-width: 1200px) 100vw, 1120px'
+RESPONSIVE_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+CHAT_PROXY_PATH = '/api/chat'
+CHAT_STATS_PATH = '/api/chat/stats'
+METRICS_PATH = '/metrics'
+# Chat requests carry the whole conversation, but nothing near this size
+MAX_CHAT_BODY = 4 * 1024 * 1024
+
+
+def render_avatar_page():
+    """Render avatar_menu_chat.html with the auto-fill script injected"""
+    # Read the original avatar_menu_chat.html
+    with open(PAGE_TEMPLATE, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    
+    # Read the system message content
+    system_message = ""
+    try:
+        with open(SYSTEM_MESSAGE_FILE, 'r', encoding='utf-8') as f:
+            system_message = f.read().strip()
+    except FileNotFoundError:
+        system_message = DEFAULT_SYSTEM_MESSAGE
+    
+    # Get environment variables
+    region = os.getenv('RESTAURANT_EVALUATION_MODEL_REGION', 'eastus2')
+    openai_endpoint = os.getenv('RESTAURANT_EVALUATION_MODEL_ENDPOINT', '')
+    deployment_name = os.getenv('RESTAURANT_EVALUATION_MODEL', 'gpt-4')
+    # With the proxy configured the page talks to /api/chat, and the key the proxy sends upstream
+    # (RESTAURANT_API_KEY) is kept out of the page; the avatar's Speech connection gets its own key
+    chat_proxy_url = CHAT_PROXY_PATH if chat_proxy.configured else ''
+    speech_key = os.getenv('AVATAR_SPEECH_KEY', '')
+    if not speech_key and not chat_proxy.configured:
+        speech_key = os.getenv('RESTAURANT_API_KEY', '')  # Older setups shared one key; the page needs it anyway
+    
+    # JavaScript to auto-fill the form
+    # Escape the system message for JavaScript
+    escaped_system_message = system_message.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n').replace('\r', '\\r')
+    
+    auto_fill_script = f"""
 <script>
+window.chatProxyUrl = '{chat_proxy_url}';
+
 window.addEventListener('DOMContentLoaded', function() {{
     // Auto-fill form fields with environment variables
     const fields = [
         {{ id: 'region', value: '{region}' }},
-        {{ id: 'APIKey', value: '{api_key}' }},
+        {{ id: 'APIKey', value: '{speech_key}' }},
         {{ id: 'azureOpenAIEndpoint', value: '{openai_endpoint}' }},
-        {{ id: 'azureOpenAIApiKey', value: '{openai_api_key}' }},
         {{ id: 'azureOpenAIDeploymentName', value: '{deployment_name}' }},
         {{ id: 'prompt', value: '{escaped_system_message}' }}
     ];
@@ -81,14 +130,581 @@ window.addEventListener('DOMContentLoaded', function() {{
 }});
 </script>
 """
+    
+    # Insert the script before the closing body tag
+    return html_content.replace('</body>', auto_fill_script + '\n</body>')
+
+
+class CachedResponse:
+    """An encoded response body held in memory with its compressed variants"""
+    
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.created = time.time()
+        
+        # Strong validator derived from the identity representation. Each
+        # content-coding gets its own tag so caches never mix them up.
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.digest = digest
+        self.variants = {'identity': (body, f'"{digest}"')}
+        
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.variants['gzip'] = (gzipped, f'"{digest}-gzip"')
+            if brotli is not None:
+                brotlied = brotli.compress(body, quality=11)
+                if len(brotlied) < len(body):
+                    self.variants['br'] = (brotlied, f'"{digest}-br"')
+    
+    @property
+    def etag(self):
+        return self.variants['identity'][1]
+    
+    def not_modified(self, if_none_match, accept_encoding):
+        """ETag of the variant Accept-Encoding selects when If-None-Match names it, else None"""
+        etag = self.select(accept_encoding)[2]
+        return etag if etag_matches(if_none_match, {etag}) else None
+    
+    def select(self, accept_encoding):
+        """Pick the best variant for an Accept-Encoding header"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                body, etag = self.variants[encoding]
+                return encoding, body, etag
+        body, etag = self.variants['identity']
+        return 'identity', body, etag
+
+
+def etag_matches(if_none_match, tags):
+    """Weak comparison of an If-None-Match header against a set of ETags"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in tags:
+            return True
+    return False
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into a {coding: qvalue} dict"""
+    accepted = {}
+    for part in (header or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def parse_range(header, size):
+    """Parse a single 'bytes=' Range header into an inclusive (start, end) pair.
+    
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and 'unsatisfiable' when no byte of the range exists.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition('-')
+    try:
+        if start_text == '':
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                return 'unsatisfiable'
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, min(end, size - 1)
+
+
+class StaticAsset:
+    """A static file with a strong ETag and, for text types, precompressed variants"""
+    
+    def __init__(self, path, url_path):
+        self.path = path
+        self.url_path = url_path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/'):
+            self.content_type += '; charset=utf-8'
+        self.dependencies = {}
+        
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        
+        if self.content_type.startswith(COMPRESSIBLE_TYPES):
+            # Small text assets live in memory with their gzip/brotli variants
+            with open(path, 'rb') as f:
+                body = f.read()
+            self.cached = CachedResponse(body, self.content_type)
+            self.digest = self.cached.digest
+            self.size = len(body)
+        else:
+            # Images and video are streamed from disk; only their hash is kept
+            self.cached = None
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+            self.digest = hasher.hexdigest()[:20]
+            self.size = stat.st_size
+        
+        self.version = self.digest[:10]
+    
+    @property
+    def etag(self):
+        return f'"{self.digest}"'
+    
+    def is_stale(self):
+        """Check whether the file on disk changed since it was loaded"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_mtime_ns, stat.st_size) != self.signature
+    
+    def is_fingerprinted(self, requested_version):
+        """Fingerprinted URLs name one exact version of the file and can be cached forever"""
+        if requested_version:
+            return requested_version == self.version
+        return bool(FINGERPRINTED_NAME.search(self.url_path))
+    
+    def not_modified(self, if_none_match, accept_encoding):
+        if self.cached is not None:
+            return self.cached.not_modified(if_none_match, accept_encoding)
+        return self.etag if etag_matches(if_none_match, {self.etag}) else None
+
+
+class StaticAssetCache:
+    """Preloads the avatar page's static assets and serves them with caching headers"""
+    
+    def __init__(self, root='.', directories=STATIC_DIRECTORIES, check_interval=ASSET_CHECK_SECONDS):
+        self.root = root
+        self.directories = directories
+        self.check_interval = check_interval
+        self.assets = {}
+        self.loaded = False
+        self.generation = 0  # Bumped whenever an asset is (re)loaded or removed
+        self._signature = None
+        self._signature_checked = 0.0
+        self._lock = threading.RLock()
+    
+    def preload(self):
+        """Hash every static asset and precompress the text ones"""
+        with self._lock:
+            self.assets = {}
+            html_paths = []
+            for directory in self.directories:
+                for dirpath, _, filenames in os.walk(os.path.join(self.root, directory)):
+                    for filename in sorted(filenames):
+                        path = os.path.join(dirpath, filename)
+                        url_path = '/' + os.path.relpath(path, self.root).replace(os.sep, '/')
+                        if filename.lower().endswith(('.html', '.htm')):
+                            # HTML references other assets, so it is fingerprinted last
+                            html_paths.append((path, url_path))
+                        else:
+                            self.assets[url_path] = StaticAsset(path, url_path)
+            self.loaded = True
+            for path, url_path in html_paths:
+                self.assets[url_path] = self._load_html(path, url_path)
+            self.generation += 1
+        return self.assets
+    
+    def _load_html(self, path, url_path):
+        """Load an HTML asset with its local references rewritten to versioned URLs"""
+        asset = StaticAsset(path, url_path)
+        with open(path, 'r', encoding='utf-8') as f:
+            html_content = f.read()
+        base = posixpath.dirname(url_path) + '/'
+        html_content, manifest_version = self.responsive_images(html_content, base)
+        rewritten, dependencies = self.fingerprint_html(html_content, base)
+        if manifest_version:
+            dependencies[ASSET_MANIFEST] = manifest_version
+        asset.cached = CachedResponse(rewritten.encode('utf-8'), asset.content_type)
+        asset.digest = asset.cached.digest
+        asset.version = asset.digest[:10]
+        asset.size = len(asset.cached.variants['identity'][0])
+        asset.dependencies = dependencies
+        return asset
+    
+    def get(self, url_path):
+        """Return the asset for a URL path, reloading it if its file changed"""
+        if not self.loaded:
+            self.preload()
+        asset = self.assets.get(url_path)
+        if asset is None:
+            return None
+        if asset.is_stale() or self._dependencies_changed(asset):
+            with self._lock:
+                self.generation += 1
+                if not os.path.isfile(asset.path):
+                    self.assets.pop(url_path, None)
+                    return None
+                if url_path.lower().endswith(('.html', '.htm')):
+                    asset = self._load_html(asset.path, url_path)
+                else:
+                    asset = StaticAsset(asset.path, url_path)
+                self.assets[url_path] = asset
+        return asset
+    
+    def _dependencies_changed(self, asset):
+        for url_path, version in asset.dependencies.items():
+            dependency = self.get(url_path)
+            if dependency is None or dependency.version != version:
+                return True
+        return False
+    
+    def fingerprint_html(self, html_content, base='/'):
+        """Append ?v=<content hash> to local src/href references that point at known assets"""
+        dependencies = {}
+        
+        def add_version(match):
+            attribute, reference = match.group(1), match.group(2)
+            # Absolute URLs never reach here (the pattern rejects ':'), protocol-relative ones are skipped.
+            # Already-fingerprinted names (build_assets.py output) need no version query
+            if not reference.startswith('//') and not FINGERPRINTED_NAME.search(reference):
+                url_path = posixpath.normpath(posixpath.join(base, reference))
+                asset = self.get(url_path)
+                if asset is not None:
+                    dependencies[url_path] = asset.version
+                    return f'{attribute}="{reference}?v={asset.version}"'
+            return match.group(0)
+        
+        return ASSET_REFERENCE.sub(add_version, html_content), dependencies
+    
+    def responsive_images(self, html_content, base='/'):
+        """Replace <img> tags that have built variants with <picture> elements.
+        
+        Returns the rewritten HTML and the manifest version it was built from
+        (None when build_assets.py has not been run).
+        """
+        manifest_asset = self.get(ASSET_MANIFEST)
+        if manifest_asset is None or manifest_asset.cached is None:
+            return html_content, None
+        try:
+            manifest = json.loads(manifest_asset.cached.variants['identity'][0])
+        except ValueError:
+            return html_content, None
+        images = manifest.get('images', {})
+        
+        def to_picture(match):
+            before, reference, after = match.groups()
+            url_path = posixpath.normpath(posixpath.join(base, reference))
+            entry = images.get(url_path.lstrip('/'))
+            if not entry:
+                return match.group(0)
+            variants = entry['variants']
             
-            # Insert the script before the closing body tag
-            html_content = html_content.replace('</body>', auto_fill_script + '\n</body>')
+            def srcset(extension):
+                return ', '.join(f"/{v['path']} {v['width']}w" for v in variants[extension])
             
-            self.wfile.write(html_content.encode('utf-8'))
+            # Browsers take the first <source> type they support, so best format goes first
+            sources = ''.join(
+                f'<source type="{RESPONSIVE_TYPES[extension]}" srcset="{srcset(extension)}" sizes="{IMAGE_SIZES}">'
+                for extension in variants if extension != 'jpg'
+            )
+            fallback = variants['jpg'][-1]
+            return (f'<picture>{sources}<img{before}src="/{fallback["path"]}" srcset="{srcset("jpg")}" '
+                    f'sizes="{IMAGE_SIZES}" width="{entry["width"]}" height="{entry["height"]}" '
+                    f'loading="lazy" decoding="async"{after}></picture>')
+        
+        return IMAGE_TAG.sub(to_picture, html_content), manifest_asset.version
+    
+    def signature(self):
+        """Versions of all assets - used to invalidate pages that embed them.
+
+        Stat-ing every asset on every page request adds up, so the result is
+        reused for check_interval seconds unless an asset was reloaded meanwhile.
+        """
+        if not self.loaded:
+            self.preload()
+        now = time.monotonic()
+        cached = self._signature
+        if cached is not None and cached[0] == self.generation and now - self._signature_checked < self.check_interval:
+            return cached[1]
+        signature = tuple((url_path, asset.version) for url_path, asset in
+                          ((url_path, self.get(url_path)) for url_path in list(self.assets))
+                          if asset is not None)
+        self._signature = (self.generation, signature)
+        self._signature_checked = now
+        return signature
+    
+    def stats(self):
+        """Summarise how many bytes the precompressed variants save"""
+        original = compressed = 0
+        for asset in self.assets.values():
+            if asset.cached is None:
+                continue
+            original += asset.size
+            best = min(len(body) for body, _ in asset.cached.variants.values())
+            compressed += best
+        return {'assets': len(self.assets), 'text_bytes': original, 'compressed_bytes': compressed}
+
+
+static_assets = StaticAssetCache()
+chat_proxy = ChatProxy.from_env()
+
+
+class AvatarPageCache:
+    """Builds the auto-filled avatar page once and rebuilds it only when its source files change"""
+    
+    def __init__(self, render=None, sources=(PAGE_TEMPLATE, SYSTEM_MESSAGE_FILE), assets=None):
+        self.render = render or self.render_fingerprinted
+        self.sources = sources
+        self.assets = assets if assets is not None else static_assets
+        self._lock = threading.Lock()
+        self._signature = None
+        self._response = None
+        self.builds = 0
+    
+    def _source_signature(self):
+        """Fingerprint the source files by mtime and size"""
+        signature = []
+        for path in self.sources:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append((path, None, None))
+        # The page embeds versioned asset URLs, so asset changes invalidate it too
+        return tuple(signature), self.assets.signature()
+    
+    def render_fingerprinted(self):
+        """Render the page and point its asset references at versioned URLs"""
+        html_content, _ = self.assets.fingerprint_html(render_avatar_page(), '/')
+        return html_content
+    
+    def get(self):
+        """Return the cached page, rebuilding it if a source file changed"""
+        signature = self._source_signature()
+        if signature == self._signature and self._response is not None:
+            return self._response
+        
+        with self._lock:
+            # Another request may have rebuilt the page while we waited
+            if signature != self._signature or self._response is None:
+                html_content = self.render()
+                self._response = CachedResponse(html_content.encode('utf-8'), 'text/html; charset=utf-8')
+                self._signature = signature
+                self.builds += 1
+            return self._response
+
+
+avatar_page_cache = AvatarPageCache()
+
+
+class AvatarRequestHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 with Content-Length on every response lets browsers reuse connections
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        self.handle_request(head_only=False)
+    
+    def do_HEAD(self):
+        self.handle_request(head_only=True)
+    
+    def do_POST(self):
+        if urlparse(self.path).path == CHAT_PROXY_PATH:
+            self.handle_chat()
+        else:
+            self.send_error(404)
+    
+    def handle_request(self, head_only):
+        url = urlparse(self.path)
+        if url.path == CHAT_STATS_PATH:
+            self.send_json(200, chat_proxy.summary())
+            return
+        if url.path == METRICS_PATH:
+            self.send_metrics(head_only)
+            return
+        if url.path == '/avatar_menu_chat.html' or url.path == '/':
+            self.send_cached(avatar_page_cache.get(), cache_control=REVALIDATE_CACHE_CONTROL, head_only=head_only)
+            return
+        
+        asset = static_assets.get(url.path)
+        if asset is not None:
+            requested_version = parse_qs(url.query).get('v', [None])[0]
+            self.send_asset(asset, requested_version, head_only)
+        elif head_only:
+            super().do_HEAD()
         else:
-            # Serve static files (CSS, JS, images, menu directory, etc.) normally
+            # Serve anything outside the static directories normally
             super().do_GET()
+    
+    def send_cached(self, cached, cache_control, head_only=False):
+        """Send a CachedResponse, honouring conditional GET and content negotiation"""
+        # A 304 carries the ETag of the variant this client would get, not the identity one
+        etag = cached.not_modified(self.headers.get('If-None-Match'), self.headers.get('Accept-Encoding'))
+        if etag:
+            self.send_not_modified(etag, cache_control)
+            return
+        
+        encoding, body, etag = cached.select(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-Type', cached.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        
+        if not head_only:
+            self.wfile.write(body)
+    
+    def send_json(self, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_metrics(self, head_only=False):
+        """Prometheus text format for the chat proxy's latency histograms and counters"""
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+    
+    def handle_chat(self):
+        """Relay a streaming chat completion from the upstream to the browser"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > MAX_CHAT_BODY:
+            self.close_connection = True
+            self.send_json(413 if length > 0 else 400, {'error': 'Invalid request body size'})
+            return
+        try:
+            request_body = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_json(400, {'error': 'Request body is not valid JSON'})
+            return
+        
+        # The page sends a per-tab id; fall back to the caller's address
+        client_id = self.headers.get('X-Chat-Client') or self.client_address[0]
+        try:
+            stream = chat_proxy.open(request_body, client_id)
+        except ChatProxyError as e:
+            headers = {'Retry-After': str(e.retry_after)} if e.retry_after else None
+            self.send_json(e.status, {'error': e.message}, headers)
+            return
+        
+        chat_proxy.maybe_prewarm(request_body)
+        
+        with stream:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-store')
+            self.send_header('X-Chat-Cache', stream.cache_status)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for event in stream.events():
+                    self.write_chunk(event)
+                # Free the client's slot before the final chunk so a follow-up call isn't refused
+                stream.close()
+                self.write_chunk(b'')
+            except (BrokenPipeError, ConnectionResetError):
+                # The browser went away (e.g. the user asked something else); drop the upstream too
+                self.close_connection = True
+    
+    def write_chunk(self, data):
+        """Write one HTTP/1.1 chunk and flush it so each event reaches the page immediately"""
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+    
+    def send_not_modified(self, etag, cache_control):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+    
+    def send_asset(self, asset, requested_version, head_only):
+        """Send a static asset with caching headers and byte-range support"""
+        if asset.is_fingerprinted(requested_version):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = REVALIDATE_CACHE_CONTROL
+        
+        etag = asset.not_modified(self.headers.get('If-None-Match'), self.headers.get('Accept-Encoding'))
+        if etag:
+            self.send_not_modified(etag, cache_control)
+            return
+        
+        # A Range request only applies while the client still holds this version
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != asset.etag:
+            range_header = None
+        byte_range = parse_range(range_header, asset.size)
+        
+        if byte_range is None and asset.cached is not None:
+            self.send_cached(asset.cached, cache_control, head_only)
+            return
+        
+        if byte_range == 'unsatisfiable':
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{asset.size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        start, end = byte_range if byte_range else (0, asset.size - 1)
+        length = max(0, end - start + 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(length))
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{asset.size}')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', asset.etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        
+        if head_only or length == 0:
+            return
+        if asset.cached is not None:
+            self.wfile.write(asset.cached.variants['identity'][0][start:end + 1])
+            return
+        with open(asset.path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
 
 def find_free_port():
     """Find a free port to use for the server"""
@@ -107,26 +723,57 @@ def open_browser(url):
     
     threading.Thread(target=delayed_open, daemon=True).start()
 
+def speech_key_warning():
+    """Startup warning for setups that relied on the page reusing RESTAURANT_API_KEY for Speech"""
+    if chat_proxy.configured and not os.getenv('AVATAR_SPEECH_KEY'):
+        return ("⚠️ AVATAR_SPEECH_KEY is not set: the chat proxy keeps RESTAURANT_API_KEY off the page, "
+                "so the avatar's Speech key field starts empty. Set AVATAR_SPEECH_KEY to your Speech resource key.")
+    return None
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Serve the avatar chat page")
+    parser.add_argument('--prewarm', type=int, default=0, metavar='N',
+                        help="Prewarm cached answers for the first N queries in evaluation_queries.jsonl")
+    parser.add_argument('--no-chat-cache', action='store_true', help="Disable the chat response cache")
+    args = parser.parse_args()
+    
     # Change to the directory containing the HTML files
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     
+    if args.no_chat_cache:
+        chat_proxy.cache = None
+    elif args.prewarm > 0:
+        # Runs after the first chat request, which carries the page's system prompt and tools
+        chat_proxy.prewarm_queries = load_prewarm_queries(limit=args.prewarm)
+    
+    # Hash and precompress the static assets once up front
+    static_assets.preload()
+    asset_stats = static_assets.stats()
+    print(f"Preloaded {asset_stats['assets']} static assets "
+          f"({asset_stats['text_bytes']:,} bytes of text, {asset_stats['compressed_bytes']:,} compressed)")
+    
     # Find a free port
     port = find_free_port()
     
     # Create and start the server
     server_address = ('localhost', port)
-    httpd = HTTPServer(server_address, AvatarRequestHandler)
+    # Threaded so a kept-alive browser connection can't block other requests
+    httpd = ThreadingHTTPServer(server_address, AvatarRequestHandler)
     
     # Construct the URL
     url = f"http://localhost:{port}/avatar_menu_chat.html"
     
     print(f"Avatar Server starting...")
     print(f"Serving on http://localhost:{port}")
+    print(f"Metrics at http://localhost:{port}{METRICS_PATH}")
     print(f"Opening {url} in your browser")
     print("The form fields will be auto-filled with environment variables")
     print("Click 'Start Session' to begin the avatar chat")
     print("Press Ctrl+C to stop the server")
+    warning = speech_key_warning()
+    if warning:
+        print(warning)
     
     # Start browser opening in background thread
     open_browser(url)
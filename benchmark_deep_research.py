@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the client side of ui-deep-research-agent.py.
+
+Each stage of the research pipeline is timed with pytest-benchmark against
+transcripts from the local fake agents service, from 1 KB reports without
+citations up to 1 MB reports with 5,000 citations:
+
+- polling: the run polling loop, progress messages and final message handling
+- results: _process_and_display_results building the report text
+- parse: report_markup.parse_markdown building the block tree once per report
+- render: MarkdownRenderer filling a Tk Text widget
+- pdf: report_pdf.write_report_pdf laying out the exported report, including
+  a report long enough for 200+ pages
+- tracing: the polling loop with and without an OpenTelemetry tracer (spans
+  go to an in-memory exporter), reporting spans and overhead per iteration
+
+The Tk benchmarks need a display. Without one they start Xvfb if it is
+installed and are skipped otherwise. Set DEEP_RESEARCH_TRANSCRIPTS to a folder
+of messages saved with save_transcript() to benchmark recorded runs as well.
+
+The fastest round of each benchmark is compared with benchmark_baseline.json
+(the minimum is far less sensitive to a busy machine than the mean); a stage
+that got slower by more than the tolerance is reported as a regression. The baseline is machine
+specific, so record it on the machine you compare on.
+
+Usage:
+    python benchmark_deep_research.py                  # run and compare with the baseline
+    python benchmark_deep_research.py --save-baseline  # record a new baseline
+    python -m pytest benchmark_deep_research.py -k results --benchmark-only
+"""
+
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from azure.ai.agents.models import MessageRole, ThreadMessage
+
+from fake_agents_service import FakeAgentsClient, research_reply
+from report_markup import parse_markdown
+from report_pdf import write_report_pdf
+
+HERE = Path(__file__).parent
+BASELINE_PATH = HERE / "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.5  # fraction a timing may grow before it counts as a regression (shared machines are noisy)
+
+# name, report size in bytes, citation count
+TRANSCRIPTS = [
+    ("1kb-0cit", 1_000, 0),
+    ("16kb-50cit", 16_000, 50),
+    ("128kb-500cit", 128_000, 500),
+    ("1mb-5000cit", 1_000_000, 5_000),
+]
+REASONING_STEPS = 20
+LONG_PDF = ("200-pages", 480_000, 2_000)  # report size that lays out to just over 200 pages
+
+
+def rounds_for(name, small=20, large=3):
+    """More rounds for the quick transcripts, so their fastest round is stable"""
+    sizes = {transcript_name: report_bytes for transcript_name, report_bytes, _ in TRANSCRIPTS}
+    return small if sizes.get(name, 1_000_000) <= 16_000 else large
+
+
+@functools.lru_cache(maxsize=None)
+def load_ui_module():
+    """Import ui-deep-research-agent.py (its file name isn't a valid module name)"""
+    spec = importlib.util.spec_from_file_location("ui_deep_research_agent", HERE / "ui-deep-research-agent.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class QueuedRoot:
+    """Stands in for the Tk root: keeps the callbacks the UI schedules instead of running them"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, delay, callback):
+        self.callbacks.append(callback)
+
+
+def headless_ui(agents_client=None):
+    """A DeepResearchAgentUI without widgets, Azure clients, checkpoints or report cache, polling without delay"""
+    ui_module = load_ui_module()
+    ui = ui_module.DeepResearchAgentUI.__new__(ui_module.DeepResearchAgentUI)
+    ui.root = QueuedRoot()
+    ui.agents_client = agents_client
+    ui.tracer = None
+    ui.thread = None
+    ui.is_processing = True
+    ui.polling_interval = 0
+    ui.checkpoints = None
+    ui.report_cache = None
+    ui.polling_summary = None
+    ui.topic_classifier = ui_module.TopicClassifier()
+    ui.watchdog_settings = ui_module.WatchdogSettings()
+    ui.run_durations = ui_module.RunDurations()
+    # Keep the finished report text instead of scheduling a widget update
+    ui.reports = []
+    ui.update_report = ui.reports.append
+    return ui
+
+
+def save_transcript(message, path):
+    """Save a final agent message so it can be benchmarked later"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(message.as_dict(), f, ensure_ascii=False)
+
+
+def recorded_transcripts():
+    """(name, path) for every saved message in DEEP_RESEARCH_TRANSCRIPTS"""
+    folder = os.environ.get("DEEP_RESEARCH_TRANSCRIPTS")
+    if not folder:
+        return []
+    return [(f"recorded-{path.stem}", path) for path in sorted(Path(folder).glob("*.json"))]
+
+
+@functools.lru_cache(maxsize=None)
+def final_message(report_bytes, citations):
+    """The final ThreadMessage of a synthetic research run"""
+    client = FakeAgentsClient(responder=research_reply(report_bytes=report_bytes, citations=citations,
+                                                       reasoning_steps=0))
+    run = client.create_thread_and_process_run(agent_id="asst_benchmark", thread={"messages": [
+        {"role": "user", "content": "Plan my restaurant"}]})
+    return client.messages.get_last_message_by_role(thread_id=run.thread_id, role=MessageRole.AGENT)
+
+
+@functools.lru_cache(maxsize=None)
+def load_message(name):
+    for recorded_name, path in recorded_transcripts():
+        if recorded_name == name:
+            with open(path, "r", encoding="utf-8") as f:
+                return ThreadMessage(json.load(f))
+    for transcript_name, report_bytes, citations in TRANSCRIPTS + [LONG_PDF]:
+        if transcript_name == name:
+            return final_message(report_bytes, citations)
+    raise KeyError(name)
+
+
+@functools.lru_cache(maxsize=None)
+def report_markdown(name):
+    """The report text _process_and_display_results hands to the renderer"""
+    ui = headless_ui()
+    ui._process_and_display_results(load_message(name))
+    return ui.reports[-1]
+
+
+def start_polled_run(name):
+    """A fresh UI and queued run whose messages stream in one poll at a time"""
+    message = load_message(name)
+    text = "\n\n".join(t.text.value for t in message.text_messages)
+    citations = [(a.text, a.url_citation.url, a.url_citation.title) for a in message.url_citation_annotations]
+
+    def respond(query):
+        reply = research_reply(report_bytes=0, citations=0, reasoning_steps=REASONING_STEPS)(query)
+        reply.text, reply.citations = text, citations
+        return reply
+
+    client = FakeAgentsClient(responder=respond)
+    ui = headless_ui(client)
+    ui.thread = client.threads.create()
+    client.messages.create(thread_id=ui.thread.id, role="user", content="Plan my restaurant")
+    run = client.runs.create(thread_id=ui.thread.id, agent_id="asst_benchmark")
+    return ui, run
+
+
+# --- Tk display ---
+
+@pytest.fixture(scope="session")
+def display():
+    """Use the current display, or run Xvfb for the session"""
+    if os.environ.get("DISPLAY"):
+        yield os.environ["DISPLAY"]
+        return
+    if not shutil.which("Xvfb"):
+        pytest.skip("no DISPLAY and Xvfb is not installed")
+
+    number = f":{90 + os.getpid() % 100}"
+    server = subprocess.Popen(["Xvfb", number, "-screen", "0", "1600x1200x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)  # Give the server a moment to accept connections
+    os.environ["DISPLAY"] = number
+    try:
+        yield number
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait()
+
+
+@pytest.fixture(scope="session")
+def report_widget(display):
+    import tkinter as tk
+
+    root = tk.Tk()
+    root.withdraw()
+    text = tk.Text(root, wrap=tk.WORD, width=120, height=40)
+    text.pack()
+    yield root, text
+    root.destroy()
+
+
+# --- benchmarks ---
+
+TRANSCRIPT_NAMES = [name for name, _, _ in TRANSCRIPTS] + [name for name, _ in recorded_transcripts()]
+
+
+@pytest.mark.parametrize("name", TRANSCRIPT_NAMES)
+def test_polling(benchmark, name):
+    benchmark.group = "polling"
+    load_message(name)
+    ui_and_run = {}
+
+    def setup():
+        ui, run = start_polled_run(name)
+        ui_and_run["ui"] = ui
+        return (run,), {}
+
+    benchmark.pedantic(lambda run: ui_and_run["ui"]._execute_research_run(run), setup=setup,
+                       rounds=rounds_for(name, large=5))
+
+    ui = ui_and_run["ui"]
+    assert ui.agents_client.calls["runs.get"] == REASONING_STEPS + 2
+    assert ui.reports[-1].startswith("## Section 1")
+
+
+@pytest.mark.parametrize("name", TRANSCRIPT_NAMES)
+def test_results(benchmark, name):
+    benchmark.group = "results"
+    message = load_message(name)
+    ui = headless_ui()
+
+    benchmark(ui._process_and_display_results, message)
+
+    assert len(ui.reports[-1]) >= len(message.text_messages[0].text.value) // 2
+
+
+@pytest.mark.parametrize("name", TRANSCRIPT_NAMES)
+def test_parse(benchmark, name):
+    benchmark.group = "parse"
+    markdown = report_markdown(name)
+
+    blocks = benchmark.pedantic(parse_markdown, args=(markdown,), rounds=rounds_for(name))
+    assert blocks
+
+
+@pytest.mark.parametrize("name", TRANSCRIPT_NAMES)
+def test_render(benchmark, report_widget, name):
+    benchmark.group = "render"
+    root, text = report_widget
+    renderer = load_ui_module().MarkdownRenderer(text)
+    markdown = report_markdown(name)
+
+    def render():
+        renderer.render_markdown(markdown)
+        root.update_idletasks()
+
+    benchmark.pedantic(render, rounds=rounds_for(name, small=10))
+    assert text.get("1.0", "end-1c")
+
+
+@pytest.mark.parametrize("name", TRANSCRIPT_NAMES)
+def test_pdf(benchmark, tmp_path, name):
+    pytest.importorskip("reportlab")
+    benchmark.group = "pdf"
+    markdown = report_markdown(name)
+    path = tmp_path / "report.pdf"
+
+    benchmark.pedantic(write_report_pdf, args=(markdown, str(path)), rounds=rounds_for(name, small=10))
+    assert path.stat().st_size > 0
+
+
+def test_pdf_pages(benchmark, tmp_path):
+    pytest.importorskip("reportlab")
+    benchmark.group = "pdf"
+    markdown = report_markdown(LONG_PDF[0])
+    path = tmp_path / "report.pdf"
+
+    pages = benchmark.pedantic(write_report_pdf, args=(markdown, str(path)), rounds=3)
+    benchmark.extra_info["pages"] = pages
+    assert pages >= 200
+
+
+@pytest.mark.parametrize("traced", [False, True], ids=["untraced", "traced"])
+def test_tracing(benchmark, traced):
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from research_tracing import TracingSettings, build_tracer_provider
+
+    benchmark.group = "tracing"
+    name = TRANSCRIPTS[0][0]
+    load_message(name)
+    exporter = InMemorySpanExporter()
+    # No tail sampling or rate limits, so every span the loop creates is counted
+    provider = build_tracer_provider(exporter, TracingSettings(span_limits={}))
+    tracer = provider.get_tracer(__name__)
+    ui_and_run = {}
+
+    def setup():
+        ui, run = start_polled_run(name)
+        ui.tracer = tracer if traced else None
+        ui_and_run["ui"] = ui
+        return (run,), {}
+
+    def poll(run):
+        ui = ui_and_run["ui"]
+        if not traced:
+            return ui._execute_research_run(run)
+        with tracer.start_as_current_span("deep_research_request") as span:
+            return ui._execute_research_run(run, span)
+
+    rounds = 20
+    benchmark.pedantic(poll, setup=setup, rounds=rounds)
+    provider.force_flush()
+
+    iterations = ui_and_run["ui"].agents_client.calls["runs.get"]
+    benchmark.extra_info["iterations"] = iterations
+    benchmark.extra_info["spans_per_iteration"] = len(exporter.get_finished_spans()) / rounds / iterations
+    benchmark.extra_info["seconds_per_iteration"] = benchmark.stats.stats.min / iterations
+    provider.shutdown()
+
+
+# --- baseline comparison ---
+
+def fastest_rounds(benchmark_json):
+    """{benchmark name: fastest round in seconds} from a pytest-benchmark JSON report"""
+    return {b["name"]: b["stats"]["min"] for b in benchmark_json["benchmarks"]}
+
+
+def compare_to_baseline(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Rows of (name, baseline, current, ratio, status) for every benchmark in either run"""
+    rows = []
+    for name in sorted(set(current) | set(baseline)):
+        before, after = baseline.get(name), current.get(name)
+        if before is None or after is None:
+            rows.append((name, before, after, None, "new" if before is None else "missing"))
+            continue
+        ratio = after / before if before else float("inf")
+        status = "regression" if ratio > 1 + tolerance else "faster" if ratio < 1 - tolerance else "ok"
+        rows.append((name, before, after, ratio, status))
+    return rows
+
+
+def print_comparison(rows):
+    icons = {"ok": "✅", "faster": "🚀", "regression": "❌", "new": "🆕", "missing": "⚠️"}
+    print(f"\n{'Benchmark':<40} {'Baseline':>10} {'Current':>10} {'Ratio':>7}")
+    for name, before, after, ratio, status in rows:
+        before_text = f"{before * 1000:.1f}ms" if before is not None else "-"
+        after_text = f"{after * 1000:.1f}ms" if after is not None else "-"
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+        print(f"{icons[status]} {name:<38} {before_text:>10} {after_text:>10} {ratio_text:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the deep research client pipeline")
+    parser.add_argument("--save-baseline", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown before a benchmark counts as a regression (0.5 = 50%%)")
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks matching this pytest -k expression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        report_path = os.path.join(folder, "benchmarks.json")
+        pytest_args = [__file__, "-q", "--benchmark-only", f"--benchmark-json={report_path}"]
+        if args.keyword:
+            pytest_args += ["-k", args.keyword]
+        exit_code = pytest.main(pytest_args)
+        if not os.path.exists(report_path):
+            return exit_code or 1
+        with open(report_path, "r", encoding="utf-8") as f:
+            current = fastest_rounds(json.load(f))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"machine": sys.platform, "python": sys.version.split()[0], "timings": current}, f, indent=2)
+            f.write("\n")
+        print(f"💾 Saved {len(current)} benchmark timings to {args.baseline}")
+        return exit_code
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline first")
+        return exit_code
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["timings"]
+    if args.keyword:
+        # Benchmarks filtered out of this run aren't missing
+        baseline = {name: seconds for name, seconds in baseline.items() if name in current}
+
+    rows = compare_to_baseline(current, baseline, args.tolerance)
+    print_comparison(rows)
+    regressions = [row for row in rows if row[4] == "regression"]
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+        return 1
+    print("\n✅ No regressions")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
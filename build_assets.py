@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Asset build step for the menu images and the restaurant logo.
+
+Produces responsive AVIF/WebP/JPEG variants of menu/images/*.png and
+pre-resized logo thumbnails under assets/, plus assets/manifest.json which
+avatar_server.py and local_assistant_gui.py read. Output filenames carry a
+content hash so the server can mark them immutable.
+
+Usage:
+    python build_assets.py           # rebuild anything whose source changed
+    python build_assets.py --force   # rebuild everything
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+
+from PIL import Image, features
+
+ASSETS_DIR = "assets"
+MANIFEST_PATH = os.path.join(ASSETS_DIR, "manifest.json")
+
+MENU_IMAGES = "menu/images/*.png"
+LOGO_PATH = "Scheibmeirs Logo.png"
+
+# Widths for srcset - sources larger than the biggest width are capped, smaller ones are never upscaled
+RESPONSIVE_WIDTHS = (320, 640, 1024)
+
+# Logo sizes used by the desktop GUI header (1x and 2x)
+LOGO_SIZES = ((300, 150), (600, 300))
+
+# Encoder settings per output format, best format first
+FORMATS = {
+    "avif": {"format": "AVIF", "quality": 55, "speed": 6},
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+
+def file_digest(path):
+    """SHA-256 of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def source_key(path):
+    return path.replace(os.sep, "/")
+
+
+def available_formats():
+    """AVIF support depends on how Pillow was built, so only use it when present"""
+    formats = dict(FORMATS)
+    if not features.check("avif"):
+        formats.pop("avif")
+    return formats
+
+
+def write_hashed(image, out_dir, stem, extension, options):
+    """Encode an image and write it as <stem>.<hash>.<ext>, returning the relative path"""
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{stem}.{digest}.{extension}")
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return path.replace(os.sep, "/"), len(data)
+
+
+def build_responsive(source, formats):
+    """Build srcset variants of one menu image in every available format"""
+    with Image.open(source) as original:
+        original.load()
+        width, height = original.size
+        # JPEG has no alpha channel, and the menu photos don't need one
+        image = original.convert("RGB")
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    widths = sorted({min(w, width) for w in RESPONSIVE_WIDTHS})
+    variants = {extension: [] for extension in formats}
+    for target_width in widths:
+        target_height = round(height * target_width / width)
+        resized = image if target_width == width else image.resize(
+            (target_width, target_height), Image.Resampling.LANCZOS
+        )
+        for extension, options in formats.items():
+            path, size = write_hashed(resized, os.path.join(ASSETS_DIR, "menu"),
+                                      f"{stem}-{target_width}", extension, options)
+            variants[extension].append({"width": target_width, "height": target_height,
+                                        "path": path, "bytes": size})
+    return {"width": width, "height": height, "variants": variants}
+
+
+def build_logo(source):
+    """Build the logo thumbnails the GUI header displays"""
+    with Image.open(source) as original:
+        original.load()
+        image = original.copy()
+
+    thumbnails = {}
+    for width, height in LOGO_SIZES:
+        # Same resize the GUI used to do at every launch
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        path, size = write_hashed(resized, os.path.join(ASSETS_DIR, "logo"),
+                                  f"scheibmeirs-logo-{width}x{height}", "png", {"format": "PNG", "optimize": True})
+        thumbnails[f"{width}x{height}"] = {"path": path, "bytes": size}
+    return {"width": image.width, "height": image.height, "thumbnails": thumbnails}
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Read the asset manifest, returning an empty one if it hasn't been built"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"images": {}, "logo": None}
+
+
+def logo_thumbnail(width, height, manifest=None):
+    """Path of a pre-sized logo thumbnail, or None if it hasn't been built"""
+    manifest = manifest if manifest is not None else load_manifest()
+    logo = manifest.get("logo") or {}
+    entry = logo.get("thumbnails", {}).get(f"{width}x{height}")
+    if entry and os.path.exists(entry["path"]):
+        return entry["path"]
+    return None
+
+
+def remove_stale_outputs(manifest):
+    """Delete generated files that the new manifest no longer references"""
+    referenced = set()
+    for entry in manifest["images"].values():
+        for variants in entry["variants"].values():
+            referenced.update(variant["path"] for variant in variants)
+    if manifest.get("logo"):
+        referenced.update(thumb["path"] for thumb in manifest["logo"]["thumbnails"].values())
+
+    removed = 0
+    for subdir in ("menu", "logo"):
+        for path in glob.glob(os.path.join(ASSETS_DIR, subdir, "*")):
+            if path.replace(os.sep, "/") not in referenced:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def build(force=False):
+    """Build every asset whose source changed and rewrite the manifest"""
+    previous = load_manifest()
+    formats = available_formats()
+    manifest = {"formats": list(formats), "images": {}, "logo": None}
+
+    for source in sorted(glob.glob(MENU_IMAGES)):
+        key = source_key(source)
+        digest = file_digest(source)
+        cached = previous.get("images", {}).get(key)
+        if not force and cached and cached.get("source_sha256") == digest \
+                and list(cached["variants"]) == list(formats):
+            manifest["images"][key] = cached
+            print(f"✓ {key} unchanged")
+            continue
+        entry = build_responsive(source, formats)
+        entry["source_sha256"] = digest
+        entry["source_bytes"] = os.path.getsize(source)
+        manifest["images"][key] = entry
+        smallest = min(v["bytes"] for variants in entry["variants"].values() for v in variants)
+        print(f"🖼️  {key}: {entry['source_bytes']:,} bytes -> {sum(len(v) for v in entry['variants'].values())} "
+              f"variants (smallest {smallest:,} bytes)")
+
+    if os.path.exists(LOGO_PATH):
+        digest = file_digest(LOGO_PATH)
+        cached = previous.get("logo")
+        if not force and cached and cached.get("source_sha256") == digest:
+            manifest["logo"] = cached
+            print(f"✓ {LOGO_PATH} unchanged")
+        else:
+            manifest["logo"] = build_logo(LOGO_PATH)
+            manifest["logo"]["source_sha256"] = digest
+            print(f"🏷️  {LOGO_PATH}: built {', '.join(manifest['logo']['thumbnails'])} thumbnails")
+
+    removed = remove_stale_outputs(manifest)
+    if removed:
+        print(f"🧹 Removed {removed} stale files")
+
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"📄 Wrote {MANIFEST_PATH}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build responsive image variants and logo thumbnails")
+    parser.add_argument("--force", action="store_true", help="Rebuild every asset even if unchanged")
+    args = parser.parse_args()
+
+    # Paths in the manifest are relative to the repository root
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        build(force=args.force)
+    except OSError as e:
+        print(f"❌ Asset build failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
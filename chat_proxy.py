@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Chat Proxy - Streams Azure OpenAI chat completions to the avatar page through avatar_server.py
+
+The browser posts its conversation to /api/chat and gets the upstream server-sent
+events back unchanged, so the Azure OpenAI key (RESTAURANT_API_KEY) is not sent to
+the page; the avatar's Speech connection uses AVATAR_SPEECH_KEY instead. Upstream
+connections are pooled, concurrent streams are capped per client, and
+time-to-first-token is recorded for every request. Completed answers to common
+questions are cached and replayed as a stream, and can be prewarmed from
+evaluation_queries.jsonl.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from local_metrics import REGISTRY, percentile
+
+API_VERSION = '2024-02-15-preview'
+
+# Only these request fields are forwarded; endpoint, key and deployment stay server-side
+FORWARDED_FIELDS = ('messages', 'tools', 'tool_choice', 'dataSources', 'temperature', 'top_p', 'max_tokens')
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MAX_CONCURRENT_PER_CLIENT = 2
+UPSTREAM_TIMEOUT = (5, 60)  # (connect, read) seconds
+LATENCY_HISTORY = 200
+
+DEFAULT_CACHE_ENTRIES = 256
+DEFAULT_CACHE_TTL = 60 * 60  # seconds
+PREWARM_QUERIES_FILE = 'evaluation_queries.jsonl'
+PREWARM_CLIENT_ID = 'prewarm'
+
+# Served on avatar_server.py's /metrics
+CHAT_FIRST_TOKEN = REGISTRY.histogram('chat_time_to_first_token_seconds', 'From request to first streamed token',
+                                      ['cache'])
+CHAT_STREAM = REGISTRY.histogram('chat_stream_seconds', 'Whole streamed answer, request to last event', ['cache'])
+CHAT_ERRORS = REGISTRY.counter('chat_upstream_errors', 'Chat requests that failed upstream')
+CHAT_REJECTED = REGISTRY.counter('chat_rejected', 'Chat requests refused by the per-client concurrency limit')
+
+
+class ChatProxyError(Exception):
+    """A request the proxy refuses before any event is streamed"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+
+class ClientLimiter:
+    """Caps concurrent streams per client so one page can't hog the upstream pool"""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.active = {}
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, client_id):
+        with self._lock:
+            count = self.active.get(client_id, 0)
+            if count >= self.max_concurrent:
+                self.rejected += 1
+                CHAT_REJECTED.inc()
+                return False
+            self.active[client_id] = count + 1
+            return True
+
+    def release(self, client_id):
+        with self._lock:
+            count = self.active.get(client_id, 0) - 1
+            if count > 0:
+                self.active[client_id] = count
+            else:
+                self.active.pop(client_id, None)
+
+
+class LatencyStats:
+    """Rolling time-to-first-token and total stream time"""
+
+    def __init__(self, history=LATENCY_HISTORY):
+        self.ttft = deque(maxlen=history)
+        self.total = deque(maxlen=history)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, ttft, total, cache='miss'):
+        with self._lock:
+            self.requests += 1
+            if ttft is not None:
+                self.ttft.append(ttft)
+            self.total.append(total)
+        if ttft is not None:
+            CHAT_FIRST_TOKEN.observe(ttft, cache=cache)
+        CHAT_STREAM.observe(total, cache=cache)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+        CHAT_ERRORS.inc()
+
+    def summary(self):
+        with self._lock:
+            ttft = list(self.ttft)
+            total = list(self.total)
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'ttft_p50': percentile(ttft, 0.5),
+                'ttft_p95': percentile(ttft, 0.95),
+                'ttft_last': ttft[-1] if ttft else None,
+                'total_p50': percentile(total, 0.5),
+                'total_p95': percentile(total, 0.95),
+            }
+
+
+def has_token(event_data):
+    """Check whether an SSE data payload carries content or a tool call"""
+    try:
+        payload = json.loads(event_data)
+    except ValueError:
+        return False
+    for choice in payload.get('choices') or []:
+        # Plain completions use choice.delta, the data-source extension uses choice.messages[].delta
+        deltas = [choice.get('delta') or {}] + [m.get('delta') or {} for m in choice.get('messages') or []]
+        for delta in deltas:
+            if delta.get('content') or delta.get('tool_calls'):
+                return True
+    return False
+
+
+def normalize_text(text):
+    """Lower-case, collapse whitespace and drop trailing punctuation so trivially different questions match"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip(' .?!')
+
+
+def normalize_message(message):
+    """Reduce a chat message to the parts that decide the answer"""
+    content = message.get('content')
+    if isinstance(content, list):
+        # Multi-part content; images make the question uncacheable
+        if any(part.get('type') != 'text' for part in content):
+            return None
+        content = ' '.join(part.get('text', '') for part in content)
+    normalized = {'role': message.get('role'), 'content': normalize_text(content or '')}
+    if message.get('tool_calls'):
+        # Tool call ids are random per response, so only the call itself counts
+        normalized['tool_calls'] = [
+            [call.get('function', {}).get('name'), call.get('function', {}).get('arguments')]
+            for call in message['tool_calls']
+        ]
+    return normalized
+
+
+def conversation_tail(messages):
+    """Messages since the last finished assistant reply, e.g. the new question plus any tool round trip"""
+    start = len(messages)
+    while start > 0:
+        previous = messages[start - 1]
+        if previous.get('role') == 'assistant' and not previous.get('tool_calls'):
+            break
+        if previous.get('role') == 'system':
+            break
+        start -= 1
+    return messages[start:]
+
+
+class ChatResponseCache:
+    """LRU + TTL cache of complete streamed answers, keyed on the conversation tail and data-source config"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, payload, deployment):
+        """Cache key for a request, or None when it shouldn't be cached"""
+        messages = payload.get('messages') or []
+        tail = conversation_tail(messages)
+        if not tail or tail[-1].get('role') != 'user':
+            return None
+        normalized_tail = [normalize_message(m) for m in tail]
+        if any(m is None for m in normalized_tail):
+            return None
+
+        # Data sources minus their secrets, so rotating a search key keeps the cache warm
+        data_sources = [
+            {**source, 'parameters': {k: v for k, v in (source.get('parameters') or {}).items() if k != 'key'}}
+            for source in payload.get('dataSources') or []
+        ]
+        material = {
+            'deployment': deployment,
+            'system': [m.get('content') for m in messages if m.get('role') == 'system'],
+            'tail': normalized_tail,
+            'tools': payload.get('tools'),
+            'tool_choice': payload.get('tool_choice'),
+            'dataSources': data_sources,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            return entry is not None and time.monotonic() - entry[0] <= self.ttl
+
+    def put(self, key, events):
+        with self._lock:
+            self.entries[key] = (time.monotonic(), tuple(events))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def summary(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+def load_prewarm_queries(path=PREWARM_QUERIES_FILE, limit=20):
+    """First `limit` distinct questions from an evaluation queries JSONL file"""
+    queries = []
+    seen = set()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if len(queries) >= limit:
+                    break
+                try:
+                    query = json.loads(line).get('query')
+                except ValueError:
+                    continue
+                if query and normalize_text(query) not in seen:
+                    seen.add(normalize_text(query))
+                    queries.append(query)
+    except FileNotFoundError:
+        print(f"Prewarm queries file not found: {path}")
+    return queries
+
+
+class ChatStream:
+    """An open upstream completion whose events are relayed to one client"""
+
+    cache_status = 'miss'
+
+    def __init__(self, proxy, response, client_id, started, cache_key=None):
+        self.proxy = proxy
+        self.response = response
+        self.client_id = client_id
+        self.started = started
+        self.cache_key = cache_key
+        self.first_token_time = None
+        self._closed = False
+
+    def events(self):
+        """Yield each upstream SSE event as bytes, ready to write to the client"""
+        recorded = [] if self.cache_key else None
+        try:
+            for line in self.response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                if self.first_token_time is None and line.startswith(b'data:'):
+                    data = line[5:].strip()
+                    if data != b'[DONE]' and has_token(data):
+                        self.first_token_time = time.perf_counter() - self.started
+                event = line + b'\n\n'
+                if recorded is not None:
+                    recorded.append(event)
+                yield event
+        except requests.RequestException as e:
+            # The status line is already sent, so the client just sees the stream end early
+            print(f"Chat upstream stream failed: {e}")
+            self.proxy.stats.record_error()
+            return
+
+        # Only complete answers are worth replaying
+        if recorded and recorded[-1].startswith(b'data: [DONE]'):
+            self.proxy.cache.put(self.cache_key, recorded)
+
+    def close(self):
+        """Return the connection to the pool and free the client's slot"""
+        if self._closed:
+            return
+        self._closed = True
+        self.response.close()
+        self.proxy.limiter.release(self.client_id)
+        self.proxy.stats.record(self.first_token_time, time.perf_counter() - self.started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CachedChatStream:
+    """Replays a cached answer with the same interface as ChatStream"""
+
+    cache_status = 'hit'
+
+    def __init__(self, proxy, events):
+        self.proxy = proxy
+        self._events = events
+        self.started = time.perf_counter()
+        self._closed = False
+
+    def events(self):
+        return iter(self._events)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        elapsed = time.perf_counter() - self.started
+        self.proxy.stats.record(elapsed, elapsed, cache='hit')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ChatProxy:
+    """Pooled, rate-limited relay for streaming chat completions"""
+
+    def __init__(self, endpoint, api_key, deployment, api_version=API_VERSION,
+                 pool_size=DEFAULT_POOL_SIZE, max_concurrent_per_client=DEFAULT_MAX_CONCURRENT_PER_CLIENT,
+                 cache=None):
+        self.endpoint = (endpoint or '').rstrip('/')
+        self.api_key = api_key or ''
+        self.deployment = deployment
+        self.api_version = api_version
+
+        # One session keeps TLS connections to the upstream alive between requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.limiter = ClientLimiter(max_concurrent_per_client)
+        self.stats = LatencyStats()
+        self.cache = cache
+
+        # Queries to prewarm once the first real request shows us the page's system prompt and tools
+        self.prewarm_queries = []
+        self.prewarm_thread = None
+        self._prewarm_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Create a proxy from the same environment variables the avatar page used"""
+        return cls(
+            endpoint=os.getenv('RESTAURANT_EVALUATION_MODEL_ENDPOINT', ''),
+            api_key=os.getenv('RESTAURANT_API_KEY', ''),
+            deployment=os.getenv('RESTAURANT_EVALUATION_MODEL', 'gpt-4'),
+            cache=ChatResponseCache(),
+        )
+
+    @property
+    def configured(self):
+        return bool(self.endpoint and self.api_key and self.deployment)
+
+    def build_payload(self, request_body):
+        """Validate the client's request and keep only the fields we forward"""
+        if not isinstance(request_body, dict) or not isinstance(request_body.get('messages'), list):
+            raise ChatProxyError(400, "Request body must be a JSON object with a 'messages' list")
+        payload = {field: request_body[field] for field in FORWARDED_FIELDS if field in request_body}
+        payload['stream'] = True
+        return payload
+
+    def upstream_url(self, payload):
+        # Bring-your-own-data requests go to the extensions endpoint
+        path = 'extensions/chat/completions' if payload.get('dataSources') else 'chat/completions'
+        return f"{self.endpoint}/openai/deployments/{self.deployment}/{path}?api-version={self.api_version}"
+
+    def open(self, request_body, client_id):
+        """Start an upstream completion, raising ChatProxyError if it can't be streamed"""
+        if not self.configured:
+            raise ChatProxyError(503, 'Chat proxy is not configured on the server')
+        payload = self.build_payload(request_body)
+
+        cache_key = self.cache.key(payload, self.deployment) if self.cache is not None else None
+        if cache_key:
+            events = self.cache.get(cache_key)
+            if events is not None:
+                return CachedChatStream(self, events)
+
+        if not self.limiter.acquire(client_id):
+            raise ChatProxyError(429, 'Too many concurrent chat requests', retry_after=1)
+
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                self.upstream_url(payload),
+                headers={'api-key': self.api_key, 'Content-Type': 'application/json'},
+                data=json.dumps(payload),
+                stream=True,
+                timeout=UPSTREAM_TIMEOUT,
+            )
+        except requests.RequestException as e:
+            self.limiter.release(client_id)
+            self.stats.record_error()
+            raise ChatProxyError(502, f'Upstream request failed: {e}')
+
+        if response.status_code != 200:
+            message = response.text[:1000]
+            retry_after = response.headers.get('Retry-After')
+            response.close()
+            self.limiter.release(client_id)
+            self.stats.record_error()
+            raise ChatProxyError(response.status_code, message, retry_after=retry_after)
+
+        return ChatStream(self, response, client_id, started, cache_key)
+
+    def maybe_prewarm(self, request_body):
+        """Start prewarming in the background using this request's system prompt, tools and data sources"""
+        if self.cache is None or not self.prewarm_queries:
+            return
+        with self._prewarm_lock:
+            if self.prewarm_thread is not None:
+                return
+            self.prewarm_thread = threading.Thread(target=self.prewarm, args=(request_body,), daemon=True)
+            self.prewarm_thread.start()
+
+    def prewarm(self, template):
+        """Fetch and cache answers to the prewarm queries, one at a time so real users keep priority"""
+        base_messages = [m for m in template.get('messages') or [] if m.get('role') == 'system']
+        warmed = 0
+        for query in self.prewarm_queries:
+            body = dict(template, messages=base_messages + [{'role': 'user', 'content': query}])
+            try:
+                payload = self.build_payload(body)
+                if self.cache.key(payload, self.deployment) in self.cache:
+                    continue
+                with self.open(body, PREWARM_CLIENT_ID) as stream:
+                    for _ in stream.events():
+                        pass
+                warmed += 1
+            except ChatProxyError as e:
+                print(f"Prewarm failed for {query!r}: {e.status} {e.message[:200]}")
+        print(f"Prewarmed {warmed} chat answers")
+        return warmed
+
+    def summary(self):
+        summary = self.stats.summary()
+        summary['rejected'] = self.limiter.rejected
+        if self.cache is not None:
+            summary['cache'] = self.cache.summary()
+        return summary
+
+    def close(self):
+        self.session.close()
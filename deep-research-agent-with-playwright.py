@@ -5,6 +5,11 @@ from azure.ai.projects import AIProjectClient
 from azure.identity import DefaultAzureCredential
 from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import DeepResearchTool, MessageRole, ThreadMessage, McpTool
+from azure.core.exceptions import HttpResponseError
+
+from mcp_approval import ApprovalPolicy, ApprovalStats, submit_approvals
+from mcp_pool import PoolClient, count_page_loads
+from run_watchdog import cancel_run
 
 # Load environment variables from .env file if they're not already set
 load_dotenv()
@@ -73,6 +78,21 @@ def fetch_and_print_new_agent_response(
     return response.id
 
 
+def create_playwright_tool(server_url: str) -> McpTool:
+    """
+    Create the Playwright MCP tool for a server URL.
+    
+    "never" runs browser actions unasked; "always" sends every call through the approval policy.
+    """
+    playwright_mcp_tool = McpTool(
+        server_label="playwright",
+        server_url=server_url,
+        allowed_tools=[]  # Empty list means all tools are allowed
+    )
+    playwright_mcp_tool.set_approval_mode(os.environ.get("MCP_APPROVAL_MODE", "never"))
+    return playwright_mcp_tool
+
+
 def create_research_summary(
         message : ThreadMessage,
 ) -> None:
@@ -155,13 +175,12 @@ if __name__ == "__main__":
     # Set up Playwright MCP server connection
     # This requires a running Playwright MCP server or you can configure to use a remote endpoint
     playwright_mcp_url = os.environ.get("PLAYWRIGHT_MCP_URL", "http://localhost:8931/mcp")
-    playwright_mcp_tool = McpTool(
-        server_label="playwright",
-        server_url=playwright_mcp_url,
-        allowed_tools=[]  # Empty list means all tools are allowed
-    )
-    # Set approval mode to never require approval for browser actions
-    playwright_mcp_tool.set_approval_mode("never")
+    playwright_mcp_tool = create_playwright_tool(playwright_mcp_url)
+    # With a pool manager (mcp_pool.py) running, every run leases the least busy of its servers instead
+    pool_url = os.environ.get("PLAYWRIGHT_MCP_POOL_URL")
+    mcp_pool = PoolClient(pool_url) if pool_url else None
+    # Answers approval requests in process from the MCP_APPROVED_* allow-lists
+    approval_policy = ApprovalPolicy.from_env()
 
     # Create Agent with both Deep Research and Playwright MCP tools
     with project_client:
@@ -238,34 +257,65 @@ Use your browser automation capabilities to gather visual and interactive inform
 
                 print(f"Processing the message... This may take a few minutes to finish. Be patient!")
                 
-                # Poll the run as long as run status is queued or in progress
-                run = agents_client.runs.create(
-                    thread_id=thread.id, 
-                    agent_id=agent.id,
-                    tool_resources=playwright_mcp_tool.resources
-                )
-                last_message_id = None
-                
-                while run.status in ("queued", "in_progress"):
-                    time.sleep(1)
-                    run = agents_client.runs.get(thread_id=thread.id, run_id=run.id)
-
-                    last_message_id = fetch_and_print_new_agent_response(
-                        thread_id=thread.id,
-                        agents_client=agents_client,
-                        last_message_id=last_message_id,
+                lease = None
+                run = None
+                if mcp_pool:
+                    lease = mcp_pool.lease()
+                    print(f"🌐 Browsing with pooled Playwright MCP server {lease['url']}")
+                try:
+                    if lease and lease["url"] != playwright_mcp_tool.server_url:
+                        # The server URL is part of the agent's tool definition, so point the agent at this one
+                        playwright_mcp_tool = create_playwright_tool(lease["url"])
+                        agents_client.update_agent(
+                            agent.id, tools=deep_research_tool.definitions + playwright_mcp_tool.definitions
+                        )
+
+                    # Poll the run as long as run status is queued or in progress
+                    run = agents_client.runs.create(
+                        thread_id=thread.id, 
+                        agent_id=agent.id,
+                        tool_resources=playwright_mcp_tool.resources
                     )
-                    print(f"Run status: {run.status}")
-
-                # Handle approval requirements if needed
-                if run.status == "requires_action":
-                    print(f"Tool requires approval. Action details available but auto-approval not implemented.")
-                    print("Please manually approve the action or modify approval settings.")
-                    # For now, we'll continue without implementing complex approval logic
-                    continue
-
-                # Once the run is finished, print the final status and ID
-                print(f"Run finished with status: {run.status}, ID: {run.id}")
+                    last_message_id = None
+                    approval_stats = ApprovalStats()
+
+                    while run.status in ("queued", "in_progress", "requires_action"):
+                        if run.status == "requires_action":
+                            # Answer the MCP approval request right away so the run doesn't stall
+                            try:
+                                run = submit_approvals(agents_client, thread.id, run, approval_policy, approval_stats)
+                            except (ValueError, HttpResponseError) as e:
+                                # Nothing else will answer the run, so cancel it rather than leave it in requires_action
+                                print(f"❌ {e}")
+                                run, _ = cancel_run(agents_client, thread.id, run.id)
+                                break
+                            continue
+                        time.sleep(1)
+                        run = agents_client.runs.get(thread_id=thread.id, run_id=run.id)
+
+                        last_message_id = fetch_and_print_new_agent_response(
+                            thread_id=thread.id,
+                            agents_client=agents_client,
+                            last_message_id=last_message_id,
+                        )
+                        print(f"Run status: {run.status}")
+
+                    # Once the run is finished, print the final status and ID
+                    print(f"Run finished with status: {run.status}, ID: {run.id}")
+                    print(approval_stats.summary())
+                finally:
+                    if lease:
+                        # Released even when the run or the script fails, so the server doesn't stay leased
+                        page_loads = 0
+                        if run is not None:
+                            # Page loads tell the pool when the server's browser is due for a restart
+                            try:
+                                page_loads = count_page_loads(
+                                    agents_client.run_steps.list(thread_id=thread.id, run_id=run.id))
+                            except HttpResponseError:
+                                pass
+                        mcp_pool.release(lease["lease"], page_loads)
+                        print(f"🌐 Released {lease['url']} after {page_loads} page loads")
 
                 if run.status == "failed":
                     print(f"Run failed: {run.last_error}")
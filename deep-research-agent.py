@@ -1,4 +1,4 @@
-import os, time, re
+import argparse, os, time, re
 from typing import Optional
 from dotenv import load_dotenv
 from azure.ai.projects import AIProjectClient
@@ -6,9 +6,13 @@ from azure.identity import DefaultAzureCredential
 from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import DeepResearchTool, MessageRole, ThreadMessage
 
+from research_checkpoint import ResearchCheckpointStore
+
 # Load environment variables from .env file if they're not already set
 load_dotenv()
 
+POLLING_INTERVAL = 1  # seconds between run status checks
+
 
 def convert_citations_to_superscript(markdown_content):
     """
@@ -38,6 +42,7 @@ def fetch_and_print_new_agent_response(
     thread_id: str,
     agents_client: AgentsClient,
     last_message_id: Optional[str] = None,
+    on_progress=None,
 ) -> Optional[str]:
     """
     Fetch the interim agent responses and citations from a thread and print them to the terminal.
@@ -47,6 +52,8 @@ def fetch_and_print_new_agent_response(
         agents_client (AgentsClient): The Azure AI agents client instance
         last_message_id (Optional[str], optional): ID of the last processed message 
             to avoid duplicates. Defaults to None.
+        on_progress (callable, optional): Called with (message_id, printed_text) for each
+            progress message shown, e.g. to checkpoint it. Defaults to None.
             
     Returns:
         Optional[str]: The ID of the latest message if new content was found, 
@@ -63,12 +70,17 @@ def fetch_and_print_new_agent_response(
     if not any(t.text.value.startswith("cot_summary:") for t in response.text_messages):
         return last_message_id    
 
-    print("\nAGENT>")
-    print("\n".join(t.text.value.replace("cot_summary:", "Reasoning:") for t in response.text_messages))
-    print()
+    lines = ["\nAGENT>"]
+    lines.append("\n".join(t.text.value.replace("cot_summary:", "Reasoning:") for t in response.text_messages))
+    lines.append("")
 
     for ann in response.url_citation_annotations:
-        print(f"Citation: [{ann.url_citation.title}]({ann.url_citation.url})")
+        lines.append(f"Citation: [{ann.url_citation.title}]({ann.url_citation.url})")
+
+    progress_text = "\n".join(lines)
+    print(progress_text)
+    if on_progress:
+        on_progress(response.id, progress_text)
 
     return response.id
 
@@ -135,102 +147,170 @@ def create_research_summary(
     print("="*80)
 
 
-if __name__ == "__main__":
-    project_client = AIProjectClient(
-        endpoint=os.environ["DEEP_RESEARCH_PROJECT_ENDPOINT"],
-        subscription_id=os.environ["AZURE_SUBSCRIPTION_ID"],
-        resource_group_name=os.environ["AZURE_RESOURCE_GROUP_NAME"],
-        project_name=os.environ["AZURE_PROJECT_NAME"],
-        credential=DefaultAzureCredential(),
-    )
+def complete_run(agents_client, thread_id, run, last_message_id=None, checkpoints=None, resumed=False):
+    """Poll a run to the end, printing (and checkpointing) progress, then print the research report"""
+    def checkpoint_progress(message_id, text):
+        checkpoints.record_progress(run.id, message_id, text, status=run.status)
+
+    if resumed:
+        # Catch up on whatever the agent posted while we were away before waiting for the next poll
+        last_message_id = fetch_and_print_new_agent_response(
+            thread_id=thread_id,
+            agents_client=agents_client,
+            last_message_id=last_message_id,
+            on_progress=checkpoint_progress if checkpoints else None,
+        )
+
+    # Poll the run as long as run status is queued or in progress
+    while run.status in ("queued", "in_progress"):
+        time.sleep(POLLING_INTERVAL)
+        run = agents_client.runs.get(thread_id=thread_id, run_id=run.id)
+
+        last_message_id = fetch_and_print_new_agent_response(
+            thread_id=thread_id,
+            agents_client=agents_client,
+            last_message_id=last_message_id,
+            on_progress=checkpoint_progress if checkpoints else None,
+        )
+        print(f"Run status: {run.status}")
 
-    conn_id = project_client.connections.get(name=os.environ["BING_RESOURCE_NAME"]).id
+    # Once the run is finished, print the final status and ID
+    print(f"Run finished with status: {run.status}, ID: {run.id}")
+    if checkpoints:
+        checkpoints.update_status(run.id, run.status)
 
-    # Initialize a Deep Research tool with Bing Connection ID and Deep Research model deployment name
-    deep_research_tool = DeepResearchTool(
-        bing_grounding_connection_id=conn_id,
-        deep_research_model=os.environ["DEEP_RESEARCH_MODEL_DEPLOYMENT_NAME"],
+    if run.status == "failed":
+        print(f"Run failed: {run.last_error}")
+        return run  # Allow user to try again
+
+    # Fetch the final message from the agent in the thread and create a research summary
+    final_message = agents_client.messages.get_last_message_by_role(
+        thread_id=thread_id, role=MessageRole.AGENT
     )
+    if final_message:
+        create_research_summary(final_message)
+    return run
 
-    # Create Agent with the Deep Research tool and process Agent run
-    with project_client:
-
-        with project_client.agents as agents_client:
-            # Create a new agent that has the Deep Research tool attached.
-            # NOTE: To add Deep Research to an existing agent, fetch it with `get_agent(agent_id)` and then,
-            # update the agent with the Deep Research tool.
-            agent = agents_client.create_agent(
-                # This model runs the actual agent, and it calls the Deep Research model as a tool
-                model=os.environ["AGENT_MODEL_DEPLOYMENT_NAME"],
-                name="restaurant-researcher",
-                instructions="You are a helpful agent that assists in doing research for restaurants and other businesses.",
-                tools=deep_research_tool.definitions,
-            )
-
-            # [END create_agent_with_deep_research_tool]
-            print(f"Created agent, ID: {agent.id}")
-
-            # Create thread for communication
-            thread = agents_client.threads.create()
-            print(f"Created thread, ID: {thread.id}")
-
-            # Interactive conversation loop
-            while True:
-                # Get user input for the message
-                if 'message' not in locals():
-                    # First message
-                    user_content = "I have rented a new storefront at 340 Jefferson St. in Fisherman's Wharf in San Francisco to open a new outpost of my restaurant chain, Scheibmeir's Steaks, Snacks and Sticks. Please help me design a strategy and theme to operate the new restaurant, including but not limited to the cuisine and menu to offer, staff recruitment requirements including salary, and marketing and promotional strategies. Provide one best option rather than multiple choices. Based on the option help me also generate a FAQ document for the customer to understand the details of the restaurant."
-                else:
-                    # Subsequent messages
-                    print("\n" + "-"*80)
-                    print("Would you like to continue the conversation?")
-                    print("Enter your message (or 'quit' to exit):")
-                    user_content = input("> ").strip()
-                    
-                    if user_content.lower() in ['quit', 'exit', 'q']:
-                        break
-                    
-                    if not user_content:
-                        print("Empty message. Please enter a message or 'quit' to exit.")
-                        continue
-
-                # Create message to thread
-                message = agents_client.messages.create(
-                    thread_id=thread.id,
-                    role="user",
-                    content=user_content,
-                )
-
-                print(f"Processing the message... This may take a few minutes to finish. Be patient!")
-                # Poll the run as long as run status is queued or in progress
-                run = agents_client.runs.create(thread_id=thread.id, agent_id=agent.id)
-                last_message_id = None
-                while run.status in ("queued", "in_progress"):
-                    time.sleep(1)
-                    run = agents_client.runs.get(thread_id=thread.id, run_id=run.id)
-
-                    last_message_id = fetch_and_print_new_agent_response(
-                        thread_id=thread.id,
-                        agents_client=agents_client,
-                        last_message_id=last_message_id,
-                    )
-                    print(f"Run status: {run.status}")
-
-                # Once the run is finished, print the final status and ID
-                print(f"Run finished with status: {run.status}, ID: {run.id}")
-
-                if run.status == "failed":
-                    print(f"Run failed: {run.last_error}")
-                    continue  # Allow user to try again
-
-                # Fetch the final message from the agent in the thread and create a research summary
-                final_message = agents_client.messages.get_last_message_by_role(
-                    thread_id=thread.id, role=MessageRole.AGENT
-                )
-                if final_message:
-                    create_research_summary(final_message)
-
-            # Clean-up and delete the agent once the conversation is finished.
-            # NOTE: Comment out this line if you plan to reuse the agent later.
-            agents_client.delete_agent(agent.id)
-            print("Conversation ended. Deleted agent.")
\ No newline at end of file
+
+def run_conversation(agents_client, model, tools, checkpoints=None, resume=None):
+    """Interactive research conversation with a new agent; deletes the agent when the user quits
+
+    With a checkpoint to resume, reattaches to its agent, thread and in-flight run instead,
+    replaying the progress already shown before the client went away.
+    """
+    if resume:
+        agent_id, thread_id = resume.agent_id, resume.thread_id
+        print(f"⏯️ Resuming run {resume.run_id} on thread {thread_id}")
+        # Progress shown before the interruption comes from the local store, not the service
+        for progress_text in checkpoints.progress(resume.run_id):
+            print(progress_text)
+        run = agents_client.runs.get(thread_id=thread_id, run_id=resume.run_id)
+        complete_run(agents_client, thread_id, run, resume.last_message_id, checkpoints, resumed=True)
+    else:
+        # Create a new agent that has the Deep Research tool attached.
+        # NOTE: To add Deep Research to an existing agent, fetch it with `get_agent(agent_id)` and then,
+        # update the agent with the Deep Research tool.
+        agent = agents_client.create_agent(
+            # This model runs the actual agent, and it calls the Deep Research model as a tool
+            model=model,
+            name="restaurant-researcher",
+            instructions="You are a helpful agent that assists in doing research for restaurants and other businesses.",
+            tools=tools,
+        )
+        agent_id = agent.id
+
+        # [END create_agent_with_deep_research_tool]
+        print(f"Created agent, ID: {agent.id}")
+
+        # Create thread for communication
+        thread = agents_client.threads.create()
+        thread_id = thread.id
+        print(f"Created thread, ID: {thread.id}")
+
+    # Interactive conversation loop
+    first_message = resume is None
+    while True:
+        # Get user input for the message
+        if first_message:
+            user_content = "I have rented a new storefront at 340 Jefferson St. in Fisherman's Wharf in San Francisco to open a new outpost of my restaurant chain, Scheibmeir's Steaks, Snacks and Sticks. Please help me design a strategy and theme to operate the new restaurant, including but not limited to the cuisine and menu to offer, staff recruitment requirements including salary, and marketing and promotional strategies. Provide one best option rather than multiple choices. Based on the option help me also generate a FAQ document for the customer to understand the details of the restaurant."
+            first_message = False
+        else:
+            # Subsequent messages
+            print("\n" + "-"*80)
+            print("Would you like to continue the conversation?")
+            print("Enter your message (or 'quit' to exit):")
+            user_content = input("> ").strip()
+            
+            if user_content.lower() in ['quit', 'exit', 'q']:
+                break
+            
+            if not user_content:
+                print("Empty message. Please enter a message or 'quit' to exit.")
+                continue
+
+        # Create message to thread
+        agents_client.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=user_content,
+        )
+
+        print(f"Processing the message... This may take a few minutes to finish. Be patient!")
+        run = agents_client.runs.create(thread_id=thread_id, agent_id=agent_id)
+        if checkpoints:
+            # Saved before the first poll, so a crash from here on can be resumed
+            checkpoints.start("cli", agent_id, thread_id, run.id, user_content, run.status)
+        complete_run(agents_client, thread_id, run, checkpoints=checkpoints)
+
+    # Clean-up and delete the agent once the conversation is finished.
+    # NOTE: Comment out this line if you plan to reuse the agent later.
+    agents_client.delete_agent(agent_id)
+    print("Conversation ended. Deleted agent.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deep Research agent for Scheibmeir's")
+    parser.add_argument("--offline", action="store_true",
+                        help="Run against the local fake agents service instead of Azure")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                        help="Reattach to an interrupted run (the most recent one if no run ID is given)")
+    args = parser.parse_args()
+    if args.offline and args.resume:
+        parser.error("--resume needs the Azure service; offline runs only live in memory")
+
+    if args.offline:
+        # Scripted progress messages and a cited report, no Azure resources needed
+        from fake_agents_service import FakeAgentsClient, research_reply
+
+        with FakeAgentsClient(responder=research_reply()) as agents_client:
+            run_conversation(agents_client, model="offline", tools=[])
+    else:
+        checkpoints = ResearchCheckpointStore()
+        resume = None
+        if args.resume:
+            resume = checkpoints.latest_unfinished("cli") if args.resume == "latest" else checkpoints.get(args.resume)
+            if not resume:
+                parser.exit(1, "No interrupted run to resume.\n")
+
+        project_client = AIProjectClient(
+            endpoint=os.environ["DEEP_RESEARCH_PROJECT_ENDPOINT"],
+            subscription_id=os.environ["AZURE_SUBSCRIPTION_ID"],
+            resource_group_name=os.environ["AZURE_RESOURCE_GROUP_NAME"],
+            project_name=os.environ["AZURE_PROJECT_NAME"],
+            credential=DefaultAzureCredential(),
+        )
+
+        conn_id = project_client.connections.get(name=os.environ["BING_RESOURCE_NAME"]).id
+
+        # Initialize a Deep Research tool with Bing Connection ID and Deep Research model deployment name
+        deep_research_tool = DeepResearchTool(
+            bing_grounding_connection_id=conn_id,
+            deep_research_model=os.environ["DEEP_RESEARCH_MODEL_DEPLOYMENT_NAME"],
+        )
+
+        # Create Agent with the Deep Research tool and process Agent run
+        with project_client:
+
+            with project_client.agents as agents_client:
+                run_conversation(agents_client, os.environ["AGENT_MODEL_DEPLOYMENT_NAME"], deep_research_tool.definitions,
+                                 checkpoints=checkpoints, resume=resume)
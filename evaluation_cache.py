@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of evaluation target responses.
+
+Entries are keyed by (agent id, agent fingerprint, query), where the
+fingerprint hashes the agent's model, instructions and tools. Re-running
+evaluators over an unchanged agent reads responses and file-search context
+from the cache instead of querying the agent again; changing the agent
+changes the fingerprint, so stale answers are never served.
+
+Usage:
+    python evaluation_cache.py --stats
+    python evaluation_cache.py --invalidate <agent_id>
+    python evaluation_cache.py --invalidate-all
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(".eval_cache", "target_responses.sqlite")
+
+# Agent properties that change how it answers
+FINGERPRINT_FIELDS = ("model", "instructions", "tools", "tool_resources", "temperature", "top_p", "response_format")
+
+
+def agent_fingerprint(agent):
+    """Stable hash of the parts of an agent definition that affect its answers"""
+    definition = {}
+    for field in FINGERPRINT_FIELDS:
+        value = agent.get(field) if hasattr(agent, "get") else getattr(agent, field, None)
+        if hasattr(value, "as_dict"):
+            value = value.as_dict()
+        elif isinstance(value, list):
+            value = [item.as_dict() if hasattr(item, "as_dict") else item for item in value]
+        definition[field] = value
+    encoded = json.dumps(definition, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class TargetResponseCache:
+    """SQLite-backed store of target outputs with hit/miss statistics"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Shared by the evaluation target's worker threads, so access is serialised by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                agent_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                query TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (agent_id, fingerprint, query)
+            )"""
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def normalize_query(query):
+        return query.strip()
+
+    def get(self, agent_id, fingerprint, query):
+        """Cached output dict for a query, or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT output FROM responses WHERE agent_id = ? AND fingerprint = ? AND query = ?",
+                (agent_id, fingerprint, self.normalize_query(query)),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, agent_id, fingerprint, query, output):
+        """Store a target output (response, query and context)"""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (agent_id, fingerprint, self.normalize_query(query),
+                 json.dumps(output, ensure_ascii=False), time.time()),
+            )
+            self._connection.commit()
+
+    def invalidate(self, agent_id=None, fingerprint=None, query=None):
+        """Delete matching entries (all of them when called without arguments); returns the count"""
+        conditions, parameters = [], []
+        for column, value in (("agent_id", agent_id), ("fingerprint", fingerprint), ("query", query)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(self.normalize_query(value) if column == "query" else value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            cursor = self._connection.execute(f"DELETE FROM responses{where}", parameters)
+            self._connection.commit()
+            return cursor.rowcount
+
+    def invalidate_stale(self, agent_id, current_fingerprint):
+        """Drop entries for older versions of an agent"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE agent_id = ? AND fingerprint != ?", (agent_id, current_fingerprint)
+            )
+            self._connection.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        """Hit/miss counts for this session plus stored entries per agent version"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT agent_id, fingerprint, COUNT(*) FROM responses GROUP BY agent_id, fingerprint"
+            ).fetchall()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": {f"{agent_id}@{fingerprint}": count for agent_id, fingerprint, count in rows},
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the evaluation target response cache")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="Cache database path")
+    parser.add_argument("--stats", action="store_true", help="Show stored entries per agent version")
+    parser.add_argument("--invalidate", metavar="AGENT_ID", help="Delete every cached response for an agent")
+    parser.add_argument("--invalidate-all", action="store_true", help="Delete every cached response")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No cache at {args.path}")
+        return
+
+    cache = TargetResponseCache(args.path)
+    if args.invalidate:
+        print(f"🗑️  Removed {cache.invalidate(agent_id=args.invalidate)} responses for {args.invalidate}")
+    elif args.invalidate_all:
+        print(f"🗑️  Removed {cache.invalidate()} responses")
+    if args.stats or not (args.invalidate or args.invalidate_all):
+        for version, count in cache.stats()["entries"].items():
+            print(f"{version}: {count} responses")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Parallel evaluation runner for the restaurant agent's saved outputs.
+
+Scores every row with all evaluators at once instead of one judge call after
+another. All judge calls share one pooled Azure OpenAI client and a global
+tokens-per-minute budget, and the runner reports latency, token usage and
+estimated cost per evaluator.
+
+The SDK has no public way to hand its prompty evaluators a client, so the
+pooling reuses the SDK's private prompty helpers. They are feature-detected
+on every run: when an SDK release moves or changes them, the runner warns and
+the evaluators keep their own per-call clients, so scores never depend on
+the SDK version, only the speed-up does.
+
+Usage from a notebook:
+    runner = EvaluationRunner(
+        {"groundedness": groundedness_evaluator, "relevance": relevance_evaluator},
+        model_config=model_config,
+        tokens_per_minute=200_000,
+    )
+    results = await runner.run(load_rows("evaluation_outputs.jsonl"))
+    runner.print_summary()
+
+    # Log the scored rows to Azure AI Foundry without scoring them again
+    evaluators, config = EvaluationRunner.recorded_evaluators(runner.evaluators)
+    evaluate(data="evaluation_scores.jsonl", evaluators=evaluators, evaluator_config=config, azure_ai_project=...)
+"""
+
+import asyncio
+import inspect
+import json
+import math
+import time
+import warnings
+from collections import defaultdict
+
+from local_metrics import percentile
+
+try:
+    import httpx
+    from openai import AsyncAzureOpenAI
+except ImportError:
+    httpx = None
+    AsyncAzureOpenAI = None  # Evaluators keep their own clients
+
+try:
+    from azure.ai.evaluation._legacy.prompty._utils import (
+        build_messages,
+        format_llm_response,
+        prepare_open_ai_request_params,
+    )
+except ImportError:
+    build_messages = None  # Older/newer SDK layout; the runner warns and evaluators keep their own clients
+
+# PooledPrompty mirrors private SDK internals; the release line it was last checked against
+TESTED_SDK_VERSION = "azure-ai-evaluation 1.18"
+# Private flow members and helper parameters PooledPrompty relies on
+FLOW_MEMBERS = ("_resolve_inputs", "_template", "_model", "_send_with_retries", "_outputs", "_data", "path")
+SEND_PARAMETERS = ("api_client", "params", "timeout")
+FORMAT_PARAMETERS = ("response", "is_first_choice", "response_format", "outputs", "inputs")
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_TOKENS_PER_MINUTE = 150_000
+# Starting guess for a judge call before any real usage has been seen
+DEFAULT_TOKENS_PER_CALL = 1_500
+
+# USD per 1K tokens; defaults are gpt-4o list prices - pass your deployment's prices for accurate cost
+DEFAULT_PROMPT_PRICE_PER_1K = 0.0025
+DEFAULT_COMPLETION_PRICE_PER_1K = 0.01
+
+# Columns an evaluator may take from a row
+EVALUATOR_INPUTS = ("query", "response", "context", "ground_truth")
+
+
+def load_rows(path):
+    """Read a JSONL file of target outputs"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class TokenBudget:
+    """Token bucket shared by every judge call, refilled continuously at tokens_per_minute"""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60.0
+        self.level = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens):
+        """Wait until `tokens` can be spent, then spend them"""
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.level < tokens:
+                delay = (tokens - self.level) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self.level -= tokens
+
+    def settle(self, estimated, actual):
+        """Correct the bucket once a call's real usage is known (may go negative)"""
+        self._refill()
+        self.level -= actual - estimated
+
+
+class PooledPrompty:
+    """Stands in for an evaluator's prompty flow, sending its judge calls through a shared client.
+
+    Mirrors AsyncPrompty.__call__ except for the client, which the SDK would
+    otherwise build (with a fresh connection) on every single call.
+    """
+
+    def __init__(self, flow, client):
+        self._wrapped = flow
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    async def __call__(self, **kwargs):
+        flow = self._wrapped
+        inputs = flow._resolve_inputs(kwargs)
+        messages = build_messages(prompt=flow._template, working_dir=flow.path.parent, **inputs)
+        params = prepare_open_ai_request_params(flow._model, messages)
+        # The SDK asks for "Connection: close" because its per-call clients die with the call;
+        # ours outlives it, so keep the connection for the next judge call
+        headers = {k: v for k, v in (params.get("extra_headers") or {}).items() if k.lower() != "connection"}
+        params["extra_headers"] = headers
+        timeout = float(kwargs["timeout"]) if kwargs.get("timeout") else None
+        response = await flow._send_with_retries(api_client=self._client, params=params, timeout=timeout)
+        return await format_llm_response(
+            response=response,
+            is_first_choice=flow._data.get("model", {}).get("response", "first").lower() == "first",
+            response_format=params.get("response_format", {}),
+            outputs=flow._outputs,
+            inputs=inputs,
+        )
+
+    @staticmethod
+    def supports(flow):
+        """Whether this SDK's flow still has the members and call signatures PooledPrompty mirrors"""
+        if build_messages is None or not all(hasattr(flow, name) for name in FLOW_MEMBERS):
+            return False
+        configuration = getattr(flow._model, "configuration", None) or {}
+        if configuration.get("byo_model"):
+            return False  # Project-connected judges go through the SDK's own Responses client
+        return (_accepts(flow._send_with_retries, SEND_PARAMETERS)
+                and _accepts(format_llm_response, FORMAT_PARAMETERS))
+
+
+def _accepts(function, names):
+    """Whether a function takes all of the named keyword arguments"""
+    try:
+        parameters = inspect.signature(function).parameters
+    except (TypeError, ValueError):
+        return False
+    if any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()):
+        return True
+    return all(name in parameters for name in names)
+
+
+class RecordedScore:
+    """An evaluate() evaluator that returns a score the runner already computed"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, score=None, reason=None):
+        return {self.name: score, f"{self.name}_reason": reason}
+
+
+def create_judge_client(model_config, max_connections):
+    """One Azure OpenAI client with a connection pool sized for the runner's concurrency"""
+    if AsyncAzureOpenAI is None or not model_config or not model_config.get("api_key"):
+        return None
+    return AsyncAzureOpenAI(
+        azure_endpoint=model_config["azure_endpoint"],
+        azure_deployment=model_config["azure_deployment"],
+        api_version=model_config.get("api_version"),
+        api_key=model_config["api_key"],
+        max_retries=0,  # The evaluators retry themselves
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        ),
+    )
+
+
+def token_usage(result):
+    """(prompt, completion) tokens an evaluator reported in its *_properties output"""
+    prompt = completion = 0
+    for key, value in (result or {}).items():
+        if key.endswith("_properties") and isinstance(value, dict):
+            prompt += value.get("prompt_tokens") or 0
+            completion += value.get("completion_tokens") or 0
+    return prompt, completion
+
+
+class EvaluationRunner:
+    """Runs every evaluator on every row concurrently within a shared token budget"""
+
+    def __init__(self, evaluators, model_config=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 prompt_price_per_1k=DEFAULT_PROMPT_PRICE_PER_1K,
+                 completion_price_per_1k=DEFAULT_COMPLETION_PRICE_PER_1K):
+        self.evaluators = dict(evaluators)
+        self.model_config = model_config
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.prompt_price_per_1k = prompt_price_per_1k
+        self.completion_price_per_1k = completion_price_per_1k
+
+        self.client = None
+        self._own_flows = {}  # Evaluator name → its own prompty flow, while a run has it pooled
+        self.budget = None
+        self.wall_clock = None
+        # Per evaluator: latencies, token counts and failures
+        self.calls = defaultdict(lambda: {"latencies": [], "prompt_tokens": 0, "completion_tokens": 0, "errors": 0})
+        self._average_tokens = {}
+
+    def _share_client(self):
+        """Point every prompty-based evaluator at a new shared client for this run"""
+        self.client = create_judge_client(self.model_config, self.max_concurrency)
+        if self.client is None:
+            if self.model_config and AsyncAzureOpenAI is None:
+                warnings.warn("openai/httpx are not installed, so evaluators open their own judge clients",
+                              RuntimeWarning, stacklevel=3)
+            return 0
+        shared = 0
+        unsupported = []
+        for name, evaluator in self.evaluators.items():
+            flow = getattr(evaluator, "_flow", None)
+            if isinstance(flow, PooledPrompty):
+                flow = flow._wrapped  # Still bound to another runner's client, which may be closed
+            if flow is None:
+                continue
+            if PooledPrompty.supports(flow):
+                self._own_flows[name] = flow
+                evaluator._flow = PooledPrompty(flow, self.client)
+                shared += 1
+            else:
+                unsupported.append(name)
+        if unsupported:
+            reason = ("azure.ai.evaluation._legacy.prompty._utils is missing" if build_messages is None
+                      else "their prompty flow has an unexpected layout")
+            warnings.warn(f"{', '.join(unsupported)} can't use the pooled judge client ({reason}) and open their own "
+                          f"connections; the runner was last checked against {TESTED_SDK_VERSION}",
+                          RuntimeWarning, stacklevel=3)
+        return shared
+
+    def _restore_flows(self):
+        """Give the evaluators back their own flows once the shared client is closed"""
+        for name, flow in self._own_flows.items():
+            self.evaluators[name]._flow = flow
+        self._own_flows = {}
+
+    @staticmethod
+    def _async_call(evaluator):
+        """An awaitable version of an evaluator, whatever kind it is"""
+        if hasattr(evaluator, "_to_async"):
+            return evaluator._to_async()
+        if inspect.iscoroutinefunction(evaluator) or inspect.iscoroutinefunction(getattr(evaluator, "__call__", None)):
+            return evaluator
+        return lambda **kwargs: asyncio.to_thread(evaluator, **kwargs)
+
+    async def _score(self, name, evaluator, row, semaphore):
+        inputs = {key: row[key] for key in EVALUATOR_INPUTS if row.get(key) is not None}
+        estimate = self._average_tokens.get(name, DEFAULT_TOKENS_PER_CALL)
+        async with semaphore:
+            await self.budget.acquire(estimate)
+            started = time.perf_counter()
+            try:
+                result = await evaluator(**inputs)
+            except Exception as e:
+                self.calls[name]["errors"] += 1
+                self.budget.settle(estimate, 0)
+                return {f"{name}_error": str(e)}
+            latency = time.perf_counter() - started
+
+        prompt, completion = token_usage(result)
+        used = prompt + completion or estimate
+        self.budget.settle(estimate, used)
+        stats = self.calls[name]
+        stats["latencies"].append(latency)
+        stats["prompt_tokens"] += prompt
+        stats["completion_tokens"] += completion
+        # Running average sharpens the estimate for the next call
+        calls = len(stats["latencies"])
+        self._average_tokens[name] = estimate + (used - estimate) / calls
+        return result
+
+    async def _score_row(self, row, evaluators, semaphore):
+        results = await asyncio.gather(*(self._score(name, call, row, semaphore) for name, call in evaluators.items()))
+        scored = dict(row)
+        for result in results:
+            scored.update(result or {})
+        return scored
+
+    async def run(self, rows):
+        """Score every row with every evaluator; returns the rows with evaluator outputs merged in"""
+        self._share_client()
+        self.budget = TokenBudget(self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        evaluators = {name: self._async_call(evaluator) for name, evaluator in self.evaluators.items()}
+
+        started = time.perf_counter()
+        try:
+            return await asyncio.gather(*(self._score_row(row, evaluators, semaphore) for row in rows))
+        finally:
+            self.wall_clock = time.perf_counter() - started
+            self._restore_flows()
+            if self.client is not None:
+                await self.client.close()
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.prompt_price_per_1k + completion_tokens * self.completion_price_per_1k) / 1000
+
+    def summary(self):
+        """Latency, tokens and estimated cost per evaluator, plus totals"""
+        evaluators = {}
+        for name, stats in self.calls.items():
+            latencies = stats["latencies"]
+            evaluators[name] = {
+                "calls": len(latencies),
+                "errors": stats["errors"],
+                "latency_p50": percentile(latencies, 0.5),
+                "latency_p95": percentile(latencies, 0.95),
+                "latency_total": sum(latencies),
+                "prompt_tokens": stats["prompt_tokens"],
+                "completion_tokens": stats["completion_tokens"],
+                "cost": self.cost(stats["prompt_tokens"], stats["completion_tokens"]),
+            }
+        serial_time = sum(e["latency_total"] for e in evaluators.values())
+        return {
+            "evaluators": evaluators,
+            "wall_clock": self.wall_clock,
+            # What the same calls would have taken one after another
+            "serial_time": serial_time,
+            "budget_wait": self.budget.waited if self.budget else 0.0,
+            "cost": sum(e["cost"] for e in evaluators.values()),
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print("Evaluator       calls  p50 (s)  p95 (s)   tokens     cost")
+        print("-" * 58)
+        for name, stats in summary["evaluators"].items():
+            tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+            p50 = stats["latency_p50"] if stats["latency_p50"] is not None else math.nan
+            p95 = stats["latency_p95"] if stats["latency_p95"] is not None else math.nan
+            print(f"{name:<15} {stats['calls']:>5} {p50:>8.2f} {p95:>8.2f} {tokens:>8,} ${stats['cost']:>7.3f}")
+        print("-" * 58)
+        print(f"⏱️  Wall clock {summary['wall_clock']:.1f}s vs {summary['serial_time']:.1f}s of judge time "
+              f"({summary['budget_wait']:.1f}s waiting on the token budget)")
+        print(f"💰 Estimated cost ${summary['cost']:.3f}")
+
+    @staticmethod
+    def metrics(results, evaluator_names):
+        """Mean score per evaluator, like evaluate()'s metrics"""
+        metrics = {}
+        for name in evaluator_names:
+            scores = [r[name] for r in results if isinstance(r.get(name), (int, float)) and not math.isnan(r[name])]
+            if scores:
+                metrics[f"{name}.{name}"] = sum(scores) / len(scores)
+        return metrics
+
+    @staticmethod
+    def recorded_evaluators(evaluator_names):
+        """evaluate() evaluators and column mappings that replay saved scores, so logging a run costs no judge calls"""
+        evaluators = {name: RecordedScore(name) for name in evaluator_names}
+        config = {name: {"column_mapping": {"score": f"${{data.{name}}}", "reason": f"${{data.{name}_reason}}"}}
+                  for name in evaluator_names}
+        return evaluators, config
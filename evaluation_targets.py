@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Evaluation targets for the Scheibmeir's restaurant agent.
+
+RestaurantAgentTarget is the query_restaurant_agent function from
+restaurant_evaluation.ipynb as a reusable object. It can still be passed to
+evaluate(target=...) one row at a time, but query_all() answers a whole query
+file concurrently (bounded by a semaphore, with backoff on 429s) so the
+evaluators can then run over the saved outputs.
+
+Usage from a notebook:
+    target = RestaurantAgentTarget(agents_client, RESTAURANT_ASSISTANT_ID, max_concurrency=8)
+    results = await target.query_all(load_queries("evaluation_queries.jsonl"))
+    write_results(results, "evaluation_outputs.jsonl")
+    print(target.latency_summary())
+
+Pass cache=TargetResponseCache() to reuse answers from earlier runs of the same agent,
+and threads=ThreadLifecycleManager(agents_client) to delete or recycle each
+query's thread instead of leaving it behind.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+from azure.ai.agents.models import (
+    MessageRole,
+    RunAdditionalFieldList,
+    RunStatus,
+    RunStepFileSearchToolCall,
+    RunStepToolCallDetails,
+)
+
+from evaluation_cache import agent_fingerprint
+from local_metrics import percentile
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY = 1.0  # seconds, doubled on every retry
+MAX_BACKOFF = 60.0
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Run errors that mean "try again later" rather than "the agent failed"
+RETRYABLE_RUN_ERRORS = ("rate_limit_exceeded",)
+
+
+class RetryableError(Exception):
+    """A failure worth retrying, optionally with the delay the service asked for"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(error):
+    """Read the Retry-After header from an Azure HTTP error, if there is one"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def extract_file_search_context(run_steps):
+    """Join the text of every file search result the run retrieved"""
+    texts = []
+    for run_step in run_steps:
+        if not isinstance(run_step.step_details, RunStepToolCallDetails):
+            continue
+        for tool_call in run_step.step_details.tool_calls:
+            if not isinstance(tool_call, RunStepFileSearchToolCall) or not tool_call.file_search:
+                continue
+            for result in tool_call.file_search.results or []:
+                texts.extend(content.text for content in result.content or [] if content.text)
+    return "\n".join(texts)
+
+
+def load_queries(path):
+    """Read the 'query' field of every line in a JSONL file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["query"] for line in f if line.strip()]
+
+
+def write_results(results, path):
+    """Write target outputs as JSONL that evaluate(data=...) can read directly"""
+    with open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+class RestaurantAgentTarget:
+    """Concurrency-limited, retrying evaluation target for an Azure AI agent"""
+
+    def __init__(self, agents_client, agent_id, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY, verbose=False, cache=None,
+                 threads=None):
+        self.agents_client = agents_client
+        self.agent_id = agent_id
+        # Optional ThreadLifecycleManager; without one every query leaves a new thread behind
+        self.threads = threads
+        # Optional TargetResponseCache; answers are reused while the agent definition is unchanged
+        self.cache = cache
+        self._fingerprint = None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.verbose = verbose
+
+        # One record per query: latency, attempts and whether it succeeded
+        self.latencies = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def fingerprint(self):
+        """Hash of the agent's model, instructions and tools, fetched once per target"""
+        with self._lock:
+            if self._fingerprint is None:
+                self._fingerprint = agent_fingerprint(self.agents_client.get_agent(self.agent_id))
+            return self._fingerprint
+
+    def query_once(self, query):
+        """Ask the agent one question on a fresh thread (blocking)"""
+        thread_id = self.threads.acquire() if self.threads else self.agents_client.threads.create().id
+        try:
+            return self._ask(thread_id, query)
+        finally:
+            if self.threads:
+                self.threads.release(thread_id)
+
+    def _ask(self, thread_id, query):
+        self.agents_client.messages.create(thread_id=thread_id, content=query, role="user")
+        run = self.agents_client.runs.create_and_process(thread_id=thread_id, agent_id=self.agent_id)
+
+        if run.status != RunStatus.COMPLETED:
+            code = (run.last_error or {}).get("code")
+            if code in RETRYABLE_RUN_ERRORS:
+                raise RetryableError(f"Run {run.id} failed with {code}")
+            raise RuntimeError(f"Run {run.id} finished with status {run.status}")
+
+        context = extract_file_search_context(self.agents_client.run_steps.list(
+            thread_id=thread_id, run_id=run.id, include=[RunAdditionalFieldList.FILE_SEARCH_CONTENTS]
+        ))
+        message = self.agents_client.messages.get_last_message_by_role(thread_id=thread_id, role=MessageRole.AGENT)
+        if message is None or not message.text_messages:
+            raise RuntimeError(f"Run {run.id} completed without an agent reply")
+
+        return {"response": message.text_messages[-1].text.value, "query": query, "context": context}
+
+    def query_with_retry(self, query):
+        """query_once with exponential backoff on throttling and transient connection errors"""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return self.query_once(query), attempt
+            except (HttpResponseError, RetryableError, ServiceRequestError) as e:
+                retryable = not isinstance(e, HttpResponseError) or e.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt > self.max_retries:
+                    e.attempts = attempt
+                    raise
+                delay = retry_after_seconds(e) if isinstance(e, HttpResponseError) else getattr(e, "retry_after", None)
+
+            if delay is None:
+                # Full jitter keeps many concurrent queries from retrying in lockstep
+                delay = random.uniform(0, min(MAX_BACKOFF, self.base_delay * 2 ** (attempt - 1)))
+            if self.verbose:
+                print(f"⏳ Retrying {query[:40]!r} in {delay:.1f}s (attempt {attempt})")
+            time.sleep(delay)
+
+    def __call__(self, query: str) -> dict:
+        """Synchronous entry point with the same output as the notebook's query_restaurant_agent"""
+        started = time.perf_counter()
+        if self.cache is not None:
+            cached = self.cache.get(self.agent_id, self.fingerprint, query)
+            if cached is not None:
+                self._record(query, started, 0, True, cached=True)
+                return cached
+        try:
+            result, attempts = self.query_with_retry(query)
+            self._record(query, started, attempts, True)
+            if self.cache is not None:
+                self.cache.put(self.agent_id, self.fingerprint, query, result)
+            return result
+        except Exception as e:
+            self._record(query, started, getattr(e, "attempts", 1), False)
+            print(f"Error querying agent: {str(e)}")
+            return {"response": f"Error querying agent: {str(e)}", "query": query}
+
+    async def aquery(self, query, semaphore=None):
+        """Async version of __call__; the blocking SDK calls run in a worker thread"""
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        if self._executor is None:
+            # Sized to the concurrency limit; the default executor may be smaller
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="eval-target")
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self, query)
+
+    async def query_all(self, queries):
+        """Answer every query with at most max_concurrency in flight, keeping input order"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.aquery(query, semaphore) for query in queries))
+        if self.verbose:
+            print(f"✅ Answered {len(results)} queries in {time.perf_counter() - started:.1f}s "
+                  f"with concurrency {self.max_concurrency}")
+        return results
+
+    def _record(self, query, started, attempts, succeeded, cached=False):
+        with self._lock:
+            self.latencies.append({
+                "query": query,
+                "latency": time.perf_counter() - started,
+                "attempts": attempts,
+                "succeeded": succeeded,
+                "cached": cached,
+            })
+
+    def latency_summary(self):
+        """p50/p95/max agent latency and retry counts over every query so far (cache hits excluded)"""
+        with self._lock:
+            records = list(self.latencies)
+        latencies = [r["latency"] for r in records if not r["cached"]]
+        return {
+            "queries": len(records),
+            "cache_hits": sum(1 for r in records if r["cached"]),
+            "failed": sum(1 for r in records if not r["succeeded"]),
+            "retries": sum(max(0, r["attempts"] - 1) for r in records),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max": max(latencies) if latencies else None,
+        }
+
+    def close(self):
+        """Shut down the worker threads used by aquery()"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Azure AI Agents service.
+
+FakeAgentsClient implements the part of azure.ai.agents.AgentsClient this repo
+uses (agents, threads, messages, runs, run_steps, get_last_message_by_role,
+create_thread_and_process_run) and returns the SDK's own model objects, so
+code written against the real client runs unchanged. Runs are scripted by a
+responder: every status poll releases the next `cot_summary:` progress message,
+then the final reply with its URL citation annotations, exactly as a Deep
+Research run does.
+
+Everything is deterministic: ids and timestamps come from counters, replies
+from seeded generators, and a run advances one step per poll rather than by
+wall-clock time. Per-call latency can be added to model network round trips.
+
+Usage:
+    client = FakeAgentsClient(responder=research_reply(report_bytes=64_000, citations=200), latency=0.01)
+    agent = client.create_agent(model="gpt-4o", name="researcher", instructions="...")
+    thread = client.threads.create()
+    client.messages.create(thread_id=thread.id, role="user", content="Plan my restaurant")
+    run = client.runs.create(thread_id=thread.id, agent_id=agent.id)
+    while run.status in ("queued", "in_progress"):
+        run = client.runs.get(thread_id=thread.id, run_id=run.id)
+"""
+
+import random
+import threading
+import time
+from collections import Counter
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.ai.agents.models import Agent, AgentThread, RunStep, ThreadMessage, ThreadRun
+
+BASE_TIMESTAMP = 1_700_000_000  # Fixed so repeated runs produce identical objects
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+WORDS = (
+    "restaurant", "menu", "steak", "wharf", "customers", "staff", "marketing", "location", "seafood", "tourists",
+    "pricing", "brand", "season", "kitchen", "service", "local", "reviews", "budget", "competitors", "strategy",
+    "the", "and", "with", "for", "of", "to", "a", "in", "our", "new",
+)
+
+REASONING_TEMPLATES = (
+    "Searching for {topic} in Fisherman's Wharf, San Francisco.",
+    "Analyzing {topic} data from recent industry reports.",
+    "Comparing {topic} across nearby steakhouses and seafood restaurants.",
+    "Researching {topic} trends for tourist-heavy neighborhoods.",
+    "Compiling findings on {topic} into the report.",
+)
+
+
+class AgentReply:
+    """What a scripted run produces: progress messages, the final text, its citations and search context"""
+
+    def __init__(self, text, citations=(), reasoning=(), context=()):
+        self.text = text
+        self.citations = list(citations)  # (marker, url, title) tuples; markers appear in text
+        self.reasoning = list(reasoning)  # Each becomes a "cot_summary:" message
+        self.context = list(context)      # File search snippets reported by run_steps
+
+
+def echo_reply(query):
+    """Default responder: a short answer that quotes the question"""
+    return AgentReply(f"Thanks for asking about Scheibmeir's: {query}")
+
+
+def synthetic_report(report_bytes, citations, seed=0, message_index=1):
+    """Markdown report of roughly `report_bytes` with `citations` numbered citation markers"""
+    rng = random.Random(seed)
+    markers = [(f"【{message_index}:{n}†source】", f"https://example.com/source/{n}", f"Source {n}")
+               for n in range(1, citations + 1)]
+    parts, size, section = [], 0, 0
+    while size < report_bytes:
+        if size == 0 or rng.random() < 0.08:
+            section += 1
+            block = f"## Section {section}: {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}\n\n"
+        elif rng.random() < 0.3:
+            block = "".join(f"- **{rng.choice(WORDS).title()}**: " +
+                            " ".join(rng.choice(WORDS) for _ in range(8)) + "\n" for _ in range(3)) + "\n"
+        else:
+            block = " ".join(rng.choice(WORDS) for _ in range(40)).capitalize() + ".\n\n"
+        parts.append(block)
+        size += len(block.encode("utf-8"))
+
+    # Spread the citation markers evenly over the paragraphs
+    if markers:
+        slots = [i for i, part in enumerate(parts) if not part.startswith("##")] or [len(parts) - 1]
+        for n, (marker, _, _) in enumerate(markers):
+            slot = slots[n * len(slots) // len(markers)]
+            parts[slot] = parts[slot].rstrip("\n") + marker + "\n\n"
+    return "".join(parts), markers
+
+
+def research_reply(report_bytes=8_000, citations=20, reasoning_steps=5, seed=0):
+    """Responder for Deep Research style runs: progress summaries, then a long cited report"""
+    def respond(query):
+        rng = random.Random(f"{seed}:{query}")
+        reasoning = [rng.choice(REASONING_TEMPLATES).format(topic=rng.choice(WORDS)) for _ in range(reasoning_steps)]
+        text, markers = synthetic_report(report_bytes, citations, seed=rng.random(), message_index=reasoning_steps + 1)
+        return AgentReply(text, citations=markers, reasoning=reasoning)
+    return respond
+
+
+def _text_content(value, citations=()):
+    """Raw JSON of a text content part with URL citation annotations"""
+    annotations = []
+    for marker, url, title in citations:
+        start = value.find(marker)
+        annotations.append({
+            "type": "url_citation", "text": marker, "url_citation": {"url": url, "title": title},
+            "start_index": max(start, 0), "end_index": max(start, 0) + len(marker),
+        })
+    return {"type": "text", "text": {"value": value, "annotations": annotations}}
+
+
+def _as_json(value):
+    if hasattr(value, "as_dict"):
+        return value.as_dict()
+    if isinstance(value, (list, tuple)):
+        return [_as_json(item) for item in value]
+    return value
+
+
+class _Operations:
+    def __init__(self, service):
+        self._service = service
+
+
+class _Threads(_Operations):
+    def create(self, messages=None, **kwargs):
+        return self._service._create_thread(messages)
+
+    def get(self, thread_id, **kwargs):
+        return AgentThread(self._service._thread(thread_id)["thread"])
+
+    def delete(self, thread_id, **kwargs):
+        self._service._delete_thread(thread_id)
+
+    def list(self, **kwargs):
+        return self._service._list_threads()
+
+
+class _Messages(_Operations):
+    def create(self, thread_id, role, content, **kwargs):
+        return self._service._add_message(thread_id, role, content)
+
+    def get(self, thread_id, message_id, **kwargs):
+        return self._service._get_message(thread_id, message_id)
+
+    def delete(self, thread_id, message_id, **kwargs):
+        self._service._delete_message(thread_id, message_id)
+
+    def list(self, thread_id, run_id=None, order="desc", limit=None, **kwargs):
+        return self._service._list_messages(thread_id, run_id, order, limit)
+
+    def get_last_message_by_role(self, thread_id, role, **kwargs):
+        return self._service._last_message(thread_id, role)
+
+    def get_last_message_text_by_role(self, thread_id, role, **kwargs):
+        message = self._service._last_message(thread_id, role)
+        return message.text_messages[-1] if message and message.text_messages else None
+
+
+class _Runs(_Operations):
+    def create(self, thread_id, agent_id, additional_messages=None, **kwargs):
+        return self._service._create_run(thread_id, agent_id, additional_messages)
+
+    def get(self, thread_id, run_id, **kwargs):
+        return self._service._poll_run(thread_id, run_id)
+
+    def cancel(self, thread_id, run_id, **kwargs):
+        return self._service._cancel_run(thread_id, run_id)
+
+    def list(self, thread_id, **kwargs):
+        return self._service._list_runs(thread_id)
+
+    def create_and_process(self, thread_id, agent_id, additional_messages=None, polling_interval=1, **kwargs):
+        run = self.create(thread_id=thread_id, agent_id=agent_id, additional_messages=additional_messages)
+        # Polls back to back: the fake's run time is its per-call latency, not the polling interval
+        while run.status not in TERMINAL_STATUSES:
+            run = self.get(thread_id=thread_id, run_id=run.id)
+        return run
+
+
+class _RunSteps(_Operations):
+    def list(self, thread_id, run_id, include=None, **kwargs):
+        return self._service._run_steps(thread_id, run_id)
+
+
+class FakeAgentsClient:
+    """In-memory, deterministic stand-in for azure.ai.agents.AgentsClient"""
+
+    def __init__(self, responder=echo_reply, latency=0.0, queued_polls=1, throttle=0, sleep=time.sleep):
+        self.responder = responder
+        # Seconds per API call: a number, or a dict of operation name -> seconds ("default" for the rest)
+        self.latency = latency
+        # Polls a run spends queued before it starts producing output
+        self.queued_polls = queued_polls
+        # The first `throttle` run creations fail with 429, to exercise retry paths
+        self.throttle = throttle
+        self._sleep = sleep
+
+        self.calls = Counter()
+        self._lock = threading.RLock()
+        self._ids = Counter()
+        self._agents = {}
+        self._threads = {}
+
+        self.threads = _Threads(self)
+        self.messages = _Messages(self)
+        self.runs = _Runs(self)
+        self.run_steps = _RunSteps(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    # --- bookkeeping ---
+
+    def _call(self, operation):
+        with self._lock:
+            self.calls[operation] += 1
+        latency = self.latency.get(operation, self.latency.get("default", 0.0)) \
+            if isinstance(self.latency, dict) else self.latency
+        if latency:
+            self._sleep(latency)
+
+    def _next_id(self, prefix):
+        with self._lock:
+            self._ids[prefix] += 1
+            return f"{prefix}_{self._ids[prefix]:06d}", BASE_TIMESTAMP + sum(self._ids.values())
+
+    def _thread(self, thread_id):
+        try:
+            return self._threads[thread_id]
+        except KeyError:
+            raise ResourceNotFoundError(f"No thread found with id '{thread_id}'.") from None
+
+    # --- agents ---
+
+    def create_agent(self, model, name=None, instructions=None, tools=None, **kwargs):
+        self._call("create_agent")
+        agent_id, created_at = self._next_id("asst")
+        raw = {"id": agent_id, "object": "assistant", "created_at": created_at, "name": name, "model": model,
+               "instructions": instructions, "tools": _as_json(tools or []), "metadata": {},
+               **{key: _as_json(value) for key, value in kwargs.items() if key in ("temperature", "top_p")}}
+        with self._lock:
+            self._agents[agent_id] = raw
+        return Agent(raw)
+
+    def get_agent(self, agent_id, **kwargs):
+        self._call("get_agent")
+        try:
+            return Agent(self._agents[agent_id])
+        except KeyError:
+            raise ResourceNotFoundError(f"No assistant found with id '{agent_id}'.") from None
+
+    def delete_agent(self, agent_id, **kwargs):
+        self._call("delete_agent")
+        with self._lock:
+            self._agents.pop(agent_id, None)
+
+    def list_agents(self, **kwargs):
+        return [Agent(raw) for raw in self._agents.values()]
+
+    def create_thread_and_process_run(self, agent_id, thread=None, polling_interval=1, **kwargs):
+        messages = (thread or {}).get("messages") if hasattr(thread or {}, "get") else None
+        created = self._create_thread(messages)
+        return self.runs.create_and_process(thread_id=created.id, agent_id=agent_id, polling_interval=polling_interval)
+
+    # --- threads and messages ---
+
+    def _create_thread(self, messages=None):
+        self._call("threads.create")
+        thread_id, created_at = self._next_id("thread")
+        with self._lock:
+            self._threads[thread_id] = {
+                "thread": {"id": thread_id, "object": "thread", "created_at": created_at, "metadata": {}},
+                "messages": [],
+                "runs": {},
+            }
+        for message in messages or []:
+            self._store_message(thread_id, message["role"], message["content"])
+        return AgentThread(self._threads[thread_id]["thread"])
+
+    def _delete_thread(self, thread_id):
+        self._call("threads.delete")
+        with self._lock:
+            self._thread(thread_id)
+            del self._threads[thread_id]
+
+    def _list_threads(self):
+        self._call("threads.list")
+        with self._lock:
+            return [AgentThread(entry["thread"]) for entry in self._threads.values()]
+
+    def _store_message(self, thread_id, role, content, citations=(), agent_id=None, run_id=None):
+        """Append a message to the thread and return its raw JSON (models are only built for callers)"""
+        role = getattr(role, "value", role)
+        message_id, created_at = self._next_id("msg")
+        raw = {
+            "id": message_id, "object": "thread.message", "created_at": created_at, "thread_id": thread_id,
+            "status": "completed", "role": role, "content": [_text_content(content, citations)],
+            "agent_id": agent_id, "run_id": run_id, "attachments": [], "metadata": {},
+        }
+        with self._lock:
+            self._thread(thread_id)["messages"].append(raw)
+        return raw
+
+    def _add_message(self, thread_id, role, content):
+        self._call("messages.create")
+        return ThreadMessage(self._store_message(thread_id, role, content))
+
+    def _get_message(self, thread_id, message_id):
+        self._call("messages.get")
+        with self._lock:
+            for raw in self._thread(thread_id)["messages"]:
+                if raw["id"] == message_id:
+                    return ThreadMessage(raw)
+        raise ResourceNotFoundError(f"No message found with id '{message_id}'.")
+
+    def _delete_message(self, thread_id, message_id):
+        self._call("messages.delete")
+        with self._lock:
+            entry = self._thread(thread_id)
+            entry["messages"] = [raw for raw in entry["messages"] if raw["id"] != message_id]
+
+    def _list_messages(self, thread_id, run_id, order, limit):
+        self._call("messages.list")
+        with self._lock:
+            messages = [raw for raw in self._thread(thread_id)["messages"] if run_id is None or raw["run_id"] == run_id]
+        if getattr(order, "value", order) != "asc":
+            messages = messages[::-1]
+        return [ThreadMessage(raw) for raw in messages[:limit]]
+
+    def _last_message(self, thread_id, role):
+        self._call("messages.get_last_message_by_role")
+        role = getattr(role, "value", role)
+        with self._lock:
+            for raw in reversed(self._thread(thread_id)["messages"]):
+                if raw["role"] == role:
+                    return ThreadMessage(raw)
+        return None
+
+    # --- runs ---
+
+    def _create_run(self, thread_id, agent_id, additional_messages=None):
+        self._call("runs.create")
+        with self._lock:
+            if self.throttle > 0:
+                self.throttle -= 1
+                error = HttpResponseError(message="Rate limit is exceeded. Try again in 1 seconds.")
+                error.status_code = 429
+                raise error
+        for message in additional_messages or []:
+            self._store_message(thread_id, message["role"], message["content"])
+
+        with self._lock:
+            user_messages = [raw for raw in self._thread(thread_id)["messages"] if raw["role"] == "user"]
+        query = user_messages[-1]["content"][0]["text"]["value"] if user_messages else ""
+        reply = self.responder(query)
+
+        run_id, created_at = self._next_id("run")
+        raw = {"id": run_id, "object": "thread.run", "thread_id": thread_id, "agent_id": agent_id,
+               "status": "queued", "created_at": created_at, "last_error": None,
+               "model": self._agents.get(agent_id, {}).get("model"), "instructions": "", "tools": [], "metadata": {}}
+        with self._lock:
+            self._thread(thread_id)["runs"][run_id] = {
+                "run": raw, "reply": reply, "polls": 0, "released": 0, "steps": [],
+            }
+        return ThreadRun(dict(raw))
+
+    def _poll_run(self, thread_id, run_id):
+        """runs.get: every poll after the queued ones releases the next progress message or the final reply"""
+        self._call("runs.get")
+        with self._lock:
+            state = self._thread(thread_id)["runs"][run_id]
+            run, reply = state["run"], state["reply"]
+            if run["status"] == "cancelling":
+                run["status"] = "cancelled"
+            elif run["status"] not in TERMINAL_STATUSES:
+                state["polls"] += 1
+                if state["polls"] > self.queued_polls:
+                    run["status"] = "in_progress"
+                    if state["released"] < len(reply.reasoning):
+                        summary = reply.reasoning[state["released"]]
+                        self._store_message(thread_id, "assistant", f"cot_summary: {summary}",
+                                            agent_id=run["agent_id"], run_id=run_id)
+                        state["released"] += 1
+                    else:
+                        message = self._store_message(thread_id, "assistant", reply.text, reply.citations,
+                                                      agent_id=run["agent_id"], run_id=run_id)
+                        state["steps"].append(message["id"])
+                        run["status"] = "completed"
+            return ThreadRun(dict(run))
+
+    def _cancel_run(self, thread_id, run_id):
+        self._call("runs.cancel")
+        with self._lock:
+            run = self._thread(thread_id)["runs"][run_id]["run"]
+            if run["status"] not in TERMINAL_STATUSES:
+                run["status"] = "cancelling"
+            return ThreadRun(dict(run))
+
+    def _list_runs(self, thread_id):
+        self._call("runs.list")
+        with self._lock:
+            return [ThreadRun(dict(state["run"])) for state in self._thread(thread_id)["runs"].values()]
+
+    def _run_steps(self, thread_id, run_id):
+        self._call("run_steps.list")
+        with self._lock:
+            state = self._thread(thread_id)["runs"][run_id]
+        steps = []
+        if state["reply"].context:
+            results = [{"file_id": f"file_{i}", "file_name": f"source_{i}.md", "score": 1.0,
+                        "content": [{"type": "text", "text": text}]} for i, text in enumerate(state["reply"].context)]
+            steps.append({"id": f"step_{run_id}_search", "object": "thread.run.step", "type": "tool_calls",
+                          "run_id": run_id, "thread_id": thread_id, "status": "completed",
+                          "step_details": {"type": "tool_calls", "tool_calls": [
+                              {"type": "file_search", "id": f"call_{run_id}", "file_search": {"results": results}}]}})
+        for message_id in state["steps"]:
+            steps.append({"id": f"step_{message_id}", "object": "thread.run.step", "type": "message_creation",
+                          "run_id": run_id, "thread_id": thread_id, "status": "completed",
+                          "step_details": {"type": "message_creation",
+                                           "message_creation": {"message_id": message_id}}})
+        return [RunStep(step) for step in steps]
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Duplicate detection and leakage-free train/validation splits for fine-tune JSONL.
+
+Validation loss only means something when no validation example, and no
+close paraphrase of one, is also in the training data. This streams any
+number of chat-format ({"messages": [...]}) or prompt/completion JSONL files
+in two passes. The first pass hashes every example's normalized conversation
+to find exact duplicates, and computes a MinHash signature of its word
+shingles (system prompts left out, since the examples share them).
+Locality-sensitive hashing over bands of the signatures finds candidate
+near-duplicates, which are confirmed by their estimated Jaccard similarity
+and merged into clusters. Whole clusters are assigned to train or validation,
+stratified by system prompt and turn count, so an example and its paraphrases
+always end up on the same side. The second pass copies the original lines
+into the split files.
+
+Memory stays bounded on 1M+ line inputs: per example only a few fixed-size
+numbers are kept in memory, signatures and band hashes go to a scratch
+directory, and clustering works one band at a time on sorted numpy arrays.
+
+Usage:
+    python finetune_dataset.py scheibmeirs_finetune_data.jsonl scheibmeirs_finetune_validation.jsonl
+    python finetune_dataset.py data.jsonl --train train.jsonl --validation validation.jsonl --report clusters.json
+
+    analysis = analyze(["data.jsonl"], validation_fraction=0.1)
+    write_splits(analysis, "train.jsonl", "validation.jsonl")
+    print("\\n".join(format_report(analysis.report())))
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import re
+import stat
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16  # 16 bands of 8 rows: pairs at 0.8 Jaccard become candidates 95% of the time
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SHINGLE_SIZE = 3
+DEFAULT_VALIDATION_FRACTION = 0.1
+DEFAULT_STRATIFY = ("system", "turns")
+BATCH_SHINGLES = 32768  # Shingles hashed per numpy batch
+PERM_BLOCK = 8  # Permutations hashed together, so the work matrix stays in the CPU cache
+VERIFY_CHUNK = 65536  # Candidate pairs whose signatures are compared at once
+PREVIEW_CHARACTERS = 120
+WORD = re.compile(rb"[\w\x80-\xff]+")  # Over UTF-8 bytes; any non-ASCII character counts as a word character
+
+
+def _content_text(content):
+    if isinstance(content, list):  # Content parts
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return "" if content is None else str(content)
+
+
+def conversation(record):
+    """(role, content) pairs of a chat or prompt/completion example; None when the record is neither"""
+    if not isinstance(record, dict):
+        return None
+    messages = record.get("messages")
+    if isinstance(messages, list) and messages:
+        if not all(isinstance(message, dict) and "role" in message for message in messages):
+            return None
+        return [(str(message["role"]), _content_text(message.get("content"))) for message in messages]
+    if "prompt" in record and "completion" in record:
+        return [("user", _content_text(record["prompt"])), ("assistant", _content_text(record["completion"]))]
+    return None
+
+
+def normalize(text):
+    return " ".join(text.split()).lower()
+
+
+def stratum_key(record, turns, keys):
+    """Raw stratum of an example: its system prompt, user turn count and/or top-level fields"""
+    values = []
+    for key in keys:
+        if key == "system":
+            values.append(next((content for role, content in turns if role == "system"), ""))
+        elif key == "turns":
+            values.append(sum(role == "user" for role, _ in turns))
+        else:
+            values.append(json.dumps(record.get(key), sort_keys=True))
+    return tuple(values)
+
+
+def stratum_name(keys, values):
+    """Readable label of a stratum key"""
+    parts = []
+    for key, value in zip(keys, values):
+        if key == "system":
+            value = normalize(value)
+            value = f"{value[:60]}…" if len(value) > 60 else value
+        parts.append(f"{key}={value}")
+    return " | ".join(parts) or "all"
+
+
+def read_lines(paths):
+    """(file index, line number, byte offset, raw line) of every non-blank line of the input files"""
+    for file_index, path in enumerate(paths):
+        with open(path, "rb") as f:
+            offset = 0
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    yield file_index, line_number, offset, line
+                offset += len(line)
+
+
+def _equal_runs(values):
+    """(first, other) index pairs linking every later occurrence of a value to its first occurrence"""
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    first = order[starts][np.cumsum(starts) - 1]
+    return first[~starts], order[~starts]
+
+
+def _merge(labels, left, right):
+    """Union the pairs into labels, where every example points at the lowest index of its cluster"""
+    while len(left):
+        low = np.minimum(labels[left], labels[right])
+        np.minimum.at(labels, labels[left], low)
+        np.minimum.at(labels, labels[right], low)
+        while True:  # Pointer jumping until every label is a cluster root
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels[:] = jumped
+        apart = labels[left] != labels[right]
+        left, right = left[apart], right[apart]
+
+
+class DuplicateIndex:
+    """Exact digests in memory; MinHash signatures and LSH band hashes in a scratch directory"""
+
+    def __init__(self, work_dir, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS, shingle_size=DEFAULT_SHINGLE_SIZE,
+                 seed=0):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        random = np.random.default_rng(seed)
+        # Multiply-shift hashing: odd 64-bit multipliers, wrapping arithmetic, top 32 bits kept
+        self.multipliers = random.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.offsets = random.integers(0, 2**64, num_perm, dtype=np.uint64, endpoint=False)
+        self.shingle_weights = random.integers(0, 2**64, shingle_size, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.band_weights = random.integers(0, 2**64, self.rows, dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self.digests = array("Q")
+        self.count = 0
+        self._pending = []
+        self._pending_shingles = 0
+        self._signature_path = os.path.join(work_dir, "signatures.u32")
+        self._band_paths = [os.path.join(work_dir, f"band{band}.u64") for band in range(bands)]
+        self._signature_file = open(self._signature_path, "wb")
+        self._band_files = [open(path, "wb") for path in self._band_paths]
+
+    def add(self, exact_text, content_text):
+        """Index one example; exact_text is its whole conversation, content_text what is shingled"""
+        self.digests.append(int.from_bytes(hashlib.blake2b(normalize(exact_text).encode("utf-8"),
+                                                           digest_size=8).digest(), "little"))
+        words = list(map(zlib.crc32, WORD.findall(content_text.lower().encode("utf-8"))))
+        words += [0] * (self.shingle_size - len(words))  # Short texts still get one shingle
+        self._pending.append(words)
+        self._pending_shingles += len(words)
+        self.count += 1
+        if self._pending_shingles >= BATCH_SHINGLES:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        lengths = np.fromiter(map(len, self._pending), dtype=np.int64, count=len(self._pending))
+        words = np.fromiter(itertools.chain.from_iterable(self._pending), dtype=np.uint64, count=int(lengths.sum()))
+        size = self.shingle_size
+        positions = len(words) - size + 1
+        shingles = np.zeros(positions, dtype=np.uint64)
+        for offset in range(size):
+            shingles += words[offset:offset + positions] * self.shingle_weights[offset]
+        # Drop shingles that run across the end of an example
+        ends = np.cumsum(lengths)
+        owner = np.repeat(np.arange(len(lengths)), lengths)[:positions]
+        shingles = shingles[np.arange(positions) + size <= ends[owner]]
+        segments = np.concatenate(([0], np.cumsum(lengths - size + 1)[:-1]))
+
+        minimums = np.empty((self.num_perm, len(lengths)), dtype=np.uint64)
+        for start in range(0, self.num_perm, PERM_BLOCK):
+            block = slice(start, start + PERM_BLOCK)
+            hashed = np.multiply.outer(self.multipliers[block], shingles)
+            hashed += self.offsets[block, None]
+            minimums[block] = np.minimum.reduceat(hashed, segments, axis=1)
+        # The smallest 64-bit hash also has the smallest top 32 bits, so shift after the minimum
+        signatures = (minimums.T >> np.uint64(32)).astype(np.uint32)
+        signatures.tofile(self._signature_file)
+        banded = signatures.reshape(len(lengths), self.bands, self.rows).astype(np.uint64)
+        band_hashes = (banded * self.band_weights).sum(axis=2, dtype=np.uint64).T.copy()
+        for band, f in enumerate(self._band_files):
+            band_hashes[band].tofile(f)
+        self._pending = []
+        self._pending_shingles = 0
+
+    def exact_duplicates(self):
+        """Boolean mask of examples identical to an earlier one"""
+        duplicates = np.zeros(self.count, dtype=bool)
+        duplicates[_equal_runs(np.frombuffer(self.digests, dtype=np.uint64))[1]] = True
+        return duplicates
+
+    def clusters(self, threshold=DEFAULT_THRESHOLD):
+        """Cluster label (index of the first member) of every example"""
+        self._flush()
+        self._signature_file.close()
+        for f in self._band_files:
+            f.close()
+        labels = np.arange(self.count, dtype=np.int64)
+        if not self.count:
+            return labels
+        _merge(labels, *_equal_runs(np.frombuffer(self.digests, dtype=np.uint64)))
+        signatures = np.memmap(self._signature_path, dtype=np.uint32, mode="r", shape=(self.count, self.num_perm))
+        for path in self._band_paths:
+            first, other = _equal_runs(np.fromfile(path, dtype=np.uint64))
+            apart = labels[first] != labels[other]
+            first, other = first[apart], other[apart]
+            confirmed = np.zeros(len(first), dtype=bool)
+            for start in range(0, len(first), VERIFY_CHUNK):
+                chunk = slice(start, start + VERIFY_CHUNK)
+                similarity = (signatures[first[chunk]] == signatures[other[chunk]]).mean(axis=1)
+                confirmed[chunk] = similarity >= threshold
+            _merge(labels, first[confirmed], other[confirmed])
+        del signatures
+        return labels
+
+
+def assign_splits(labels, stratum_ids, keep, digests, fraction, seed=0):
+    """Validation mask that puts whole clusters on one side, about fraction of each stratum's kept examples"""
+    roots = np.unique(labels)
+    sizes = np.bincount(labels, weights=keep, minlength=len(labels))[roots]
+    cluster_strata = stratum_ids[roots]
+    # Deterministic shuffle of the clusters: a mixed hash of their first member's digest
+    order_keys = (digests[roots] ^ np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15)
+    # One sort groups the clusters by stratum, shuffled within each, instead of a scan per stratum
+    clusters = np.lexsort((order_keys, cluster_strata))
+    sorted_sizes, sorted_strata = sizes[clusters], cluster_strata[clusters]
+    first = np.ones(len(clusters), dtype=bool)
+    first[1:] = sorted_strata[1:] != sorted_strata[:-1]
+    starts, stratum = np.flatnonzero(first), np.cumsum(first) - 1
+    before = np.cumsum(sorted_sizes) - sorted_sizes
+    before -= before[starts][stratum]  # Kept examples ahead of the cluster in its own stratum
+    targets = np.round(fraction * np.add.reduceat(sorted_sizes, starts))
+    chosen_roots = np.zeros(len(labels), dtype=bool)
+    # A cluster goes to validation while its midpoint is under the target, so big clusters overshoot less
+    chosen_roots[roots[clusters[before + sorted_sizes / 2 < targets[stratum]]]] = True
+    return chosen_roots[labels] & keep
+
+
+class DatasetAnalysis:
+    """Clusters, strata and split assignment of every valid example of a set of JSONL files"""
+
+    def __init__(self, paths, settings):
+        self.paths = list(paths)
+        self.settings = settings
+        self.files = array("H")
+        self.lines = array("I")
+        self.offsets = array("Q")
+        self.stratum_ids = array("I")
+        self.strata = {}  # Stratum key → id
+        self.invalid = []  # "path:line" of lines that are not JSON examples
+        self.labels = None
+        self.exact_duplicate = None
+        self.keep = None
+        self.validation = None
+        self.digests = None
+        self.seconds = 0.0
+
+    def ref(self, index):
+        return f"{self.paths[self.files[index]]}:{self.lines[index]}"
+
+    def preview(self, index):
+        """Start of the non-system messages of an example, read back from its file"""
+        with open(self.paths[self.files[index]], "rb") as f:
+            f.seek(self.offsets[index])
+            turns = conversation(json.loads(f.readline()))
+        text = " ".join(content for role, content in turns if role != "system")
+        return normalize(text)[:PREVIEW_CHARACTERS]
+
+    def report(self, top=20):
+        """Counts, cross-file overlap, split sizes per stratum and the largest duplicate clusters"""
+        labels = self.labels
+        files = np.frombuffer(self.files, dtype=np.uint16)
+        sizes = np.bincount(labels, minlength=len(labels))
+        roots = np.nonzero(sizes > 1)[0]
+        distinct = np.bincount(np.unique(labels * len(self.paths) + files) // len(self.paths),
+                               minlength=len(labels)) if len(labels) else np.zeros(0, dtype=np.int64)
+        digests_per_cluster = np.bincount(np.unique(np.stack([labels, self.digests.view(np.int64)]), axis=1)[0],
+                                          minlength=len(labels)) if len(labels) else distinct
+        overlap = {}
+        for first, second in itertools.combinations(range(len(self.paths)), 2):
+            shared = np.intersect1d(labels[files == first], labels[files == second]).size
+            if shared:
+                overlap[f"{self.paths[first]} ↔ {self.paths[second]}"] = shared
+
+        stratum_ids = np.frombuffer(self.stratum_ids, dtype=np.uint32)
+        train = np.bincount(stratum_ids[self.keep & ~self.validation], minlength=len(self.strata))
+        held_out = np.bincount(stratum_ids[self.validation], minlength=len(self.strata))
+        strata = {}
+        for key, stratum_id in self.strata.items():
+            name = stratum_name(self.settings["stratify"], key)
+            if name in strata:  # System prompts that differ only after the preview
+                name = f"{name} ({stratum_id})"
+            strata[name] = {"train": int(train[stratum_id]), "validation": int(held_out[stratum_id])}
+
+        largest = []
+        for root in roots[np.argsort(-sizes[roots], kind="stable")][:top]:
+            members = np.nonzero(labels == root)[0]
+            largest.append({
+                "size": int(sizes[root]), "kind": "exact" if digests_per_cluster[root] == 1 else "near",
+                "files": [self.paths[index] for index in np.unique(files[members])],
+                "members": [self.ref(index) for index in members[:10]], "preview": self.preview(root),
+            })
+        validation = int(self.validation.sum())
+        return {
+            "inputs": self.paths, "examples": len(labels), "invalid": len(self.invalid),
+            "invalid_lines": self.invalid[:20], "exact_duplicates": int(self.exact_duplicate.sum()),
+            "clusters": len(roots), "near_duplicate_clusters": int((digests_per_cluster[roots] > 1).sum()),
+            "clustered_examples": int(sizes[roots].sum()), "cross_file_clusters": int((distinct[roots] > 1).sum()),
+            "overlap": overlap, "dropped": int((~self.keep).sum()), "train": int(self.keep.sum()) - validation,
+            "validation": validation, "strata": strata, "largest_clusters": largest,
+            "settings": self.settings, "seconds": self.seconds,
+        }
+
+
+def analyze(paths, validation_fraction=DEFAULT_VALIDATION_FRACTION, stratify=DEFAULT_STRATIFY,
+            threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+            shingle_size=DEFAULT_SHINGLE_SIZE, keep_exact_duplicates=False, drop_near_duplicates=False, seed=0,
+            work_dir=None):
+    """First pass: index every example, cluster duplicates and decide the split"""
+    settings = {"validation_fraction": validation_fraction, "stratify": list(stratify), "threshold": threshold,
+                "num_perm": num_perm, "bands": bands, "shingle_size": shingle_size,
+                "keep_exact_duplicates": keep_exact_duplicates, "drop_near_duplicates": drop_near_duplicates,
+                "seed": seed}
+    analysis = DatasetAnalysis(paths, settings)
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix="finetune_dataset_") as scratch:
+        index = DuplicateIndex(scratch, num_perm, bands, shingle_size, seed)
+        for file_index, line_number, offset, line in read_lines(analysis.paths):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            turns = conversation(record)
+            if turns is None:
+                analysis.invalid.append(f"{analysis.paths[file_index]}:{line_number}")
+                continue
+            analysis.files.append(file_index)
+            analysis.lines.append(line_number)
+            analysis.offsets.append(offset)
+            analysis.stratum_ids.append(analysis.strata.setdefault(stratum_key(record, turns, stratify),
+                                                                   len(analysis.strata)))
+            index.add("\n".join(f"{role}: {content}" for role, content in turns),
+                      " ".join(content for role, content in turns if role != "system"))
+        analysis.labels = index.clusters(threshold)
+        analysis.exact_duplicate = index.exact_duplicates()
+        analysis.digests = np.frombuffer(index.digests, dtype=np.uint64).copy()
+
+    keep = np.ones(len(analysis.labels), dtype=bool)
+    if not keep_exact_duplicates:
+        keep &= ~analysis.exact_duplicate
+    if drop_near_duplicates:
+        keep &= analysis.labels == np.arange(len(analysis.labels))
+    analysis.keep = keep
+    analysis.validation = assign_splits(analysis.labels, np.frombuffer(analysis.stratum_ids, dtype=np.uint32),
+                                        keep, analysis.digests, validation_fraction, seed)
+    analysis.seconds = time.perf_counter() - started
+    return analysis
+
+
+def _output_mode(path):
+    """Permissions for a rewritten file: the existing file's, else what open() would give a new one"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_splits(analysis, train_path, validation_path):
+    """Second pass: copy the kept lines into the split files; outputs may overwrite the inputs (report first)"""
+    outputs = {}
+    for name, path in (("train", train_path), ("validation", validation_path)):
+        folder = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        os.chmod(temporary, _output_mode(path))  # mkstemp creates 0600 files, and os.replace keeps that mode
+        outputs[name] = (os.fdopen(handle, "wb"), temporary, path)
+    try:
+        index = 0
+        count = len(analysis.files)
+        for file_index, line_number, _, line in read_lines(analysis.paths):
+            if index >= count or (analysis.files[index], analysis.lines[index]) != (file_index, line_number):
+                continue  # An invalid line
+            if analysis.keep[index]:
+                f = outputs["validation" if analysis.validation[index] else "train"][0]
+                f.write(line if line.endswith(b"\n") else line + b"\n")
+            index += 1
+    except BaseException:
+        for f, temporary, _ in outputs.values():
+            f.close()
+            os.remove(temporary)
+        raise
+    for f, temporary, path in outputs.values():
+        f.close()
+        os.replace(temporary, path)
+
+
+def format_report(report):
+    """Printable lines of a dataset report"""
+    examples = report["examples"]
+    lines = [f"📊 {examples} examples from {len(report['inputs'])} file(s) in {report['seconds']:.1f}s"
+             + (f", {report['invalid']} invalid lines skipped" if report["invalid"] else ""),
+             f"🔁 {report['exact_duplicates']} exact duplicates; {report['clusters']} duplicate clusters "
+             f"({report['near_duplicate_clusters']} with near-duplicates) covering {report['clustered_examples']} "
+             f"examples"]
+    for pair, shared in report["overlap"].items():
+        lines.append(f"⚠️ {shared} clusters shared between {pair}")
+    lines.append(f"✂️ {report['train']} train / {report['validation']} validation"
+                 + (f", {report['dropped']} dropped" if report["dropped"] else ""))
+    for name, counts in report["strata"].items():
+        lines.append(f"  {counts['train']:>8} / {counts['validation']:<8} {name}")
+    for cluster in report["largest_clusters"][:5]:
+        lines.append(f"  {cluster['size']:>4} x {cluster['kind']:<5} {cluster['preview'][:80]}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find duplicate fine-tune examples and write leakage-free splits")
+    parser.add_argument("inputs", nargs="+", help="Chat or prompt/completion JSONL files")
+    parser.add_argument("--train", help="Train split to write")
+    parser.add_argument("--validation", help="Validation split to write")
+    parser.add_argument("--validation-fraction", type=float, default=DEFAULT_VALIDATION_FRACTION,
+                        help="Share of each stratum's examples to put in validation")
+    parser.add_argument("--stratify-by", default=",".join(DEFAULT_STRATIFY),
+                        help="Comma-separated: system, turns and/or top-level record fields ('none' for no strata)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity of word shingles that makes two examples near-duplicates")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM, help="MinHash permutations")
+    parser.add_argument("--bands", type=int, default=DEFAULT_BANDS, help="LSH bands (must divide --num-perm)")
+    parser.add_argument("--shingle-size", type=int, default=DEFAULT_SHINGLE_SIZE, help="Words per shingle")
+    parser.add_argument("--keep-exact-duplicates", action="store_true", help="Write every copy of an example")
+    parser.add_argument("--drop-near-duplicates", action="store_true",
+                        help="Write only the first example of each duplicate cluster")
+    parser.add_argument("--seed", type=int, default=0, help="Changes which clusters go to validation")
+    parser.add_argument("--report", help="Write the full cluster report as JSON")
+    parser.add_argument("--top", type=int, default=20, help="Largest clusters to include in the report")
+    parser.add_argument("--work-dir", help="Scratch folder for signatures (defaults to the system temp folder)")
+    parser.add_argument("--fail-on-overlap", action="store_true",
+                        help="Exit with 1 when a duplicate cluster spans more than one input file")
+    args = parser.parse_args(argv)
+    if bool(args.train) != bool(args.validation):
+        parser.error("--train and --validation go together")
+    stratify = [] if args.stratify_by == "none" else [key.strip() for key in args.stratify_by.split(",") if key]
+
+    analysis = analyze(args.inputs, args.validation_fraction, stratify, args.threshold, args.num_perm, args.bands,
+                       args.shingle_size, args.keep_exact_duplicates, args.drop_near_duplicates, args.seed,
+                       args.work_dir)
+    report = analysis.report(args.top)  # Before the splits, which may overwrite the inputs it reads previews from
+    if args.train:
+        write_splits(analysis, args.train, args.validation)
+    print("\n".join(format_report(report)))
+    if args.train:
+        print(f"💾 Wrote {args.train} and {args.validation}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"📄 Wrote {args.report}")
+    if args.fail_on_overlap and report["cross_file_clusters"]:
+        print(f"❌ {report['cross_file_clusters']} duplicate clusters span more than one input file")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,7 @@ var spokenTextQueue = []
 var sessionActive = false
 var lastSpeakTime
 var imgUrl = ""
+var chatClientId = Math.random().toString(36).substring(2) // Lets the chat proxy limit concurrent requests per tab
 
 // Connect to avatar service
 function connectAvatar() {
@@ -67,7 +68,8 @@ function connectAvatar() {
     const azureOpenAIEndpoint = document.getElementById('azureOpenAIEndpoint').value
     const azureOpenAIApiKey = document.getElementById('azureOpenAIApiKey').value
     const azureOpenAIDeploymentName = document.getElementById('azureOpenAIDeploymentName').value
-    if (azureOpenAIEndpoint === '' || azureOpenAIApiKey === '' || azureOpenAIDeploymentName === '') {
+    // The API key is only needed when the page calls Azure OpenAI directly rather than through the server's chat proxy
+    if (!window.chatProxyUrl && (azureOpenAIEndpoint === '' || azureOpenAIApiKey === '' || azureOpenAIDeploymentName === '')) {
         alert('Please fill in the Azure OpenAI endpoint, API key and deployment name.')
         return
     }
@@ -300,6 +302,44 @@ function setDataSources(azureCogSearchEndpoint, azureCogSearchApiKey, azureCogSe
     dataSources.push(dataSource)
 }
 
+// Send a streaming chat completion request, through the avatar server's chat proxy when it provides one
+function fetchChatCompletion(payload) {
+    let body = Object.assign({}, payload, { stream: true })
+    if (dataSources.length > 0) {
+        body.dataSources = dataSources
+    }
+
+    if (window.chatProxyUrl) {
+        // The server holds the Azure OpenAI key and chooses the endpoint
+        return fetch(window.chatProxyUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Chat-Client': chatClientId
+            },
+            body: JSON.stringify(body)
+        })
+    }
+
+    const azureOpenAIEndpoint = document.getElementById('azureOpenAIEndpoint').value
+    const azureOpenAIApiKey = document.getElementById('azureOpenAIApiKey').value
+    const azureOpenAIDeploymentName = document.getElementById('azureOpenAIDeploymentName').value
+
+    let url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
+    if (dataSources.length > 0) {
+        url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/extensions/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
+    }
+
+    return fetch(url, {
+        method: 'POST',
+        headers: {
+            'api-key': azureOpenAIApiKey,
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(body)
+    })
+}
+
 // Do HTML encoding on given text
 function htmlEncode(text) {
     const entityMap = {
@@ -459,29 +499,6 @@ function handleUserQuery(userQuery, userQueryHTML, imgUrlPath) {
         speak(getQuickReply(), 2000)
     }
 
-    const azureOpenAIEndpoint = document.getElementById('azureOpenAIEndpoint').value
-    const azureOpenAIApiKey = document.getElementById('azureOpenAIApiKey').value
-    const azureOpenAIDeploymentName = document.getElementById('azureOpenAIDeploymentName').value
-
-    let url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
-    let body = JSON.stringify({
-        messages: messages,
-        tools: [menuNavigationTool],
-        tool_choice: "auto",
-        stream: true
-    })
-
-    if (dataSources.length > 0) {
-        url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/extensions/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
-        body = JSON.stringify({
-            dataSources: dataSources,
-            messages: messages,
-            tools: [menuNavigationTool],
-            tool_choice: "auto",
-            stream: true
-        })
-    }
-
     let assistantReply = ''
     let toolContent = ''
     let spokenSentence = ''
@@ -490,13 +507,10 @@ function handleUserQuery(userQuery, userQueryHTML, imgUrlPath) {
     let currentToolCall = null
     let toolCallsExecuted = []
 
-    fetch(url, {
-        method: 'POST',
-        headers: {
-            'api-key': azureOpenAIApiKey,
-            'Content-Type': 'application/json'
-        },
-        body: body
+    fetchChatCompletion({
+        messages: messages,
+        tools: [menuNavigationTool],
+        tool_choice: "auto"
     })
     .then(response => {
         if (!response.ok) {
@@ -691,42 +705,18 @@ function handleUserQuery(userQuery, userQueryHTML, imgUrlPath) {
 
 // Function to make a follow-up call after tool execution
 function makeFollowUpCall() {
-    const azureOpenAIEndpoint = document.getElementById('azureOpenAIEndpoint').value
-    const azureOpenAIApiKey = document.getElementById('azureOpenAIApiKey').value
-    const azureOpenAIDeploymentName = document.getElementById('azureOpenAIDeploymentName').value
-
     // Add a prompt asking the assistant to describe what was just shown
     messages.push({
         role: 'user',
         content: 'Please briefly describe, in no more than one short sentence, what you just showed me. Say something like "Here\'s the classic filet mignon."'
     })
 
-    let url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
-    let body = JSON.stringify({
-        messages: messages,
-        stream: true
-    })
-
-    if (dataSources.length > 0) {
-        url = "{AOAIEndpoint}/openai/deployments/{AOAIDeployment}/extensions/chat/completions?api-version=2024-02-15-preview".replace("{AOAIEndpoint}", azureOpenAIEndpoint).replace("{AOAIDeployment}", azureOpenAIDeploymentName)
-        body = JSON.stringify({
-            dataSources: dataSources,
-            messages: messages,
-            stream: true
-        })
-    }
-
     let followUpReply = ''
     let spokenSentence = ''
     let displaySentence = ''
 
-    fetch(url, {
-        method: 'POST',
-        headers: {
-            'api-key': azureOpenAIApiKey,
-            'Content-Type': 'application/json'
-        },
-        body: body
+    fetchChatCompletion({
+        messages: messages
     })
     .then(response => {
         if (!response.ok) {
@@ -4,7 +4,19 @@ import threading
 import openai
 from foundry_local import FoundryLocalManager
 import os
+import time
 from PIL import Image, ImageTk
+from build_assets import logo_thumbnail
+from local_metrics import LATENCY_BUCKETS, RATE_BUCKETS, REGISTRY, start_metrics_server
+
+METRICS_PORT = 9103  # local Prometheus endpoint, http://localhost:9103/metrics
+
+FIRST_TOKEN_SECONDS = REGISTRY.histogram("local_model_time_to_first_token_seconds",
+                                         "From sending a question to the first streamed token",
+                                         buckets=LATENCY_BUCKETS + (20, 30, 60))
+TOKENS_PER_SECOND = REGISTRY.histogram("local_model_tokens_per_second",
+                                       "Streamed tokens per second after the first token", buckets=RATE_BUCKETS)
+REQUESTS = REGISTRY.counter("local_model_requests", "Questions answered by the local model", ["status"])
 
 class RestaurantAssistantGUI:
     def __init__(self):
@@ -25,6 +37,9 @@ class RestaurantAssistantGUI:
         
         # Setup the UI
         self.setup_ui()
+        
+        # Live time-to-first-token and tokens/sec numbers
+        self.metrics_server = start_metrics_server(METRICS_PORT)
     
     def setup_ai(self):
         """Initialize the Foundry Local manager and OpenAI client"""
@@ -50,11 +65,14 @@ class RestaurantAssistantGUI:
             self.restaurant_info = "Restaurant information not available."
     
     def load_logo(self):
-        """Load and resize the restaurant logo"""
+        """Load the pre-sized restaurant logo, resizing the original only as a fallback"""
         try:
-            # Load the logo image
+            # Thumbnails come from build_assets.py, which saves decoding the 3 MB original
+            thumbnail_path = logo_thumbnail(300, 150)
             logo_path = "Scheibmeirs Logo.png"
-            if os.path.exists(logo_path):
+            if thumbnail_path:
+                self.logo_image = ImageTk.PhotoImage(Image.open(thumbnail_path))
+            elif os.path.exists(logo_path):
                 # Open and resize the image
                 pil_image = Image.open(logo_path)
                 # Resize to fit nicely in the header (maintain aspect ratio)
@@ -267,6 +285,9 @@ Here is the information to use when answering:
 {self.restaurant_info}"""
             
             # Get streaming response
+            started = time.perf_counter()
+            first_token = None
+            tokens = 0
             stream = self.client.chat.completions.create(
                 model=self.manager.get_model_info(self.alias).id,
                 messages=[{"role": "user", "content": prompt}],
@@ -278,16 +299,27 @@ Here is the information to use when answering:
             for chunk in stream:
                 if chunk.choices[0].delta.content is not None:
                     content = chunk.choices[0].delta.content
+                    # Each streamed chunk carries one token
+                    tokens += 1
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        FIRST_TOKEN_SECONDS.observe(first_token - started)
                     self.response_text.insert(tk.END, content)
                     self.response_text.see(tk.END)
                     self.response_text.update()
             
             self.response_text.config(state=tk.DISABLED)
             
+            generating = time.perf_counter() - first_token if first_token is not None else 0
+            if tokens > 1 and generating > 0:
+                TOKENS_PER_SECOND.observe((tokens - 1) / generating)
+            REQUESTS.inc(status="ok")
+            
             # Update status
             self.root.after(0, lambda: self.status_label.config(text="Response complete!"))
             
         except Exception as e:
+            REQUESTS.inc(status="error")
             error_msg = f"Error processing question: {str(e)}"
             self.root.after(0, lambda: self.show_error_response(error_msg))
         
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+In-process Prometheus-style metrics for the research UIs, the local assistant and the avatar server.
+
+Traces go to Application Insights, but live latency numbers shouldn't need
+Azure. Each app records counters and histograms in a process-wide registry
+and serves them in the Prometheus text format on a local /metrics endpoint,
+so a Prometheus (or anything that scrapes it) on the same machine can chart
+time to first reasoning, poll round trips, report render time, image
+generation time, local model tokens per second and chat latency.
+
+The Tk apps start a small server on localhost (override the port with
+METRICS_PORT, or set it to 0 to turn the endpoint off); avatar_server.py
+serves /metrics on its own port.
+
+Usage:
+    LOOKUP_SECONDS = REGISTRY.histogram("menu_lookup_seconds", "Time to look up a menu item", ["source"])
+    LOOKUP_SECONDS.observe(0.12, source="cache")
+    with LOOKUP_SECONDS.time(source="search"):
+        ...
+
+    start_metrics_server(9101)
+    curl http://localhost:9101/metrics
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency, from cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Minutes-long work: time to first reasoning, image generation, whole research runs
+LONG_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers: the smallest value with at least fraction of them at or below it"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Rounded first so float noise (0.07 * 100 = 7.000000000000001) doesn't push the rank up by one
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[min(len(ordered) - 1, max(0, rank - 1))]
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}_total{_label_text(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with-block took"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _samples(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state[0]):
+            cumulative += count
+            labels = _label_text(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state[1])}")
+        lines.append(f"{self.name}_count{labels} {state[2]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process; asking for an existing name returns the same metric"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PROCESS_START = REGISTRY.gauge("process_start_time_seconds", "Start time of the process since the Unix epoch")
+PROCESS_START.set(time.time())
+
+# Shared by ui-deep-research-agent.py (app="deep_research") and ui_deep_research_images.py (app="images")
+RESEARCH_FIRST_REASONING = REGISTRY.histogram(
+    "research_time_to_first_reasoning_seconds", "From starting a run to its first progress message", ["app"],
+    buckets=LONG_BUCKETS)
+RESEARCH_POLL = REGISTRY.histogram(
+    "research_poll_seconds", "Round trip of one poll of the agents service", ["app", "call"])
+RESEARCH_RENDER = REGISTRY.histogram(
+    "research_report_render_seconds", "Time to render the final report in the report panel", ["app"])
+RESEARCH_RUNS = REGISTRY.counter("research_runs", "Finished research runs by outcome", ["app", "status"])
+RESEARCH_CANCEL_ACK = REGISTRY.histogram(
+    "research_cancel_ack_seconds", "From the cancel request to the service reporting the run ended", ["app"])
+RESEARCH_SECONDS_SAVED = REGISTRY.counter(
+    "research_run_seconds_saved", "Estimated service run time saved by cancelling runs", ["app", "reason"])
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the console
+
+
+def start_metrics_server(port, registry=REGISTRY, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; METRICS_PORT overrides the port and 0 disables it"""
+    port = int(os.environ.get("METRICS_PORT", port))
+    if not port:
+        return None
+    handler = type("RegistryHandler", (MetricsRequestHandler,), {"registry": registry})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
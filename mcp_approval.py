@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Policy-based approval of MCP tool calls for agent runs that stop in requires_action.
+
+When an MCP server asks for approval, the run waits in requires_action until
+the client submits a decision for every tool call. ApprovalPolicy decides in
+process from allow-lists of server labels, tool names and URL patterns
+(fnmatch patterns, checked against every "url" argument), and
+submit_approvals answers the run with runs.submit_tool_outputs so polling
+can carry on. ApprovalStats counts the decisions and times them, so a run's
+summary shows how much latency approvals added.
+
+The allow-lists come from the environment (comma-separated patterns):
+    MCP_APPROVED_SERVERS=playwright
+    MCP_APPROVED_TOOLS=browser_navigate,browser_snapshot,...
+    MCP_APPROVED_URLS=https://*,http://localhost/*,http://localhost:*
+
+Usage:
+    policy = ApprovalPolicy.from_env()
+    stats = ApprovalStats()
+    while run.status in ("queued", "in_progress", "requires_action"):
+        if run.status == "requires_action":
+            run = submit_approvals(agents_client, thread.id, run, policy, stats)
+        ...
+    print(stats.summary())
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+
+from azure.ai.agents.models import SubmitToolApprovalAction, ToolApproval
+
+DEFAULT_SERVERS = ("playwright",)
+# Reading and navigating pages; JavaScript evaluation, file uploads and browser installs need a human
+DEFAULT_TOOLS = (
+    "browser_navigate", "browser_navigate_back", "browser_navigate_forward", "browser_snapshot",
+    "browser_take_screenshot", "browser_click", "browser_hover", "browser_type", "browser_press_key",
+    "browser_select_option", "browser_wait_for", "browser_resize", "browser_tab_*", "browser_close",
+    "browser_console_messages", "browser_network_requests",
+)
+# Local pages on the default port ("http://localhost/menu/") as well as on any other one
+DEFAULT_URLS = ("https://*", "http://localhost", "http://localhost/*", "http://localhost:*",
+                "http://127.0.0.1", "http://127.0.0.1/*", "http://127.0.0.1:*")
+
+
+def parse_patterns(text):
+    return tuple(pattern.strip() for pattern in text.split(",") if pattern.strip())
+
+
+def _urls(arguments):
+    """Every string under a "url" key of the tool call's JSON arguments"""
+    if isinstance(arguments, dict):
+        for key, value in arguments.items():
+            if key.lower().endswith("url") and isinstance(value, str):
+                yield value
+            else:
+                yield from _urls(value)
+    elif isinstance(arguments, list):
+        for value in arguments:
+            yield from _urls(value)
+
+
+class ApprovalPolicy:
+    """Allow-lists of MCP server labels, tool names and URLs; anything not listed is denied"""
+
+    def __init__(self, servers=DEFAULT_SERVERS, tools=DEFAULT_TOOLS, urls=DEFAULT_URLS):
+        self.servers = tuple(servers)
+        self.tools = tuple(tools)
+        self.urls = tuple(urls)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            servers=parse_patterns(os.environ.get("MCP_APPROVED_SERVERS", ",".join(DEFAULT_SERVERS))),
+            tools=parse_patterns(os.environ.get("MCP_APPROVED_TOOLS", ",".join(DEFAULT_TOOLS))),
+            urls=parse_patterns(os.environ.get("MCP_APPROVED_URLS", ",".join(DEFAULT_URLS))),
+        )
+
+    def decide(self, tool_call):
+        """(approve, reason) for one RequiredMcpToolCall"""
+        if not any(fnmatchcase(tool_call.server_label or "", pattern) for pattern in self.servers):
+            return False, f"server {tool_call.server_label!r} is not allowed"
+        if not any(fnmatchcase(tool_call.name or "", pattern) for pattern in self.tools):
+            return False, f"tool {tool_call.name!r} is not allowed"
+        try:
+            arguments = json.loads(tool_call.arguments or "{}")
+        except ValueError:
+            return False, "arguments are not valid JSON"
+        for url in _urls(arguments):
+            if not any(fnmatchcase(url, pattern) for pattern in self.urls):
+                return False, f"URL {url!r} is not allowed"
+        return True, "allowed"
+
+
+class ApprovalStats:
+    """Approval decisions of a run, with the time spent deciding and submitting them"""
+
+    def __init__(self):
+        self.decisions = Counter()  # (tool, "approved" | "denied") → count
+        self.denials = []  # (tool, reason)
+        self.requests = 0  # requires_action rounds answered
+        self.decision_seconds = 0.0
+        self.submit_seconds = 0.0
+        self.slowest_seconds = 0.0
+
+    @property
+    def approved(self):
+        return sum(count for (_, outcome), count in self.decisions.items() if outcome == "approved")
+
+    @property
+    def denied(self):
+        return sum(count for (_, outcome), count in self.decisions.items() if outcome == "denied")
+
+    @property
+    def total_seconds(self):
+        return self.decision_seconds + self.submit_seconds
+
+    def summary(self):
+        if not self.requests:
+            return "🔐 No tool approvals were requested"
+        return (f"🔐 {self.approved + self.denied} tool calls in {self.requests} approval requests: "
+                f"{self.approved} approved, {self.denied} denied; approvals added {self.total_seconds * 1000:.0f} ms "
+                f"(deciding {self.decision_seconds * 1000:.1f} ms, slowest request {self.slowest_seconds * 1000:.0f} ms)")
+
+
+def submit_approvals(agents_client, thread_id, run, policy, stats=None):
+    """Answer every MCP approval request of a run in requires_action and return the resumed run"""
+    action = run.required_action
+    if not isinstance(action, SubmitToolApprovalAction):
+        raise ValueError(f"Run {run.id} requires {getattr(action, 'type', 'an unknown action')}, not tool approval")
+
+    started = time.perf_counter()
+    approvals = []
+    decisions = []
+    for tool_call in action.submit_tool_approval.tool_calls:
+        approve, reason = policy.decide(tool_call)
+        approvals.append(ToolApproval(tool_call_id=tool_call.id, approve=approve))
+        decisions.append((tool_call.name, approve, reason))
+    decided = time.perf_counter()
+    run = agents_client.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_approvals=approvals)
+    submitted = time.perf_counter()
+
+    if stats is not None:
+        stats.requests += 1
+        stats.decision_seconds += decided - started
+        stats.submit_seconds += submitted - decided
+        stats.slowest_seconds = max(stats.slowest_seconds, submitted - started)
+        for tool, approve, reason in decisions:
+            stats.decisions[(tool, "approved" if approve else "denied")] += 1
+            if not approve:
+                stats.denials.append((tool, reason))
+    for tool, approve, reason in decisions:
+        print(f"{'✅' if approve else '🚫'} {tool}: {reason}")
+    return run
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for Playwright MCP tool calls.
+
+Browsing research runs spend most of their time in navigate, snapshot and
+click calls, so this replays a scripted browsing session against a local
+static site (the repo's menu/ pages, served on a free port) over the MCP
+streamable HTTP transport. Each worker opens its own MCP session and repeats
+the script; with several workers the calls contend for the server's browser
+the way concurrent research runs do. The report has p50/p95/p99 latency per
+tool over the successful calls (failed calls are counted and timed apart, so
+fast failures don't flatter the percentiles) and, when psutil is installed and
+the server process can be found, the memory of the server and its browser
+processes sampled over time.
+
+Usage:
+    python test-playwright-mcp.py --benchmark --concurrency 4 --iterations 10
+    python test-playwright-mcp.py --benchmark --json mcp_benchmark.json
+
+    result = run_benchmark("http://localhost:8931/mcp", concurrency=2, iterations=5)
+    print("\\n".join(format_report(result.report())))
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+
+from local_metrics import percentile
+
+try:
+    import psutil
+except ImportError:  # Memory sampling is skipped without psutil
+    psutil = None
+
+PROTOCOL_VERSION = "2025-03-26"
+# Only the menu pages are served, not the rest of the repository (.env included)
+SITE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu")
+# One pass of the scripted browsing session; {site} is the static site's base URL
+DEFAULT_SCRIPT = (
+    ("browser_navigate", {"url": "{site}/menu.html"}),
+    ("browser_snapshot", {}),
+    ("browser_click", None),  # Arguments come from the element refs of the last snapshot
+    ("browser_navigate", {"url": "{site}/avatar_menu.html"}),
+    ("browser_take_screenshot", {}),
+    ("browser_navigate_back", {}),
+)
+PAGE_LOAD_TOOLS = ("browser_navigate", "browser_navigate_back", "browser_navigate_forward", "browser_tab_new")
+SNAPSHOT_REF = re.compile(r'- (link|button|img|heading)(?: "([^"]*)")?[^\n]*?\[ref=([^\]]+)\]')
+
+
+class McpError(Exception):
+    """A JSON-RPC error or an unusable response from the MCP server"""
+
+
+class McpSession:
+    """Minimal MCP client over streamable HTTP: initialize, tools/call and close"""
+
+    def __init__(self, url, timeout=60):
+        self.url = url
+        self.timeout = timeout
+        self.session_id = None
+        self._http = requests.Session()
+        self._next_id = 0
+
+    def _post(self, payload):
+        headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        response = self._http.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def request(self, method, params=None):
+        self._next_id += 1
+        response = self._post({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params or {}})
+        self.session_id = response.headers.get("Mcp-Session-Id", self.session_id)
+        message = self._read_message(response, self._next_id)
+        if "error" in message:
+            raise McpError(f"{method}: {message['error'].get('message', message['error'])}")
+        return message.get("result", {})
+
+    def _read_message(self, response, request_id):
+        """The JSON-RPC response with request_id, from a JSON body or a server-sent event stream"""
+        if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith("data:"):
+                    message = json.loads(line[5:])
+                    if message.get("id") == request_id:
+                        return message
+            raise McpError(f"No response to request {request_id} in the event stream")
+        return response.json()
+
+    def open(self):
+        result = self.request("initialize", {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                                             "clientInfo": {"name": "mcp-benchmark", "version": "1.0"}})
+        self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+        return result
+
+    def call_tool(self, name, arguments=None):
+        """Text of a tool's result; raises McpError when the tool reports an error"""
+        result = self.request("tools/call", {"name": name, "arguments": arguments or {}})
+        text = "\n".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
+        if result.get("isError"):
+            raise McpError(f"{name}: {text[:200]}")
+        return text
+
+    def close(self):
+        if self.session_id:
+            try:
+                self._http.delete(self.url, headers={"Mcp-Session-Id": self.session_id}, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                pass  # The server drops idle sessions on its own
+        self._http.close()
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_static_site(directory=SITE_DIRECTORY, host="127.0.0.1"):
+    """Serve a folder on a free port from a daemon thread; returns (server, base URL)"""
+    server = ThreadingHTTPServer((host, 0), partial(QuietHandler, directory=directory))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def find_server_pid(mcp_url):
+    """PID of the local process listening on the MCP URL's port, if psutil can see it"""
+    if psutil is None:
+        return None
+    port = urlparse(mcp_url).port
+    try:
+        for connection in psutil.net_connections(kind="tcp"):
+            if connection.status == psutil.CONN_LISTEN and connection.laddr and connection.laddr.port == port:
+                return connection.pid
+    except psutil.AccessDenied:
+        pass
+    return None
+
+
+def tree_rss(pid):
+    """Resident memory of a process and all of its children (the browser runs as the server's children)"""
+    process = psutil.Process(pid)
+    total = 0
+    for member in [process] + process.children(recursive=True):
+        try:
+            total += member.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
+
+
+class MemorySampler:
+    """Samples the server's process tree memory every interval seconds in a daemon thread"""
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []  # (seconds since start, bytes)
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        try:
+            self.samples.append((time.perf_counter() - self._started, tree_rss(self.pid)))
+            return True
+        except psutil.Error:
+            return False  # The server exited
+
+    def _run(self):
+        while self._sample() and not self._stop.wait(self.interval):
+            pass
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and take a last sample of the memory at the end of the benchmark"""
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+class BenchmarkResult:
+    """Latencies per tool (successful and failed calls apart), page loads and memory samples of one benchmark"""
+
+    def __init__(self, concurrency, iterations):
+        self.concurrency = concurrency
+        self.iterations = iterations
+        self.latencies = defaultdict(list)
+        self.error_latencies = defaultdict(list)
+        self.skipped = Counter()
+        self.page_loads = 0
+        self.seconds = 0.0
+        self.memory = []
+        self._lock = threading.Lock()
+
+    def record(self, tool, seconds, error=None):
+        with self._lock:
+            if error is not None:
+                self.error_latencies[tool].append(seconds)
+                return
+            self.latencies[tool].append(seconds)
+            if tool in PAGE_LOAD_TOOLS:
+                self.page_loads += 1
+
+    def skip(self, tool):
+        with self._lock:
+            self.skipped[tool] += 1
+
+    def report(self):
+        tools = {}
+        for tool in sorted(set(self.latencies) | set(self.error_latencies)):
+            values, errors = self.latencies.get(tool, []), self.error_latencies.get(tool, [])
+            tools[tool] = {
+                "calls": len(values) + len(errors), "errors": len(errors), "skipped": self.skipped[tool],
+                # Percentiles of successful calls only; None when every call failed
+                "p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "p99": percentile(values, 0.99),
+                "mean": sum(values) / len(values) if values else None,
+                "error_mean": sum(errors) / len(errors) if errors else None,
+            }
+        report = {"concurrency": self.concurrency, "iterations": self.iterations, "seconds": self.seconds,
+                  "page_loads": self.page_loads, "tools": tools, "memory": None}
+        if self.memory:
+            start, peak, end = self.memory[0][1], max(rss for _, rss in self.memory), self.memory[-1][1]
+            growth = (end - start) / 2**20
+            report["memory"] = {
+                "start_mb": start / 2**20, "peak_mb": peak / 2**20, "end_mb": end / 2**20, "growth_mb": growth,
+                "growth_mb_per_100_page_loads": growth * 100 / self.page_loads if self.page_loads else None,
+                "samples": [(round(seconds, 2), round(rss / 2**20, 1)) for seconds, rss in self.memory],
+            }
+        return report
+
+
+def _click_arguments(snapshot):
+    """browser_click arguments for the first clickable element in a page snapshot"""
+    match = SNAPSHOT_REF.search(snapshot or "")
+    if not match:
+        return None
+    role, name, ref = match.groups()
+    return {"element": f"{role} {name}" if name else role, "ref": ref}
+
+
+def _run_worker(mcp_url, site_url, script, iterations, result, timeout):
+    session = McpSession(mcp_url, timeout)
+    try:
+        session.open()
+        snapshot = None
+        for _ in range(iterations):
+            for tool, arguments in script:
+                if arguments is None:
+                    arguments = _click_arguments(snapshot)
+                    if arguments is None:
+                        result.skip(tool)
+                        continue
+                else:
+                    arguments = {key: value.format(site=site_url) if isinstance(value, str) else value
+                                 for key, value in arguments.items()}
+                started = time.perf_counter()
+                try:
+                    text = session.call_tool(tool, arguments)
+                except (McpError, requests.exceptions.RequestException) as e:
+                    result.record(tool, time.perf_counter() - started, e)
+                    continue
+                result.record(tool, time.perf_counter() - started)
+                if "[ref=" in text:
+                    snapshot = text
+    finally:
+        session.close()
+
+
+def run_benchmark(mcp_url, concurrency=1, iterations=5, site_url=None, script=DEFAULT_SCRIPT, server_pid=None,
+                  memory_interval=1.0, timeout=60):
+    """Run the script iterations times in each of concurrency MCP sessions and collect the timings"""
+    site = None
+    if site_url is None:
+        site, site_url = serve_static_site()
+    server_pid = server_pid or find_server_pid(mcp_url)
+    sampler = MemorySampler(server_pid, memory_interval).start() if psutil and server_pid else None
+    result = BenchmarkResult(concurrency, iterations)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            workers = [executor.submit(_run_worker, mcp_url, site_url, script, iterations, result, timeout)
+                       for _ in range(concurrency)]
+            for worker in workers:
+                worker.result()
+    finally:
+        result.seconds = time.perf_counter() - started
+        if sampler:
+            sampler.stop()
+            result.memory = sampler.samples
+        if site:
+            site.shutdown()
+    return result
+
+
+def format_report(report):
+    """Printable lines of a benchmark report"""
+    lines = [f"⏱️ {report['concurrency']} sessions x {report['iterations']} iterations "
+             f"in {report['seconds']:.1f}s, {report['page_loads']} page loads",
+             f"  {'tool':<26}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for tool, stats in report["tools"].items():
+        latencies = "".join(f"{stats[key] * 1000:>10.0f}" if stats[key] is not None else f"{'-':>10}"
+                            for key in ("p50", "p95", "p99"))
+        lines.append(f"  {tool:<26}{stats['calls']:>7}{stats['errors']:>8}{latencies}")
+    memory = report["memory"]
+    if memory:
+        per_load = memory["growth_mb_per_100_page_loads"]
+        lines.append(f"🧠 Server and browser memory: {memory['start_mb']:.0f} MB → {memory['end_mb']:.0f} MB "
+                     f"(peak {memory['peak_mb']:.0f} MB, {memory['growth_mb']:+.0f} MB"
+                     + (f", {per_load:+.1f} MB per 100 page loads)" if per_load is not None else ")"))
+    else:
+        lines.append("🧠 Memory not sampled (needs psutil and a local server process; pass --server-pid)")
+    return lines
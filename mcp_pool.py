@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+A pool of local Playwright MCP servers shared by concurrent browsing research runs.
+
+One Playwright MCP server runs one browser, so every browsing tool call of
+every research session queues behind the same page. The pool launches N
+servers (npx @playwright/mcp@latest --port P, one port each), probes them
+the way test-playwright-mcp.py does, and leases each run the healthy server
+with the fewest active runs. Browsers leak memory over many page loads, so a
+server that has loaded max_page_loads pages stops taking new runs and is
+restarted once its last run is released. A server that fails two health
+probes in a row is restarted too. Leases expire lease_ttl seconds after the
+last heartbeat (PoolClient sends them from a background thread), so a run
+whose script died without releasing doesn't hold its server forever.
+Servers are stopped outside the pool's lock, so a slow browser shutdown
+doesn't hold up leases of the other servers.
+
+Run the pool manager once; agent scripts lease a server per run over HTTP:
+    python mcp_pool.py --size 3 --max-page-loads 200
+    PLAYWRIGHT_MCP_POOL_URL=http://localhost:8930 python deep-research-agent-with-playwright.py
+
+The service has to reach the servers, so set MCP_POOL_URL_TEMPLATE (for
+example to a tunnel address with a {port} placeholder) when the agent service
+is not on this machine.
+
+Usage:
+    client = PoolClient("http://localhost:8930")
+    lease = client.lease()  # {"lease": "9f3c...", "port": 8932, "url": "http://localhost:8932/mcp", ...}
+    try:
+        ...
+    finally:
+        client.release(lease["lease"], page_loads=count_page_loads(steps))
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+DEFAULT_MANAGER_PORT = 8930
+DEFAULT_BASE_PORT = 8931
+DEFAULT_URL_TEMPLATE = "http://localhost:{port}/mcp"
+DEFAULT_SERVER_ARGS = ("--headless", "--browser", "chrome", "--viewport-size", "1280,720")
+# MCP tool calls that load a page in the server's browser
+PAGE_LOAD_TOOLS = ("browser_navigate", "browser_navigate_back", "browser_navigate_forward", "browser_tab_new")
+FAILED_PROBES_BEFORE_RESTART = 2
+STARTUP_GRACE_SECONDS = 30  # npx may still be downloading the server or its browser
+LEASE_TTL_SECONDS = 120  # Without a heartbeat for this long, a lease is reclaimed
+
+
+class Probe:
+    """Result of probing one MCP server"""
+
+    __slots__ = ("healthy", "status_code", "tools", "error", "seconds")
+
+    def __init__(self, healthy, status_code=None, tools=None, error=None, seconds=0.0):
+        self.healthy = healthy
+        self.status_code = status_code
+        self.tools = tools
+        self.error = error
+        self.seconds = seconds
+
+
+def probe_server(mcp_url, timeout=10):
+    """Health and tools probes of an MCP server; healthy when it answers the health check without a 5xx"""
+    started = time.perf_counter()
+    try:
+        response = requests.get(f"{mcp_url}/health", timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return Probe(False, error=e, seconds=time.perf_counter() - started)
+
+    tools = None
+    try:
+        tools_response = requests.get(f"{mcp_url}/tools", timeout=timeout)
+        if tools_response.status_code == 200:
+            tools = [tool.get("name", "Unknown") for tool in tools_response.json() if isinstance(tool, dict)]
+    except (requests.exceptions.RequestException, ValueError):
+        pass  # The tools listing is informational; the health check decides
+    return Probe(response.status_code < 500, response.status_code, tools, seconds=time.perf_counter() - started)
+
+
+def launch_server(port, server_args=DEFAULT_SERVER_ARGS):
+    """Start one Playwright MCP server process"""
+    npx = shutil.which("npx") or "npx"
+    return subprocess.Popen([npx, "@playwright/mcp@latest", "--port", str(port), *server_args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_process(process, timeout=10):
+    """Terminate a server process, killing it if it doesn't exit in time"""
+    if process is None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def count_page_loads(run_steps):
+    """Pages a run loaded, from the MCP tool calls in its run steps"""
+    loads = 0
+    for step in run_steps:
+        for tool_call in getattr(step.step_details, "tool_calls", None) or []:
+            if tool_call.type == "mcp" and tool_call.name in PAGE_LOAD_TOOLS:
+                loads += 1
+    return loads
+
+
+class PooledServer:
+    """One Playwright MCP server of the pool and its load"""
+
+    __slots__ = ("port", "url", "process", "healthy", "failures", "active_runs", "runs", "page_loads",
+                 "draining", "recycles", "started_at")
+
+    def __init__(self, port, url):
+        self.port = port
+        self.url = url
+        self.process = None
+        self.healthy = False
+        self.failures = 0
+        self.active_runs = 0
+        self.runs = 0
+        self.page_loads = 0  # Since the last (re)start
+        self.draining = False  # Takes no new runs; restarted when the last one is released
+        self.recycles = 0
+        self.started_at = None
+
+    def as_dict(self):
+        return {"port": self.port, "url": self.url, "healthy": self.healthy, "active_runs": self.active_runs,
+                "runs": self.runs, "page_loads": self.page_loads, "draining": self.draining,
+                "recycles": self.recycles, "uptime_seconds": time.time() - self.started_at if self.started_at else 0}
+
+
+class Lease:
+    """One run's hold on a pooled server, kept alive by heartbeats"""
+
+    __slots__ = ("id", "server", "expires_at")
+
+    def __init__(self, server, expires_at):
+        self.id = uuid.uuid4().hex
+        self.server = server
+        self.expires_at = expires_at
+
+
+class McpServerPool:
+    """Launches, health-checks, leases by load and recycles a set of Playwright MCP servers"""
+
+    def __init__(self, size=2, base_port=DEFAULT_BASE_PORT, max_page_loads=200, url_template=DEFAULT_URL_TEMPLATE,
+                 server_args=DEFAULT_SERVER_ARGS, launcher=launch_server, probe=probe_server,
+                 lease_ttl=LEASE_TTL_SECONDS, clock=time.monotonic):
+        self.max_page_loads = max_page_loads
+        self.server_args = server_args
+        self.launcher = launcher
+        self.probe = probe
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+        self.servers = [PooledServer(port, url_template.format(port=port))
+                        for port in range(base_port, base_port + size)]
+        self.leases = {}
+        self._lock = threading.Lock()
+
+    def start(self, timeout=60):
+        """Launch every server and wait until they pass a health probe; returns the number that did"""
+        with self._lock:
+            for server in self.servers:
+                self._launch(server)
+        deadline = time.monotonic() + timeout
+        while True:
+            healthy = self.check_health()
+            if healthy == len(self.servers) or time.monotonic() >= deadline:
+                return healthy
+            time.sleep(1)
+
+    def _launch(self, server):
+        server.process = self.launcher(server.port, self.server_args)
+        server.healthy = False
+        server.failures = 0
+        server.page_loads = 0
+        server.draining = False
+        server.started_at = time.time()
+
+    def _take_down(self, server):
+        """Under the lock: take a server out of rotation and hand back its process to stop"""
+        process, server.process = server.process, None
+        server.healthy = False
+        return process
+
+    def _restart(self, stopping):
+        """Outside the lock: stop the (server, process) pairs taken down, then launch fresh servers"""
+        for server, process in stopping:
+            stop_process(process)
+            with self._lock:
+                self._launch(server)
+                server.recycles += 1
+
+    def _return(self, server, page_loads, stopping):
+        """Under the lock: end one run on a server; one past max_page_loads is taken down once it is idle"""
+        server.active_runs = max(0, server.active_runs - 1)
+        server.page_loads += page_loads
+        if self.max_page_loads and server.page_loads >= self.max_page_loads:
+            server.draining = True
+        if server.draining and server.active_runs == 0 and server.process is not None:
+            print(f"♻️ Recycling Playwright MCP server on port {server.port} "
+                  f"after {server.page_loads} page loads")
+            stopping.append((server, self._take_down(server)))
+
+    def _expire_leases(self, stopping):
+        """Under the lock: reclaim leases whose holder stopped sending heartbeats"""
+        now = self.clock()
+        for lease in [lease for lease in self.leases.values() if lease.expires_at <= now]:
+            del self.leases[lease.id]
+            print(f"⌛ Reclaiming an expired lease of the Playwright MCP server on port {lease.server.port}")
+            self._return(lease.server, 0, stopping)
+
+    def check_health(self):
+        """Probe every server outside the lock, then restart idle ones that keep failing; returns the healthy count"""
+        probes = [(server, self.probe(server.url)) for server in self.servers if server.process is not None]
+        stopping = []
+        with self._lock:
+            self._expire_leases(stopping)
+            for server, probe in probes:
+                if server.process is None:
+                    continue  # Taken down while it was being probed
+                server.healthy = probe.healthy
+                server.failures = 0 if probe.healthy else server.failures + 1
+                starting = time.time() - server.started_at < STARTUP_GRACE_SECONDS
+                if server.failures >= FAILED_PROBES_BEFORE_RESTART and server.active_runs == 0 and not starting:
+                    print(f"🔁 Restarting Playwright MCP server on port {server.port}: "
+                          f"{probe.error or probe.status_code}")
+                    stopping.append((server, self._take_down(server)))
+        self._restart(stopping)
+        with self._lock:
+            return sum(server.healthy for server in self.servers)
+
+    def acquire(self):
+        """Lease the healthy server with the fewest active runs (then the fewest page loads)"""
+        stopping = []
+        try:
+            with self._lock:
+                self._expire_leases(stopping)
+                candidates = [server for server in self.servers if server.healthy and not server.draining]
+                if not candidates:
+                    raise RuntimeError("No healthy Playwright MCP server is available")
+                server = min(candidates, key=lambda server: (server.active_runs, server.page_loads))
+                server.active_runs += 1
+                server.runs += 1
+                lease = Lease(server, self.clock() + self.lease_ttl)
+                self.leases[lease.id] = lease
+                return lease
+        finally:
+            self._restart(stopping)
+
+    def heartbeat(self, lease_id):
+        """Extend a lease by lease_ttl; False when it already expired or was released"""
+        with self._lock:
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return False
+            lease.expires_at = self.clock() + self.lease_ttl
+            return True
+
+    def release(self, lease_id, page_loads=0):
+        """Return a leased server; False when the lease already expired and was reclaimed"""
+        stopping = []
+        with self._lock:
+            lease = self.leases.pop(lease_id, None)
+            if lease is not None:
+                self._return(lease.server, page_loads, stopping)
+        self._restart(stopping)
+        return lease is not None
+
+    def status(self):
+        with self._lock:
+            return [server.as_dict() for server in self.servers]
+
+    def close(self):
+        with self._lock:
+            processes = [self._take_down(server) for server in self.servers]
+            self.leases.clear()
+        for process in processes:
+            stop_process(process)
+
+
+class PoolRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of the pool manager: POST /lease, POST /heartbeat, POST /release, GET /status"""
+
+    pool = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/status":
+            self.send_error(404)
+            return
+        self._reply(200, self.pool.status())
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/lease":
+            try:
+                lease = self.pool.acquire()
+            except RuntimeError as e:
+                self._reply(503, {"error": str(e)})
+                return
+            self._reply(200, {"lease": lease.id, "port": lease.server.port, "url": lease.server.url,
+                              "ttl_seconds": self.pool.lease_ttl})
+        elif self.path in ("/heartbeat", "/release"):
+            try:
+                lease_id, page_loads = str(request["lease"]), int(request.get("page_loads", 0))
+            except (KeyError, ValueError, TypeError):
+                self._reply(400, {"error": "a lease id is required"})
+                return
+            if self.path == "/heartbeat":
+                known = self.pool.heartbeat(lease_id)
+            else:
+                known = self.pool.release(lease_id, page_loads)
+            if known:
+                self._reply(200, {})
+            else:
+                self._reply(404, {"error": "unknown or expired lease"})
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_pool(pool, port=DEFAULT_MANAGER_PORT, host="127.0.0.1"):
+    """Serve the pool's lease API from a daemon thread"""
+    handler = type("PoolHandler", (PoolRequestHandler,), {"pool": pool})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class PoolClient:
+    """Leases servers from a running pool manager and keeps the leases alive until they are released"""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._heartbeats = {}
+
+    def lease(self):
+        response = requests.post(f"{self.base_url}/lease", json={}, timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(response.json().get("error", f"Lease failed with status {response.status_code}"))
+        lease = response.json()
+        stop = self._heartbeats[lease["lease"]] = threading.Event()
+        # Three beats per TTL, so one lost request doesn't cost the lease
+        threading.Thread(target=self._keep_alive, args=(lease["lease"], lease["ttl_seconds"] / 3, stop),
+                         daemon=True).start()
+        return lease
+
+    def _keep_alive(self, lease_id, interval, stop):
+        while not stop.wait(interval):
+            try:
+                response = requests.post(f"{self.base_url}/heartbeat", json={"lease": lease_id}, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                continue
+            if response.status_code == 404:
+                print(f"⚠️ The pool reclaimed lease {lease_id}; the run may share its browser now")
+                return
+
+    def release(self, lease_id, page_loads=0):
+        """Return a lease; False when the pool had already reclaimed it"""
+        stop = self._heartbeats.pop(lease_id, None)
+        if stop is not None:
+            stop.set()
+        response = requests.post(f"{self.base_url}/release", json={"lease": lease_id, "page_loads": page_loads},
+                                 timeout=self.timeout)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def status(self):
+        return requests.get(f"{self.base_url}/status", timeout=self.timeout).json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a pool of local Playwright MCP servers")
+    parser.add_argument("--size", type=int, default=int(os.environ.get("MCP_POOL_SIZE", 2)), help="Servers to run")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT, help="Port of the first server")
+    parser.add_argument("--max-page-loads", type=int, default=int(os.environ.get("MCP_POOL_MAX_PAGE_LOADS", 200)),
+                        help="Restart a server after this many page loads (0 = never)")
+    parser.add_argument("--port", type=int, default=DEFAULT_MANAGER_PORT, help="Port of the lease API")
+    parser.add_argument("--health-interval", type=float, default=30, help="Seconds between health probes")
+    parser.add_argument("--lease-ttl", type=float, default=LEASE_TTL_SECONDS,
+                        help="Reclaim a lease after this many seconds without a heartbeat")
+    args = parser.parse_args()
+
+    pool = McpServerPool(args.size, args.base_port, args.max_page_loads,
+                         os.environ.get("MCP_POOL_URL_TEMPLATE", DEFAULT_URL_TEMPLATE), lease_ttl=args.lease_ttl)
+    last_port = args.base_port + args.size - 1
+    print(f"🚀 Starting {args.size} Playwright MCP servers on ports {args.base_port}-{last_port}...")
+    healthy = pool.start()
+    print(f"✅ {healthy}/{args.size} servers healthy")
+    manager = serve_pool(pool, args.port)
+    print(f"📡 Lease API at http://localhost:{args.port} (set PLAYWRIGHT_MCP_POOL_URL to use it)")
+    try:
+        while True:
+            time.sleep(args.health_interval)
+            pool.check_health()
+            for server in pool.status():
+                print(f"  {server['port']}  {'✅' if server['healthy'] else '❌'}  {server['active_runs']} active  "
+                      f"{server['page_loads']} page loads  {server['recycles']} recycles")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping the pool...")
+    finally:
+        manager.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
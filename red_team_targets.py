@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Red team target for the Scheibmeir's restaurant agent.
+
+RestaurantRedTeamTarget is the restaurant_agent_callback from
+restaurant_red_team.ipynb as a reusable object that never blocks the event
+loop. With an async AgentsClient (azure.ai.agents.aio) it awaits the agent
+directly; with the regular client the blocking calls run on a dedicated
+thread pool. Either way a semaphore bounds how many attacks are in flight,
+so RedTeam.scan can overlap its attacks. Pass threads=ThreadLifecycleManager(...)
+to run attacks on pooled threads that are deleted or recycled afterwards.
+
+Usage from a notebook:
+    target = RestaurantRedTeamTarget(agents_client, RESTAURANT_ASSISTANT_ID, max_concurrency=8)
+    result = await red_team.scan(target=target, max_parallel_tasks=8, ...)
+    print(target.summary())
+
+    timings = await scan_at_concurrency_levels(red_team, target, [1, 4, 8], scan_name="...")
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.core.exceptions import HttpResponseError
+from azure.ai.agents.models import MessageRole, RunStatus, ThreadMessageOptions
+
+from local_metrics import percentile
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_POLLING_INTERVAL = 1  # seconds between run status checks
+
+
+def message_content(message):
+    """Text of a red team conversation message (dicts in current SDKs, objects in older ones)"""
+    if isinstance(message, dict):
+        return message.get("content")
+    return getattr(message, "content", None)
+
+
+def assistant_message(content):
+    return {"messages": [{"content": content, "role": "assistant"}]}
+
+
+class RestaurantRedTeamTarget:
+    """Async red team callback with bounded concurrency over a sync or async agents client"""
+
+    def __init__(self, agents_client, agent_id, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 polling_interval=DEFAULT_POLLING_INTERVAL, threads=None):
+        self.agents_client = agents_client
+        self.agent_id = agent_id
+        self.polling_interval = polling_interval
+        # Optional ThreadLifecycleManager; without one each attack leaves its thread behind
+        self.threads = threads
+        # azure.ai.agents.aio.AgentsClient returns coroutines; the sync client is offloaded to threads
+        self.is_async = inspect.iscoroutinefunction(agents_client.create_thread_and_process_run)
+
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # One record per attack: latency and whether the agent answered
+        self.calls = []
+
+    def set_concurrency(self, max_concurrency):
+        """Change how many attacks may be in flight (between scans)"""
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self.close()
+
+    def _ask_blocking(self, query):
+        if self.threads is None:
+            run = self.agents_client.create_thread_and_process_run(
+                agent_id=self.agent_id,
+                thread={"messages": [{"role": "user", "content": query}]},
+                polling_interval=self.polling_interval,
+            )
+            return run, self._reply_blocking(run)
+
+        thread_id = self.threads.acquire()
+        try:
+            run = self.agents_client.runs.create_and_process(
+                thread_id=thread_id,
+                agent_id=self.agent_id,
+                additional_messages=[ThreadMessageOptions(role=MessageRole.USER, content=query)],
+                polling_interval=self.polling_interval,
+            )
+            return run, self._reply_blocking(run)
+        finally:
+            self.threads.release(thread_id)
+
+    def _reply_blocking(self, run):
+        if run.status != RunStatus.COMPLETED:
+            return None
+        return self.agents_client.messages.get_last_message_text_by_role(thread_id=run.thread_id, role=MessageRole.AGENT)
+
+    async def _ask(self, query):
+        if not self.is_async:
+            if self._executor is None:
+                # Sized to the concurrency limit; the default executor may be smaller
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="red-team")
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._ask_blocking, query)
+
+        if self.threads is None:
+            run = await self.agents_client.create_thread_and_process_run(
+                agent_id=self.agent_id,
+                thread={"messages": [{"role": "user", "content": query}]},
+                polling_interval=self.polling_interval,
+            )
+            return run, await self._reply(run)
+
+        # The attack prompt rides along with the run, so a pooled thread costs no extra request
+        thread_id = await self.threads.aacquire()
+        try:
+            run = await self.agents_client.runs.create_and_process(
+                thread_id=thread_id,
+                agent_id=self.agent_id,
+                additional_messages=[ThreadMessageOptions(role=MessageRole.USER, content=query)],
+                polling_interval=self.polling_interval,
+            )
+            return run, await self._reply(run)
+        finally:
+            await self.threads.arelease(thread_id)
+
+    async def _reply(self, run):
+        if run.status != RunStatus.COMPLETED:
+            return None
+        return await self.agents_client.messages.get_last_message_text_by_role(
+            thread_id=run.thread_id, role=MessageRole.AGENT
+        )
+
+    async def __call__(self, messages, stream=False, session_state=None, context=None):
+        """Red team callback: send the latest attack prompt to the agent and return its reply"""
+        query = message_content(messages[-1]) if messages else "Hello"
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                run, reply = await self._ask(query)
+            except HttpResponseError as e:
+                self._record(started, False)
+                if e.status_code == 429:
+                    raise  # The red team retries rate limited attacks itself
+                return assistant_message(f"I encountered an error and couldn't process your request: {str(e)}")
+            except Exception as e:
+                self._record(started, False)
+                return assistant_message(f"I encountered an error and couldn't process your request: {str(e)}")
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        self._record(started, reply is not None)
+        if reply is None:
+            status = getattr(run.status, "value", run.status)
+            return assistant_message(f"I encountered an error processing your request. Status: {status}")
+        return assistant_message(reply.text.value)
+
+    def _record(self, started, answered):
+        with self._lock:
+            self.calls.append({"latency": time.perf_counter() - started, "answered": answered})
+
+    def summary(self):
+        """Attack count, failures, agent latency percentiles and peak concurrency"""
+        with self._lock:
+            calls = list(self.calls)
+        latencies = [c["latency"] for c in calls]
+        return {
+            "attacks": len(calls),
+            "failed": sum(1 for c in calls if not c["answered"]),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "max_in_flight": self.max_in_flight,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = []
+            self.max_in_flight = 0
+
+    def close(self):
+        """Shut down the worker threads used with a sync client"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+async def scan_at_concurrency_levels(red_team, target, levels, output_path=None, **scan_kwargs):
+    """Run the same scan once per concurrency level and report the wall-clock time of each"""
+    timings = []
+    for level in levels:
+        target.set_concurrency(level)
+        target.reset_stats()
+        kwargs = dict(scan_kwargs)
+        if output_path:
+            root, dot, extension = output_path.rpartition(".")
+            kwargs["output_path"] = f"{root}_c{level}.{extension}" if dot else f"{output_path}_c{level}"
+
+        print(f"🚀 Scanning with concurrency {level}...")
+        started = time.perf_counter()
+        await red_team.scan(target=target, parallel_execution=level > 1, max_parallel_tasks=level, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        summary = target.summary()
+        timings.append({"concurrency": level, "wall_clock": elapsed, **summary})
+        print(f"✅ Concurrency {level}: {elapsed:.1f}s for {summary['attacks']} attacks "
+              f"(peak {summary['max_in_flight']} in flight, {summary['failed']} failed)")
+
+    baseline = timings[0]["wall_clock"] if timings else None
+    print("\nConcurrency  Wall clock  Speed-up")
+    for timing in timings:
+        speedup = baseline / timing["wall_clock"] if timing["wall_clock"] else float("nan")
+        print(f"{timing['concurrency']:>11} {timing['wall_clock']:>10.1f}s {speedup:>8.1f}x")
+    return timings
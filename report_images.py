@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Downscaled image cache shared by the image report view and its PDF export.
+
+Generated report images are large PNGs, but the Tk report view only needs a
+thumbnail and the PDF only needs enough pixels to fill the page width. Each
+image is decoded once, downscaled and re-encoded (JPEG unless it really has
+transparency), and the encoded bytes are kept in an LRU bounded by size, so
+an image-heavy report never holds full-size bitmaps in memory. Thumbnails are
+also written to a .thumbnails folder next to the originals because
+tkhtmlview loads images by path.
+
+Usage:
+    cache = ImageCache()
+    image = cache.load("html/images/dining_room.png", (936, 1296))
+    print(image.width, image.height, len(image.data))
+
+    thumbnail_path = cache.thumbnail_file("html/images/dining_room.png", 600)
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # Encoded bytes kept across all cached sizes
+DECODED_IMAGES = 2  # Full-size decodes kept so the thumbnail and PDF sizes share one decode
+JPEG_QUALITY = 85
+THUMBNAIL_DIR = ".thumbnails"
+
+
+class CachedImage:
+    """An encoded, downscaled image ready to embed or display"""
+
+    __slots__ = ("data", "width", "height", "format")
+
+    def __init__(self, data, width, height, format):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.format = format
+
+
+class ImageCache:
+    """Thread-safe LRU of downscaled images keyed by file, modification time and size"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+        self._images = OrderedDict()
+        self._decoded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, path, max_size):
+        """The image at path scaled to fit within max_size (width, height) pixels, never upscaled"""
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns, tuple(max_size))
+        with self._lock:
+            cached = self._images.get(key)
+            if cached is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        cached = self._downscale(self._decode(path, key[1]), max_size)
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = cached
+                self.size_bytes += len(cached.data)
+            while self.size_bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.size_bytes -= len(evicted.data)
+        return cached
+
+    def thumbnail_file(self, path, max_width):
+        """Path of a thumbnail no wider than max_width, written next to the original on first use"""
+        folder, filename = os.path.split(os.path.abspath(path))
+        stem = os.path.splitext(filename)[0]
+        thumbnail_dir = os.path.join(folder, THUMBNAIL_DIR)
+        for extension in ("jpg", "png"):
+            existing = os.path.join(thumbnail_dir, f"{stem}_{max_width}.{extension}")
+            if os.path.exists(existing) and os.path.getmtime(existing) >= os.path.getmtime(path):
+                return existing
+
+        image = self.load(path, (max_width, max_width * 4))
+        os.makedirs(thumbnail_dir, exist_ok=True)
+        thumbnail_path = os.path.join(thumbnail_dir, f"{stem}_{max_width}.{image.format.lower().replace('jpeg', 'jpg')}")
+        temp_path = f"{thumbnail_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(image.data)
+        os.replace(temp_path, thumbnail_path)  # Readers never see a half-written file
+        return thumbnail_path
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._decoded.clear()
+            self.size_bytes = 0
+
+    def _decode(self, path, mtime):
+        """Full-size decode, shared by every size requested for the same file"""
+        key = (path, mtime)
+        with self._lock:
+            image = self._decoded.get(key)
+            if image is not None:
+                self._decoded.move_to_end(key)
+                return image
+
+        with Image.open(path) as source:
+            source.load()
+            image = source if source.mode in ("RGB", "RGBA", "L") else source.convert("RGBA")
+            if image.mode == "RGBA" and image.getextrema()[3][0] == 255:
+                image = image.convert("RGB")  # Fully opaque alpha channel, JPEG is fine
+
+        with self._lock:
+            self.decodes += 1
+            self._decoded[key] = image
+            while len(self._decoded) > DECODED_IMAGES:
+                self._decoded.popitem(last=False)
+        return image
+
+    @staticmethod
+    def _downscale(image, max_size):
+        scale = min(1.0, max_size[0] / image.width, max_size[1] / image.height)
+        if scale < 1.0:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if image.mode == "RGBA":
+            image.save(buffer, "PNG", optimize=True)
+            image_format = "PNG"
+        else:
+            image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+            image_format = "JPEG"
+        return CachedImage(buffer.getvalue(), image.width, image.height, image_format)
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Report markup parsing shared by the Tk report view and the PDF exporters.
+
+A research report arrives either as markdown (deep research UI) or as HTML
+(image-enhanced UI). Both are tokenized in a single pass into the same small
+tree: a list of Blocks (headings, paragraphs, list items, images), each
+holding Inline runs (text, bold, italic, code, links, citations, line
+breaks). Renderers walk the tree instead of re-running regex chains over
+the text, so a report is parsed once however many times it is shown or
+exported.
+
+Usage:
+    blocks = parse_markdown(report_markdown)
+    blocks = parse_html(report_html)
+
+    for block in blocks:
+        print(block.kind, plain_text(block.inlines))
+    Paragraph(to_reportlab_markup(blocks[0].inlines), style)
+"""
+
+import re
+from html.parser import HTMLParser
+from xml.sax.saxutils import escape
+
+# One scanner for every inline construct; alternation order decides precedence
+INLINE_PATTERN = re.compile(
+    r"\*\*(?P<bold>.+?)\*\*"
+    r"|\*(?P<italic>[^*\s][^*]*?)\*"
+    r"|`(?P<code>[^`]+)`"
+    r"|\[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)\)"
+    r"|<sup>(?P<sup>\d+)</sup>"
+    r"|【\d+:(?P<marker>\d+)†[^】]*】"
+    r"|\[(?P<cite>\d+)\]",
+    re.DOTALL,
+)
+BLOCK_PATTERN = re.compile(r"(?P<heading>#{1,6})\s+(?P<title>.*)|(?P<bullet>[-*]|\d+\.)\s+(?P<item>.*)")
+HTML_MARKERS = ('<h1', '<h2', '<h3', '<p>', '<p ', '<div', '<li', '<img')
+
+
+class Inline:
+    """A run of inline content: text, bold, italic, code, link, citation or line_break"""
+
+    __slots__ = ("kind", "text", "children", "url")
+
+    def __init__(self, kind, text="", children=None, url=None):
+        self.kind = kind
+        self.text = text
+        self.children = children or []
+        self.url = url
+
+    def __eq__(self, other):
+        return (isinstance(other, Inline) and self.kind == other.kind and self.text == other.text
+                and self.children == other.children and self.url == other.url)
+
+    def __repr__(self):
+        if self.children:
+            return f"Inline({self.kind!r}, children={self.children!r}, url={self.url!r})"
+        return f"Inline({self.kind!r}, {self.text!r})"
+
+
+class Block:
+    """A heading, paragraph, list_item or image; gap is how many blank lines followed it"""
+
+    __slots__ = ("kind", "inlines", "level", "marker", "src", "alt", "gap")
+
+    def __init__(self, kind, inlines=None, level=0, marker="", src="", alt="", gap=0):
+        self.kind = kind
+        self.inlines = inlines or []
+        self.level = level
+        self.marker = marker
+        self.src = src
+        self.alt = alt
+        self.gap = gap
+
+    def __repr__(self):
+        return f"Block({self.kind!r}, level={self.level}, inlines={self.inlines!r})"
+
+
+def parse_inlines(text):
+    """Tokenize inline markdown (bold, italic, code, links, citations) in one left-to-right scan"""
+    inlines = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            inlines.append(Inline("text", text[position:match.start()]))
+        group = match.lastgroup
+        if group in ("bold", "italic"):
+            inlines.append(Inline(group, children=parse_inlines(match.group(group))))
+        elif group == "code":
+            inlines.append(Inline("code", match.group("code")))
+        elif group == "url":
+            inlines.append(Inline("link", children=parse_inlines(match.group("link")), url=match.group("url")))
+        else:
+            # [n], <sup>n</sup> and 【a:n†source】 are all the same citation
+            inlines.append(Inline("citation", match.group(group)))
+        position = match.end()
+    if position < len(text):
+        inlines.append(Inline("text", text[position:]))
+    return inlines
+
+
+def parse_markdown(text):
+    """Parse report markdown into a list of Blocks"""
+    blocks = []
+    paragraph = []
+
+    def flush():
+        if paragraph:
+            blocks.append(Block("paragraph", parse_inlines("\n".join(paragraph))))
+            paragraph.clear()
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            flush()
+            if blocks:
+                blocks[-1].gap += 1
+            continue
+
+        match = BLOCK_PATTERN.match(line)
+        if not match:
+            paragraph.append(line)
+            continue
+
+        flush()
+        if match.group("heading"):
+            blocks.append(Block("heading", parse_inlines(match.group("title")), level=len(match.group("heading"))))
+        else:
+            blocks.append(Block("list_item", parse_inlines(match.group("item")), marker=match.group("bullet")))
+    flush()
+    return blocks
+
+
+class _ReportHTMLParser(HTMLParser):
+    """Builds the block tree from report HTML in a single pass over the tags"""
+
+    INLINE_TAGS = {"strong": "bold", "b": "bold", "em": "italic", "i": "italic", "code": "code",
+                   "a": "link", "sup": "sup"}
+    BLOCK_TAGS = {"p", "div", "section", "article", "blockquote", "pre", "td", "th", "tr", "table",
+                  "header", "footer", "body"}
+    SKIPPED_TAGS = {"head", "script", "style", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.block = None
+        self.stack = []  # Open inline containers: (tag, Inline)
+        self.lists = []  # Item counters for open <ol>/<ul>, None for bullets
+        self.skipping = 0
+
+    def _target(self):
+        if self.block is None:
+            self.block = Block("paragraph")
+        return self.stack[-1][1].children if self.stack else self.block.inlines
+
+    def _flush(self):
+        self.stack.clear()
+        if self.block is not None:
+            _trim(self.block.inlines)
+            if self.block.inlines:
+                self.blocks.append(self.block)
+        self.block = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping += 1
+        elif self.skipping:
+            return
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            self._flush()
+            self.block = Block("heading", level=int(tag[1]))
+        elif tag == "li":
+            self._flush()
+            marker = "-"
+            if self.lists and self.lists[-1] is not None:
+                self.lists[-1] += 1
+                marker = f"{self.lists[-1]}."
+            self.block = Block("list_item", marker=marker)
+        elif tag in ("ul", "ol"):
+            self._flush()
+            self.lists.append(0 if tag == "ol" else None)
+        elif tag == "img":
+            attributes = dict(attrs)
+            self._flush()
+            self.blocks.append(Block("image", src=attributes.get("src") or "", alt=attributes.get("alt") or ""))
+        elif tag == "br":
+            self._target().append(Inline("line_break"))
+        elif tag in self.INLINE_TAGS:
+            inline = Inline(self.INLINE_TAGS[tag], url=dict(attrs).get("href") if tag == "a" else None)
+            self._target().append(inline)
+            self.stack.append((tag, inline))
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif self.skipping:
+            return
+        elif tag in self.INLINE_TAGS:
+            for index in range(len(self.stack) - 1, -1, -1):
+                if self.stack[index][0] == tag:
+                    _, inline = self.stack[index]
+                    del self.stack[index:]
+                    if inline.kind == "sup":
+                        _close_sup(inline, self._target())
+                    break
+        elif tag in ("ul", "ol"):
+            self._flush()
+            if self.lists:
+                self.lists.pop()
+        elif tag in ("h1", "h2", "h3", "h4", "h5", "h6", "li") or tag in self.BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        text = re.sub(r"\s+", " ", data)
+        if not text.strip() and (self.block is None or not self.block.inlines):
+            return  # Whitespace between blocks
+        target = self._target()
+        if target and target[-1].kind == "text":
+            target[-1].text += text
+        else:
+            target.append(Inline("text", text))
+
+
+def _close_sup(inline, parent):
+    """A <sup> holding only a number is a citation; anything else is plain text"""
+    text = plain_text(inline.children).strip()
+    parent.remove(inline)
+    if text.isdigit():
+        parent.append(Inline("citation", text))
+    elif text:
+        parent.append(Inline("text", text))
+
+
+def _trim(inlines):
+    """Strip whitespace at the edges of a block"""
+    while inlines and inlines[0].kind == "text" and not inlines[0].text.strip():
+        inlines.pop(0)
+    while inlines and inlines[-1].kind in ("text", "line_break") and not inlines[-1].text.strip():
+        inlines.pop()
+    if inlines and inlines[0].kind == "text":
+        inlines[0].text = inlines[0].text.lstrip()
+    if inlines and inlines[-1].kind == "text":
+        inlines[-1].text = inlines[-1].text.rstrip()
+
+
+def parse_html(html):
+    """Parse report HTML into a list of Blocks"""
+    parser = _ReportHTMLParser()
+    parser.feed(html)
+    parser.close()
+    parser._flush()
+    return parser.blocks
+
+
+def parse_report(text):
+    """Parse a report that may be HTML or markdown"""
+    if any(marker in text for marker in HTML_MARKERS):
+        return parse_html(text)
+    return parse_markdown(text)
+
+
+def plain_text(inlines):
+    """The visible text of an inline run"""
+    parts = []
+    for inline in inlines:
+        if inline.kind == "citation":
+            parts.append(f"[{inline.text}]")
+        elif inline.kind == "line_break":
+            parts.append("\n")
+        elif inline.children:
+            parts.append(plain_text(inline.children))
+        else:
+            parts.append(inline.text)
+    return "".join(parts)
+
+
+def to_reportlab_markup(inlines):
+    """Render an inline run as reportlab paragraph markup, escaping the text"""
+    parts = []
+    for inline in inlines:
+        kind = inline.kind
+        if kind == "text":
+            parts.append(escape(inline.text))
+        elif kind == "bold":
+            parts.append(f"<b>{to_reportlab_markup(inline.children)}</b>")
+        elif kind == "italic":
+            parts.append(f"<i>{to_reportlab_markup(inline.children)}</i>")
+        elif kind == "code":
+            parts.append(f'<font face="Courier">{escape(inline.text)}</font>')
+        elif kind == "link" and inline.url:
+            url = escape(inline.url, {'"': "&quot;"})
+            parts.append(f'<a href="{url}" color="#2980b9">{to_reportlab_markup(inline.children)}</a>')
+            if plain_text(inline.children) != inline.url:
+                parts.append(f" ({url})")
+        elif kind == "link":
+            parts.append(to_reportlab_markup(inline.children))
+        elif kind == "citation":
+            parts.append(f"<super>{escape(inline.text)}</super>")
+        elif kind == "line_break":
+            parts.append("<br/>")
+    return "".join(parts)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Streaming PDF export for the deep research report.
+
+The report is parsed once into report_markup blocks (headings, paragraphs,
+list items) and each block becomes a reportlab flowable only when the layout
+engine is about to need it, so memory stays flat however long the report is.
+Callers that already hold the parsed blocks pass them in directly. Images
+are embedded downscaled to the page width through a report_images cache,
+so a report full of generated images doesn't carry full-size bitmaps.
+Paragraph styles are built once per process and reused by every export.
+
+PdfExportJob runs the export on a worker thread and exposes its progress, so
+the Tk thread can poll it with root.after() instead of freezing until the
+whole document is laid out.
+
+Usage:
+    write_report_pdf(report_markdown, "report.pdf")
+    write_report_pdf(parse_html(report_html), "report.pdf", base_dir="html", image_cache=cache)
+
+    job = PdfExportJob(blocks, "report.pdf").start()
+    while not job.done:
+        print(f"{job.progress:.0%} ({job.pages} pages)")
+        time.sleep(0.1)
+"""
+
+import functools
+import io
+import os
+import threading
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from report_markup import parse_report, to_reportlab_markup
+
+DEFAULT_TITLE = "🔬 Deep Research Report"
+LOOKAHEAD = 32  # Flowables kept ahead of the layout engine (keepWithNext needs a few)
+IMAGE_PIXELS_PER_POINT = 2  # 144 dpi is plenty for report images
+IMAGE_MAX_HEIGHT = 0.6  # Fraction of the frame height an image may take
+
+
+class ExportCancelled(Exception):
+    """Raised inside the layout loop when the export is cancelled"""
+
+
+@functools.lru_cache(maxsize=None)
+def report_styles():
+    """Paragraph styles for the report, created once per process"""
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib.colors import HexColor
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+    styles = getSampleStyleSheet()
+    return {
+        "normal": styles['Normal'],
+        "title": ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=20, spaceAfter=30,
+                                alignment=TA_CENTER, textColor=HexColor('#2c3e50')),
+        "h1": ParagraphStyle('CustomHeading1', parent=styles['Heading1'], fontSize=16, spaceAfter=12,
+                             spaceBefore=20, textColor=HexColor('#34495e')),
+        "h2": ParagraphStyle('CustomHeading2', parent=styles['Heading2'], fontSize=14, spaceAfter=10,
+                             spaceBefore=16, textColor=HexColor('#34495e')),
+        "h3": ParagraphStyle('CustomHeading3', parent=styles['Heading3'], fontSize=12, spaceAfter=8,
+                             spaceBefore=12, textColor=HexColor('#34495e')),
+        "body": ParagraphStyle('CustomBody', parent=styles['Normal'], fontSize=11, spaceAfter=6,
+                               alignment=TA_JUSTIFY, leftIndent=0, rightIndent=0),
+        "citation": ParagraphStyle('Citations', parent=styles['Normal'], fontSize=10, spaceAfter=4,
+                                   leftIndent=20),
+        "caption": ParagraphStyle('Caption', parent=styles['Normal'], fontName='Helvetica-Oblique', fontSize=9,
+                                  spaceBefore=4, spaceAfter=12, alignment=TA_CENTER,
+                                  textColor=HexColor('#7f8c8d')),
+    }
+
+
+def image_flowables(block, image_cache, base_dir, frame_size):
+    """An embedded image scaled to the frame plus its caption, or a placeholder if it can't be loaded"""
+    from reportlab.platypus import Image, Paragraph
+
+    styles = report_styles()
+    placeholder = [Paragraph(f"[Image unavailable: {escape(block.alt or block.src)}]", styles["caption"])]
+    path = os.path.join(base_dir, block.src)
+    if "://" in block.src or block.src.startswith("data:") or not os.path.isfile(path):
+        return placeholder
+
+    max_width, max_height = frame_size[0], frame_size[1] * IMAGE_MAX_HEIGHT
+    try:
+        image = image_cache.load(path, (int(max_width * IMAGE_PIXELS_PER_POINT),
+                                        int(max_height * IMAGE_PIXELS_PER_POINT)))
+    except OSError:
+        return placeholder  # Unreadable or not an image
+
+    scale = min(max_width / image.width, max_height / image.height, 1 / IMAGE_PIXELS_PER_POINT)
+    flowables = [Image(io.BytesIO(image.data), width=image.width * scale, height=image.height * scale)]
+    if block.alt:
+        flowables.append(Paragraph(escape(block.alt), styles["caption"]))
+    return flowables
+
+
+def iter_report_flowables(blocks, title=DEFAULT_TITLE, generated=None, image_cache=None, base_dir=".",
+                          frame_size=(468, 648)):
+    """Turn parsed report blocks into reportlab flowables, one block at a time"""
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = report_styles()
+    generated = generated or datetime.now()
+    yield Paragraph(title, styles["title"])
+    yield Spacer(1, 20)
+    yield Paragraph(f"Generated: {generated.strftime('%B %d, %Y at %I:%M %p')}", styles["normal"])
+    yield Spacer(1, 20)
+
+    spacing = {1: 20, 2: 16, 3: 12}
+    for block in blocks:
+        if block.kind == "heading":
+            level = min(block.level, 3)
+            yield Spacer(1, spacing[level])
+            yield Paragraph(to_reportlab_markup(block.inlines), styles[f"h{level}"])
+        elif block.kind == "list_item":
+            yield Paragraph(f"{escape(block.marker)} {to_reportlab_markup(block.inlines)}", styles["citation"])
+        elif block.kind == "image":
+            if image_cache is None:
+                from report_images import ImageCache
+                image_cache = ImageCache()
+            yield from image_flowables(block, image_cache, base_dir, frame_size)
+        else:
+            yield Paragraph(to_reportlab_markup(block.inlines), styles["body"])
+            yield Spacer(1, 6)
+
+
+class FlowableStream(list):
+    """A story list that reportlab consumes from the front while it is refilled from a generator"""
+
+    def __init__(self, flowables, lookahead=LOOKAHEAD, on_refill=None):
+        super().__init__()
+        self._flowables = flowables
+        self._lookahead = lookahead
+        self._on_refill = on_refill
+        self._exhausted = False
+
+    def __len__(self):
+        # doc.build checks len() before handling each flowable, which is when we top the buffer up
+        if not self._exhausted and super().__len__() < self._lookahead:
+            for flowable in self._flowables:
+                self.append(flowable)
+                if super().__len__() >= self._lookahead * 2:
+                    break
+            else:
+                self._exhausted = True
+            if self._on_refill:
+                self._on_refill()
+        return super().__len__()
+
+
+def write_report_pdf(report, file_path, title=DEFAULT_TITLE, progress=None, cancel_event=None,
+                     image_cache=None, base_dir="."):
+    """Lay out a report (markdown, HTML or parsed blocks) into a PDF, streaming flowables; returns the page count
+
+    Image sources are resolved against base_dir and embedded downscaled through image_cache.
+    """
+    from reportlab import rl_config
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    # Binary streams instead of ASCII85: without the C accelerator, encoding images dominates the export
+    rl_config.useA85 = 0
+    doc = SimpleDocTemplate(file_path, pagesize=letter,
+                            rightMargin=72, leftMargin=72,
+                            topMargin=72, bottomMargin=18)
+    report_blocks = parse_report(report) if isinstance(report, str) else report
+    total = max(1, len(report_blocks))
+    laid_out = {"blocks": 0}
+
+    def blocks():
+        for index, block in enumerate(report_blocks, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled()
+            laid_out["blocks"] = index
+            yield block
+
+    def on_refill():
+        if progress:
+            progress(laid_out["blocks"] / total, getattr(doc, "page", 0))  # page is set once layout starts
+
+    try:
+        flowables = iter_report_flowables(blocks(), title, image_cache=image_cache, base_dir=base_dir,
+                                          frame_size=(doc.width, doc.height))
+        doc.build(FlowableStream(flowables, on_refill=on_refill))
+    except ExportCancelled:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    if progress:
+        progress(1.0, doc.page)
+    return doc.page
+
+
+class PdfExportJob:
+    """Runs write_report_pdf on a worker thread; poll progress, pages and done from the UI thread"""
+
+    def __init__(self, report, file_path, title=DEFAULT_TITLE, image_cache=None, base_dir="."):
+        self.report = report
+        self.file_path = file_path
+        self.title = title
+        self.image_cache = image_cache
+        self.base_dir = base_dir
+        self.progress = 0.0
+        self.pages = 0
+        self.error = None
+        self.cancelled = False
+        self.elapsed = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self.pages = write_report_pdf(self.report, self.file_path, self.title,
+                                          progress=self._update, cancel_event=self._cancel,
+                                          image_cache=self.image_cache, base_dir=self.base_dir)
+        except ExportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self._done.set()
+
+    def _update(self, fraction, pages):
+        self.progress = fraction
+        self.pages = pages
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """Block until the export finishes; True if it did"""
+        return self._done.wait(timeout)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of finished deep research reports.
+
+Entries are keyed by the normalized prompt (case, whitespace, Unicode forms
+and trailing punctuation don't matter) and a fingerprint of the research
+agent's model, instructions and Deep Research model. The final agent message
+is stored as the SDK's JSON, text and citation annotations included, so a
+repeated prompt renders through the usual report pipeline in milliseconds
+instead of starting a multi-minute run. Entries expire after a TTL and the
+least recently used ones are evicted once the cache grows past its size cap.
+
+Usage:
+    python research_cache.py --stats
+    python research_cache.py --prune
+    python research_cache.py --clear
+
+    cache = ReportCache()
+    cached = cache.get(prompt, fingerprint)
+    if cached is None:
+        cache.put(prompt, fingerprint, final_message.as_dict())
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.path.join(".research_cache", "reports.sqlite")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # Research goes stale; a week-old storefront report is still useful
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def normalize_prompt(prompt):
+    """Prompt text with trivial differences (case, spacing, Unicode forms, final punctuation) removed"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    return re.sub(r"\s+", " ", text).strip().rstrip(".!?").strip()
+
+
+class CachedReport:
+    """A cached final message and when it was produced"""
+
+    __slots__ = ("message", "created_at", "prompt")
+
+    def __init__(self, message, created_at, prompt):
+        self.message = message
+        self.created_at = created_at
+        self.prompt = prompt
+
+    @property
+    def age_seconds(self):
+        return time.time() - self.created_at
+
+
+class ReportCache:
+    """SQLite-backed store of final research messages with a TTL, a size cap and hit/miss statistics"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Written from the research worker thread, so access is serialised by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS reports (
+                prompt_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                message TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (prompt_key, fingerprint)
+            )"""
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def prompt_key(prompt):
+        return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+    def get(self, prompt, fingerprint):
+        """The cached report for a prompt and agent version, or None if missing or expired"""
+        key = self.prompt_key(prompt)
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT message, created_at, prompt FROM reports WHERE prompt_key = ? AND fingerprint = ?",
+                (key, fingerprint),
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._connection.execute("DELETE FROM reports WHERE prompt_key = ? AND fingerprint = ?",
+                                         (key, fingerprint))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE reports SET used_at = ? WHERE prompt_key = ? AND fingerprint = ?",
+                                     (now, key, fingerprint))
+            self.hits += 1
+        return CachedReport(json.loads(row[0]), row[1], row[2])
+
+    def put(self, prompt, fingerprint, message):
+        """Store a final message dict (ThreadMessage.as_dict()), evicting old reports past the size cap"""
+        encoded = json.dumps(message, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.prompt_key(prompt), fingerprint, prompt, encoded, len(encoded.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._connection.execute("DELETE FROM reports WHERE created_at < ?", (now - self.ttl,))
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first, keeping at least the newest report
+        rows = self._connection.execute(
+            "SELECT prompt_key, fingerprint, size FROM reports ORDER BY used_at ASC").fetchall()
+        for prompt_key, fingerprint, size in rows[:-1]:
+            self._connection.execute("DELETE FROM reports WHERE prompt_key = ? AND fingerprint = ?",
+                                     (prompt_key, fingerprint))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def prune(self):
+        """Drop expired reports and enforce the size cap; returns how many were removed"""
+        with self._lock, self._connection:
+            before = self._connection.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+            self._evict(time.time())
+            return before - self._connection.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def invalidate(self, prompt=None, fingerprint=None):
+        """Delete matching reports (all of them when called without arguments); returns the count"""
+        conditions, parameters = [], []
+        if prompt is not None:
+            conditions.append("prompt_key = ?")
+            parameters.append(self.prompt_key(prompt))
+        if fingerprint is not None:
+            conditions.append("fingerprint = ?")
+            parameters.append(fingerprint)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock, self._connection:
+            return self._connection.execute(f"DELETE FROM reports{where}", parameters).rowcount
+
+    def stats(self):
+        """Hit/miss counts for this session plus stored reports and their total size"""
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the deep research report cache")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="Cache database path")
+    parser.add_argument("--stats", action="store_true", help="Show stored reports and their size")
+    parser.add_argument("--prune", action="store_true", help="Drop expired reports and enforce the size cap")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached report")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No cache at {args.path}")
+        return
+
+    cache = ReportCache(args.path)
+    if args.prune:
+        print(f"🗑️  Removed {cache.prune()} expired or evicted reports")
+    elif args.clear:
+        print(f"🗑️  Removed {cache.invalidate()} reports")
+    stats = cache.stats()
+    print(f"{stats['entries']} reports, {stats['bytes'] / 1024:.0f} KB")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
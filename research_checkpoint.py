@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Crash-safe checkpoints for deep research runs.
+
+A deep research run keeps going on the service for many minutes, but the
+agent, thread and run IDs only live in the client's memory. The checkpoint
+store writes them to a local SQLite database as soon as the run is created,
+then records every progress message the client has shown, so after a crash,
+a closed laptop lid or a stopped poll the client can reattach to the run and
+replay the progress it already rendered without fetching it again.
+
+Every update is a single transaction on a WAL database with synchronous=FULL,
+so a checkpoint is either fully written or not written at all.
+
+Usage:
+    python research_checkpoint.py --list
+    python research_checkpoint.py --discard <run_id>
+
+    store = ResearchCheckpointStore()
+    store.start("cli", agent_id, thread_id, run_id, query)
+    store.record_progress(run_id, message_id, text)
+    checkpoint = store.latest_unfinished("cli")
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(".research_checkpoints", "runs.sqlite")
+
+# Run statuses the service can still move forward, so the run is worth reattaching to
+ACTIVE_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
+
+
+def _status_text(status):
+    """Plain status string; RunStatus members would otherwise be stored as 'RunStatus.X'"""
+    return getattr(status, "value", status)
+
+
+class Checkpoint:
+    """Saved state of one research run"""
+
+    __slots__ = ("run_id", "source", "agent_id", "thread_id", "query", "status", "last_message_id",
+                 "created_at", "updated_at")
+
+    def __init__(self, run_id, source, agent_id, thread_id, query, status, last_message_id, created_at, updated_at):
+        self.run_id = run_id
+        self.source = source
+        self.agent_id = agent_id
+        self.thread_id = thread_id
+        self.query = query
+        self.status = status
+        self.last_message_id = last_message_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def resumable(self):
+        return self.status in ACTIVE_STATUSES
+
+    def __repr__(self):
+        return f"Checkpoint(run_id={self.run_id!r}, status={self.status!r}, thread_id={self.thread_id!r})"
+
+
+class ResearchCheckpointStore:
+    """SQLite-backed record of in-flight research runs and the progress already shown for them"""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Written from the research worker thread and read from the Tk thread
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                agent_id TEXT NOT NULL,
+                thread_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                status TEXT NOT NULL,
+                last_message_id TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS progress (
+                run_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            );"""
+        )
+        self._connection.commit()
+
+    def start(self, source, agent_id, thread_id, run_id, query, status="queued"):
+        """Checkpoint a newly created run; source tells the CLI and UI sessions apart"""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (run_id, source, agent_id, thread_id, query, _status_text(status), now, now),
+            )
+
+    def record_progress(self, run_id, message_id, text, status=None):
+        """Append a progress message the client has shown and advance last_message_id in one transaction"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO progress SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM progress WHERE run_id = ?",
+                (run_id, message_id, text, run_id),
+            )
+            self._connection.execute(
+                "UPDATE runs SET last_message_id = ?, status = COALESCE(?, status), updated_at = ? WHERE run_id = ?",
+                (message_id, _status_text(status) if status is not None else None, time.time(), run_id),
+            )
+
+    def update_status(self, run_id, status):
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                                     (_status_text(status), time.time(), run_id))
+
+    def get(self, run_id):
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return Checkpoint(*row) if row else None
+
+    def latest_unfinished(self, source=None):
+        """The most recently updated run that can still be resumed, optionally for one source"""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        query = f"SELECT * FROM runs WHERE status IN ({placeholders})"
+        parameters = list(ACTIVE_STATUSES)
+        if source is not None:
+            query += " AND source = ?"
+            parameters.append(source)
+        with self._lock:
+            row = self._connection.execute(query + " ORDER BY updated_at DESC LIMIT 1", parameters).fetchone()
+        return Checkpoint(*row) if row else None
+
+    def durations(self, source=None, status="completed", limit=20):
+        """Start-to-last-update seconds of the most recent runs that ended with a status, oldest first"""
+        query = "SELECT updated_at - created_at FROM runs WHERE status = ?"
+        parameters = [status]
+        if source is not None:
+            query += " AND source = ?"
+            parameters.append(source)
+        with self._lock:
+            rows = self._connection.execute(query + " ORDER BY updated_at DESC LIMIT ?",
+                                            parameters + [limit]).fetchall()
+        return [seconds for (seconds,) in reversed(rows)]
+
+    def list(self):
+        with self._lock:
+            rows = self._connection.execute("SELECT * FROM runs ORDER BY updated_at DESC").fetchall()
+        return [Checkpoint(*row) for row in rows]
+
+    def progress(self, run_id):
+        """Progress texts already shown for a run, in order"""
+        with self._lock:
+            rows = self._connection.execute("SELECT text FROM progress WHERE run_id = ? ORDER BY seq",
+                                            (run_id,)).fetchall()
+        return [text for (text,) in rows]
+
+    def discard(self, run_id):
+        """Forget a run and its progress; returns True if it existed"""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM progress WHERE run_id = ?", (run_id,))
+            cursor = self._connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            return cursor.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear saved deep research run checkpoints")
+    parser.add_argument("--path", default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint database path")
+    parser.add_argument("--list", action="store_true", help="Show saved runs")
+    parser.add_argument("--discard", metavar="RUN_ID", help="Forget a saved run")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No checkpoints at {args.path}")
+        return
+
+    store = ResearchCheckpointStore(args.path)
+    if args.discard:
+        print(f"🗑️ Discarded {args.discard}" if store.discard(args.discard) else f"No checkpoint for {args.discard}")
+    else:
+        for checkpoint in store.list():
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(checkpoint.updated_at))
+            icon = "⏯️" if checkpoint.resumable else "✅"
+            print(f"{icon} {checkpoint.run_id}  {checkpoint.source:<3}  {checkpoint.status:<12} {updated}  "
+                  f"{len(store.progress(checkpoint.run_id))} progress messages  {checkpoint.query[:50]}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
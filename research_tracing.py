@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Sampling and span-volume control for the deep research UI's tracing.
+
+A 30-minute deep research run polls the service every second, and every poll
+used to produce its own spans, so a single run sent thousands of spans to
+Application Insights. This module keeps the volume proportional to what
+happened rather than to how long it took:
+
+- PollingSummary aggregates every poll of a run into counters and latency
+  statistics on the run's research_polling_phase span
+- SpanRateLimiter caps how often noisy span names (per-poll SDK calls,
+  reasoning steps) are recorded, with a token bucket per name pattern
+- head sampling keeps a fixed ratio of traces (ParentBased(TraceIdRatioBased))
+- TailSamplingProcessor buffers each trace until its root span ends and only
+  exports healthy, fast traces at a ratio; failed and slow traces are always
+  exported
+- the batch span processor gets larger, less frequent exports (OTEL_BSP_*)
+
+Every knob can be overridden with environment variables (see TracingSettings).
+
+Usage:
+    tracer_provider = configure_research_tracing(connection_string)
+    tracer = tracer_provider.get_tracer(__name__)
+
+    summary = PollingSummary()
+    summary.record_run_poll(run.status, latency_seconds)
+    summary.apply(polling_span)
+"""
+
+import fnmatch
+import os
+import random
+import threading
+import time
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import StatusCode
+
+# Spans per minute for names that repeat on every poll; fnmatch patterns, first match wins
+DEFAULT_SPAN_LIMITS = {
+    "agent_reasoning_step": 30,
+    "RunsOperations.get": 6,
+    "MessagesOperations.*": 6,
+    "GET": 12,
+    "HTTP GET": 12,
+}
+
+# Batch span processor settings: after aggregation a run produces tens of spans, so
+# export them in a few large batches instead of waking the exporter every 5 seconds
+BATCH_PROCESSOR_DEFAULTS = {
+    "OTEL_BSP_SCHEDULE_DELAY": "15000",
+    "OTEL_BSP_MAX_QUEUE_SIZE": "1024",
+    "OTEL_BSP_MAX_EXPORT_BATCH_SIZE": "256",
+    "OTEL_BSP_EXPORT_TIMEOUT": "30000",
+}
+
+POLLING_EVENT_LIMIT = 10  # Status changes and errors recorded as events on the summary span
+
+
+def parse_span_limits(text):
+    """'name=30,Runs*=6' → {'name': 30.0, 'Runs*': 6.0} (spans per minute)"""
+    limits = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        pattern, _, rate = item.rpartition("=")
+        if not pattern.strip():
+            raise ValueError(f"Span limit needs a name=spans_per_minute pair: {item!r}")
+        limits[pattern.strip()] = float(rate)
+    return limits
+
+
+class TracingSettings:
+    """Sampling configuration, read from RESEARCH_TRACE_* environment variables"""
+
+    __slots__ = ("sample_ratio", "tail_ratio", "slow_seconds", "span_limits")
+
+    def __init__(self, sample_ratio=1.0, tail_ratio=1.0, slow_seconds=900.0, span_limits=None):
+        self.sample_ratio = sample_ratio  # Head sampling: fraction of traces recorded at all
+        self.tail_ratio = tail_ratio  # Tail sampling: fraction of healthy, fast traces exported
+        self.slow_seconds = slow_seconds  # Traces at least this long are always exported
+        self.span_limits = DEFAULT_SPAN_LIMITS if span_limits is None else span_limits
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        limits = environ.get("RESEARCH_TRACE_SPAN_LIMITS")
+        return cls(
+            sample_ratio=float(environ.get("RESEARCH_TRACE_SAMPLE_RATIO", 1.0)),
+            tail_ratio=float(environ.get("RESEARCH_TRACE_TAIL_RATIO", 1.0)),
+            slow_seconds=float(environ.get("RESEARCH_TRACE_SLOW_SECONDS", 900)),
+            span_limits=parse_span_limits(limits) if limits is not None else None,
+        )
+
+
+class SpanRateLimiter(Sampler):
+    """Drops spans whose name matches a limited pattern once its token bucket is empty"""
+
+    def __init__(self, delegate, limits, clock=time.monotonic):
+        self._delegate = delegate
+        self._clock = clock
+        self._lock = threading.Lock()
+        # pattern → [spans per second, bucket capacity, tokens, last refill]
+        self._buckets = {pattern: [rate / 60, max(1.0, rate), max(1.0, rate), clock()]
+                         for pattern, rate in limits.items()}
+        self._patterns = {}  # Span name → matching pattern (or None), so fnmatch runs once per name
+        self.dropped = {}
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None,
+                      trace_state=None):
+        result = self._delegate.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if not result.decision.is_sampled():
+            return result
+
+        pattern = self._patterns.get(name, False)
+        if pattern is False:
+            pattern = next((p for p in self._buckets if fnmatch.fnmatchcase(name, p)), None)
+            self._patterns[name] = pattern
+        if pattern is None or self._take(pattern):
+            return result
+
+        self.dropped[name] = self.dropped.get(name, 0) + 1
+        return SamplingResult(Decision.DROP, None, result.trace_state)
+
+    def _take(self, pattern):
+        with self._lock:
+            bucket = self._buckets[pattern]
+            now = self._clock()
+            bucket[2] = min(bucket[1], bucket[2] + (now - bucket[3]) * bucket[0])
+            bucket[3] = now
+            if bucket[2] < 1:
+                return False
+            bucket[2] -= 1
+            return True
+
+    def get_description(self):
+        return f"SpanRateLimiter{{{self._delegate.get_description()}}}"
+
+
+class TailSamplingProcessor(SpanProcessor):
+    """Buffers each trace until its root span ends, then exports it or drops it as a whole"""
+
+    def __init__(self, downstream, keep_ratio=1.0, slow_seconds=900.0, max_spans_per_trace=1000,
+                 max_open_traces=64, random_value=random.random):
+        self._downstream = downstream
+        self.keep_ratio = keep_ratio
+        self.slow_seconds = slow_seconds
+        self.max_spans_per_trace = max_spans_per_trace
+        self.max_open_traces = max_open_traces
+        self._random = random_value
+        self._lock = threading.Lock()
+        self._traces = {}  # trace_id → ended spans, in insertion (start) order
+        self.kept_traces = 0
+        self.dropped_traces = 0
+        self.dropped_spans = 0
+
+    def on_start(self, span, parent_context=None):
+        self._downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._traces.setdefault(trace_id, [])
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(span)
+            else:
+                self.dropped_spans += 1
+            if span.parent is None or span.parent.is_remote:
+                decided = [(self._traces.pop(trace_id), span)]
+            else:
+                decided = []
+            while len(self._traces) > self.max_open_traces:
+                # A root that never ends (crashed thread) mustn't hold spans forever
+                oldest = next(iter(self._traces))
+                decided.append((self._traces.pop(oldest), None))
+        for spans, root in decided:
+            self._finish(spans, root)
+
+    def _keep(self, spans, root):
+        if any(s.status.status_code is StatusCode.ERROR for s in spans):
+            return True
+        if root is not None and (root.end_time - root.start_time) / 1e9 >= self.slow_seconds:
+            return True
+        return self._random() < self.keep_ratio
+
+    def _finish(self, spans, root):
+        if self._keep(spans, root):
+            self.kept_traces += 1
+            for span in spans:
+                self._downstream.on_end(span)
+        else:
+            self.dropped_traces += 1
+
+    def force_flush(self, timeout_millis=30000):
+        with self._lock:
+            pending, self._traces = list(self._traces.values()), {}
+        for spans in pending:
+            self._finish(spans, None)
+        return self._downstream.force_flush(timeout_millis)
+
+    def shutdown(self):
+        self.force_flush()
+        self._downstream.shutdown()
+
+
+class PollingSummary:
+    """Counters for every poll of one run, written to a single span instead of a span per poll"""
+
+    __slots__ = ("iterations", "status_changes", "message_polls", "new_messages", "other_messages",
+                 "errors", "last_error", "latency_total", "latency_min", "latency_max", "last_status", "events")
+
+    def __init__(self):
+        self.iterations = 0
+        self.status_changes = 0
+        self.message_polls = 0
+        self.new_messages = 0
+        self.other_messages = 0
+        self.errors = 0
+        self.last_error = None
+        self.latency_total = 0.0
+        self.latency_min = None
+        self.latency_max = 0.0
+        self.last_status = None
+        self.events = []  # (name, attributes), capped so a failing run can't grow it without bound
+
+    def _latency(self, seconds):
+        self.latency_total += seconds
+        self.latency_min = seconds if self.latency_min is None else min(self.latency_min, seconds)
+        self.latency_max = max(self.latency_max, seconds)
+
+    def _event(self, name, attributes):
+        if len(self.events) < POLLING_EVENT_LIMIT:
+            self.events.append((name, attributes))
+
+    def record_run_poll(self, status, latency):
+        """One runs.get call and the status it returned"""
+        status = getattr(status, "value", status)
+        self.iterations += 1
+        self._latency(latency)
+        if status != self.last_status:
+            if self.last_status is not None:
+                self.status_changes += 1
+                self._event("run_status_changed", {"run.status": status, "iteration.number": self.iterations})
+            self.last_status = status
+
+    def record_message_poll(self, new_message, latency):
+        self.message_polls += 1
+        self._latency(latency)
+        if new_message:
+            self.new_messages += 1
+
+    def record_error(self, error):
+        self.errors += 1
+        self.last_error = str(error)
+        self._event("poll_error", {"error.type": type(error).__name__, "error.message": str(error),
+                                   "iteration.number": self.iterations})
+
+    def attributes(self):
+        calls = self.iterations + self.message_polls
+        return {
+            "polling.iterations": self.iterations,
+            "polling.status_changes": self.status_changes,
+            "polling.message_polls": self.message_polls,
+            "polling.new_messages": self.new_messages,
+            "polling.other_messages": self.other_messages,
+            "polling.errors": self.errors,
+            "polling.latency_ms.avg": round(self.latency_total / calls * 1000, 2) if calls else 0.0,
+            "polling.latency_ms.min": round((self.latency_min or 0.0) * 1000, 2),
+            "polling.latency_ms.max": round(self.latency_max * 1000, 2),
+        }
+
+    def apply(self, span):
+        """Write the counters, the last error and the capped events to a span"""
+        if span is None or not span.is_recording():
+            return
+        span.set_attributes(self.attributes())
+        if self.last_error:
+            span.set_attribute("polling.last_error", self.last_error[:500])
+        for name, attributes in self.events:
+            span.add_event(name, attributes)
+
+
+def apply_batch_processor_defaults(environ=os.environ):
+    """Fill in OTEL_BSP_* settings the environment doesn't already set"""
+    for name, value in BATCH_PROCESSOR_DEFAULTS.items():
+        environ.setdefault(name, value)
+
+
+def build_tracer_provider(exporter, settings=None, resource=None):
+    """A TracerProvider with head sampling, span rate limits and tail sampling in front of a batch exporter"""
+    settings = settings or TracingSettings.from_env()
+    apply_batch_processor_defaults()
+    sampler = SpanRateLimiter(ParentBased(TraceIdRatioBased(settings.sample_ratio)), settings.span_limits)
+    tracer_provider = TracerProvider(sampler=sampler, resource=resource or Resource.create())
+    tracer_provider.add_span_processor(TailSamplingProcessor(
+        BatchSpanProcessor(exporter), keep_ratio=settings.tail_ratio, slow_seconds=settings.slow_seconds))
+    return tracer_provider
+
+
+def configure_research_tracing(connection_string, settings=None):
+    """Send sampled traces to Application Insights; logs, metrics and instrumentation go through the distro"""
+    from azure.monitor.opentelemetry import configure_azure_monitor
+    from azure.monitor.opentelemetry.exporter import AzureMonitorTraceExporter
+
+    tracer_provider = build_tracer_provider(AzureMonitorTraceExporter(connection_string=connection_string), settings)
+    trace.set_tracer_provider(tracer_provider)
+    # The distro can't take a custom sampler or tune its own span processor, so it only sets up the rest
+    configure_azure_monitor(connection_string=connection_string, disable_tracing=True)
+    try:
+        # Normally done by the distro's tracing setup: Azure SDK calls report through OpenTelemetry
+        from azure.core.settings import settings as azure_settings
+        from azure.core.tracing.ext.opentelemetry_span import OpenTelemetrySpan
+        azure_settings.tracing_implementation = OpenTelemetrySpan
+    except ImportError:
+        pass
+    return tracer_provider
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Server-side cancellation and a watchdog for deep research runs.
+
+Stopping a run in the UIs used to stop only the client's polling; the run
+kept spending model and Bing quota on the service until it finished. The
+UIs now call runs.cancel and keep polling until the service acknowledges
+the cancellation. The watchdog cancels runs the same way when they exceed
+a maximum wall-clock time or show no progress (no new message and no
+status change) for too long, which also bounds a run stuck in "queued".
+
+Every cancellation records how much run time it saved: the time the run
+would still have taken, from the median of recently completed runs, or for
+a stalled run the time left until the service would have expired it.
+
+Limits come from the environment (0 turns a limit off):
+    RESEARCH_MAX_RUN_MINUTES=60
+    RESEARCH_NO_PROGRESS_MINUTES=15
+    RESEARCH_CANCEL_TIMEOUT_SECONDS=60
+
+Usage:
+    watchdog = RunWatchdog(WatchdogSettings.from_env())
+    while run.status in ("queued", "in_progress") and not watchdog.reason:
+        run = client.runs.get(thread_id=thread_id, run_id=run.id)
+        watchdog.observe(run.status, progressed=new_message)
+    if watchdog.reason:
+        run, acknowledged = cancel_run(client, thread_id, run.id, watchdog.settings.cancel_timeout)
+"""
+
+import os
+import statistics
+import time
+from collections import deque
+
+from azure.core.exceptions import HttpResponseError
+
+# Statuses after which the service no longer spends anything on the run
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+STOP_REASONS = {
+    "user": "stopped by user",
+    "max_runtime": "exceeded the maximum run time",
+    "no_progress": "made no progress",
+}
+
+
+def _status_text(status):
+    return getattr(status, "value", status)
+
+
+class WatchdogSettings:
+    """Run limits in seconds; a limit of 0 is never enforced"""
+
+    __slots__ = ("max_run_seconds", "no_progress_seconds", "cancel_timeout")
+
+    def __init__(self, max_run_seconds=3600, no_progress_seconds=900, cancel_timeout=60):
+        self.max_run_seconds = max_run_seconds
+        self.no_progress_seconds = no_progress_seconds
+        self.cancel_timeout = cancel_timeout
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_run_seconds=float(os.environ.get("RESEARCH_MAX_RUN_MINUTES", 60)) * 60,
+            no_progress_seconds=float(os.environ.get("RESEARCH_NO_PROGRESS_MINUTES", 15)) * 60,
+            cancel_timeout=float(os.environ.get("RESEARCH_CANCEL_TIMEOUT_SECONDS", 60)),
+        )
+
+
+class RunWatchdog:
+    """Tracks one run's age and last progress; reason is set once the run should be cancelled"""
+
+    def __init__(self, settings, started_at=None, clock=time.time):
+        self.settings = settings
+        self.clock = clock
+        # A resumed run passes its checkpoint's start time so the wall-clock limit covers the whole run
+        self.started_at = started_at if started_at is not None else clock()
+        self.last_progress = clock()
+        self.last_status = None
+        self.reason = None
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.started_at
+
+    def observe(self, status, progressed=False):
+        """Record a poll; a new message or a status change counts as progress. Returns the stop reason"""
+        status = _status_text(status)
+        now = self.clock()
+        if progressed or status != self.last_status:
+            self.last_progress = now
+            self.last_status = status
+        if self.reason is None:
+            if self.settings.max_run_seconds and now - self.started_at >= self.settings.max_run_seconds:
+                self.reason = "max_runtime"
+            elif self.settings.no_progress_seconds and now - self.last_progress >= self.settings.no_progress_seconds:
+                self.reason = "no_progress"
+        return self.reason
+
+    def stop(self, reason="user"):
+        if self.reason is None:
+            self.reason = reason
+
+
+class RunDurations:
+    """Durations of recently completed runs, for estimating how long a cancelled run had left"""
+
+    def __init__(self, durations=(), size=20):
+        self._durations = deque(durations, maxlen=size)
+
+    def record(self, seconds):
+        self._durations.append(seconds)
+
+    def typical(self, default):
+        return statistics.median(self._durations) if self._durations else default
+
+
+def cancel_run(agents_client, thread_id, run_id, timeout=60, poll_interval=2, sleep=time.sleep):
+    """Cancel a run and poll until the service reports a terminal status; returns (run, acknowledged)"""
+    try:
+        run = agents_client.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except HttpResponseError:
+        # The run may have finished between the last poll and the cancel request
+        run = agents_client.runs.get(thread_id=thread_id, run_id=run_id)
+    deadline = time.monotonic() + timeout
+    while _status_text(run.status) not in TERMINAL_STATUSES and time.monotonic() < deadline:
+        sleep(poll_interval)
+        run = agents_client.runs.get(thread_id=thread_id, run_id=run_id)
+    return run, _status_text(run.status) in TERMINAL_STATUSES
+
+
+def estimate_saved_seconds(run, elapsed, typical_seconds, reason, now=None):
+    """Run time a cancellation saved: what a typical run had left, or for a stalled run the time to expiry"""
+    remaining = max(0.0, typical_seconds - elapsed)
+    expires_at = getattr(run, "expires_at", None)
+    if expires_at is not None:
+        until_expiry = max(0.0, expires_at.timestamp() - (now if now is not None else time.time()))
+        # A stalled run would have sat there until the service gave up on it
+        remaining = until_expiry if reason == "no_progress" else min(remaining, until_expiry)
+    return remaining
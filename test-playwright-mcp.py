@@ -2,13 +2,20 @@
 """
 Test script to verify Playwright MCP server connection and basic functionality.
 Run this script to ensure your Playwright MCP server is properly configured.
+
+With --benchmark it times a scripted browsing session against the repo's
+menu pages instead (see mcp_benchmark.py):
+    python test-playwright-mcp.py --benchmark --concurrency 4 --iterations 10
 """
 
+import argparse
+import json
 import os
 import requests
-import json
 from dotenv import load_dotenv
 
+from mcp_pool import probe_server
+
 # Load environment variables
 load_dotenv()
 
@@ -18,44 +25,36 @@ def test_mcp_connection():
     mcp_url = os.environ.get("PLAYWRIGHT_MCP_URL", "http://localhost:8931/mcp")
     print(f"Testing connection to Playwright MCP server at: {mcp_url}")
     
-    try:
-        # Test basic connectivity
-        response = requests.get(f"{mcp_url}/health", timeout=10)
-        if response.status_code == 200:
-            print("✅ MCP server is responding to health checks")
-        else:
-            print(f"⚠️  MCP server responded with status code: {response.status_code}")
-    except requests.exceptions.ConnectionError:
+    # The same probes decide whether mcp_pool.py keeps a pooled server in rotation
+    probe = probe_server(mcp_url)
+    if isinstance(probe.error, requests.exceptions.ConnectionError):
         print("❌ Cannot connect to MCP server")
         print("Make sure the Playwright MCP server is running:")
         print("  npx @playwright/mcp@latest --port 8931")
         return False
-    except requests.exceptions.Timeout:
+    if isinstance(probe.error, requests.exceptions.Timeout):
         print("❌ Connection to MCP server timed out")
         return False
-    except Exception as e:
-        print(f"❌ Error connecting to MCP server: {e}")
+    if probe.error:
+        print(f"❌ Error connecting to MCP server: {probe.error}")
         return False
     
-    try:
-        # Test tools endpoint
-        response = requests.get(f"{mcp_url}/tools", timeout=10)
-        if response.status_code == 200:
-            tools = response.json()
-            print(f"✅ MCP server tools endpoint is working")
-            print(f"📋 Available tools: {len(tools)} found")
-            
-            # List some available tools
-            tool_names = [tool.get('name', 'Unknown') for tool in tools if isinstance(tool, dict)]
-            if tool_names:
-                print(f"🔧 Tool names: {', '.join(tool_names[:5])}")
-                if len(tool_names) > 5:
-                    print(f"   ... and {len(tool_names) - 5} more")
-        else:
-            print(f"⚠️  Tools endpoint responded with status code: {response.status_code}")
-            
-    except Exception as e:
-        print(f"⚠️  Could not fetch tools information: {e}")
+    if probe.status_code == 200:
+        print("✅ MCP server is responding to health checks")
+    else:
+        print(f"⚠️  MCP server responded with status code: {probe.status_code}")
+    
+    if probe.tools is not None:
+        print(f"✅ MCP server tools endpoint is working")
+        print(f"📋 Available tools: {len(probe.tools)} found")
+        
+        # List some available tools
+        if probe.tools:
+            print(f"🔧 Tool names: {', '.join(probe.tools[:5])}")
+            if len(probe.tools) > 5:
+                print(f"   ... and {len(probe.tools) - 5} more")
+    else:
+        print("⚠️  Could not fetch tools information")
     
     return True
 
@@ -118,9 +117,37 @@ def test_environment_variables():
     
     return True
 
+def run_mcp_benchmark(args):
+    """Time MCP tool calls against the local menu pages and print p50/p95/p99 per tool"""
+    from mcp_benchmark import format_report, run_benchmark
+    
+    mcp_url = os.environ.get("PLAYWRIGHT_MCP_URL", "http://localhost:8931/mcp")
+    print(f"⏱️ Benchmarking Playwright MCP server at {mcp_url} "
+          f"({args.concurrency} sessions x {args.iterations} iterations)...")
+    result = run_benchmark(mcp_url, args.concurrency, args.iterations, server_pid=args.server_pid,
+                           memory_interval=args.memory_interval)
+    report = result.report()
+    print("\n".join(format_report(report)))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved the report to {args.json}")
+
 def main():
     """Main test function"""
     
+    parser = argparse.ArgumentParser(description="Check or benchmark the Playwright MCP server")
+    parser.add_argument("--benchmark", action="store_true", help="Time scripted MCP tool calls instead of checking")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel MCP sessions (default: 1)")
+    parser.add_argument("--iterations", type=int, default=5, help="Script passes per session (default: 5)")
+    parser.add_argument("--server-pid", type=int, help="Server process for memory sampling (default: found by port)")
+    parser.add_argument("--memory-interval", type=float, default=1.0, help="Seconds between memory samples")
+    parser.add_argument("--json", metavar="PATH", help="Also write the benchmark report as JSON")
+    args = parser.parse_args()
+    if args.benchmark:
+        run_mcp_benchmark(args)
+        return
+    
     print("🧪 Playwright MCP Server Test Suite")
     print("=" * 50)
     
@@ -0,0 +1,280 @@
+"""
+Tests for the avatar server's cached page rendering and HTTP caching behaviour.
+Runs a real server on a free local port against temporary copies of the page files.
+"""
+
+import gzip
+import http.client
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import avatar_server
+
+
+@pytest.fixture
+def avatar_site(tmp_path, monkeypatch):
+    """Serve a minimal avatar page from a temporary directory"""
+    (tmp_path / "avatar_menu_chat.html").write_text(
+        '<html><head><link rel="stylesheet" href="css/styles.css"><script src="js/chat.js"></script></head>'
+        "<body><h1>Menu</h1>" + "<p>Steaks, snacks and sticks.</p>" * 50
+        + '<a href="https://example.com/">elsewhere</a></body></html>',
+        encoding="utf-8",
+    )
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_text("body { color: #333; }\n" * 100, encoding="utf-8")
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "chat.js").write_text("console.log('chat');\n" * 100, encoding="utf-8")
+    (tmp_path / "menu").mkdir()
+    (tmp_path / "menu" / "menu.html").write_text('<img src="../css/styles.css">', encoding="utf-8")
+    (tmp_path / "video").mkdir()
+    (tmp_path / "video" / "idle.mp4").write_bytes(bytes(range(256)) * 40)
+    (tmp_path / "voice_avatar_system_message.txt").write_text("You are Scheibmeir's host.", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    assets = avatar_server.StaticAssetCache()
+    assets.preload()
+    monkeypatch.setattr(avatar_server, "static_assets", assets)
+    page_cache = avatar_server.AvatarPageCache(assets=assets)
+    monkeypatch.setattr(avatar_server, "avatar_page_cache", page_cache)
+
+    httpd = ThreadingHTTPServer(("localhost", 0), avatar_server.AvatarRequestHandler)
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        yield httpd.server_address[1], page_cache, tmp_path
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def request(port, path, headers=None, method="GET"):
+    connection = http.client.HTTPConnection("localhost", port, timeout=10)
+    connection.request(method, path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_page_is_rendered_once_and_reused(avatar_site):
+    port, page_cache, _ = avatar_site
+
+    first, first_body = request(port, "/")
+    second, second_body = request(port, "/avatar_menu_chat.html")
+
+    assert first.status == 200 and second.status == 200
+    assert first_body == second_body
+    assert b"You are Scheibmeir\\'s host." in first_body
+    assert int(first.getheader("Content-Length")) == len(first_body)
+    assert page_cache.builds == 1
+
+
+def test_conditional_get_returns_304(avatar_site):
+    port, _, _ = avatar_site
+
+    response, _ = request(port, "/")
+    etag = response.getheader("ETag")
+
+    not_modified, body = request(port, "/", {"If-None-Match": etag})
+    assert not_modified.status == 304
+    assert body == b""
+    assert not_modified.getheader("ETag") == etag
+
+
+def test_compressed_variants_are_negotiated(avatar_site):
+    port, _, _ = avatar_site
+
+    identity, identity_body = request(port, "/")
+    gzipped, gzipped_body = request(port, "/", {"Accept-Encoding": "gzip"})
+
+    assert gzipped.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(gzipped_body) == identity_body
+    assert gzipped.getheader("ETag") != identity.getheader("ETag")
+    assert gzipped.getheader("Vary") == "Accept-Encoding"
+
+    # A cached gzip ETag validates the gzip variant, and the 304 keeps that variant's ETag
+    revalidated, _ = request(port, "/", {"If-None-Match": gzipped.getheader("ETag"), "Accept-Encoding": "gzip"})
+    assert revalidated.status == 304 and revalidated.getheader("ETag") == gzipped.getheader("ETag")
+    # A client that no longer accepts gzip gets the identity variant instead
+    switched, _ = request(port, "/", {"If-None-Match": gzipped.getheader("ETag")})
+    assert switched.status == 200 and switched.getheader("ETag") == identity.getheader("ETag")
+
+    if avatar_server.brotli is not None:
+        brotlied, brotlied_body = request(port, "/", {"Accept-Encoding": "gzip, br"})
+        assert brotlied.getheader("Content-Encoding") == "br"
+        assert avatar_server.brotli.decompress(brotlied_body) == identity_body
+
+    refused, _ = request(port, "/", {"Accept-Encoding": "gzip;q=0"})
+    assert refused.getheader("Content-Encoding") is None
+
+
+def test_page_is_rebuilt_when_source_changes(avatar_site):
+    port, page_cache, site_dir = avatar_site
+
+    before, _ = request(port, "/")
+    message_file = site_dir / "voice_avatar_system_message.txt"
+    message_file.write_text("You are the new host.", encoding="utf-8")
+    # Make sure the mtime moves even on coarse-grained filesystems
+    future = time.time() + 5
+    os.utime(message_file, (future, future))
+
+    after, body = request(port, "/")
+    assert b"You are the new host." in body
+    assert after.getheader("ETag") != before.getheader("ETag")
+    assert page_cache.builds == 2
+
+
+def test_head_request_has_no_body(avatar_site):
+    port, _, _ = avatar_site
+
+    response, body = request(port, "/", method="HEAD")
+    assert response.status == 200
+    assert body == b""
+    assert int(response.getheader("Content-Length")) > 0
+
+
+def test_page_references_versioned_assets(avatar_site):
+    port, _, _ = avatar_site
+
+    _, body = request(port, "/")
+    assert b'href="css/styles.css?v=' in body
+    assert b'src="js/chat.js?v=' in body
+    assert b'href="https://example.com/"' in body
+
+    _, menu = request(port, "/menu/menu.html")
+    assert b'src="../css/styles.css?v=' in menu
+
+
+def test_static_assets_are_precompressed_and_cached(avatar_site):
+    port, _, _ = avatar_site
+
+    _, page = request(port, "/")
+    versioned = page.split(b'src="')[1].split(b'"')[0].decode()
+
+    unversioned, plain_body = request(port, "/js/chat.js")
+    assert unversioned.getheader("Cache-Control") == "no-cache"
+
+    immutable, gzipped_body = request(port, "/" + versioned, {"Accept-Encoding": "gzip"})
+    assert immutable.getheader("Cache-Control") == "public, max-age=31536000, immutable"
+    assert immutable.getheader("Content-Encoding") == "gzip"
+    assert gzip.decompress(gzipped_body) == plain_body
+
+    # A stale version must not be marked immutable
+    stale, _ = request(port, "/js/chat.js?v=0000000000")
+    assert stale.getheader("Cache-Control") == "no-cache"
+
+    revalidated, _ = request(port, "/js/chat.js", {"If-None-Match": unversioned.getheader("ETag")})
+    assert revalidated.status == 304
+    revalidated, _ = request(port, "/" + versioned, {"If-None-Match": immutable.getheader("ETag"),
+                                                     "Accept-Encoding": "gzip"})
+    assert revalidated.status == 304 and revalidated.getheader("ETag") == immutable.getheader("ETag")
+
+
+def test_video_supports_range_requests(avatar_site):
+    port, _, site_dir = avatar_site
+    video = (site_dir / "video" / "idle.mp4").read_bytes()
+
+    full, full_body = request(port, "/video/idle.mp4")
+    assert full.status == 200
+    assert full.getheader("Accept-Ranges") == "bytes"
+    assert full_body == video
+
+    partial, partial_body = request(port, "/video/idle.mp4", {"Range": "bytes=100-199"})
+    assert partial.status == 206
+    assert partial.getheader("Content-Range") == f"bytes 100-199/{len(video)}"
+    assert partial_body == video[100:200]
+
+    suffix, suffix_body = request(port, "/video/idle.mp4", {"Range": "bytes=-10"})
+    assert suffix.status == 206
+    assert suffix_body == video[-10:]
+
+    unsatisfiable, _ = request(port, "/video/idle.mp4", {"Range": f"bytes={len(video)}-"})
+    assert unsatisfiable.status == 416
+
+    # If-Range with an old ETag falls back to the whole file
+    changed, changed_body = request(port, "/video/idle.mp4", {"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert changed.status == 200
+    assert changed_body == video
+
+
+def test_page_is_rebuilt_when_asset_changes(avatar_site):
+    port, page_cache, site_dir = avatar_site
+
+    _, before = request(port, "/")
+    script = site_dir / "js" / "chat.js"
+    script.write_text("console.log('changed');\n", encoding="utf-8")
+    future = time.time() + 5
+    os.utime(script, (future, future))
+
+    # Asset versions are re-checked at most every ASSET_CHECK_SECONDS...
+    _, cached = request(port, "/")
+    assert cached == before and page_cache.builds == 1
+    # ...but serving the changed asset reloads it, which invalidates the page at once
+    request(port, "/js/chat.js")
+    _, after = request(port, "/")
+    assert after != before
+    assert page_cache.builds == 2
+
+    # Once the check interval passes, a change is picked up without the asset being requested
+    script.write_text("console.log('changed again');\n", encoding="utf-8")
+    os.utime(script, (future + 5, future + 5))
+    page_cache.assets.check_interval = 0
+    request(port, "/")
+    assert page_cache.builds == 3
+
+
+def test_menu_images_use_built_variants(avatar_site):
+    port, _, site_dir = avatar_site
+    (site_dir / "menu" / "menu.html").write_text(
+        '<img src="./images/steak.png" alt="Steak">', encoding="utf-8"
+    )
+    (site_dir / "assets").mkdir()
+    (site_dir / "assets" / "manifest.json").write_text(json.dumps({"images": {"menu/images/steak.png": {
+        "width": 1024, "height": 768,
+        "variants": {
+            "webp": [{"width": 320, "path": "assets/menu/steak-320.0123456789.webp"}],
+            "jpg": [{"width": 320, "path": "assets/menu/steak-320.abcdef0123.jpg"}],
+        },
+    }}}), encoding="utf-8")
+    avatar_server.static_assets.preload()
+
+    _, menu = request(port, "/menu/menu.html")
+    assert b'<source type="image/webp" srcset="/assets/menu/steak-320.0123456789.webp 320w"' in menu
+    assert b'src="/assets/menu/steak-320.abcdef0123.jpg"' in menu
+    assert b'alt="Steak"></picture>' in menu
+
+
+def test_metrics_endpoint_reports_chat_latency(avatar_site):
+    port, _, _ = avatar_site
+    avatar_server.chat_proxy.stats.record(0.2, 1.5, cache="hit")
+
+    response, body = request(port, "/metrics")
+
+    assert response.status == 200
+    assert response.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+    assert b'chat_stream_seconds_bucket{cache="hit",le="2.5"}' in body
+    assert b"# TYPE chat_time_to_first_token_seconds histogram" in body
+
+
+def test_page_never_carries_the_proxied_openai_key(avatar_site, monkeypatch):
+    port, _, _ = avatar_site
+    monkeypatch.setattr(avatar_server.chat_proxy, "endpoint", "https://example.openai.azure.com")
+    monkeypatch.setattr(avatar_server.chat_proxy, "api_key", "openai-secret")
+    monkeypatch.setenv("RESTAURANT_API_KEY", "openai-secret")
+    monkeypatch.delenv("AVATAR_SPEECH_KEY", raising=False)
+
+    page = avatar_server.render_avatar_page()
+    assert "openai-secret" not in page and "{ id: 'APIKey', value: '' }" in page
+    assert "AVATAR_SPEECH_KEY" in avatar_server.speech_key_warning()
+    monkeypatch.setenv("AVATAR_SPEECH_KEY", "speech-key")
+    page = avatar_server.render_avatar_page()
+    assert "{ id: 'APIKey', value: 'speech-key' }" in page and "openai-secret" not in page
+    assert avatar_server.speech_key_warning() is None
+
+    response, body = request(port, "/api/chat", {"Content-Length": "lots"}, method="POST")
+    assert response.status == 400 and json.loads(body) == {"error": "Invalid request body size"}
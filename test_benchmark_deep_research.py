@@ -0,0 +1,37 @@
+"""
+Tests for the deep research benchmark helpers and baseline comparison.
+"""
+
+from benchmark_deep_research import (
+    REASONING_STEPS,
+    compare_to_baseline,
+    fastest_rounds,
+    report_markdown,
+    start_polled_run,
+)
+
+
+def test_headless_pipeline_builds_the_cited_report():
+    ui, run = start_polled_run("16kb-50cit")
+    ui._execute_research_run(run)
+
+    report = ui.reports[-1]
+    assert ui.agents_client.calls["runs.get"] == REASONING_STEPS + 2
+    assert "<sup>50</sup>" in report
+    assert report.rstrip().endswith("50. [Source 50](https://example.com/source/50)")
+    assert report == report_markdown("16kb-50cit")
+
+
+def test_regressions_are_flagged_against_the_baseline():
+    current = fastest_rounds({"benchmarks": [
+        {"name": "test_pdf[1kb]", "stats": {"min": 0.013}},
+        {"name": "test_render[1kb]", "stats": {"min": 0.004}},
+        {"name": "test_results[1kb]", "stats": {"min": 0.002}},
+    ]})
+    baseline = {"test_pdf[1kb]": 0.010, "test_render[1kb]": 0.010, "test_polling[1kb]": 0.5,
+                "test_results[1kb]": 0.0021}
+
+    rows = {row[0]: row[4] for row in compare_to_baseline(current, baseline, tolerance=0.25)}
+
+    assert rows == {"test_pdf[1kb]": "regression", "test_render[1kb]": "faster",
+                    "test_polling[1kb]": "missing", "test_results[1kb]": "ok"}
@@ -0,0 +1,53 @@
+"""
+Tests for the image asset build step and the manifest it writes.
+"""
+
+import json
+
+from PIL import Image
+
+import build_assets
+
+
+def make_site(tmp_path):
+    (tmp_path / "menu" / "images").mkdir(parents=True)
+    Image.new("RGB", (800, 600), "darkred").save(tmp_path / "menu" / "images" / "steak.png")
+    Image.new("RGBA", (900, 600), (200, 150, 50, 255)).save(tmp_path / "Scheibmeirs Logo.png")
+
+
+def test_build_writes_variants_and_manifest(tmp_path, monkeypatch):
+    make_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    manifest = build_assets.build()
+
+    entry = manifest["images"]["menu/images/steak.png"]
+    # Widths above the source size are capped rather than upscaled
+    assert [v["width"] for v in entry["variants"]["jpg"]] == [320, 640, 800]
+    assert set(entry["variants"]) == set(build_assets.available_formats())
+    for variants in entry["variants"].values():
+        for variant in variants:
+            assert (tmp_path / variant["path"]).exists()
+
+    thumbnail = build_assets.logo_thumbnail(300, 150)
+    with Image.open(thumbnail) as image:
+        assert image.size == (300, 150)
+    assert json.loads((tmp_path / "assets" / "manifest.json").read_text()) == manifest
+
+
+def test_unchanged_sources_are_not_rebuilt(tmp_path, monkeypatch):
+    make_site(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    first = build_assets.build()
+
+    calls = []
+    monkeypatch.setattr(build_assets, "build_responsive", lambda *args: calls.append(args))
+    second = build_assets.build()
+
+    assert calls == []
+    assert second["images"] == first["images"]
+
+
+def test_logo_thumbnail_missing_without_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert build_assets.logo_thumbnail(300, 150) is None
@@ -0,0 +1,289 @@
+"""
+Tests for the avatar server's /api/chat streaming proxy.
+Runs the real avatar server handler in front of a local fake chat completions server.
+"""
+
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import avatar_server
+from chat_proxy import ChatProxy, ChatResponseCache, load_prewarm_queries
+
+
+def completion_event(delta):
+    return {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+
+
+class FakeCompletionsHandler(BaseHTTPRequestHandler):
+    """Streams a canned chat completion the way Azure OpenAI does"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append({"path": self.path, "headers": dict(self.headers),
+                                "body": body, "client_port": self.client_address[1]})
+
+        if server.status != 200:
+            error = json.dumps({"error": {"message": "rate limited"}}).encode()
+            self.send_response(server.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(error)))
+            self.send_header("Retry-After", "3")
+            self.end_headers()
+            self.wfile.write(error)
+            return
+
+        if body.get("tools"):
+            events = [
+                completion_event({"role": "assistant", "tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                                                       "function": {"name": "show_menu_section", "arguments": ""}}]}),
+                completion_event({"tool_calls": [{"index": 0, "function": {"arguments": '{"hashtag": "#steaks"}'}}]}),
+            ]
+        else:
+            events = [completion_event({"role": "assistant"})]
+            events += [completion_event({"content": token}) for token in ("Our ", "filet ", "is ", "great.")]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(server.first_token_delay)
+        for event in events:
+            self.write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(server.token_delay)
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.write_chunk(b"")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def fake_upstream():
+    server = ThreadingHTTPServer(("localhost", 0), FakeCompletionsHandler)
+    server.requests = []
+    server.status = 200
+    server.first_token_delay = 0.05
+    server.token_delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def proxy_server(fake_upstream, monkeypatch):
+    proxy = ChatProxy(f"http://localhost:{fake_upstream.server_address[1]}", "secret-key", "gpt-test",
+                      max_concurrent_per_client=1, cache=ChatResponseCache())
+    monkeypatch.setattr(avatar_server, "chat_proxy", proxy)
+    httpd = ThreadingHTTPServer(("localhost", 0), avatar_server.AvatarRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address[1], proxy
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        proxy.close()
+
+
+def post_chat(port, body, client="tab-1"):
+    connection = http.client.HTTPConnection("localhost", port, timeout=10)
+    connection.request("POST", "/api/chat", body=json.dumps(body),
+                       headers={"Content-Type": "application/json", "X-Chat-Client": client})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response, data
+
+
+def parse_events(data):
+    events = [chunk[5:].strip() for chunk in data.decode().split("\n\n") if chunk.startswith("data:")]
+    return [json.loads(event) for event in events if event != "[DONE]"], events[-1] == "[DONE]"
+
+
+def test_streams_completion_without_exposing_key(proxy_server, fake_upstream):
+    port, proxy = proxy_server
+
+    response, data = post_chat(port, {"messages": [{"role": "user", "content": "Tell me about the filet"}],
+                                      "api_key": "ignored"})
+
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+    events, done = parse_events(data)
+    assert done
+    assert "".join(e["choices"][0]["delta"].get("content") or "" for e in events) == "Our filet is great."
+
+    upstream = fake_upstream.requests[0]
+    assert upstream["path"] == "/openai/deployments/gpt-test/chat/completions?api-version=2024-02-15-preview"
+    assert upstream["headers"]["api-key"] == "secret-key"
+    assert upstream["body"]["stream"] is True
+    assert "api_key" not in upstream["body"]
+
+    stats = proxy.stats.summary()
+    assert stats["requests"] == 1
+    assert stats["ttft_last"] >= fake_upstream.first_token_delay
+
+
+def test_tool_calls_and_data_sources_are_forwarded(proxy_server, fake_upstream):
+    port, _ = proxy_server
+    tool = {"type": "function", "function": {"name": "show_menu_section", "parameters": {}}}
+
+    _, data = post_chat(port, {"messages": [{"role": "user", "content": "Show me steaks"}], "tools": [tool],
+                               "tool_choice": "auto", "dataSources": [{"type": "AzureCognitiveSearch"}]})
+
+    events, _ = parse_events(data)
+    tool_calls = [e["choices"][0]["delta"]["tool_calls"][0] for e in events]
+    assert tool_calls[0]["function"]["name"] == "show_menu_section"
+    assert tool_calls[1]["function"]["arguments"] == '{"hashtag": "#steaks"}'
+
+    upstream = fake_upstream.requests[0]
+    assert "/extensions/chat/completions" in upstream["path"]
+    assert upstream["body"]["tools"] == [tool]
+
+
+def test_upstream_connections_are_pooled(proxy_server, fake_upstream):
+    port, _ = proxy_server
+
+    for question in ("hi", "hello", "hey"):
+        post_chat(port, {"messages": [{"role": "user", "content": question}]})
+
+    assert len(fake_upstream.requests) == 3
+    assert len({r["client_port"] for r in fake_upstream.requests}) == 1
+
+
+def test_concurrent_requests_are_limited_per_client(proxy_server, fake_upstream):
+    port, proxy = proxy_server
+    fake_upstream.first_token_delay = 0.5
+    body = {"messages": [{"role": "user", "content": "hi"}]}
+
+    results = {}
+    slow = threading.Thread(target=lambda: results.setdefault("first", post_chat(port, body)))
+    slow.start()
+    time.sleep(0.2)
+    rejected, _ = post_chat(port, body)
+    other_client, _ = post_chat(port, body, client="tab-2")
+    slow.join()
+
+    assert rejected.status == 429
+    assert rejected.getheader("Retry-After") == "1"
+    assert other_client.status == 200
+    assert results["first"][0].status == 200
+    assert proxy.limiter.active == {}
+
+
+def test_upstream_errors_are_passed_through(proxy_server, fake_upstream):
+    port, proxy = proxy_server
+    fake_upstream.status = 429
+
+    response, data = post_chat(port, {"messages": [{"role": "user", "content": "hi"}]})
+
+    assert response.status == 429
+    assert response.getheader("Retry-After") == "3"
+    assert "rate limited" in json.loads(data)["error"]
+    assert proxy.stats.summary()["errors"] == 1
+    assert proxy.limiter.active == {}
+
+
+def test_invalid_request_is_rejected(proxy_server):
+    port, _ = proxy_server
+
+    response, _ = post_chat(port, {"prompt": "no messages"})
+    assert response.status == 400
+
+
+SYSTEM = {"role": "system", "content": "You are Scheibmeir's host."}
+
+
+def test_repeated_question_is_replayed_from_cache(proxy_server, fake_upstream):
+    port, proxy = proxy_server
+
+    first, first_data = post_chat(port, {"messages": [SYSTEM, {"role": "user", "content": "Tell me about the filet?"}]})
+    # Earlier turns don't matter, and case, spacing and punctuation are normalized
+    history = [SYSTEM, {"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi there!"}]
+    second, second_data = post_chat(port, {"messages": history + [{"role": "user", "content": "  tell me about the FILET "}]})
+
+    assert first.getheader("X-Chat-Cache") == "miss"
+    assert second.getheader("X-Chat-Cache") == "hit"
+    assert second_data == first_data
+    assert len(fake_upstream.requests) == 1
+    assert proxy.summary()["cache"]["hits"] == 1
+
+
+def test_cache_key_includes_system_prompt_and_data_sources(proxy_server, fake_upstream):
+    port, _ = proxy_server
+    question = {"role": "user", "content": "What time do you open?"}
+    search = {"type": "AzureCognitiveSearch", "parameters": {"indexName": "menu", "key": "one"}}
+
+    post_chat(port, {"messages": [SYSTEM, question]})
+    post_chat(port, {"messages": [{"role": "system", "content": "Other prompt"}, question]})
+    post_chat(port, {"messages": [question], "dataSources": [search]})
+    # A rotated search key is still the same data source
+    rotated = {"type": "AzureCognitiveSearch", "parameters": {"indexName": "menu", "key": "two"}}
+    post_chat(port, {"messages": [question], "dataSources": [rotated]})
+
+    assert len(fake_upstream.requests) == 3
+
+
+def test_tool_follow_up_hits_cache_despite_new_call_ids(proxy_server, fake_upstream):
+    port, _ = proxy_server
+
+    def follow_up(call_id):
+        return {"messages": [
+            SYSTEM,
+            {"role": "user", "content": "Show me the steaks"},
+            {"role": "assistant", "content": None, "tool_calls": [
+                {"id": call_id, "type": "function", "function": {"name": "showMenuSection", "arguments": '{"hashtag":"steaks"}'}}]},
+            {"role": "tool", "tool_call_id": call_id, "content": "Navigated to menu section: steaks"},
+            {"role": "user", "content": "Please briefly describe what you just showed me."},
+        ]}
+
+    post_chat(port, follow_up("call_a"))
+    replay, _ = post_chat(port, follow_up("call_b"))
+
+    assert replay.getheader("X-Chat-Cache") == "hit"
+    assert len(fake_upstream.requests) == 1
+
+
+def test_image_questions_are_not_cached(proxy_server, fake_upstream):
+    port, _ = proxy_server
+    body = {"messages": [{"role": "user", "content": [
+        {"type": "text", "text": "What is this?"},
+        {"type": "image_url", "image_url": {"url": "https://example.com/dish.jpg"}}]}]}
+
+    post_chat(port, body)
+    second, _ = post_chat(port, body)
+
+    assert second.getheader("X-Chat-Cache") == "miss"
+    assert len(fake_upstream.requests) == 2
+
+
+def test_prewarm_fills_cache_for_top_queries(proxy_server, fake_upstream, tmp_path):
+    port, proxy = proxy_server
+    queries_file = tmp_path / "queries.jsonl"
+    queries_file.write_text("\n".join(json.dumps({"query": q}) for q in
+                                      ["Where are you?", "where are you", "When do you open?", "Do you have nachos?"]))
+
+    proxy.prewarm_queries = load_prewarm_queries(str(queries_file), limit=2)
+    assert proxy.prewarm_queries == ["Where are you?", "When do you open?"]
+
+    assert proxy.prewarm({"messages": [SYSTEM, {"role": "user", "content": "ignored"}]}) == 2
+    response, _ = post_chat(port, {"messages": [SYSTEM, {"role": "user", "content": "When do you open"}]})
+
+    assert response.getheader("X-Chat-Cache") == "hit"
+    assert len(fake_upstream.requests) == 2
@@ -0,0 +1,64 @@
+"""
+Tests for the on-disk evaluation target response cache.
+"""
+
+from evaluation_cache import TargetResponseCache, agent_fingerprint
+from evaluation_targets import RestaurantAgentTarget
+from test_evaluation_targets import FakeAgentsClient
+
+
+def make_agent(instructions="Answer questions about Scheibmeir's."):
+    return {"id": "asst_1", "model": "gpt-4o", "instructions": instructions, "tools": [{"type": "file_search"}],
+            "name": "Restaurant assistant"}
+
+
+def test_fingerprint_tracks_answer_affecting_fields():
+    agent = make_agent()
+
+    assert agent_fingerprint(agent) == agent_fingerprint(dict(agent, name="Renamed"))
+    assert agent_fingerprint(agent) != agent_fingerprint(make_agent("Be brief."))
+
+
+def test_cache_round_trip_and_invalidation(tmp_path):
+    cache = TargetResponseCache(str(tmp_path / "cache.sqlite"))
+    output = {"response": "We open at 11.", "query": "When do you open?", "context": "Hours: 11-10"}
+
+    assert cache.get("asst_1", "v1", "When do you open?") is None
+    cache.put("asst_1", "v1", "When do you open?", output)
+    cache.put("asst_1", "v2", "When do you open?", output)
+    cache.put("asst_2", "v1", "Where are you?", output)
+
+    assert cache.get("asst_1", "v1", "  When do you open?") == output
+    assert cache.get("asst_1", "v3", "When do you open?") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    assert cache.invalidate_stale("asst_1", "v2") == 1
+    assert cache.invalidate(agent_id="asst_2") == 1
+    assert cache.stats()["entries"] == {"asst_1@v2": 1}
+    cache.close()
+
+    # Entries survive reopening the database
+    reopened = TargetResponseCache(str(tmp_path / "cache.sqlite"))
+    assert reopened.get("asst_1", "v2", "When do you open?") == output
+    reopened.close()
+
+
+def test_target_reuses_cached_answers_until_agent_changes(tmp_path):
+    cache = TargetResponseCache(str(tmp_path / "cache.sqlite"))
+    client = FakeAgentsClient(delay=0.0)
+    agent = make_agent()
+    client.get_agent = lambda agent_id: agent
+
+    target = RestaurantAgentTarget(client, "asst_1", cache=cache)
+    first = target("When do you open?")
+    second = target("When do you open?")
+
+    assert second == first
+    assert client.runs_created == 1
+    assert target.latency_summary()["cache_hits"] == 1
+
+    # A new target over an edited agent gets a new fingerprint and queries again
+    agent["instructions"] = "Be brief."
+    RestaurantAgentTarget(client, "asst_1", cache=cache)("When do you open?")
+    assert client.runs_created == 2
+    cache.close()
@@ -0,0 +1,189 @@
+"""
+Tests for the parallel evaluation runner.
+Runs the SDK's own evaluators against a local fake chat completions server.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from azure.ai.evaluation import CoherenceEvaluator, RelevanceEvaluator
+
+import evaluation_runner
+from evaluation_runner import EvaluationRunner, PooledPrompty, TokenBudget
+
+
+class FakeJudgeHandler(BaseHTTPRequestHandler):
+    """Scores every request 4 after a short delay, reporting fixed token usage"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.connections.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+
+        body = json.dumps({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps({"score": 4, "reason": "Fine."})}}],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def judge():
+    server = ThreadingHTTPServer(("localhost", 0), FakeJudgeHandler)
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0.05
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def model_config(server):
+    return {"azure_endpoint": f"http://localhost:{server.server_address[1]}", "azure_deployment": "gpt-4o",
+            "api_key": "fake-key", "api_version": "2024-06-01"}
+
+
+ROWS = [{"query": f"Question {i}?", "response": f"Answer {i}.", "context": "Menu"} for i in range(6)]
+
+
+def test_evaluators_fan_out_over_one_pooled_client(judge):
+    config = model_config(judge)
+    evaluators = {"relevance": RelevanceEvaluator(config), "coherence": CoherenceEvaluator(config)}
+    runner = EvaluationRunner(evaluators, model_config=config, max_concurrency=4)
+
+    own_flows = {name: evaluator._flow for name, evaluator in evaluators.items()}
+    results = asyncio.run(runner.run(ROWS))
+
+    # Pooled during the run only; afterwards the evaluators work on their own again
+    assert all(evaluator._flow is own_flows[name] for name, evaluator in evaluators.items())
+    assert [r["query"] for r in results] == [row["query"] for row in ROWS]
+    assert results[0]["relevance"] == 4.0 and results[0]["coherence"] == 4.0
+    assert judge.max_in_flight == 4
+    # Kept-alive connections are reused rather than one per judge call
+    assert len(judge.connections) <= 4
+
+    summary = runner.summary()
+    relevance = summary["evaluators"]["relevance"]
+    assert relevance["calls"] == 6 and relevance["errors"] == 0
+    assert relevance["prompt_tokens"] == 6 * 900
+    assert relevance["cost"] == pytest.approx(6 * (900 * 0.0025 + 100 * 0.01) / 1000)
+    assert summary["wall_clock"] < summary["serial_time"]
+    assert runner.metrics(results, evaluators) == {"relevance.relevance": 4.0, "coherence.coherence": 4.0}
+
+
+def test_runner_can_run_again_after_closing_its_client(judge):
+    config = model_config(judge)
+    evaluator = RelevanceEvaluator(config)
+    runner = EvaluationRunner({"relevance": evaluator}, model_config=config, max_concurrency=2)
+
+    first = asyncio.run(runner.run(ROWS[:2]))
+    second = asyncio.run(runner.run(ROWS[2:4]))
+
+    assert [row["relevance"] for row in first + second] == [4.0] * 4
+    assert not any("relevance_error" in row for row in second)
+    assert runner.summary()["evaluators"]["relevance"]["calls"] == 4
+    assert evaluator(query="Open Sunday?", response="Yes.")["relevance"] == 4.0  # Its own client still works
+
+
+def test_changed_sdk_internals_fall_back_to_the_evaluators_own_clients(judge, monkeypatch):
+    config = model_config(judge)
+    evaluator = RelevanceEvaluator(config)
+
+    async def send_with_retries(client, request):  # A release that renamed the parameters
+        raise AssertionError("must not be called")
+
+    monkeypatch.setattr(evaluator._flow, "_send_with_retries", send_with_retries)
+    assert not PooledPrompty.supports(evaluator._flow)
+    monkeypatch.undo()
+    monkeypatch.setattr(evaluation_runner, "format_llm_response", lambda response, choice: response)
+    runner = EvaluationRunner({"relevance": evaluator}, model_config=config, max_concurrency=2)
+
+    with pytest.warns(RuntimeWarning, match="unexpected layout"):
+        results = asyncio.run(runner.run(ROWS[:2]))
+
+    assert results[0]["relevance"] == 4.0
+
+
+def test_missing_sdk_internals_are_reported_not_silent(judge, monkeypatch):
+    config = model_config(judge)
+    evaluator = RelevanceEvaluator(config)
+    monkeypatch.setattr(evaluation_runner, "build_messages", None)
+    runner = EvaluationRunner({"relevance": evaluator}, model_config=config, max_concurrency=2)
+
+    with pytest.warns(RuntimeWarning, match="relevance can't use the pooled judge client .*_legacy.prompty._utils"):
+        results = asyncio.run(runner.run(ROWS[:2]))
+
+    assert not isinstance(evaluator._flow, PooledPrompty)
+    assert results[0]["relevance"] == 4.0
+
+
+def test_token_budget_throttles_judge_calls():
+    async def scenario():
+        budget = TokenBudget(tokens_per_minute=6000)  # 100 tokens a second
+        await budget.acquire(6000)
+        started = time.perf_counter()
+        await budget.acquire(20)
+        return time.perf_counter() - started, budget.waited
+
+    elapsed, waited = asyncio.run(scenario())
+
+    assert 0.15 <= elapsed < 1.0
+    assert waited == pytest.approx(0.2, abs=0.05)
+
+
+def test_failing_evaluator_is_reported_without_stopping_the_others():
+    async def fluency(query, response, context):
+        return {"fluency": 5.0, "fluency_properties": {"prompt_tokens": 10, "completion_tokens": 2}}
+
+    async def broken(query, response, context):
+        raise RuntimeError("judge unavailable")
+
+    runner = EvaluationRunner({"fluency": fluency, "broken": broken})
+    results = asyncio.run(runner.run(ROWS[:2]))
+
+    assert results[1]["fluency"] == 5.0
+    assert results[1]["broken_error"] == "judge unavailable"
+    summary = runner.summary()
+    assert summary["evaluators"]["broken"]["errors"] == 2
+    assert summary["evaluators"]["fluency"]["prompt_tokens"] == 20
+
+
+def test_recorded_evaluators_log_saved_scores_without_judge_calls(tmp_path):
+    from azure.ai.evaluation import evaluate
+
+    scored = tmp_path / "evaluation_scores.jsonl"
+    scored.write_text(json.dumps({"query": "Open Sunday?", "relevance": 4.0, "relevance_reason": "Direct."}) + "\n"
+                      + json.dumps({"query": "Parking?", "relevance_error": "timeout"}) + "\n", encoding="utf-8")
+    evaluators, config = EvaluationRunner.recorded_evaluators(["relevance"])
+
+    result = evaluate(data=str(scored), evaluators=evaluators, evaluator_config=config)
+
+    assert result["metrics"] == {"relevance.relevance": 4.0}
+    assert result["rows"][0]["outputs.relevance.relevance_reason"] == "Direct."
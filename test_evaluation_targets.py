@@ -0,0 +1,103 @@
+"""
+Tests for the concurrent restaurant agent evaluation target.
+Uses a small in-memory stand-in for the agents client.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from azure.core.exceptions import HttpResponseError
+from azure.ai.agents.models import MessageRole, RunStatus
+
+from evaluation_targets import RestaurantAgentTarget
+
+
+class FakeAgentsClient:
+    """Answers every question after a delay, failing the first `throttle` runs with a 429"""
+
+    def __init__(self, delay=0.05, throttle=0):
+        self.delay = delay
+        self.throttle = throttle
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runs_created = 0
+        self._lock = threading.Lock()
+        self._questions = {}
+
+        self.threads = SimpleNamespace(create=self._create_thread)
+        self.messages = SimpleNamespace(create=self._create_message, get_last_message_by_role=self._last_message)
+        self.runs = SimpleNamespace(create_and_process=self._create_and_process)
+        self.run_steps = SimpleNamespace(list=lambda **kwargs: [])
+
+    def _create_thread(self):
+        with self._lock:
+            thread_id = f"thread_{len(self._questions)}"
+            self._questions[thread_id] = None
+        return SimpleNamespace(id=thread_id)
+
+    def _create_message(self, thread_id, content, role):
+        self._questions[thread_id] = content
+
+    def _create_and_process(self, thread_id, agent_id):
+        with self._lock:
+            self.runs_created += 1
+            if self.throttle > 0:
+                self.throttle -= 1
+                error = HttpResponseError(message="Too Many Requests")
+                error.status_code = 429
+                raise error
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(id=f"run_{thread_id}", status=RunStatus.COMPLETED, last_error=None)
+
+    def _last_message(self, thread_id, role):
+        assert role == MessageRole.AGENT
+        text = SimpleNamespace(text=SimpleNamespace(value=f"Answer to: {self._questions[thread_id]}"))
+        return SimpleNamespace(text_messages=[text])
+
+
+def test_query_all_keeps_order_and_bounds_concurrency():
+    client = FakeAgentsClient(delay=0.05)
+    target = RestaurantAgentTarget(client, "asst_1", max_concurrency=4)
+    queries = [f"Question {i}?" for i in range(16)]
+
+    started = time.perf_counter()
+    results = asyncio.run(target.query_all(queries))
+    elapsed = time.perf_counter() - started
+    target.close()
+
+    assert [r["query"] for r in results] == queries
+    assert results[3]["response"] == "Answer to: Question 3?"
+    assert results[3]["context"] == ""
+    assert client.max_in_flight == 4
+    # 16 queries of 50ms at concurrency 4 take ~4 rounds, not 16
+    assert elapsed < 16 * client.delay
+
+
+def test_throttled_queries_are_retried_and_counted():
+    client = FakeAgentsClient(delay=0.0, throttle=2)
+    target = RestaurantAgentTarget(client, "asst_1", base_delay=0.01)
+
+    result = target("When do you open?")
+
+    assert result["response"] == "Answer to: When do you open?"
+    summary = target.latency_summary()
+    assert summary["queries"] == 1
+    assert summary["retries"] == 2
+    assert summary["failed"] == 0
+
+
+def test_failure_after_retries_returns_error_row():
+    client = FakeAgentsClient(delay=0.0, throttle=10)
+    target = RestaurantAgentTarget(client, "asst_1", max_retries=2, base_delay=0.0)
+
+    result = target("Anything?")
+
+    assert result["response"].startswith("Error querying agent")
+    assert client.runs_created == 3
+    assert target.latency_summary()["failed"] == 1
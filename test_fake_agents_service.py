@@ -0,0 +1,114 @@
+"""
+Tests for the local fake agents service.
+Drives the repo's own agent code (deep-research-agent.py, the evaluation and
+red team targets) against FakeAgentsClient.
+"""
+
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+from azure.ai.agents.models import MessageRole, ThreadMessage
+
+from evaluation_targets import RestaurantAgentTarget
+from fake_agents_service import AgentReply, FakeAgentsClient, research_reply, synthetic_report
+from red_team_targets import RestaurantRedTeamTarget
+
+
+def load_deep_research_agent():
+    path = Path(__file__).parent / "deep-research-agent.py"
+    spec = importlib.util.spec_from_file_location("deep_research_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_deep_research_polling_loop_prints_progress_and_citations(capsys):
+    agent_module = load_deep_research_agent()
+    client = FakeAgentsClient(responder=research_reply(report_bytes=4_000, citations=6, reasoning_steps=3))
+    agent = client.create_agent(model="gpt-4o", name="researcher", instructions="Research restaurants")
+    thread = client.threads.create()
+    client.messages.create(thread_id=thread.id, role="user", content="Plan my wharf restaurant")
+
+    run = client.runs.create(thread_id=thread.id, agent_id=agent.id)
+    last_message_id, polls = None, 0
+    while run.status in ("queued", "in_progress"):
+        run = client.runs.get(thread_id=thread.id, run_id=run.id)
+        last_message_id = agent_module.fetch_and_print_new_agent_response(thread.id, client, last_message_id)
+        polls += 1
+    # One queued poll, three progress summaries, then the report
+    assert run.status == "completed"
+    assert polls == 5
+
+    final = client.messages.get_last_message_by_role(thread_id=thread.id, role=MessageRole.AGENT)
+    assert isinstance(final, ThreadMessage)
+    assert len(final.url_citation_annotations) == 6
+    agent_module.create_research_summary(final)
+
+    output = capsys.readouterr().out
+    assert output.count("Reasoning:") == 3
+    assert "<sup>6</sup>" in output
+    assert "6. [Source 6](https://example.com/source/6)" in output
+
+
+def test_synthetic_reports_are_deterministic_and_sized():
+    text, markers = synthetic_report(32_000, 50, seed=7)
+    assert synthetic_report(32_000, 50, seed=7) == (text, markers)
+    assert 32_000 <= len(text.encode("utf-8")) < 34_000
+    assert all(text.count(marker) == 1 for marker, _, _ in markers)
+
+    def transcript():
+        client = FakeAgentsClient(responder=research_reply())
+        run = client.create_thread_and_process_run(agent_id="asst_1", thread={"messages": [
+            {"role": "user", "content": "Same question"}]})
+        return [m.as_dict() for m in client.messages.list(thread_id=run.thread_id)]
+
+    assert transcript() == transcript()
+
+
+def test_evaluation_target_reads_reply_and_search_context():
+    def respond(query):
+        return AgentReply(f"We open at 11am. ({query})", context=["Hours: 11am-10pm daily"])
+
+    client = FakeAgentsClient(responder=respond, throttle=2)
+    target = RestaurantAgentTarget(client, "asst_1", base_delay=0)
+
+    result = target("When do you open?")
+
+    assert result == {"response": "We open at 11am. (When do you open?)", "query": "When do you open?",
+                      "context": "Hours: 11am-10pm daily"}
+    # Two throttled run creations were retried
+    assert target.latency_summary()["retries"] == 2
+    assert client.calls["runs.create"] == 3
+
+
+def test_red_team_target_runs_against_the_fake():
+    client = FakeAgentsClient(latency={"runs.get": 0.001})
+    target = RestaurantRedTeamTarget(client, "asst_1", max_concurrency=4, polling_interval=0)
+
+    async def attacks():
+        return await asyncio.gather(*(target([{"role": "user", "content": f"Attack {i}"}]) for i in range(8)))
+
+    replies = asyncio.run(attacks())
+    target.close()
+
+    assert replies[3]["messages"][0]["content"] == "Thanks for asking about Scheibmeir's: Attack 3"
+    assert target.summary()["failed"] == 0
+    assert client.calls["threads.create"] == 8
+
+
+def test_cancelled_runs_and_missing_threads():
+    client = FakeAgentsClient(responder=research_reply(reasoning_steps=10))
+    thread = client.threads.create()
+    client.messages.create(thread_id=thread.id, role="user", content="Long research")
+    run = client.runs.create(thread_id=thread.id, agent_id="asst_1")
+    client.runs.get(thread_id=thread.id, run_id=run.id)
+
+    assert client.runs.cancel(thread_id=thread.id, run_id=run.id).status == "cancelling"
+    assert client.runs.get(thread_id=thread.id, run_id=run.id).status == "cancelled"
+
+    client.threads.delete(thread.id)
+    with pytest.raises(HttpResponseError):
+        client.runs.get(thread_id=thread.id, run_id=run.id)
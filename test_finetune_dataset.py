@@ -0,0 +1,115 @@
+"""
+Tests for fine-tune dataset deduplication and leakage-free splitting.
+"""
+
+import json
+import os
+import random
+import stat
+
+import numpy as np
+
+from finetune_dataset import analyze, main, write_splits
+
+SYSTEM = {"role": "system", "content": "You are an assistant for Scheibmeir's Steaks, Snacks, and Sticks."}
+REFUSAL_SYSTEM = {"role": "system", "content": "Only answer questions about Scheibmeir's."}
+WORDS = ["steak", "ribeye", "filet", "nachos", "wings", "brunch", "menu", "hours", "denver", "phoenix", "vegas",
+         "garlic", "bread", "skewers", "pork", "noodles", "reservation", "parking", "patio", "dessert"]
+
+
+def example(question, answer, system=SYSTEM):
+    return {"messages": [system, {"role": "user", "content": question}, {"role": "assistant", "content": answer}]}
+
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+    return str(path)
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_exact_and_near_duplicates_are_clustered(tmp_path):
+    long_answer = ("Our ribeye is a richly marbled cut served with grilled zucchini and parmesan truffle fries, "
+                   "and most guests pair it with a glass of Colorado red and the cheesy garlic bread to start.")
+    records = [
+        example("What comes with the ribeye?", long_answer),
+        example("What  comes with the RIBEYE?", long_answer),  # Same after normalizing spacing and case
+        example("What comes with the ribeye steak?", long_answer),  # A paraphrase
+        example("Are you open on Sunday?", "Yes, from 12:00 PM to 9:00 PM."),
+        "not json",
+        {"text": "no messages"},
+    ]
+    path = write_jsonl(tmp_path / "data.jsonl", records)
+
+    analysis = analyze([path], validation_fraction=0.5, stratify=[])
+    report = analysis.report()
+
+    assert list(analysis.labels) == [0, 0, 0, 3]
+    assert (report["examples"], report["invalid"], report["exact_duplicates"]) == (4, 2, 1)
+    assert report["invalid_lines"] == [f"{path}:5", f"{path}:6"]
+    assert (report["clusters"], report["near_duplicate_clusters"], report["clustered_examples"]) == (1, 1, 3)
+    assert report["largest_clusters"][0]["members"] == [f"{path}:1", f"{path}:2", f"{path}:3"]
+    assert report["largest_clusters"][0]["preview"].startswith("what comes with the ribeye?")
+    assert report["dropped"] == 1 and report["train"] + report["validation"] == 3
+
+
+def test_splits_keep_clusters_together_and_follow_strata(tmp_path):
+    rng = random.Random(7)
+    records = []
+    for index in range(600):
+        system = REFUSAL_SYSTEM if index % 3 == 0 else SYSTEM
+        words = rng.choices(WORDS, k=30)
+        records.append(example(" ".join(words[:12]), " ".join(words[12:]), system))
+        if index % 4 == 0:  # A paraphrase with one word changed at the end
+            records.append(example(" ".join(words[:12]), " ".join(words[12:-1] + ["tonight"]), system))
+    path = write_jsonl(tmp_path / "data.jsonl", records)
+    train_path, validation_path = tmp_path / "train.jsonl", tmp_path / "validation.jsonl"
+    validation_path.write_text("")
+    os.chmod(validation_path, 0o640)
+    umask = os.umask(0o022)
+
+    try:
+        analysis = analyze([path], validation_fraction=0.2, threshold=0.7)
+        write_splits(analysis, train_path, validation_path)
+    finally:
+        os.umask(umask)
+    report = analysis.report()
+
+    # A new file gets the usual mode, a rewritten one keeps its own, neither gets mkstemp's 0600
+    assert stat.S_IMODE(os.stat(train_path).st_mode) == 0o644
+    assert stat.S_IMODE(os.stat(validation_path).st_mode) == 0o640
+
+    assert report["near_duplicate_clusters"] >= 140
+    train, validation = read_jsonl(train_path), read_jsonl(validation_path)
+    assert len(train) + len(validation) == len(records)
+    assert (len(train), len(validation)) == (report["train"], report["validation"])
+    for counts in report["strata"].values():
+        assert abs(counts["validation"] / (counts["train"] + counts["validation"]) - 0.2) < 0.02
+    clusters = {}
+    for index, label in enumerate(analysis.labels):
+        clusters.setdefault(label, set()).add(bool(analysis.validation[index]))
+    assert all(len(sides) == 1 for sides in clusters.values())
+    # Same input and seed, same split
+    assert np.array_equal(analyze([path], validation_fraction=0.2, threshold=0.7).validation, analysis.validation)
+
+
+def test_cli_flags_identical_train_and_validation_files_and_rewrites_them(tmp_path, capsys):
+    records = [example(f"What does the {word} cost?", f"The {word} is ${index + 8}.")
+               for index, word in enumerate(WORDS)]
+    train = write_jsonl(tmp_path / "train.jsonl", records)
+    validation = write_jsonl(tmp_path / "validation.jsonl", records)
+    report_path = tmp_path / "clusters.json"
+
+    assert main([train, validation, "--report", str(report_path), "--fail-on-overlap"]) == 1
+    assert "20 clusters shared between" in capsys.readouterr().out
+    with open(report_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["cross_file_clusters"] == len(WORDS)
+
+    assert main([train, "--train", train, "--validation", validation, "--validation-fraction", "0.25"]) == 0
+    assert (len(read_jsonl(train)), len(read_jsonl(validation))) == (15, 5)
+    assert main([train, validation, "--fail-on-overlap"]) == 0
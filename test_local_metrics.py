@@ -0,0 +1,92 @@
+"""
+Tests for the in-process metrics registry and its /metrics endpoint.
+"""
+
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmark_deep_research import REASONING_STEPS, start_polled_run
+from local_metrics import (RESEARCH_FIRST_REASONING, RESEARCH_POLL, RESEARCH_RUNS, MetricsRegistry, percentile,
+                           start_metrics_server)
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    runs = registry.counter("runs", "Finished runs", ["status"])
+    active = registry.gauge("active_runs", "Runs in progress")
+    latency = registry.histogram("poll_seconds", "Poll round trip", buckets=(0.1, 1))
+
+    runs.inc(status="completed")
+    runs.inc(2, status='say "hi"\n')
+    active.set(3)
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP active_runs Runs in progress",
+        "# TYPE active_runs gauge",
+        "active_runs 3",
+        "# HELP poll_seconds Poll round trip",
+        "# TYPE poll_seconds histogram",
+        'poll_seconds_bucket{le="0.1"} 1',
+        'poll_seconds_bucket{le="1"} 2',
+        'poll_seconds_bucket{le="+Inf"} 3',
+        "poll_seconds_sum 5.55",
+        "poll_seconds_count 3",
+        "# HELP runs Finished runs",
+        "# TYPE runs counter",
+        'runs_total{status="completed"} 1',
+        'runs_total{status="say \\"hi\\"\\n"} 2',
+    ]
+    assert registry.counter("runs", "Finished runs", ["status"]) is runs
+    with pytest.raises(ValueError):
+        runs.inc(outcome="failed")
+
+
+@pytest.mark.parametrize("size, fraction, expected", [
+    (5, 0.5, 3), (7, 0.5, 4), (30, 0.95, 29), (31, 0.95, 30), (101, 0.5, 51), (101, 0.95, 96), (101, 0.99, 100),
+    (100, 0.95, 95), (100, 0.99, 99), (100, 0.07, 7), (1, 0.99, 1), (3, 0.0, 1), (3, 1.0, 3),
+])
+def test_percentile_is_nearest_rank(size, fraction, expected):
+    values = list(range(size, 0, -1))  # Unsorted on purpose
+
+    assert percentile(values, fraction) == expected
+    assert percentile([], fraction) is None
+
+
+def test_metrics_server_serves_only_metrics(monkeypatch):
+    registry = MetricsRegistry()
+    registry.counter("scrapes", "Test counter").inc()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+
+    server = start_metrics_server(port, registry)
+    try:
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "scrapes_total 1" in body
+    monkeypatch.setenv("METRICS_PORT", "0")
+    assert start_metrics_server(port, registry) is None
+
+
+def test_research_polling_records_latency_metrics():
+    ui, run = start_polled_run("1kb-0cit")
+    polls = RESEARCH_POLL.count(app="deep_research", call="runs_get")
+    first_reasoning = RESEARCH_FIRST_REASONING.count(app="deep_research")
+    completed = RESEARCH_RUNS.value(app="deep_research", status="completed")
+
+    ui._execute_research_run(run)
+
+    assert RESEARCH_POLL.count(app="deep_research", call="runs_get") == polls + REASONING_STEPS + 2
+    assert RESEARCH_FIRST_REASONING.count(app="deep_research") == first_reasoning + 1
+    assert RESEARCH_RUNS.value(app="deep_research", status="completed") == completed + 1
@@ -0,0 +1,78 @@
+"""
+Tests for the MCP tool approval policy and its submission to the agents service.
+"""
+
+import json
+
+import pytest
+from azure.ai.agents.models import ThreadRun
+
+from mcp_approval import ApprovalPolicy, ApprovalStats, submit_approvals
+
+
+def approval_run(*tool_calls):
+    return ThreadRun({"id": "run_1", "status": "requires_action", "required_action": {
+        "type": "submit_tool_approval", "submit_tool_approval": {"tool_calls": [
+            {"type": "mcp", "id": f"call_{index}", "server_label": server, "name": name,
+             "arguments": json.dumps(arguments)}
+            for index, (server, name, arguments) in enumerate(tool_calls)]}}})
+
+
+class RecordingRuns:
+    def __init__(self):
+        self.submitted = []
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_approvals):
+        self.submitted.append((thread_id, run_id, [approval.as_dict() for approval in tool_approvals]))
+        return ThreadRun({"id": run_id, "status": "in_progress"})
+
+
+class RecordingClient:
+    def __init__(self):
+        self.runs = RecordingRuns()
+
+
+def test_policy_checks_servers_tools_and_every_url():
+    policy = ApprovalPolicy()
+    run = approval_run(
+        ("playwright", "browser_navigate", {"url": "https://www.sftravel.com/"}),
+        ("playwright", "browser_tab_new", {"url": "http://localhost:8000/menu/"}),
+        ("playwright", "browser_navigate", {"url": "http://localhost/menu/"}),
+        ("playwright", "browser_navigate", {"url": "file:///etc/passwd"}),
+        ("playwright", "browser_evaluate", {"function": "() => document.cookie"}),
+        ("github", "browser_snapshot", {}),
+    )
+
+    decisions = [policy.decide(call) for call in run.required_action.submit_tool_approval.tool_calls]
+
+    assert [approve for approve, _ in decisions] == [True, True, True, False, False, False]
+    assert "file:///etc/passwd" in decisions[3][1]
+    assert "browser_evaluate" in decisions[4][1]
+    assert "github" in decisions[5][1]
+
+
+def test_approvals_are_submitted_counted_and_timed(monkeypatch):
+    monkeypatch.setenv("MCP_APPROVED_TOOLS", "browser_*")
+    monkeypatch.setenv("MCP_APPROVED_URLS", "https://*.example.com/*")
+    client = RecordingClient()
+    stats = ApprovalStats()
+    run = approval_run(("playwright", "browser_evaluate", {}),
+                       ("playwright", "browser_navigate", {"url": "https://evil.test/"}))
+
+    resumed = submit_approvals(client, "thread_1", run, ApprovalPolicy.from_env(), stats)
+
+    assert resumed.status == "in_progress"
+    assert client.runs.submitted == [("thread_1", "run_1", [
+        {"tool_call_id": "call_0", "approve": True}, {"tool_call_id": "call_1", "approve": False}])]
+    assert (stats.requests, stats.approved, stats.denied) == (1, 1, 1)
+    assert stats.denials == [("browser_navigate", "URL 'https://evil.test/' is not allowed")]
+    assert 0 < stats.decision_seconds <= stats.total_seconds < 1
+    assert "1 approved, 1 denied" in stats.summary()
+
+
+def test_other_required_actions_are_not_answered():
+    run = ThreadRun({"id": "run_1", "status": "requires_action", "required_action": {
+        "type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": []}}})
+
+    with pytest.raises(ValueError, match="submit_tool_outputs"):
+        submit_approvals(RecordingClient(), "thread_1", run, ApprovalPolicy())
@@ -0,0 +1,148 @@
+"""
+Tests for the Playwright MCP latency benchmark, against a stand-in MCP server.
+"""
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mcp_benchmark import BenchmarkResult, McpError, McpSession, format_report, run_benchmark, serve_static_site
+
+SNAPSHOT = '- Page Snapshot:\n```yaml\n- heading "Scheibmeir\'s Menu" [level=1] [ref=e2]\n- img "Filet" [ref=e5]\n```'
+
+
+class FakeMcpHandler(BaseHTTPRequestHandler):
+    """Streamable HTTP MCP endpoint answering in server-sent events; navigate fetches the page like a browser"""
+
+    sessions = set()
+    started = 0
+    calls = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        message = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if "id" not in message:
+            self.send_response(202)
+            self.end_headers()
+            return
+        headers = {}
+        if message["method"] == "initialize":
+            with self.lock:
+                FakeMcpHandler.started += 1
+                session = f"session-{self.started}"
+                self.sessions.add(session)
+            headers["Mcp-Session-Id"] = session
+            result = {"protocolVersion": message["params"]["protocolVersion"], "capabilities": {"tools": {}}}
+        else:
+            assert self.headers["Mcp-Session-Id"] in self.sessions
+            name, arguments = message["params"]["name"], message["params"]["arguments"]
+            with self.lock:
+                self.calls.append((name, arguments))
+            text = SNAPSHOT
+            if name == "browser_navigate":
+                with urllib.request.urlopen(arguments["url"]) as page:
+                    text += f"\n- Page Title: {page.read().decode('utf-8').split('<title>')[1].split('</title>')[0]}"
+            result = {"content": [{"type": "text", "text": text}], "isError": name == "browser_take_screenshot"}
+        body = f"event: message\ndata: {json.dumps({'jsonrpc': '2.0', 'id': message['id'], 'result': result})}\n\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body.encode("utf-8"))))
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def do_DELETE(self):
+        with self.lock:
+            self.sessions.discard(self.headers["Mcp-Session-Id"])
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fake_mcp_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMcpHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/mcp"
+
+
+def test_scripted_session_runs_against_the_local_menu_site():
+    server, url = fake_mcp_server()
+    FakeMcpHandler.calls.clear()
+    try:
+        result = run_benchmark(url, concurrency=2, iterations=3, server_pid=os.getpid(), memory_interval=0.01)
+    finally:
+        server.shutdown()
+
+    report = result.report()
+    assert report["tools"]["browser_navigate"]["calls"] == 2 * 3 * 2
+    assert report["tools"]["browser_navigate_back"]["calls"] == 2 * 3
+    screenshots = report["tools"]["browser_take_screenshot"]
+    assert (screenshots["calls"], screenshots["errors"], screenshots["p50"]) == (6, 6, None)
+    assert screenshots["error_mean"] > 0 and format_report(report)[-2].endswith(" -")
+    assert report["page_loads"] == 2 * 3 * 3
+    clicks = [arguments for name, arguments in FakeMcpHandler.calls if name == "browser_click"]
+    assert clicks[0] == {"element": "heading Scheibmeir's Menu", "ref": "e2"}
+    assert not FakeMcpHandler.sessions  # Every session was closed
+    assert report["memory"]["start_mb"] > 0 and len(report["memory"]["samples"]) >= 2
+
+
+def test_static_site_serves_the_menu_folder_only():
+    site, url = serve_static_site()
+    try:
+        with urllib.request.urlopen(f"{url}/menu.html") as page:
+            assert page.status == 200
+        with pytest.raises(urllib.error.HTTPError, match="404"):
+            urllib.request.urlopen(f"{url}/mcp_benchmark.py")
+    finally:
+        site.shutdown()
+
+
+def test_percentiles_and_report_per_tool():
+    result = BenchmarkResult(concurrency=1, iterations=1)
+    for millisecond in range(1, 101):
+        result.record("browser_snapshot", millisecond / 1000)
+    result.record("browser_navigate", 0.5)
+    result.record("browser_navigate", 2.0, error=TimeoutError())
+
+    report = result.report()
+
+    snapshot = report["tools"]["browser_snapshot"]
+    assert (snapshot["p50"], snapshot["p95"], snapshot["p99"]) == (0.05, 0.095, 0.099)
+    navigate = report["tools"]["browser_navigate"]
+    assert (navigate["calls"], navigate["errors"], navigate["p99"], navigate["error_mean"]) == (2, 1, 0.5, 2.0)
+    assert report["page_loads"] == 1
+    assert "Memory not sampled" in format_report(report)[-1]
+
+
+def test_session_reads_plain_json_responses_too():
+    class JsonHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            message = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            body = json.dumps({"jsonrpc": "2.0", "id": message.get("id"),
+                               "error": {"code": -32602, "message": "Unknown tool"}}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JsonHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = McpSession(f"http://127.0.0.1:{server.server_address[1]}/mcp")
+    try:
+        with pytest.raises(McpError, match="tools/call: Unknown tool"):
+            session.call_tool("browser_fly")
+    finally:
+        session.close()
+        server.shutdown()
@@ -0,0 +1,129 @@
+"""
+Tests for the Playwright MCP server pool: load-based leasing, lease expiry, recycling and the lease API.
+"""
+
+from azure.ai.agents.models import RunStep
+
+from mcp_pool import McpServerPool, PoolClient, Probe, count_page_loads, serve_pool
+
+
+class FakeProcess:
+    def __init__(self, port, pool_lock):
+        self.port = port
+        self.pool_lock = pool_lock
+        self.terminated = False
+        self.waited_under_lock = None
+
+    def terminate(self):
+        self.terminated = True
+
+    def wait(self, timeout=None):
+        self.waited_under_lock = self.pool_lock().locked()
+        return 0
+
+
+class FakeServers:
+    """Launcher and probe for a pool without npx; ports in `down` fail their health check"""
+
+    def __init__(self):
+        self.launched = []
+        self.down = set()
+        self.pool = None
+
+    def launch(self, port, server_args):
+        self.launched.append(FakeProcess(port, lambda: self.pool._lock))
+        return self.launched[-1]
+
+    def probe(self, url):
+        port = int(url.split(":")[-1].split("/")[0])
+        return Probe(False, error=ConnectionError("refused")) if port in self.down else Probe(True, 200)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_pool(size=3, max_page_loads=10, clock=None):
+    servers = FakeServers()
+    pool = McpServerPool(size, base_port=9931, max_page_loads=max_page_loads,
+                         launcher=servers.launch, probe=servers.probe, lease_ttl=60, clock=clock or FakeClock())
+    servers.pool = pool
+    assert pool.start(timeout=1) == size
+    return pool, servers
+
+
+def test_runs_are_spread_over_the_least_loaded_healthy_servers():
+    pool, servers = fake_pool()
+    servers.down.add(9933)
+    pool.check_health()
+
+    leased = [pool.acquire() for _ in range(4)]
+
+    assert [lease.server.port for lease in leased] == [9931, 9932, 9931, 9932]
+    assert pool.release(leased[1].id, page_loads=3) and pool.release(leased[3].id, page_loads=3)
+    assert not pool.release(leased[3].id)  # Already returned
+    assert pool.acquire().server.port == 9932  # Now idle, while 9931 still has two runs
+    assert [server.url for server in pool.servers][0] == "http://localhost:9931/mcp"
+
+
+def test_servers_are_recycled_after_their_page_load_budget():
+    pool, servers = fake_pool(size=2, max_page_loads=10)
+    first_lease, second_lease = pool.acquire(), pool.acquire()
+    first, second = first_lease.server, second_lease.server
+    also_first = pool.acquire()
+    assert also_first.server is first
+
+    pool.release(first_lease.id, page_loads=12)  # Over budget, but another run still uses it
+    assert first.draining and not servers.launched[0].terminated
+    assert pool.acquire().server is second  # A draining server takes no new runs
+
+    pool.release(also_first.id, page_loads=1)
+
+    assert servers.launched[0].terminated
+    assert servers.launched[0].waited_under_lock is False  # Other leases don't wait for a browser to exit
+    assert first.process is servers.launched[-1] and first.recycles == 1
+    assert (first.page_loads, first.draining, first.healthy) == (0, False, False)
+    pool.check_health()
+    assert first.healthy
+
+
+def test_leases_without_heartbeats_are_reclaimed():
+    clock = FakeClock()
+    pool, servers = fake_pool(size=2, max_page_loads=10, clock=clock)
+    kept, abandoned = pool.acquire(), pool.acquire()
+
+    clock.now += 45
+    assert pool.heartbeat(kept.id)
+    clock.now += 45  # 90 s since the abandoned lease was taken, 45 s since the kept one's heartbeat
+    pool.check_health()
+
+    assert set(pool.leases) == {kept.id}
+    assert (kept.server.active_runs, abandoned.server.active_runs) == (1, 0)
+    assert not pool.heartbeat(abandoned.id) and not pool.release(abandoned.id)
+    assert pool.acquire().server is abandoned.server
+
+
+def test_lease_api_and_page_load_counting():
+    pool, servers = fake_pool(size=2)
+    manager = serve_pool(pool, port=0)
+    client = PoolClient(f"http://127.0.0.1:{manager.server_address[1]}")
+    steps = [RunStep({"id": "step_1", "type": "tool_calls", "step_details": {"type": "tool_calls", "tool_calls": [
+        {"type": "mcp", "id": "call_1", "name": "browser_navigate", "arguments": "{}", "output": ""},
+        {"type": "mcp", "id": "call_2", "name": "browser_snapshot", "arguments": "{}", "output": ""},
+        {"type": "mcp", "id": "call_3", "name": "browser_tab_new", "arguments": "{}", "output": ""}]}})]
+
+    try:
+        lease = client.lease()
+        released = client.release(lease["lease"], page_loads=count_page_loads(steps))
+        released_again = client.release(lease["lease"])
+        status = {server["port"]: server for server in client.status()}
+    finally:
+        manager.shutdown()
+
+    assert (lease["port"], lease["url"], lease["ttl_seconds"]) == (9931, "http://localhost:9931/mcp", 60)
+    assert released and not released_again
+    assert status[9931]["runs"] == 1 and status[9931]["page_loads"] == 2 and status[9931]["active_runs"] == 0
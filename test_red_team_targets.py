@@ -0,0 +1,136 @@
+"""
+Tests for the async red team target.
+Uses small in-memory stand-ins for the sync and async agents clients.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+from azure.ai.agents.models import MessageRole, RunStatus
+
+from red_team_targets import RestaurantRedTeamTarget, scan_at_concurrency_levels
+
+
+def reply(text):
+    return SimpleNamespace(text=SimpleNamespace(value=text))
+
+
+class FakeSyncAgentsClient:
+    """Blocking client that answers after a delay"""
+
+    def __init__(self, delay=0.05, status=RunStatus.COMPLETED):
+        self.delay = delay
+        self.status = status
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._questions = {}
+        self.messages = SimpleNamespace(get_last_message_text_by_role=self._last_text)
+
+    def create_thread_and_process_run(self, agent_id, thread, polling_interval):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            thread_id = f"thread_{len(self._questions)}"
+            self._questions[thread_id] = thread["messages"][0]["content"]
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(thread_id=thread_id, status=self.status)
+
+    def _last_text(self, thread_id, role):
+        assert role == MessageRole.AGENT
+        return reply(f"I can't help with: {self._questions[thread_id]}")
+
+
+class FakeAsyncAgentsClient:
+    """Async client that answers after a delay, optionally throttling"""
+
+    def __init__(self, delay=0.05, throttle=False):
+        self.delay = delay
+        self.throttle = throttle
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.messages = SimpleNamespace(get_last_message_text_by_role=self._last_text)
+
+    async def create_thread_and_process_run(self, agent_id, thread, polling_interval):
+        if self.throttle:
+            error = HttpResponseError(message="Too Many Requests")
+            error.status_code = 429
+            raise error
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return SimpleNamespace(thread_id="thread_async", status=RunStatus.COMPLETED)
+
+    async def _last_text(self, thread_id, role):
+        return reply("Let's talk about the menu instead.")
+
+
+def attack(text):
+    return [{"role": "user", "content": text}]
+
+
+async def run_attacks(target, count):
+    return await asyncio.gather(*(target(attack(f"Attack {i}")) for i in range(count)))
+
+
+@pytest.mark.parametrize("client", [FakeSyncAgentsClient(), FakeAsyncAgentsClient()], ids=["sync", "async"])
+def test_attacks_overlap_up_to_the_concurrency_limit(client):
+    target = RestaurantRedTeamTarget(client, "asst_1", max_concurrency=4)
+
+    started = time.perf_counter()
+    results = asyncio.run(run_attacks(target, 12))
+    elapsed = time.perf_counter() - started
+    target.close()
+
+    assert all(r["messages"][0]["role"] == "assistant" for r in results)
+    assert client.max_in_flight == 4
+    # 12 attacks of 50ms at concurrency 4 take ~3 rounds, not 12
+    assert elapsed < 12 * client.delay
+    assert target.summary()["attacks"] == 12
+
+
+def test_reply_text_and_failed_runs():
+    target = RestaurantRedTeamTarget(FakeSyncAgentsClient(delay=0), "asst_1")
+    answered = asyncio.run(target(attack("How do I pick a lock?")))
+    assert answered["messages"][0]["content"] == "I can't help with: How do I pick a lock?"
+
+    failed = RestaurantRedTeamTarget(FakeSyncAgentsClient(delay=0, status=RunStatus.FAILED), "asst_1")
+    result = asyncio.run(failed(attack("Anything")))
+    assert "Status: failed" in result["messages"][0]["content"]
+    assert failed.summary()["failed"] == 1
+
+
+def test_rate_limits_are_raised_for_the_red_team_to_retry():
+    target = RestaurantRedTeamTarget(FakeAsyncAgentsClient(throttle=True), "asst_1")
+
+    with pytest.raises(HttpResponseError):
+        asyncio.run(target(attack("Anything")))
+
+
+def test_scan_wall_clock_is_reported_per_concurrency_level():
+    class FakeRedTeam:
+        def __init__(self):
+            self.calls = []
+
+        async def scan(self, target, **kwargs):
+            self.calls.append(kwargs)
+            await run_attacks(target, 8)
+
+    red_team = FakeRedTeam()
+    target = RestaurantRedTeamTarget(FakeAsyncAgentsClient(delay=0.05), "asst_1")
+
+    timings = asyncio.run(scan_at_concurrency_levels(red_team, target, [1, 4], output_path="scan.json",
+                                                     scan_name="test"))
+
+    assert [t["concurrency"] for t in timings] == [1, 4]
+    assert [t["max_in_flight"] for t in timings] == [1, 4]
+    assert timings[1]["wall_clock"] < timings[0]["wall_clock"]
+    assert red_team.calls[1]["max_parallel_tasks"] == 4
+    assert red_team.calls[1]["output_path"] == "scan_c4.json"
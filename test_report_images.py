@@ -0,0 +1,48 @@
+"""
+Tests for the downscaled image cache shared by the report panel and PDF export.
+"""
+
+import os
+
+from PIL import Image
+
+from report_images import ImageCache
+
+
+def save_image(path, size=(1024, 768), mode="RGB"):
+    Image.new(mode, size, (200, 120, 40) if mode == "RGB" else (200, 120, 40, 128)).save(path)
+    return str(path)
+
+
+def test_sizes_share_one_decode_and_repeat_loads_hit_the_cache(tmp_path):
+    path = save_image(tmp_path / "dining_room.png")
+    cache = ImageCache()
+
+    pdf = cache.load(path, (936, 777))
+    thumbnail_path = cache.thumbnail_file(path, 300)
+    again = cache.load(path, (936, 777))
+
+    assert (pdf.width, pdf.height, pdf.format) == (936, 702, "JPEG")
+    assert again is pdf and cache.hits == 1
+    assert cache.decodes == 1
+    with Image.open(thumbnail_path) as thumbnail:
+        assert thumbnail.size == (300, 225)
+    # A second report panel refresh reuses the thumbnail file
+    assert cache.thumbnail_file(path, 300) == thumbnail_path and cache.misses == 2
+    # Small images are never upscaled and transparency keeps PNG
+    icon = cache.load(save_image(tmp_path / "icon.png", (64, 64), "RGBA"), (936, 777))
+    assert (icon.width, icon.format) == (64, "PNG")
+
+
+def test_cache_is_bounded_and_notices_changed_files(tmp_path):
+    paths = [save_image(tmp_path / f"image_{i}.png") for i in range(4)]
+    first = ImageCache().load(paths[0], (400, 400))
+    cache = ImageCache(max_bytes=len(first.data) * 2)
+
+    for path in paths:
+        cache.load(path, (400, 400))
+
+    assert cache.size_bytes <= cache.max_bytes
+    save_image(paths[3], (200, 100))
+    os.utime(paths[3], ns=(0, os.stat(paths[3]).st_mtime_ns + 1_000_000))
+    assert cache.load(paths[3], (400, 400)).width == 200
@@ -0,0 +1,51 @@
+"""
+Tests for the shared report markup parser.
+"""
+
+from report_markup import Inline, parse_html, parse_markdown, parse_report, plain_text, to_reportlab_markup
+
+
+def test_markdown_is_tokenized_into_blocks_and_inlines():
+    blocks = parse_markdown("## Menu\n\nServe **dry-aged *ribeye* cuts** nightly.[1]<sup>2</sup>\n\n"
+                            "- [Chowder](https://example.com/chowder) in `bread bowls`\n3. Oysters\n")
+
+    assert [(b.kind, b.level, b.marker, b.gap) for b in blocks] == [
+        ("heading", 2, "", 1), ("paragraph", 0, "", 1), ("list_item", 0, "-", 0), ("list_item", 0, "3.", 0)]
+    assert blocks[1].inlines == [
+        Inline("text", "Serve "),
+        Inline("bold", children=[Inline("text", "dry-aged "), Inline("italic", children=[Inline("text", "ribeye")]),
+                                Inline("text", " cuts")]),
+        Inline("text", " nightly."),
+        Inline("citation", "1"),
+        Inline("citation", "2"),
+    ]
+    assert blocks[2].inlines[0] == Inline("link", children=[Inline("text", "Chowder")],
+                                          url="https://example.com/chowder")
+    assert plain_text(blocks[2].inlines) == "Chowder in bread bowls"
+
+
+def test_html_reports_share_the_same_tree():
+    html = """<html><head><style>p { color: red; }</style></head><body>
+    <h2>Dining Room</h2>
+    <p>Warm <em>nautical</em> decor<sup>4</sup> &amp; brass.<br>Seats 80.</p>
+    <img src="./images/room.png" alt="Dining room">
+    <h2>📚 Citations</h2>
+    <ol><li><a href="https://example.com/4">Wharf guide</a></li><li>Notes</li></ol>
+    </body></html>"""
+
+    blocks = parse_report(html)
+
+    assert [(b.kind, b.marker) for b in blocks] == [
+        ("heading", ""), ("paragraph", ""), ("image", ""), ("heading", ""), ("list_item", "1."), ("list_item", "2.")]
+    assert plain_text(blocks[1].inlines) == "Warm nautical decor[4] & brass.\nSeats 80."
+    assert (blocks[2].src, blocks[2].alt) == ("./images/room.png", "Dining room")
+    assert blocks[4].inlines[0].url == "https://example.com/4"
+    assert parse_report("# Plain markdown")[0].kind == "heading"
+
+
+def test_reportlab_markup_escapes_text_and_keeps_superscripts():
+    inlines = parse_html("<p>Steaks &lt;$40 &amp; <b>up</b><sup>7</sup></p>")[0].inlines
+
+    assert to_reportlab_markup(inlines) == "Steaks &lt;$40 &amp; <b>up</b><super>7</super>"
+    assert to_reportlab_markup(parse_markdown("[https://a.io](https://a.io)")[0].inlines) == \
+        '<a href="https://a.io" color="#2980b9">https://a.io</a>'
@@ -0,0 +1,95 @@
+"""
+Tests for the streaming PDF export of research reports.
+"""
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from fake_agents_service import synthetic_report
+from report_markup import parse_html, parse_markdown
+from report_pdf import PdfExportJob, iter_report_flowables, report_styles, write_report_pdf
+
+REPORT = """# Strategy
+
+Scheibmeir's should open a **steakhouse** with
+a seafood twist.[1]
+
+## Menu
+- Ribeye [Source](https://example.com)
+1. Clam chowder
+#### Deep & nested
+"""
+
+
+def test_flowables_follow_the_report_structure():
+    flowables = list(iter_report_flowables(parse_markdown(REPORT)))[4:]  # Skip the title block
+    paragraphs = [(f.style.name, f.text) for f in flowables if hasattr(f, "style")]
+
+    assert paragraphs == [
+        ("CustomHeading1", "Strategy"),
+        ("CustomBody", "Scheibmeir's should open a <b>steakhouse</b> with a seafood twist.<super>1</super>"),
+        ("CustomHeading2", "Menu"),
+        ("Citations", '- Ribeye <a href="https://example.com" color="#2980b9">Source</a> (https://example.com)'),
+        ("Citations", "1. Clam chowder"),
+        ("CustomHeading3", "Deep &amp; nested"),
+    ]
+
+
+def test_html_reports_export_from_parsed_blocks(tmp_path):
+    html = "<h1>Report</h1>" + "".join(f"<p>Finding {i} &lt;{i}&gt;<sup>{i}</sup></p>" for i in range(300))
+
+    pages = write_report_pdf(parse_html(html), str(tmp_path / "report.pdf"))
+
+    assert pages > 1
+
+
+def test_images_are_embedded_downscaled_with_captions(tmp_path):
+    from PIL import Image
+    from report_images import ImageCache
+
+    (tmp_path / "images").mkdir()
+    Image.new("RGB", (2048, 1024), (30, 90, 160)).save(tmp_path / "images" / "wharf.png")
+    html = ('<h2>Storefront</h2><img src="./images/wharf.png" alt="Harbor view">' * 3
+            + '<img src="./images/missing.png" alt="Lost">')
+    cache = ImageCache()
+
+    flowables = list(iter_report_flowables(parse_html(html), image_cache=cache, base_dir=str(tmp_path)))
+    pages = write_report_pdf(parse_html(html), str(tmp_path / "report.pdf"), image_cache=cache,
+                             base_dir=str(tmp_path))
+
+    images = [f for f in flowables if type(f).__name__ == "Image"]
+    assert len(images) == 3 and images[0].drawWidth == 468
+    assert [f.text for f in flowables if getattr(f, "style", None) and f.style.name == "Caption"] == [
+        "Harbor view", "Harbor view", "Harbor view", "[Image unavailable: Lost]"]
+    assert cache.decodes == 1 and pages >= 1
+    # The image is stored once at 144 dpi rather than at full size
+    assert (tmp_path / "report.pdf").stat().st_size < 200_000
+
+
+def test_export_reports_progress_and_reuses_styles(tmp_path):
+    report, _ = synthetic_report(40_000, 100)
+    updates = []
+
+    pages = write_report_pdf(report, str(tmp_path / "report.pdf"), progress=lambda f, p: updates.append((f, p)))
+
+    assert (tmp_path / "report.pdf").read_bytes().startswith(b"%PDF")
+    assert pages > 10
+    fractions = [f for f, _ in updates]
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+    # Progress arrives while pages are still being laid out
+    assert any(0 < page < pages for _, page in updates)
+    assert report_styles() is report_styles()
+
+
+def test_background_job_finishes_and_can_be_cancelled(tmp_path):
+    finished = PdfExportJob(REPORT, str(tmp_path / "small.pdf")).start()
+    assert finished.wait(30)
+    assert finished.pages == 1 and finished.error is None and not finished.cancelled
+
+    report, _ = synthetic_report(400_000, 1_000)
+    path = tmp_path / "large.pdf"
+    job = PdfExportJob(report, str(path)).start()
+    job.cancel()
+    assert job.wait(30)
+    assert job.cancelled and not path.exists()
@@ -0,0 +1,64 @@
+"""
+Tests for the deep research report cache.
+"""
+
+from types import SimpleNamespace
+
+from benchmark_deep_research import headless_ui
+from fake_agents_service import FakeAgentsClient, research_reply
+from research_cache import ReportCache, normalize_prompt
+
+PROMPT = "I have rented a new storefront at 340 Jefferson St. Please help me design a strategy."
+
+
+def test_trivially_different_prompts_share_an_entry(tmp_path):
+    cache = ReportCache(str(tmp_path / "reports.sqlite"))
+    message = {"id": "msg_1", "content": [{"type": "text", "text": {"value": "Report", "annotations": []}}]}
+
+    cache.put(PROMPT, "v1", message)
+
+    assert normalize_prompt("  I have rented a NEW storefront\nat 340 Jefferson St.  Please help me design a strategy!") \
+        == normalize_prompt(PROMPT)
+    assert cache.get(PROMPT.upper() + "  ", "v1").message == message
+    assert cache.get(PROMPT, "v2") is None  # Edited agent
+    assert cache.get("A different storefront", "v1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+    cache.close()
+
+
+def test_entries_expire_and_the_size_cap_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "reports.sqlite")
+    expired = ReportCache(path, ttl=-1)
+    expired.put(PROMPT, "v1", {"id": "msg_1"})
+    assert expired.get(PROMPT, "v1") is None
+    expired.close()
+
+    cache = ReportCache(path, max_bytes=2_500)
+    for i in range(3):
+        cache.put(f"prompt {i}", "v1", {"id": f"msg_{i}", "text": "x" * 1_000})
+        cache.get("prompt 0", "v1")  # Keep the first report in use
+
+    assert cache.get("prompt 0", "v1") is not None
+    assert cache.get("prompt 1", "v1") is None
+    assert cache.stats()["bytes"] <= 2_500
+    cache.close()
+
+
+def test_ui_serves_repeated_prompts_from_the_cache_until_refresh(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_MODEL_DEPLOYMENT_NAME", "gpt-4o")
+    monkeypatch.setenv("DEEP_RESEARCH_MODEL_DEPLOYMENT_NAME", "o3-deep-research")
+    client = FakeAgentsClient(responder=research_reply(report_bytes=4_000, citations=6, reasoning_steps=2))
+    ui = headless_ui(client)
+    ui.report_cache = ReportCache(str(tmp_path / "reports.sqlite"))
+    ui.agent = None
+    ui.deep_research_tool = SimpleNamespace(definitions=[])
+
+    ui._run_research_internal(PROMPT)
+    ui._run_research_internal(PROMPT.lower())
+
+    assert client.calls["runs.create"] == 1
+    assert len(ui.reports) == 2 and ui.reports[1] == ui.reports[0]
+    assert "<sup>6</sup>" in ui.reports[1]
+
+    ui._run_research_internal(PROMPT, refresh=True)
+    assert client.calls["runs.create"] == 2
@@ -0,0 +1,111 @@
+"""
+Tests for research run checkpoints and resuming interrupted runs.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from benchmark_deep_research import headless_ui
+from fake_agents_service import FakeAgentsClient, research_reply
+from research_checkpoint import ResearchCheckpointStore
+
+
+def load_deep_research_agent():
+    path = Path(__file__).parent / "deep-research-agent.py"
+    spec = importlib.util.spec_from_file_location("deep_research_agent", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.POLLING_INTERVAL = 0
+    return module
+
+
+def crash_after(client, polls):
+    """Make runs.get fail after a number of polls, like a client that lost its process"""
+    get = client.runs.get
+    calls = {"count": 0}
+
+    def flaky_get(**kwargs):
+        calls["count"] += 1
+        if calls["count"] > polls:
+            raise ConnectionError("client went away")
+        return get(**kwargs)
+
+    client.runs.get = flaky_get
+    return lambda: setattr(client.runs, "get", get)
+
+
+def test_store_survives_reopening_and_tracks_progress(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    store = ResearchCheckpointStore(path)
+    store.start("cli", "asst_1", "thread_1", "run_1", "Plan my restaurant")
+    store.record_progress("run_1", "msg_1", "Reasoning: menus", status="in_progress")
+    store.record_progress("run_1", "msg_2", "Reasoning: staffing")
+    store.start("ui", "asst_1", "thread_2", "run_2", "Other question")
+    store.update_status("run_2", "completed")
+    store.close()
+
+    reopened = ResearchCheckpointStore(path)
+    checkpoint = reopened.latest_unfinished()
+
+    assert (checkpoint.run_id, checkpoint.status, checkpoint.last_message_id) == ("run_1", "in_progress", "msg_2")
+    assert reopened.progress("run_1") == ["Reasoning: menus", "Reasoning: staffing"]
+    assert reopened.latest_unfinished("ui") is None
+    assert reopened.discard("run_1") and reopened.latest_unfinished() is None and reopened.progress("run_1") == []
+
+
+def test_cli_resumes_an_interrupted_run(tmp_path, monkeypatch, capsys):
+    agent_module = load_deep_research_agent()
+    store = ResearchCheckpointStore(str(tmp_path / "runs.sqlite"))
+    client = FakeAgentsClient(responder=research_reply(report_bytes=4_000, citations=6, reasoning_steps=4))
+    restore = crash_after(client, polls=3)
+
+    with pytest.raises(ConnectionError):
+        agent_module.run_conversation(client, "gpt-4o", [], checkpoints=store)
+    before_crash = capsys.readouterr().out
+    restore()
+
+    checkpoint = store.latest_unfinished("cli")
+    monkeypatch.setattr("builtins.input", lambda prompt="": "quit")
+    agent_module.run_conversation(client, "gpt-4o", [], checkpoints=store, resume=checkpoint)
+    resumed = capsys.readouterr().out
+
+    assert before_crash.count("Reasoning:") == 2
+    # Both earlier summaries are replayed from the store, the other two come from the service
+    assert resumed.count("Reasoning:") == 4
+    assert "FINAL RESEARCH REPORT" in resumed and "Deleted agent" in resumed
+    assert store.get(checkpoint.run_id).status == "completed"
+    assert store.latest_unfinished() is None
+
+
+def test_ui_resume_replays_saved_progress_without_refetching(tmp_path):
+    store = ResearchCheckpointStore(str(tmp_path / "runs.sqlite"))
+    client = FakeAgentsClient(responder=research_reply(report_bytes=4_000, citations=6, reasoning_steps=4))
+    ui = headless_ui(client)
+    ui.checkpoints = store
+    ui.reasoning = []
+    ui.update_reasoning = ui.reasoning.append
+    ui.agent = client.create_agent(model="gpt-4o")
+    ui.thread = client.threads.create()
+    client.messages.create(thread_id=ui.thread.id, role="user", content="Plan my wharf restaurant")
+    run = client.runs.create(thread_id=ui.thread.id, agent_id=ui.agent.id)
+    ui._checkpoint_new_run(run, "Plan my wharf restaurant")
+    restore = crash_after(client, polls=3)
+
+    with pytest.raises(ConnectionError):
+        ui._execute_research_run(run)
+    restore()
+
+    resumed = headless_ui(client)  # A restarted UI with nothing in memory
+    resumed.checkpoints = store
+    resumed.reasoning = []
+    resumed.update_reasoning = resumed.reasoning.append
+    resumed._resume_research_internal(store.latest_unfinished("ui"))
+
+    shown_before = [text for text in ui.reasoning if "Reasoning" in text]
+    shown_after = [text for text in resumed.reasoning if "Reasoning" in text]
+    assert len(shown_before) == 2
+    assert shown_after[:2] == shown_before and len(shown_after) == 4
+    assert resumed.reports and resumed.reports[-1].startswith("## Section 1")
+    assert store.get(run.id).status == "completed" and not resumed.is_processing
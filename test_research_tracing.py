@@ -0,0 +1,86 @@
+"""
+Tests for span aggregation, rate limiting and tail sampling of the research UI's tracing.
+"""
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.trace import Status, StatusCode
+
+from benchmark_deep_research import REASONING_STEPS, start_polled_run
+from research_tracing import SpanRateLimiter, TracingSettings, build_tracer_provider, parse_span_limits
+
+
+def traced(settings):
+    exporter = InMemorySpanExporter()
+    return build_tracer_provider(exporter, settings), exporter
+
+
+def test_polling_is_summarised_on_one_span():
+    provider, exporter = traced(TracingSettings(span_limits={}))
+    ui, run = start_polled_run("1kb-0cit")
+    ui.tracer = provider.get_tracer(__name__)
+    get_last_message = ui.agents_client.messages.get_last_message_by_role
+    failures = iter([RuntimeError("service busy")])
+
+    def flaky_get_last_message(**kwargs):
+        error = next(failures, None)
+        if error:
+            raise error
+        return get_last_message(**kwargs)
+
+    ui.agents_client.messages.get_last_message_by_role = flaky_get_last_message
+    ui.update_reasoning = lambda text: None
+
+    with ui.tracer.start_as_current_span("deep_research_request") as span:
+        ui._execute_research_run(run, span)
+    provider.force_flush()
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert not {"polling_iteration", "poll_agent_message", "poll_message_error"} & set(spans)
+    polling = spans["research_polling_phase"]
+    assert polling.attributes["polling.iterations"] == ui.agents_client.calls["runs.get"] == REASONING_STEPS + 2
+    assert polling.attributes["polling.errors"] == 1
+    assert polling.attributes["polling.last_error"] == "service busy"
+    assert [e.name for e in polling.events].count("poll_error") == 1
+    assert polling.status.status_code is StatusCode.UNSET
+    # A span for the run, the polling phase and final results, plus the rate-limited reasoning steps
+    assert len(exporter.get_finished_spans()) <= REASONING_STEPS + 5
+
+
+def test_rate_limits_cap_noisy_span_names():
+    now = [0.0]
+    limiter = SpanRateLimiter(ALWAYS_ON, parse_span_limits("agent_reasoning_step=2,Runs*=60"), clock=lambda: now[0])
+    provider = TracerProvider(sampler=limiter)
+    exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer(__name__)
+
+    for _ in range(5):
+        tracer.start_span("agent_reasoning_step").end()
+        tracer.start_span("RunsOperations.get").end()
+    now[0] = 30.0  # Half a minute refills one of the two reasoning tokens
+    tracer.start_span("agent_reasoning_step").end()
+    tracer.start_span("agent_reasoning_step").end()
+
+    names = [s.name for s in exporter.get_finished_spans()]
+    assert names.count("agent_reasoning_step") == 3
+    assert names.count("RunsOperations.get") == 5
+    assert limiter.dropped == {"agent_reasoning_step": 4}
+
+
+def test_tail_sampling_keeps_failed_and_slow_traces_whole():
+    provider, exporter = traced(TracingSettings(tail_ratio=0.0, slow_seconds=60, span_limits={}))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("healthy"):
+        tracer.start_span("child").end()
+    with tracer.start_as_current_span("failed"):
+        with tracer.start_as_current_span("child") as child:
+            child.set_status(Status(StatusCode.ERROR, "boom"))
+    slow = tracer.start_span("slow", start_time=0)
+    slow.end(end_time=61 * 10**9)
+    provider.force_flush()
+
+    assert sorted(s.name for s in exporter.get_finished_spans()) == ["child", "failed", "slow"]
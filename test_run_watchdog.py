@@ -0,0 +1,79 @@
+"""
+Tests for server-side cancellation of research runs and the run watchdog.
+"""
+
+from benchmark_deep_research import REASONING_STEPS, headless_ui, start_polled_run
+from fake_agents_service import FakeAgentsClient
+from local_metrics import RESEARCH_RUNS, RESEARCH_SECONDS_SAVED
+from research_checkpoint import ResearchCheckpointStore
+from run_watchdog import RunDurations, RunWatchdog, WatchdogSettings
+
+
+def test_user_stop_cancels_the_run_on_the_service(tmp_path):
+    ui, run = start_polled_run("1kb-0cit")
+    ui.checkpoints = ResearchCheckpointStore(str(tmp_path / "runs.sqlite"))
+    ui.checkpoints.start("ui", "asst_benchmark", ui.thread.id, run.id, "Plan my restaurant", run.status)
+    ui.run_durations = RunDurations([600, 900, 1200])
+    shown = []
+    polls = []
+    get_run = ui.agents_client.runs.get
+
+    def stop_after_three_polls(**kwargs):
+        polls.append(kwargs)
+        if len(polls) == 3:
+            ui.is_processing = False  # What stop_research does from the Tk thread
+        return get_run(**kwargs)
+
+    ui.agents_client.runs.get = stop_after_three_polls
+    ui.update_reasoning = shown.append
+    saved_before = RESEARCH_SECONDS_SAVED.value(app="deep_research", reason="user")
+
+    final_run = ui._execute_research_run(run)
+
+    assert ui.agents_client.calls["runs.cancel"] == 1
+    assert final_run.status == "cancelled"
+    # The run ends before the report, and its checkpoint is no longer offered for resuming
+    assert ui.reports == [] and len(polls) < REASONING_STEPS
+    assert ui.checkpoints.get(run.id).status == "cancelled"
+    assert ui.checkpoints.latest_unfinished("ui") is None
+    saved = RESEARCH_SECONDS_SAVED.value(app="deep_research", reason="user") - saved_before
+    assert 890 < saved <= 900  # The median run of 15 minutes, less the moment this one ran
+    assert any("Run cancelled" in text for text in shown)
+
+
+def test_watchdog_trips_on_wall_clock_and_on_stalls():
+    now = [0.0]
+    settings = WatchdogSettings(max_run_seconds=3600, no_progress_seconds=600)
+
+    stalled = RunWatchdog(settings, clock=lambda: now[0])
+    stalled.observe("queued")
+    now[0] = 599
+    assert stalled.observe("queued") is None
+    now[0] = 600
+    assert stalled.observe("queued") == "no_progress"
+
+    now[0] = 0.0
+    busy = RunWatchdog(settings, started_at=-3000, clock=lambda: now[0])  # Resumed 50 minutes into the run
+    for minute in range(10):
+        now[0] = minute * 60
+        assert busy.observe("in_progress", progressed=True) is None
+    now[0] = 600
+    assert busy.observe("in_progress", progressed=True) == "max_runtime"
+    assert RunWatchdog(WatchdogSettings(0, 0), clock=lambda: now[0]).observe("queued") is None
+
+
+def test_run_stuck_in_queued_is_cancelled_by_the_watchdog():
+    client = FakeAgentsClient(queued_polls=10**6)
+    ui = headless_ui(client)
+    ui.watchdog_settings = WatchdogSettings(no_progress_seconds=0.05, cancel_timeout=5)
+    ui.update_reasoning = lambda text: None
+    ui.thread = client.threads.create()
+    client.messages.create(thread_id=ui.thread.id, role="user", content="Plan my restaurant")
+    run = client.runs.create(thread_id=ui.thread.id, agent_id="asst_benchmark")
+    stalled_before = RESEARCH_RUNS.value(app="deep_research", status="watchdog_no_progress")
+
+    final_run = ui._execute_research_run(run)
+
+    assert final_run.status == "cancelled"
+    assert client.calls["runs.cancel"] == 1
+    assert RESEARCH_RUNS.value(app="deep_research", status="watchdog_no_progress") == stalled_before + 1
@@ -0,0 +1,205 @@
+"""
+Tests for the shared agent thread lifecycle manager.
+Uses in-memory stand-ins for the sync and async agents clients.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from azure.ai.agents.models import RunStatus
+
+from evaluation_targets import RestaurantAgentTarget
+from red_team_targets import RestaurantRedTeamTarget
+from thread_lifecycle import ThreadLifecycleManager
+
+
+class FakeThreadStore:
+    """Threads and messages with a fixed delay on every create and delete"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.threads = {}
+        self.created = 0
+        self.deleted = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def new_thread(self):
+        with self._lock:
+            thread_id = f"thread_{next(self._ids)}"
+            self.threads[thread_id] = []
+            self.created += 1
+        return SimpleNamespace(id=thread_id)
+
+    def remove_thread(self, thread_id):
+        with self._lock:
+            del self.threads[thread_id]
+            self.deleted += 1
+
+    def create_thread(self):
+        time.sleep(self.delay)
+        return self.new_thread()
+
+    def delete_thread(self, thread_id):
+        time.sleep(self.delay)
+        self.remove_thread(thread_id)
+
+    def add_message(self, thread_id, role, content):
+        with self._lock:
+            messages = self.threads[thread_id]
+            messages.append(SimpleNamespace(id=f"msg_{len(messages)}", role=role, content=content))
+
+    def list_messages(self, thread_id):
+        return list(self.threads[thread_id])
+
+    def delete_message(self, thread_id, message_id):
+        with self._lock:
+            self.threads[thread_id] = [m for m in self.threads[thread_id] if m.id != message_id]
+
+    def answer(self, thread_id):
+        history = self.threads[thread_id]
+        # Replies reveal whether an earlier conversation leaked into the thread
+        text = f"Answer to {history[-1].content} (history {len(history) - 1})"
+        self.add_message(thread_id, "assistant", text)
+        return text
+
+
+class FakeSyncAgentsClient:
+    def __init__(self, store):
+        self.store = store
+        self.threads = SimpleNamespace(create=store.create_thread, delete=store.delete_thread)
+        self.messages = SimpleNamespace(
+            create=lambda thread_id, content, role: store.add_message(thread_id, role, content),
+            list=lambda thread_id: store.list_messages(thread_id),
+            delete=store.delete_message,
+            get_last_message_by_role=self._last_message,
+        )
+        self.runs = SimpleNamespace(create_and_process=self._create_and_process)
+        self.run_steps = SimpleNamespace(list=lambda **kwargs: [])
+
+    def _create_and_process(self, thread_id, agent_id):
+        self.store.answer(thread_id)
+        return SimpleNamespace(id="run_1", thread_id=thread_id, status=RunStatus.COMPLETED, last_error=None)
+
+    def _last_message(self, thread_id, role):
+        text = self.store.threads[thread_id][-1].content
+        return SimpleNamespace(text_messages=[SimpleNamespace(text=SimpleNamespace(value=text))])
+
+
+class FakeAsyncAgentsClient:
+    def __init__(self, store):
+        self.store = store
+        self.threads = SimpleNamespace(create=self._create_thread, delete=self._delete_thread)
+        self.messages = SimpleNamespace(list=self._list, delete=self._delete_message,
+                                        get_last_message_text_by_role=self._last_text)
+        self.runs = SimpleNamespace(create_and_process=self._create_and_process)
+
+    async def create_thread_and_process_run(self, **kwargs):
+        raise AssertionError("pooled threads should be used")
+
+    async def _create_thread(self):
+        await asyncio.sleep(self.store.delay)
+        return self.store.new_thread()
+
+    async def _delete_thread(self, thread_id):
+        await asyncio.sleep(self.store.delay)
+        self.store.remove_thread(thread_id)
+
+    async def _list(self, thread_id):
+        for message in self.store.list_messages(thread_id):
+            yield message
+
+    async def _delete_message(self, thread_id, message_id):
+        self.store.delete_message(thread_id, message_id)
+
+    async def _create_and_process(self, thread_id, agent_id, additional_messages, polling_interval):
+        for message in additional_messages:
+            self.store.add_message(thread_id, "user", message.content)
+        await asyncio.sleep(0.01)
+        self.store.answer(thread_id)
+        return SimpleNamespace(thread_id=thread_id, status=RunStatus.COMPLETED)
+
+    async def _last_text(self, thread_id, role):
+        return SimpleNamespace(text=SimpleNamespace(value=self.store.threads[thread_id][-1].content))
+
+
+QUERIES = [f"Question {i}?" for i in range(12)]
+
+
+def test_delete_policy_leaves_no_threads_behind():
+    store = FakeThreadStore()
+    threads = ThreadLifecycleManager(FakeSyncAgentsClient(store), policy="delete")
+    target = RestaurantAgentTarget(FakeSyncAgentsClient(store), "asst_1", max_concurrency=4, threads=threads)
+
+    results = asyncio.run(target.query_all(QUERIES))
+    target.close()
+    threads.close()
+
+    assert results[5]["response"] == "Answer to Question 5? (history 0)"
+    assert store.created == store.deleted == len(QUERIES)
+    assert store.threads == {}
+    summary = threads.summary()
+    assert summary["threads_deleted"] == len(QUERIES)
+    assert summary["cleanup_seconds_in_background"] >= len(QUERIES) * store.delay
+
+
+def test_recycled_threads_are_reused_with_empty_history():
+    store = FakeThreadStore()
+    threads = ThreadLifecycleManager(FakeSyncAgentsClient(store), policy="recycle")
+    target = RestaurantAgentTarget(FakeSyncAgentsClient(store), "asst_1", max_concurrency=2, threads=threads)
+
+    results = [target(query) for query in QUERIES]
+    threads.close()
+
+    # Every answer saw only its own question, even on a reused thread
+    assert all(r["response"].endswith("(history 0)") for r in results)
+    assert store.created < len(QUERIES)
+    assert threads.summary()["calls_from_pool"] == len(QUERIES) - store.created
+    assert store.threads == {}
+
+
+def test_prefilled_pool_keeps_creation_off_the_call_path():
+    store = FakeThreadStore(delay=0.05)
+    threads = ThreadLifecycleManager(FakeSyncAgentsClient(store), policy="delete", pool_size=4)
+    threads.prefill()
+    time.sleep(0.2)
+
+    started = time.perf_counter()
+    thread_id = threads.acquire()
+    assert time.perf_counter() - started < store.delay
+    threads.release(thread_id)
+    threads.close()
+
+    summary = threads.summary()
+    assert summary["calls_from_pool"] == 1
+    assert summary["create_seconds_saved"] >= store.delay
+    assert summary["seconds_saved"] > summary["create_seconds_saved"]
+    assert store.threads == {}
+
+
+def test_async_red_team_target_recycles_pooled_threads():
+    store = FakeThreadStore(delay=0.02)
+    client = FakeAsyncAgentsClient(store)
+
+    async def scenario():
+        threads = ThreadLifecycleManager(client, policy="recycle", pool_size=2)
+        target = RestaurantRedTeamTarget(client, "asst_1", max_concurrency=4, threads=threads)
+        replies = await asyncio.gather(*(target([{"role": "user", "content": q}]) for q in QUERIES))
+        await threads.aclose()
+        return replies, threads.summary()
+
+    replies, summary = asyncio.run(scenario())
+
+    assert all(r["messages"][0]["content"].endswith("(history 0)") for r in replies)
+    assert summary["threads_recycled"] == len(QUERIES)
+    assert summary["calls_from_pool"] > 0
+    assert store.threads == {}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ThreadLifecycleManager(FakeSyncAgentsClient(FakeThreadStore()), policy="archive")
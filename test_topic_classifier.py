@@ -0,0 +1,73 @@
+"""
+Tests for the single-pass topic classifier and its batch mode.
+"""
+
+import json
+
+from research_cache import ReportCache
+from topic_classifier import (SINGLE_SCAN_MIN_KEYWORDS, KeywordMatcher, SubstringMatcher, TopicClassifier,
+                              iter_cached_reports)
+
+
+def test_query_attributes_come_from_one_scan():
+    prompt = ("Plan a Restaurant strategy in San Francisco: menu, staff recruitment, marketing and an FAQ. "
+              "Which location works best? How big should the budget be?")
+
+    attributes = TopicClassifier().attributes("query", prompt)
+
+    assert attributes == {
+        "query.domain": "restaurant",
+        "query.requirements": "strategy,menu,staffing,marketing,faq,location_analysis",
+        "query.location": "san_francisco",
+        "query.complexity": "high",
+        "query.question_count": 2,
+        "query.sentence_count": 3,
+        "query.word_count": 24,
+    }
+    assert TopicClassifier().attributes("query", "hello")["query.domain"] == "general"
+
+
+def test_keywords_inside_longer_matches_are_still_counted():
+    matcher = KeywordMatcher(["research", "search", "arch", "cost", "costs"])
+    text = "Researching costs. Search the archive! Costs?"
+
+    counts = matcher.count(text)
+
+    for keyword in ("research", "search", "arch", "cost", "costs"):
+        assert counts[keyword] == text.lower().count(keyword), keyword
+    assert (counts["."], counts["!"], counts["?"]) == (1, 1, 1)
+    # "research" contains "search", and search comes first in the dictionary, as the old elif chain did
+    assert TopicClassifier().attributes("reasoning", "Researching menus")["reasoning.type"] == "search"
+
+
+def test_large_dictionaries_switch_to_one_scan_with_the_same_labels():
+    labels = {f"label{index}": [f"keyword{index:03d}"] for index in range(SINGLE_SCAN_MIN_KEYWORDS)}
+    large = TopicClassifier({"content": {"topics": {"mode": "all", "labels": labels}}})
+    small = TopicClassifier({"content": {"topics": {"mode": "all", "labels": dict(list(labels.items())[:5])}}})
+    text = "Keyword001 and keyword003 twice: keyword003. Then keyword039!"
+
+    assert isinstance(large._matchers["content"], KeywordMatcher)
+    assert isinstance(small._matchers["content"], SubstringMatcher)
+    assert all(isinstance(matcher, SubstringMatcher) for matcher in TopicClassifier()._matchers.values())
+    assert large.attributes("content", text)["content.topics"] == "label1,label3,label39"
+    assert small.attributes("content", text)["content.topics"] == "label1,label3"
+    assert large.classify("content", text).sentences == small.classify("content", text).sentences == 2
+
+
+def test_custom_dictionary_and_cached_reports_batch(tmp_path):
+    dictionary = {"content": {"cuisine": {"mode": "all", "labels": {
+        "seafood": ["crab", "oyster"], "steak": ["ribeye"], "dessert": ["tiramisu"]}}}}
+    classifier = TopicClassifier(dictionary)
+    cache = ReportCache(str(tmp_path / "reports.sqlite"))
+    report = {"id": "msg_1", "role": "assistant", "content": [
+        {"type": "text", "text": {"value": "Dungeness CRAB and oysters beside a dry-aged ribeye.", "annotations": []}}]}
+    cache.put("Wharf menu ideas", "fp", report)
+    cache.close()
+
+    reports = list(iter_cached_reports(str(tmp_path / "reports.sqlite")))
+    attributes = classifier.attributes("content", reports[0][1])
+
+    assert reports[0][0] == "Wharf menu ideas"
+    assert attributes["content.cuisine"] == "seafood,steak"
+    assert attributes["content.quality"] == "brief"
+    assert json.loads(json.dumps(attributes)) == attributes
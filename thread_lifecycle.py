@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Thread lifecycle manager for the agent evaluation, simulator and red team targets.
+
+Every query used to create a new agent thread and leave it behind, so a red
+team scan orphaned thousands of threads and paid thread creation latency on
+every call. ThreadLifecycleManager hands out threads and takes them back:
+
+- "delete" deletes each thread in the background once the call is done
+- "recycle" clears the thread's messages in the background and reuses it
+- "keep" leaves threads alone (handy when inspecting runs in the portal)
+
+With pool_size > 0 the manager keeps that many empty threads ready, created in
+the background, so callers never wait on thread creation. Background work runs
+on a small thread pool for the sync AgentsClient and as asyncio tasks for the
+azure.ai.agents.aio client.
+
+Usage:
+    threads = ThreadLifecycleManager(agents_client, policy="recycle", pool_size=8)
+    target = RestaurantAgentTarget(agents_client, RESTAURANT_ASSISTANT_ID, threads=threads)
+    ...
+    threads.close()
+    threads.print_summary()
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DELETE = "delete"
+RECYCLE = "recycle"
+KEEP = "keep"
+POLICIES = (DELETE, RECYCLE, KEEP)
+
+DEFAULT_BACKGROUND_WORKERS = 4
+
+
+class ThreadLifecycleManager:
+    """Hands out agent threads and deletes or recycles them off the call path"""
+
+    def __init__(self, agents_client, policy=DELETE, pool_size=0, background_workers=DEFAULT_BACKGROUND_WORKERS):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown thread policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        self.agents_client = agents_client
+        self.policy = policy
+        self.pool_size = pool_size
+        self.is_async = inspect.iscoroutinefunction(agents_client.threads.create)
+
+        self._idle = deque()  # Empty threads ready to hand out
+        self._filling = 0     # Background creates in flight
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = None
+        if not self.is_async:
+            self._executor = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="agent-threads")
+
+        # Count and total seconds per operation
+        self.timings = {name: {"count": 0, "seconds": 0.0} for name in
+                        ("create_foreground", "create_background", "delete", "clear", "reused", "errors")}
+
+    def _time(self, name, started):
+        with self._lock:
+            self.timings[name]["count"] += 1
+            self.timings[name]["seconds"] += time.perf_counter() - started
+
+    def _count(self, name):
+        with self._lock:
+            self.timings[name]["count"] += 1
+
+    # --- blocking operations for the sync client, run on the manager's executor ---
+
+    def _create(self, name):
+        started = time.perf_counter()
+        thread_id = self.agents_client.threads.create().id
+        self._time(name, started)
+        return thread_id
+
+    def _fill(self):
+        try:
+            thread_id = self._create("create_background")
+            with self._lock:
+                self._idle.append(thread_id)
+        except Exception:
+            self._count("errors")
+        finally:
+            with self._lock:
+                self._filling -= 1
+
+    def _delete(self, thread_id):
+        started = time.perf_counter()
+        try:
+            self.agents_client.threads.delete(thread_id)
+            self._time("delete", started)
+        except Exception:
+            self._count("errors")
+
+    def _recycle(self, thread_id):
+        started = time.perf_counter()
+        try:
+            for message in list(self.agents_client.messages.list(thread_id=thread_id)):
+                self.agents_client.messages.delete(thread_id=thread_id, message_id=message.id)
+        except Exception:
+            # A thread that can't be cleared is deleted instead of being reused with stale history
+            self._count("errors")
+            return self._delete(thread_id)
+        self._time("clear", started)
+        self._return_to_pool(thread_id)
+
+    # --- the same operations as coroutines for the async client ---
+
+    async def _acreate(self, name):
+        started = time.perf_counter()
+        thread = await self.agents_client.threads.create()
+        self._time(name, started)
+        return thread.id
+
+    async def _afill(self):
+        try:
+            thread_id = await self._acreate("create_background")
+            with self._lock:
+                self._idle.append(thread_id)
+        except Exception:
+            self._count("errors")
+        finally:
+            with self._lock:
+                self._filling -= 1
+
+    async def _adelete(self, thread_id):
+        started = time.perf_counter()
+        try:
+            await self.agents_client.threads.delete(thread_id)
+            self._time("delete", started)
+        except Exception:
+            self._count("errors")
+
+    async def _arecycle(self, thread_id):
+        started = time.perf_counter()
+        try:
+            messages = [message async for message in self.agents_client.messages.list(thread_id=thread_id)]
+            for message in messages:
+                await self.agents_client.messages.delete(thread_id=thread_id, message_id=message.id)
+        except Exception:
+            self._count("errors")
+            return await self._adelete(thread_id)
+        self._time("clear", started)
+        self._return_to_pool(thread_id)
+
+    # --- scheduling ---
+
+    def _background(self, work, *args):
+        if self.is_async:
+            task = asyncio.get_running_loop().create_task(work(*args))
+        else:
+            task = self._executor.submit(work, *args)
+        with self._lock:
+            self._pending.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        with self._lock:
+            self._pending.discard(task)
+
+    def _pending_work(self):
+        with self._lock:
+            return list(self._pending)
+
+    def _return_to_pool(self, thread_id):
+        with self._lock:
+            self._idle.append(thread_id)
+
+    def _take_idle(self):
+        with self._lock:
+            thread_id = self._idle.popleft() if self._idle else None
+            # Top the pool back up in the background
+            missing = max(0, self.pool_size - len(self._idle) - self._filling)
+            self._filling += missing
+        if thread_id is not None:
+            self._count("reused")
+        return thread_id, missing
+
+    def prefill(self):
+        """Start creating pool_size empty threads in the background"""
+        with self._lock:
+            missing = max(0, self.pool_size - len(self._idle) - self._filling)
+            self._filling += missing
+        for _ in range(missing):
+            self._background(self._afill if self.is_async else self._fill)
+
+    def acquire(self):
+        """An empty thread id, from the pool when one is ready (sync client)"""
+        thread_id, missing = self._take_idle()
+        for _ in range(missing):
+            self._background(self._fill)
+        return thread_id if thread_id is not None else self._create("create_foreground")
+
+    def release(self, thread_id):
+        """Hand a thread back once its call is done; cleanup happens in the background (sync client)"""
+        if thread_id is None or self.policy == KEEP:
+            return
+        self._background(self._recycle if self.policy == RECYCLE else self._delete, thread_id)
+
+    async def aacquire(self):
+        """acquire() for either client, without blocking the event loop"""
+        if not self.is_async:
+            return await asyncio.get_running_loop().run_in_executor(None, self.acquire)
+        thread_id, missing = self._take_idle()
+        for _ in range(missing):
+            self._background(self._afill)
+        return thread_id if thread_id is not None else await self._acreate("create_foreground")
+
+    async def arelease(self, thread_id):
+        """release() for either client"""
+        if not self.is_async:
+            return self.release(thread_id)
+        if thread_id is None or self.policy == KEEP:
+            return
+        self._background(self._arecycle if self.policy == RECYCLE else self._adelete, thread_id)
+
+    # --- shutdown and reporting ---
+
+    def _drain_idle(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        return idle if self.policy != KEEP else []
+
+    def close(self):
+        """Finish background work and delete pooled threads (sync client); the manager stays usable"""
+        while self._pending_work():
+            wait(self._pending_work())
+        for thread_id in self._drain_idle():
+            self._delete(thread_id)
+
+    async def aclose(self):
+        """close() for either client"""
+        if not self.is_async:
+            return await asyncio.get_running_loop().run_in_executor(None, self.close)
+        while self._pending_work():
+            await asyncio.gather(*self._pending_work(), return_exceptions=True)
+        await asyncio.gather(*(self._adelete(thread_id) for thread_id in self._drain_idle()))
+
+    def summary(self):
+        """Thread counts and how much create/delete time was kept off the call path"""
+        with self._lock:
+            timings = {name: dict(value) for name, value in self.timings.items()}
+            idle = len(self._idle)
+        creates = timings["create_foreground"]["count"] + timings["create_background"]["count"]
+        create_seconds = timings["create_foreground"]["seconds"] + timings["create_background"]["seconds"]
+        average_create = create_seconds / creates if creates else 0.0
+        # Every call served from the pool skipped a create on its call path
+        saved_create = timings["reused"]["count"] * average_create
+        cleanup = timings["delete"]["seconds"] + timings["clear"]["seconds"]
+        return {
+            "policy": self.policy,
+            "threads_created": creates,
+            "threads_deleted": timings["delete"]["count"],
+            "threads_recycled": timings["clear"]["count"],
+            "threads_idle": idle,
+            "calls_from_pool": timings["reused"]["count"],
+            "errors": timings["errors"]["count"],
+            "average_create_seconds": average_create,
+            "create_seconds_saved": saved_create,
+            "cleanup_seconds_in_background": cleanup,
+            "seconds_saved": saved_create + cleanup,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"🧵 Threads ({summary['policy']}): {summary['threads_created']} created, "
+              f"{summary['threads_deleted']} deleted, {summary['threads_recycled']} recycled, "
+              f"{summary['calls_from_pool']} calls served from the pool")
+        print(f"⏱️  Kept off the call path: {summary['create_seconds_saved']:.1f}s of thread creation, "
+              f"{summary['cleanup_seconds_in_background']:.1f}s of cleanup")
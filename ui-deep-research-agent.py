@@ -12,13 +12,30 @@ from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import DeepResearchTool, MessageRole, ThreadMessage
 from tkinter import font
 from datetime import datetime
-from azure.monitor.opentelemetry import configure_azure_monitor
 from opentelemetry import trace
 from opentelemetry.trace import Tracer
 
+from report_markup import parse_markdown
+from report_pdf import PdfExportJob
+from evaluation_cache import agent_fingerprint
+from research_cache import ReportCache
+from research_checkpoint import ResearchCheckpointStore
+from research_tracing import PollingSummary, configure_research_tracing
+from topic_classifier import TopicClassifier
+from local_metrics import (RESEARCH_CANCEL_ACK, RESEARCH_FIRST_REASONING, RESEARCH_POLL, RESEARCH_RENDER,
+                           RESEARCH_RUNS, RESEARCH_SECONDS_SAVED, start_metrics_server)
+from run_watchdog import (STOP_REASONS, TERMINAL_STATUSES, RunDurations, RunWatchdog, WatchdogSettings, cancel_run,
+                          estimate_saved_seconds)
+
 # Load environment variables from .env file if they're not already set
 load_dotenv()
 
+POLLING_INTERVAL = 2  # seconds between run status checks
+AGENT_INSTRUCTIONS = "You are a TEXT-ONLY research agent. ABSOLUTELY NO IMAGE CONTENT: Do not search for images, do not load images, do not display images, do not reference images, do not describe images, do not suggest image sources, do not research image licensing, do not engage with any visual content whatsoever. Do not mention photo galleries, image databases, visual resources, or any image-related websites. ONLY provide text-based research, written analysis, and textual information. If asked about visual content, explicitly state that you are a text-only agent and cannot assist with image-related requests."
+PDF_PROGRESS_INTERVAL_MS = 100  # how often the export button shows PDF progress
+METRICS_PORT = 9101  # local Prometheus endpoint, http://localhost:9101/metrics
+METRICS_APP = "deep_research"
+
 
 class MarkdownRenderer:
     """Simple Markdown renderer for tkinter Text widgets"""
@@ -69,116 +86,50 @@ class MarkdownRenderer:
     
     def render_markdown(self, markdown_text):
         """Render markdown text to the text widget"""
+        self.render_blocks(parse_markdown(markdown_text))
+    
+    def render_blocks(self, blocks):
+        """Render parsed report blocks, one widget insert per block"""
         self.text_widget.delete(1.0, tk.END)
         
-        lines = markdown_text.split('\n')
-        current_pos = 1.0
-        
-        for line in lines:
-            line = line.rstrip()
-            
-            # Headers
-            if line.startswith('### '):
-                self.insert_with_tag(line[4:] + '\n', "h3")
-            elif line.startswith('## '):
-                self.insert_with_tag(line[3:] + '\n', "h2")
-            elif line.startswith('# '):
-                self.insert_with_tag(line[2:] + '\n', "h1")
-            
-            # List items
-            elif line.startswith('- ') or re.match(r'^\d+\.\s', line):
-                self.process_formatted_line(line + '\n', "list_item")
-            
-            # Regular paragraphs
-            elif line.strip():
-                self.process_formatted_line(line + '\n')
-            
-            # Empty lines
+        for block in blocks:
+            # Tk's insert takes alternating text/tags pairs, so a block is a single call
+            chunks = []
+            if block.kind == "heading":
+                self.add_inline_chunks(block.inlines, (f"h{min(block.level, 3)}",), chunks)
+            elif block.kind == "list_item":
+                chunks += [f"{block.marker} ", ("list_item",)]
+                self.add_inline_chunks(block.inlines, ("list_item",), chunks)
+            elif block.kind == "image":
+                chunks += [f"[Image: {block.alt}]", ("italic",)]
             else:
-                self.text_widget.insert(tk.END, '\n')
-    
-    def process_formatted_line(self, line, base_tag=None):
-        """Process a line with inline formatting"""
-        # Handle citations (superscript HTML tags)
-        line = re.sub(r'<sup>(\d+)</sup>', r'[\1]', line)
-        
-        # Handle links in markdown format [text](url)
-        def replace_link(match):
-            text, url = match.groups()
-            start_pos = self.text_widget.index(tk.END)
-            self.text_widget.insert(tk.END, text)
-            end_pos = self.text_widget.index(tk.END)
-            self.text_widget.tag_add("link", start_pos, end_pos)
-            self.text_widget.tag_add(f"url:{url}", start_pos, end_pos)
-            return ""
-        
-        # Process links
-        link_pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-        
-        current_pos = 0
-        for match in re.finditer(link_pattern, line):
-            # Add text before the link
-            before_text = line[current_pos:match.start()]
-            if before_text:
-                self.insert_with_formatting(before_text, base_tag)
-            
-            # Add the link
-            text, url = match.groups()
-            start_pos = self.text_widget.index(tk.END)
-            self.text_widget.insert(tk.END, text)
-            end_pos = self.text_widget.index(tk.END)
-            self.text_widget.tag_add("link", start_pos, end_pos)
-            self.text_widget.tag_add(f"url:{url}", start_pos, end_pos)
-            if base_tag:
-                self.text_widget.tag_add(base_tag, start_pos, end_pos)
-            
-            current_pos = match.end()
-        
-        # Add remaining text
-        remaining_text = line[current_pos:]
-        if remaining_text:
-            self.insert_with_formatting(remaining_text, base_tag)
+                self.add_inline_chunks(block.inlines, (), chunks)
+            chunks += ["\n" * (1 + block.gap), ()]
+            self.text_widget.insert(tk.END, *chunks)
     
-    def insert_with_formatting(self, text, base_tag=None):
-        """Insert text with bold/italic formatting"""
-        # Handle bold **text**
-        bold_pattern = r'\*\*(.*?)\*\*'
-        current_pos = 0
-        
-        for match in re.finditer(bold_pattern, text):
-            # Add text before bold
-            before_text = text[current_pos:match.start()]
-            if before_text:
-                self.insert_with_tag(before_text, base_tag)
-            
-            # Add bold text
-            bold_text = match.group(1)
-            start_pos = self.text_widget.index(tk.END)
-            self.text_widget.insert(tk.END, bold_text)
-            end_pos = self.text_widget.index(tk.END)
-            self.text_widget.tag_add("bold", start_pos, end_pos)
-            if base_tag:
-                self.text_widget.tag_add(base_tag, start_pos, end_pos)
-            
-            current_pos = match.end()
-        
-        # Add remaining text
-        remaining_text = text[current_pos:]
-        if remaining_text:
-            self.insert_with_tag(remaining_text, base_tag)
-    
-    def insert_with_tag(self, text, tag=None):
-        """Insert text with optional tag"""
-        start_pos = self.text_widget.index(tk.END)
-        self.text_widget.insert(tk.END, text)
-        if tag:
-            end_pos = self.text_widget.index(tk.END)
-            self.text_widget.tag_add(tag, start_pos, end_pos)
+    def add_inline_chunks(self, inlines, tags, chunks):
+        """Append (text, tags) pairs for an inline run"""
+        for inline in inlines:
+            if inline.kind == "text":
+                chunks += [inline.text, tags]
+            elif inline.kind in ("bold", "italic"):
+                self.add_inline_chunks(inline.children, tags + (inline.kind,), chunks)
+            elif inline.kind == "code":
+                chunks += [inline.text, tags + ("code",)]
+            elif inline.kind == "link":
+                link_tags = tags + ("link", f"url:{inline.url}") if inline.url else tags
+                self.add_inline_chunks(inline.children, link_tags, chunks)
+            elif inline.kind == "citation":
+                chunks += [f"[{inline.text}]", tags + ("citation",)]
+            elif inline.kind == "line_break":
+                chunks += ["\n", tags]
 
 
 class DeepResearchAgentUI:
     """Graphical User Interface for the Deep Research Agent"""
     
+    polling_interval = POLLING_INTERVAL
+    
     def __init__(self, root):
         self.root = root
         self.root.title("🔬 Deep Research Agent")
@@ -200,6 +151,19 @@ class DeepResearchAgentUI:
         self.project_client: Optional[AIProjectClient] = None
         self.agents_client_context = None
         self.tracer: Optional[Tracer] = None  # OpenTelemetry tracer for custom spans
+        self.polling_summary: Optional[PollingSummary] = None  # Poll counters of the run being polled
+        self.topic_classifier = TopicClassifier.from_file()  # Topic attributes for query, reasoning and report spans
+        self.metrics_server = start_metrics_server(METRICS_PORT)  # Live latency numbers without Azure
+        self.pdf_job: Optional[PdfExportJob] = None  # Background PDF export, if one has run
+        self.report_blocks = []  # Parsed report shared by the report view and PDF export
+        self.checkpoints = ResearchCheckpointStore()  # Lets an interrupted run be resumed after a restart
+        self.report_cache = ReportCache()  # Finished reports for repeated prompts
+        self.current_query = None  # Prompt of the run being polled, for the report cache
+        self.watchdog_settings = WatchdogSettings.from_env()  # Max run time and no-progress limits
+        self.watchdog: Optional[RunWatchdog] = None  # Watchdog of the run being polled
+        self.research_thread: Optional[threading.Thread] = None
+        # Typical run length, for estimating how much run time a cancellation saved
+        self.run_durations = RunDurations(self.checkpoints.durations("ui", "completed"))
         
         # Create UI elements
         self.create_widgets()
@@ -245,11 +209,11 @@ class DeepResearchAgentUI:
                 self.update_reasoning("   Set this in your .env file - get it from Azure Portal > Application Insights > Overview\n")
                 return False
             
-            # Configure Azure Monitor tracing
-            configure_azure_monitor(connection_string=connection_string)
+            # Configure Azure Monitor tracing with head/tail sampling and span rate limits
+            tracer_provider = configure_research_tracing(connection_string)
             
             # Create a tracer for custom spans
-            self.tracer = trace.get_tracer(__name__)
+            self.tracer = tracer_provider.get_tracer(__name__)
             
             content_status = "enabled" if content_recording == "true" else "disabled"
             self.update_reasoning(f"✅ Azure AI Foundry tracing initialized successfully (content recording: {content_status}).\n")
@@ -405,6 +369,19 @@ class DeepResearchAgentUI:
                                      state='disabled')
         self.stop_button.pack(side='left')
         
+        # Resume button (enabled when an interrupted run was checkpointed)
+        self.resume_button = ttk.Button(button_frame, text="⏯️ Resume Research", 
+                                       style='Clear.TButton',
+                                       command=self.resume_research)
+        self.resume_button.pack(side='left', padx=(15, 0))
+        
+        # Refresh override for the report cache
+        self.refresh_cache = tk.BooleanVar(value=False)
+        self.refresh_checkbox = ttk.Checkbutton(button_frame, text="🔄 Refresh (skip cached report)",
+                                                variable=self.refresh_cache)
+        self.refresh_checkbox.pack(side='left', padx=(15, 0))
+        self.update_button_states()
+        
         # Right side buttons
         # Copy button for research report
         self.copy_button = ttk.Button(button_frame, text="📋 Copy Report", 
@@ -478,6 +455,60 @@ class DeepResearchAgentUI:
             self.update_reasoning("⚠️ Tracing not available - running without traces\n")
             self._start_research_internal(user_input)
     
+    def resume_research(self):
+        """Reattach to the most recent interrupted run"""
+        if self.is_processing or not self.agents_client:
+            return
+        
+        checkpoint = self.checkpoints.latest_unfinished("ui")
+        if not checkpoint:
+            messagebox.showinfo("Nothing to Resume", "There is no interrupted research run to resume.")
+            self.update_button_states()
+            return
+        
+        self.is_processing = True
+        self.show_loading()
+        self.update_button_states()
+        
+        self.research_thread = threading.Thread(target=self._resume_research_internal, args=(checkpoint,))
+        self.research_thread.daemon = True
+        self.research_thread.start()
+    
+    def _resume_research_internal(self, checkpoint):
+        """Replay saved progress, then keep polling the checkpointed run (called in background thread)"""
+        try:
+            self.update_reasoning(f"\n⏯️ Resuming research run {checkpoint.run_id}...\n\n")
+            self.current_query = checkpoint.query
+            # Progress shown before the interruption comes from the local store, not the service
+            for progress_text in self.checkpoints.progress(checkpoint.run_id):
+                self.update_reasoning(progress_text)
+            
+            self.agent = self.agents_client.get_agent(checkpoint.agent_id)
+            self.thread = self.agents_client.threads.get(checkpoint.thread_id)
+            run = self.agents_client.runs.get(thread_id=checkpoint.thread_id, run_id=checkpoint.run_id)
+            self.current_run = run
+            # Catch up on whatever the agent posted while we were away before waiting for the next poll
+            last_message_id = self.fetch_and_display_progress(checkpoint.thread_id, self.agents_client,
+                                                              checkpoint.last_message_id)
+            
+            if self.tracer:
+                with self.tracer.start_as_current_span("resume_agent_run") as run_span:
+                    run_span.set_attribute("run.id", run.id)
+                    run_span.set_attribute("run.resumed_status", run.status)
+                    run_span.set_attribute("run.replayed_messages", len(self.checkpoints.progress(checkpoint.run_id)))
+                    return self._execute_research_run(run, run_span, last_message_id, checkpoint.created_at)
+            return self._execute_research_run(run, None, last_message_id, checkpoint.created_at)
+        
+        except Exception as e:
+            error_msg = f"❌ Could not resume research: {str(e)}"
+            self.update_reasoning(f"\n{error_msg}\n")
+            self.root.after(0, lambda: messagebox.showerror("Resume Error", error_msg))
+        
+        finally:
+            self.is_processing = False
+            self.root.after(0, self.hide_loading)
+            self.root.after(0, self.update_button_states)
+    
     def _start_research_internal(self, user_input):
         """Internal method to start research process"""
         # Start research in background thread
@@ -495,12 +526,13 @@ class DeepResearchAgentUI:
             self.update_reasoning("\n" + "="*50 + "\n")
             self.update_reasoning("🔄 Starting new research request...\n\n")
         
-        research_thread = threading.Thread(target=self.run_research, args=(user_input,))
-        research_thread.daemon = True
-        research_thread.start()
+        self.research_thread = threading.Thread(target=self.run_research,
+                                                args=(user_input, self.refresh_cache.get()))
+        self.research_thread.daemon = True
+        self.research_thread.start()
     
-    def run_research(self, user_input):
-        """Run the research process (called in background thread)"""
+    def run_research(self, user_input, refresh=False):
+        """Run the research process (called in background thread); refresh bypasses the report cache"""
         # Create a custom span for the entire research operation
         scenario = "deep_research_agent_query"
         
@@ -513,13 +545,18 @@ class DeepResearchAgentUI:
                 span.set_attribute("agent.model", os.environ.get("AGENT_MODEL_DEPLOYMENT_NAME", "unknown"))
                 span.set_attribute("deep_research.model", os.environ.get("DEEP_RESEARCH_MODEL_DEPLOYMENT_NAME", "unknown"))
                 
-                return self._run_research_internal(user_input, span)
+                return self._run_research_internal(user_input, span, refresh)
         else:
-            return self._run_research_internal(user_input, None)
+            return self._run_research_internal(user_input, None, refresh)
     
-    def _run_research_internal(self, user_input, span=None):
+    def _run_research_internal(self, user_input, span=None, refresh=False):
         """Internal research method with comprehensive tracing"""
         try:
+            # A repeated prompt is answered from the report cache instead of a new multi-minute run
+            self.current_query = user_input
+            if self._serve_cached_report(user_input, refresh, span):
+                return
+            
             # Check if clients are initialized
             if not self.agents_client:
                 raise Exception("Azure clients not initialized")
@@ -536,7 +573,7 @@ class DeepResearchAgentUI:
                         self.agent = self.agents_client.create_agent(
                             model=os.environ["AGENT_MODEL_DEPLOYMENT_NAME"],
                             name="deep-research-agent-ui",
-                            instructions="You are a TEXT-ONLY research agent. ABSOLUTELY NO IMAGE CONTENT: Do not search for images, do not load images, do not display images, do not reference images, do not describe images, do not suggest image sources, do not research image licensing, do not engage with any visual content whatsoever. Do not mention photo galleries, image databases, visual resources, or any image-related websites. ONLY provide text-based research, written analysis, and textual information. If asked about visual content, explicitly state that you are a text-only agent and cannot assist with image-related requests.",
+                            instructions=AGENT_INSTRUCTIONS,
                             tools=self.deep_research_tool.definitions,
                         )
                         creation_time = time.time() - start_time
@@ -548,7 +585,7 @@ class DeepResearchAgentUI:
                     self.agent = self.agents_client.create_agent(
                         model=os.environ["AGENT_MODEL_DEPLOYMENT_NAME"],
                         name="deep-research-agent-ui", 
-                        instructions="You are a TEXT-ONLY research agent. ABSOLUTELY NO IMAGE CONTENT: Do not search for images, do not load images, do not display images, do not reference images, do not describe images, do not suggest image sources, do not research image licensing, do not engage with any visual content whatsoever. Do not mention photo galleries, image databases, visual resources, or any image-related websites. ONLY provide text-based research, written analysis, and textual information. If asked about visual content, explicitly state that you are a text-only agent and cannot assist with image-related requests.",
+                        instructions=AGENT_INSTRUCTIONS,
                         tools=self.deep_research_tool.definitions,
                     )
             else:
@@ -587,7 +624,7 @@ class DeepResearchAgentUI:
                     msg_span.set_attribute("message.content_preview", user_input[:200])  # First 200 chars
                     
                     # Analyze user input for better tracing
-                    self._analyze_user_input(user_input, msg_span)
+                    msg_span.set_attributes(self.topic_classifier.attributes("query", user_input))
                     
                     start_time = time.time()
                     message = self.agents_client.messages.create(
@@ -623,6 +660,7 @@ class DeepResearchAgentUI:
                     run_span.set_attribute("run.id", run.id)
                     run_span.set_attribute("run.initial_status", run.status)
                     run_span.set_attribute("run.start_time", start_time)
+                    self._checkpoint_new_run(run, user_input)
                     
                     result = self._execute_research_run(run, run_span)
                     
@@ -645,6 +683,7 @@ class DeepResearchAgentUI:
                     thread_id=self.thread.id, 
                     agent_id=self.agent.id
                 )
+                self._checkpoint_new_run(run, user_input)
                 return self._execute_research_run(run, None)
                     
         except Exception as e:
@@ -661,125 +700,111 @@ class DeepResearchAgentUI:
             self.root.after(0, self.hide_loading)
             self.root.after(0, self.update_button_states)
     
-    def _analyze_user_input(self, user_input, span):
-        """Analyze user input for tracing insights"""
-        try:
-            input_lower = user_input.lower()
-            
-            # Detect query type
-            if "restaurant" in input_lower or "food" in input_lower:
-                span.set_attribute("query.domain", "restaurant")
-            elif "business" in input_lower or "company" in input_lower:
-                span.set_attribute("query.domain", "business")
-            elif "marketing" in input_lower or "promotion" in input_lower:
-                span.set_attribute("query.domain", "marketing")
-            elif "technology" in input_lower or "software" in input_lower:
-                span.set_attribute("query.domain", "technology")
-            else:
-                span.set_attribute("query.domain", "general")
-            
-            # Detect specific requirements
-            requirements = []
-            if "strategy" in input_lower:
-                requirements.append("strategy")
-            if "menu" in input_lower:
-                requirements.append("menu")
-            if "staff" in input_lower or "recruitment" in input_lower:
-                requirements.append("staffing")
-            if "marketing" in input_lower:
-                requirements.append("marketing")
-            if "faq" in input_lower:
-                requirements.append("faq")
-            if "location" in input_lower or "address" in input_lower:
-                requirements.append("location_analysis")
-            
-            if requirements:
-                span.set_attribute("query.requirements", ",".join(requirements))
-                span.set_attribute("query.complexity", "high" if len(requirements) > 3 else "medium" if len(requirements) > 1 else "low")
-            
-            # Detect geographic context
-            if "san francisco" in input_lower:
-                span.set_attribute("query.location", "san_francisco")
-            elif "california" in input_lower:
-                span.set_attribute("query.location", "california")
-            
-            # Question complexity analysis
-            question_count = input_lower.count('?')
-            sentence_count = max(1, input_lower.count('.') + input_lower.count('!') + question_count)
-            
-            span.set_attribute("query.question_count", question_count)
-            span.set_attribute("query.sentence_count", sentence_count)
-            span.set_attribute("query.word_count", len(user_input.split()))
-            
-        except Exception as e:
-            span.set_attribute("query.analysis_error", str(e))
+    def _report_fingerprint(self):
+        """Hash of what shapes a report: the agent model, its instructions and the Deep Research model"""
+        return agent_fingerprint({
+            "model": os.environ.get("AGENT_MODEL_DEPLOYMENT_NAME"),
+            "instructions": AGENT_INSTRUCTIONS,
+            "tools": [os.environ.get("DEEP_RESEARCH_MODEL_DEPLOYMENT_NAME")],
+        })
+    
+    def _serve_cached_report(self, user_input, refresh, span=None):
+        """Render the cached report for a repeated prompt; True on a cache hit"""
+        if not self.report_cache:
+            return False
+        if refresh:
+            self.update_reasoning("🔄 Refresh requested - skipping the report cache\n")
+            if span:
+                span.set_attribute("report_cache.refresh", True)
+            return False
+        
+        cached = self.report_cache.get(user_input, self._report_fingerprint())
+        if span:
+            span.set_attribute("report_cache.hit", cached is not None)
+        if cached is None:
+            return False
+        
+        minutes = cached.age_seconds / 60
+        age = f"{minutes:.0f} min" if minutes < 120 else f"{minutes / 60:.1f} h"
+        self.update_reasoning(f"⚡ Same request as {age} ago - showing the cached report "
+                              f"(tick Refresh to research it again)\n")
+        RESEARCH_RUNS.inc(app=METRICS_APP, status="cached")
+        self.display_final_results(ThreadMessage(cached.message))
+        return True
     
-    def _execute_research_run(self, run, span=None):
-        """Execute the research run with comprehensive tracing"""
+    def _checkpoint_new_run(self, run, user_input):
+        """Save the agent, thread and run IDs before polling starts"""
+        if self.checkpoints:
+            self.checkpoints.start("ui", self.agent.id, self.thread.id, run.id, user_input, run.status)
+            self.root.after(0, self.update_button_states)
+    
+    def _execute_research_run(self, run, span=None, last_message_id=None, started_at=None):
+        """Execute the research run with comprehensive tracing; started_at is when a resumed run began"""
         self.current_run = run
-        last_message_id = None
+        # Cancels the run server-side if it runs too long or stalls, and on a user stop
+        self.watchdog = RunWatchdog(self.watchdog_settings, started_at)
         citations_count = 0
         reasoning_steps = 0
         polling_iterations = 0
+        # Every poll is counted here and reported once on the polling span, not as a span per poll
+        self.polling_summary = PollingSummary()
         
-        # Create span for the polling phase
-        if span and self.tracer:
-            with self.tracer.start_as_current_span("research_polling_phase") as polling_span:
-                polling_span.set_attribute("run.id", run.id)
-                polling_span.set_attribute("run.initial_status", run.status)
-                
-                return self._execute_polling_loop(run, polling_span, last_message_id, 
+        try:
+            # Create span for the polling phase
+            if span and self.tracer:
+                with self.tracer.start_as_current_span("research_polling_phase") as polling_span:
+                    polling_span.set_attribute("run.id", run.id)
+                    polling_span.set_attribute("run.initial_status", run.status)
+                    
+                    return self._execute_polling_loop(run, polling_span, last_message_id, 
+                                                    citations_count, reasoning_steps, polling_iterations)
+            else:
+                return self._execute_polling_loop(run, None, last_message_id, 
                                                 citations_count, reasoning_steps, polling_iterations)
-        else:
-            return self._execute_polling_loop(run, None, last_message_id, 
-                                            citations_count, reasoning_steps, polling_iterations)
+        finally:
+            self.polling_summary = None
+            self.watchdog = None
     
     def _execute_polling_loop(self, run, polling_span, last_message_id, citations_count, reasoning_steps, polling_iterations):
-        """Execute the main polling loop with detailed tracing"""
+        """Execute the main polling loop, aggregating every poll into the polling span"""
+        summary = self.polling_summary
+        watchdog = self.watchdog
+        # Time to first reasoning only means something for a run we just started
+        run_start = time.perf_counter() if last_message_id is None else None
         
         # Poll for progress
-        while run.status in ("queued", "in_progress") and self.is_processing:
+        while run.status in ("queued", "in_progress") and self.is_processing and not watchdog.reason:
             polling_iterations += 1
+            time.sleep(self.polling_interval)
+            
+            # Get updated run status
+            poll_start = time.perf_counter()
+            run = self.agents_client.runs.get(thread_id=self.thread.id, run_id=run.id)  # type: ignore
+            poll_seconds = time.perf_counter() - poll_start
+            summary.record_run_poll(run.status, poll_seconds)
+            RESEARCH_POLL.observe(poll_seconds, app=METRICS_APP, call="runs_get")
+            
+            # Check for progress messages
+            old_last_message_id = last_message_id
+            last_message_id = self.fetch_and_display_progress(
+                self.thread.id, self.agents_client, last_message_id  # type: ignore
+            )
             
-            # Create span for each polling iteration
-            if polling_span and self.tracer:
-                with self.tracer.start_as_current_span("polling_iteration") as iter_span:
-                    iter_span.set_attribute("iteration.number", polling_iterations)
-                    iter_span.set_attribute("run.status", run.status)
-                    
-                    time.sleep(2)
-                    
-                    # Get updated run status
-                    run = self.agents_client.runs.get(thread_id=self.thread.id, run_id=run.id)  # type: ignore
-                    iter_span.set_attribute("run.new_status", run.status)
-                    
-                    # Check for progress messages
-                    old_last_message_id = last_message_id
-                    last_message_id = self.fetch_and_display_progress(
-                        self.thread.id, self.agents_client, last_message_id  # type: ignore
-                    )
-                    
-                    # Track if we got new content
-                    if last_message_id != old_last_message_id:
-                        reasoning_steps += 1
-                        iter_span.set_attribute("iteration.new_content", True)
-                        iter_span.set_attribute("iteration.reasoning_step", reasoning_steps)
-                    else:
-                        iter_span.set_attribute("iteration.new_content", False)
-            else:
-                time.sleep(2)
-                run = self.agents_client.runs.get(thread_id=self.thread.id, run_id=run.id)  # type: ignore
-                
-                old_last_message_id = last_message_id
-                last_message_id = self.fetch_and_display_progress(
-                    self.thread.id, self.agents_client, last_message_id  # type: ignore
-                )
-                
-                if last_message_id != old_last_message_id:
-                    reasoning_steps += 1
+            # Track if we got new content
+            progressed = last_message_id != old_last_message_id
+            if progressed:
+                if reasoning_steps == 0 and run_start is not None:
+                    RESEARCH_FIRST_REASONING.observe(time.perf_counter() - run_start, app=METRICS_APP)
+                reasoning_steps += 1
+            watchdog.observe(run.status, progressed)
+        
+        # A run left cancelling by an earlier stop is seen through to the end when resumed
+        if not self.is_processing or run.status == "cancelling":
+            watchdog.stop("user")
         
         # Update polling span with final metrics
         if polling_span:
+            summary.apply(polling_span)
             polling_span.set_attribute("polling.total_iterations", polling_iterations)
             polling_span.set_attribute("polling.reasoning_steps", reasoning_steps)
             polling_span.set_attribute("polling.final_status", run.status)
@@ -790,11 +815,14 @@ class DeepResearchAgentUI:
     def _handle_research_completion(self, run, citations_count, reasoning_steps, parent_span):
         """Handle research completion with detailed result tracing"""
         
-        if not self.is_processing:
-            self.update_reasoning("\n⏹️ Research stopped by user.\n")
-            if parent_span:
-                parent_span.set_attribute("research.cancelled_by_user", True)
-            return
+        if self.watchdog and self.watchdog.reason and run.status not in TERMINAL_STATUSES:
+            return self._cancel_run(run, parent_span)
+        
+        if self.checkpoints:
+            self.checkpoints.update_status(run.id, run.status)
+        RESEARCH_RUNS.inc(app=METRICS_APP, status=getattr(run.status, "value", run.status))
+        if run.status == "completed" and self.watchdog:
+            self.run_durations.record(self.watchdog.elapsed)
         
         if run.status == "failed":
             error_msg = f"❌ Research failed: {run.last_error}"
@@ -832,6 +860,50 @@ class DeepResearchAgentUI:
             if final_message:
                 return self._process_final_message(final_message, None, None)
     
+    def _cancel_run(self, run, parent_span=None):
+        """Cancel the run on the service, wait for the acknowledgement and record the run time saved"""
+        watchdog = self.watchdog
+        reason = watchdog.reason
+        if reason == "user":
+            self.update_reasoning("\n⏹️ Research stopped by user. Cancelling the run on the service...\n")
+        else:
+            self.update_reasoning(f"\n⏱️ Run {STOP_REASONS[reason]} after {watchdog.elapsed / 60:.0f} min. "
+                                  f"Cancelling it on the service...\n")
+        
+        cancel_start = time.perf_counter()
+        run, acknowledged = cancel_run(self.agents_client, self.thread.id, run.id,
+                                       self.watchdog_settings.cancel_timeout, self.polling_interval)
+        ack_seconds = time.perf_counter() - cancel_start
+        status = getattr(run.status, "value", run.status)
+        if self.checkpoints:
+            # A cancelled run can't be resumed; one still cancelling stays resumable until it ends
+            self.checkpoints.update_status(run.id, run.status)
+        RESEARCH_RUNS.inc(app=METRICS_APP, status="stopped" if reason == "user" else f"watchdog_{reason}")
+        
+        saved = 0.0
+        if acknowledged:
+            RESEARCH_CANCEL_ACK.observe(ack_seconds, app=METRICS_APP)
+            if status == "cancelled":
+                saved = estimate_saved_seconds(run, watchdog.elapsed,
+                                               self.run_durations.typical(self.watchdog_settings.max_run_seconds),
+                                               reason)
+                RESEARCH_SECONDS_SAVED.inc(saved, app=METRICS_APP, reason=reason)
+                self.update_reasoning(f"✅ Run cancelled in {ack_seconds:.1f}s, "
+                                      f"saving about {saved / 60:.0f} min of run time.\n")
+            else:
+                self.update_reasoning(f"ℹ️ The run had already ended ({status}) before it could be cancelled.\n")
+        else:
+            self.update_reasoning(f"⚠️ The service had not confirmed the cancellation after {ack_seconds:.0f}s "
+                                  f"(status: {status}).\n")
+        
+        if parent_span:
+            parent_span.set_attribute("research.cancelled_by_user", reason == "user")
+            parent_span.set_attribute("research.cancel_reason", reason)
+            parent_span.set_attribute("research.cancel_acknowledged", acknowledged)
+            parent_span.set_attribute("research.cancel_ack_seconds", ack_seconds)
+            parent_span.set_attribute("research.run_seconds_saved", saved)
+        return run
+    
     def _process_final_message(self, final_message, results_span, parent_span):
         """Process the final message with detailed content analysis"""
         
@@ -848,7 +920,7 @@ class DeepResearchAgentUI:
             results_span.set_attribute("final_message.word_count", len(content_text.split()))
             
             # Analyze content topics
-            self._analyze_final_content(content_text, results_span)
+            results_span.set_attributes(self.topic_classifier.attributes("content", content_text))
         
         if parent_span:
             parent_span.set_attribute("research.citations_count", citations_count)
@@ -858,91 +930,38 @@ class DeepResearchAgentUI:
         
         # Display the results
         self.display_final_results(final_message)
+        
+        if self.report_cache and self.current_query:
+            self.report_cache.put(self.current_query, self._report_fingerprint(), final_message.as_dict())
     
-    def _analyze_final_content(self, content_text, span):
-        """Analyze final content for business intelligence"""
+    def fetch_and_display_progress(self, thread_id, agents_client, last_message_id):
+        """Fetch and display intermediate progress, counting the poll in the run's polling summary"""
+        summary = self.polling_summary
         try:
-            # Content complexity metrics
-            sentence_count = content_text.count('.') + content_text.count('!') + content_text.count('?')
-            span.set_attribute("content.estimated_sentences", sentence_count)
-            
-            # Topic analysis
-            topics_found = []
-            if "menu" in content_text or "food" in content_text:
-                topics_found.append("menu_planning")
-            if "marketing" in content_text or "promotion" in content_text:
-                topics_found.append("marketing")
-            if "staff" in content_text or "employee" in content_text:
-                topics_found.append("staffing")
-            if "location" in content_text or "neighborhood" in content_text:
-                topics_found.append("location_analysis")
-            if "competitor" in content_text or "competition" in content_text:
-                topics_found.append("competitive_analysis")
-            if "cost" in content_text or "price" in content_text or "budget" in content_text:
-                topics_found.append("financial_planning")
-            if "faq" in content_text:
-                topics_found.append("faq_generation")
+            poll_start = time.perf_counter()
+            response = agents_client.messages.get_last_message_by_role(
+                thread_id=thread_id,
+                role=MessageRole.AGENT,
+            )
+            new_message = bool(response) and response.id != last_message_id
+            poll_seconds = time.perf_counter() - poll_start
+            RESEARCH_POLL.observe(poll_seconds, app=METRICS_APP, call="messages")
+            if summary:
+                summary.record_message_poll(new_message, poll_seconds)
             
-            if topics_found:
-                span.set_attribute("content.topics", ",".join(topics_found))
-                span.set_attribute("content.topic_count", len(topics_found))
+            if not new_message:
+                return last_message_id
             
-            # Quality indicators
-            if len(content_text) > 2000:
-                span.set_attribute("content.quality", "comprehensive")
-            elif len(content_text) > 1000:
-                span.set_attribute("content.quality", "detailed")
-            elif len(content_text) > 500:
-                span.set_attribute("content.quality", "standard")
-            else:
-                span.set_attribute("content.quality", "brief")
-                
-        except Exception as e:
-            span.set_attribute("content.analysis_error", str(e))
-    
-    def fetch_and_display_progress(self, thread_id, agents_client, last_message_id):
-        """Fetch and display intermediate progress with tracing"""
-        try:
-            # Create a span for message polling if tracing is enabled
-            if self.tracer:
-                with self.tracer.start_as_current_span("poll_agent_message") as span:
-                    span.set_attribute("thread.id", thread_id)
-                    span.set_attribute("message.last_id", last_message_id or "none")
-                    
-                    response = agents_client.messages.get_last_message_by_role(
-                        thread_id=thread_id,
-                        role=MessageRole.AGENT,
-                    )
-                    
-                    if not response or response.id == last_message_id:
-                        span.set_attribute("message.new_found", False)
-                        return last_message_id
-                    
-                    span.set_attribute("message.new_found", True)
-                    span.set_attribute("message.id", response.id)
-                    
-                    return self._process_agent_response(response, span)
-            else:
-                response = agents_client.messages.get_last_message_by_role(
-                    thread_id=thread_id,
-                    role=MessageRole.AGENT,
-                )
-                
-                if not response or response.id == last_message_id:
-                    return last_message_id
-                
-                return self._process_agent_response(response, None)
+            return self._process_agent_response(response)
             
         except Exception as e:
             self.update_reasoning(f"⚠️ Progress update error: {str(e)}\n")
-            if self.tracer:
-                # Create error span
-                with self.tracer.start_as_current_span("poll_message_error") as error_span:
-                    error_span.set_attribute("error.message", str(e))
-                    error_span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            if summary:
+                # Recorded as a counter and a capped event on the polling span instead of an error span
+                summary.record_error(e)
             return last_message_id
     
-    def _process_agent_response(self, response, span=None):
+    def _process_agent_response(self, response):
         """Process agent response with optional tracing"""
         # Check if this is a reasoning message
         reasoning_messages = []
@@ -954,88 +973,45 @@ class DeepResearchAgentUI:
             else:
                 other_messages.append(t.text.value)
         
+        shown = []  # Everything added to the reasoning panel, for the checkpoint
         if reasoning_messages:
-            # This is a reasoning step - create a dedicated span
-            if span and self.tracer:
+            reasoning_text = "\n".join(
+                msg.replace("cot_summary:", "💭 Reasoning: ") 
+                for msg in reasoning_messages
+            )
+            
+            # This is a reasoning step - create a dedicated span (rate limited by the tracer's sampler)
+            if self.tracer:
                 with self.tracer.start_as_current_span("agent_reasoning_step") as reasoning_span:
-                    reasoning_span.set_attribute("reasoning.step_count", len(reasoning_messages))
-                    
-                    reasoning_text = "\n".join(
-                        msg.replace("cot_summary:", "💭 Reasoning: ") 
-                        for msg in reasoning_messages
-                    )
-                    
-                    # Extract key reasoning concepts for better tracing
-                    self._extract_reasoning_attributes(reasoning_text, reasoning_span)
-                    
-                    self.update_reasoning(f"{reasoning_text}\n\n")
-            else:
-                reasoning_text = "\n".join(
-                    msg.replace("cot_summary:", "💭 Reasoning: ") 
-                    for msg in reasoning_messages
-                )
-                self.update_reasoning(f"{reasoning_text}\n\n")
+                    if reasoning_span.is_recording():
+                        reasoning_span.set_attribute("reasoning.step_count", len(reasoning_messages))
+                        reasoning_span.set_attribute("reasoning.citations_found",
+                                                     len(response.url_citation_annotations or []))
+                        # Extract key reasoning concepts for better tracing
+                        reasoning_span.set_attributes(self.topic_classifier.attributes("reasoning", reasoning_text))
+            
+            shown.append(f"{reasoning_text}\n\n")
+            self.update_reasoning(shown[-1])
             
             # Also display citations if available
             if response.url_citation_annotations:
-                citations_count = len(response.url_citation_annotations)
-                if span:
-                    span.set_attribute("reasoning.citations_found", citations_count)
-                
                 citations_text = "🔗 Sources found:\n"
                 for ann in response.url_citation_annotations[:3]:  # Show first 3
                     title = ann.url_citation.title or ann.url_citation.url
                     citations_text += f"  • [{title}]({ann.url_citation.url})\n"
-                self.update_reasoning(f"{citations_text}\n")
+                shown.append(f"{citations_text}\n")
+                self.update_reasoning(shown[-1])
         
         # Handle other message types
-        if other_messages:
-            if span:
-                span.set_attribute("message.other_content", True)
-                span.set_attribute("message.other_count", len(other_messages))
+        if other_messages and self.polling_summary:
+            self.polling_summary.other_messages += len(other_messages)
+        
+        if self.checkpoints and self.current_run:
+            # Remember that this message was shown so a resumed run replays it instead of refetching
+            self.checkpoints.record_progress(self.current_run.id, response.id, "".join(shown))
         
         return response.id
     
-    def _extract_reasoning_attributes(self, reasoning_text, span):
-        """Extract key attributes from reasoning text for better observability"""
-        try:
-            # Convert to lowercase for analysis
-            text_lower = reasoning_text.lower()
-            
-            # Check for different types of reasoning activities
-            if "search" in text_lower or "searching" in text_lower:
-                span.set_attribute("reasoning.type", "search")
-            elif "analy" in text_lower:  # covers analyze, analysis, etc.
-                span.set_attribute("reasoning.type", "analysis")
-            elif "research" in text_lower:
-                span.set_attribute("reasoning.type", "research")
-            elif "compil" in text_lower or "generat" in text_lower:
-                span.set_attribute("reasoning.type", "compilation")
-            else:
-                span.set_attribute("reasoning.type", "general")
-            
-            # Extract word count for complexity metrics
-            word_count = len(reasoning_text.split())
-            span.set_attribute("reasoning.word_count", word_count)
-            
-            # Check for specific topics or domains
-            if "restaurant" in text_lower or "food" in text_lower:
-                span.set_attribute("reasoning.domain", "restaurant")
-            elif "business" in text_lower or "strategy" in text_lower:
-                span.set_attribute("reasoning.domain", "business")
-            elif "marketing" in text_lower:
-                span.set_attribute("reasoning.domain", "marketing")
-            elif "finance" in text_lower or "cost" in text_lower:
-                span.set_attribute("reasoning.domain", "finance")
-            
-            # Check for geographic references
-            if "san francisco" in text_lower or "fisherman" in text_lower:
-                span.set_attribute("reasoning.location", "san_francisco")
-            
-        except Exception as e:
-            # Don't fail the main operation if attribute extraction fails
-            span.set_attribute("reasoning.extraction_error", str(e))
-    
     def display_final_results(self, message):
         """Display the final research results with tracing"""
         if not message:
@@ -1146,10 +1122,15 @@ class DeepResearchAgentUI:
     
     def update_report(self, markdown_text):
         """Update the research report panel (thread-safe)"""
+        # Parse on the calling thread; the view and the PDF export share the blocks
+        blocks = parse_markdown(markdown_text)
+        
         def _update():
-            self.report_text.configure(state='normal')
-            self.report_renderer.render_markdown(markdown_text)
-            self.report_text.configure(state='disabled')
+            self.report_blocks = blocks
+            with RESEARCH_RENDER.time(app=METRICS_APP):
+                self.report_text.configure(state='normal')
+                self.report_renderer.render_blocks(blocks)
+                self.report_text.configure(state='disabled')
         
         self.root.after(0, _update)
     
@@ -1170,12 +1151,22 @@ class DeepResearchAgentUI:
         else:
             self.submit_button.configure(state='normal')
             self.stop_button.configure(state='disabled')
+        resumable = not self.is_processing and self.checkpoints and self.checkpoints.latest_unfinished("ui")
+        self.resume_button.configure(state='normal' if resumable else 'disabled')
     
     def stop_research(self):
-        """Stop the current research process"""
+        """Stop polling; the research thread then cancels the run on the service and waits for it to end"""
         self.is_processing = False
+        self.stop_button.configure(state='disabled')
         self.update_reasoning("\n🛑 Stopping research...\n")
     
+    def wait_for_research(self, timeout):
+        """Keep the window responsive while the research thread finishes, e.g. waiting for a cancel"""
+        deadline = time.monotonic() + timeout
+        while self.research_thread and self.research_thread.is_alive() and time.monotonic() < deadline:
+            self.root.update()
+            time.sleep(0.05)
+    
     def clear_all(self):
         """Clear all content areas"""
         # Clear reasoning panel
@@ -1187,6 +1178,7 @@ class DeepResearchAgentUI:
         self.report_text.configure(state='normal')
         self.report_text.delete(1.0, tk.END)
         self.report_text.configure(state='disabled')
+        self.report_blocks = []
         
         # Reset input to default text
         default_text = ("I have rented a new storefront at 340 Jefferson St. in Fisherman's Wharf in San Francisco to open a new outpost of my restaurant chain, Scheibmeir's Steaks, Snacks and Sticks. Please help me design a strategy and theme to operate the new restaurant, including but not limited to the cuisine and menu to offer, staff recruitment requirements including salary, and marketing and promotional strategies. Provide one best option rather than multiple choices. Based on the option help me also generate a FAQ document for the customer to understand the details of the restaurant.")
@@ -1207,6 +1199,7 @@ class DeepResearchAgentUI:
         self.report_text.configure(state='normal')
         self.report_text.delete(1.0, tk.END)
         self.report_text.configure(state='disabled')
+        self.report_blocks = []
         
         # Add status message to reasoning panel
         self.update_reasoning("📝 Ready for new research request...\n")
@@ -1222,194 +1215,56 @@ class DeepResearchAgentUI:
             messagebox.showwarning("No Content", "No research report to copy.")
     
     def export_to_pdf(self):
-        """Export the research report to PDF"""
-        report_content = self.report_text.get(1.0, tk.END).strip()
-        if not report_content:
+        """Export the research report to PDF on a background worker"""
+        if not self.report_blocks:
             messagebox.showwarning("No Content", "No research report to export.")
             return
         
+        if self.pdf_job and not self.pdf_job.done:
+            return  # An export is already running
+        
         try:
-            # Import PDF libraries here to avoid import errors if not installed
-            from reportlab.lib.pagesizes import letter, A4
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-            from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-            from reportlab.lib import colors
-            from reportlab.lib.colors import HexColor
-            
-            # Ask user for save location
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"research_report_{timestamp}.pdf"
-            
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")],
-                initialfile=default_filename,
-                title="Export Research Report to PDF"
-            )
-            
-            if not file_path:
-                return  # User cancelled
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(file_path, pagesize=letter,
-                                  rightMargin=72, leftMargin=72,
-                                  topMargin=72, bottomMargin=18)
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=20,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=HexColor('#2c3e50')
-            )
-            
-            heading1_style = ParagraphStyle(
-                'CustomHeading1',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=12,
-                spaceBefore=20,
-                textColor=HexColor('#34495e')
-            )
-            
-            heading2_style = ParagraphStyle(
-                'CustomHeading2', 
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=10,
-                spaceBefore=16,
-                textColor=HexColor('#34495e')
-            )
-            
-            heading3_style = ParagraphStyle(
-                'CustomHeading3',
-                parent=styles['Heading3'],
-                fontSize=12,
-                spaceAfter=8,
-                spaceBefore=12,
-                textColor=HexColor('#34495e')
-            )
-            
-            body_style = ParagraphStyle(
-                'CustomBody',
-                parent=styles['Normal'],
-                fontSize=11,
-                spaceAfter=6,
-                alignment=TA_JUSTIFY,
-                leftIndent=0,
-                rightIndent=0
-            )
-            
-            citation_style = ParagraphStyle(
-                'Citations',
-                parent=styles['Normal'],
-                fontSize=10,
-                spaceAfter=4,
-                leftIndent=20
-            )
-            
-            # Build story (content) for PDF
-            story = []
-            
-            # Add title
-            story.append(Paragraph("🔬 Deep Research Report", title_style))
-            story.append(Spacer(1, 20))
-            
-            # Add timestamp
-            timestamp_text = f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
-            story.append(Paragraph(timestamp_text, styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Process the report content
-            lines = report_content.split('\n')
-            current_paragraph = ""
-            
-            for line in lines:
-                line = line.strip()
-                
-                if not line:
-                    # Empty line - finish current paragraph if any
-                    if current_paragraph.strip():
-                        # Clean up markdown formatting for PDF
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        story.append(Spacer(1, 6))
-                        current_paragraph = ""
-                    continue
-                
-                # Headers
-                if line.startswith('### '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 12))
-                    story.append(Paragraph(line[4:], heading3_style))
-                    
-                elif line.startswith('## '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 16))
-                    story.append(Paragraph(line[3:], heading2_style))
-                    
-                elif line.startswith('# '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 20))
-                    story.append(Paragraph(line[2:], heading1_style))
-                
-                # List items
-                elif line.startswith('- ') or re.match(r'^\d+\.\s', line):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    
-                    # Handle list items
-                    cleaned_line = self.clean_markdown_for_pdf(line)
-                    story.append(Paragraph(cleaned_line, citation_style))
-                
-                # Citation numbers (standalone)
-                elif re.match(r'^\d+\.\s.*', line) and '(' in line and ')' in line:
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    
-                    cleaned_line = self.clean_markdown_for_pdf(line)
-                    story.append(Paragraph(cleaned_line, citation_style))
-                
-                # Regular content
-                else:
-                    current_paragraph += line + " "
-            
-            # Handle any remaining paragraph
-            if current_paragraph.strip():
-                cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                story.append(Paragraph(cleaned_text, body_style))
-            
-            # Build PDF
-            doc.build(story)
-            
-            messagebox.showinfo("Export Successful", f"Research report exported to:\n{file_path}")
-            
+            # Check for the PDF library up front so the user gets a clear message
+            import reportlab  # noqa: F401
         except ImportError:
             messagebox.showerror("Missing Dependency", 
                                "The reportlab library is required for PDF export.\n"
                                "Please install it using: pip install reportlab")
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export PDF:\n{str(e)}")
+            return
+        
+        # Ask user for save location
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        default_filename = f"research_report_{timestamp}.pdf"
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")],
+            initialfile=default_filename,
+            title="Export Research Report to PDF"
+        )
+        
+        if not file_path:
+            return  # User cancelled
+        
+        # Lay out the PDF off the Tk thread and poll its progress
+        self.pdf_job = PdfExportJob(self.report_blocks, file_path).start()
+        self.pdf_button.configure(state='disabled', text="📄 Exporting 0%")
+        self.root.after(PDF_PROGRESS_INTERVAL_MS, self._poll_pdf_export)
+    
+    def _poll_pdf_export(self):
+        """Show PDF export progress and report the result once the worker finishes"""
+        job = self.pdf_job
+        if not job.done:
+            self.pdf_button.configure(text=f"📄 Exporting {job.progress:.0%} ({job.pages} pages)")
+            self.root.after(PDF_PROGRESS_INTERVAL_MS, self._poll_pdf_export)
+            return
+        
+        self.pdf_button.configure(state='normal', text="📄 Export to PDF")
+        if job.error:
+            messagebox.showerror("Export Error", f"Failed to export PDF:\n{str(job.error)}")
+        elif not job.cancelled:
+            messagebox.showinfo("Export Successful",
+                                f"Research report exported to:\n{job.file_path}\n({job.pages} pages)")
     
     def cleanup_azure_resources(self):
         """Clean up Azure resources when application closes"""
@@ -1429,25 +1284,6 @@ class DeepResearchAgentUI:
                 
         except Exception as e:
             print(f"Error during cleanup: {e}")
-    
-    def clean_markdown_for_pdf(self, text):
-        """Clean markdown formatting for PDF rendering"""
-        # Convert markdown links [text](url) to just text with URL in parentheses
-        text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'\1 (\2)', text)
-        
-        # Convert bold **text** to <b>text</b>
-        text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-        
-        # Convert italic *text* to <i>text</i>
-        text = re.sub(r'\*(.*?)\*', r'<i>\1</i>', text)
-        
-        # Convert citations [n] to superscript
-        text = re.sub(r'\[(\d+)\]', r'<sup>\1</sup>', text)
-        
-        # Remove HTML superscript tags and convert to plain text
-        text = re.sub(r'<sup>(\d+)</sup>', r'[\1]', text)
-        
-        return text
 
 
 def main():
@@ -1487,7 +1323,8 @@ def main():
         if app.is_processing:
             if messagebox.askokcancel("Quit", "Research is in progress. Stop and quit?"):
                 app.stop_research()
-                time.sleep(1)  # Give time for cleanup
+                # Let the research thread cancel the run on the service before the process exits
+                app.wait_for_research(POLLING_INTERVAL + app.watchdog_settings.cancel_timeout)
                 app.cleanup_azure_resources()
                 root.destroy()
         else:
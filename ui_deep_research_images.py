@@ -19,9 +19,26 @@ from azure.ai.agents import AgentsClient
 from azure.ai.agents.models import DeepResearchTool, MessageRole, ThreadMessage
 from openai import AzureOpenAI
 
+from report_images import ImageCache
+from report_markup import parse_html
+from report_pdf import PdfExportJob
+from local_metrics import (LONG_BUCKETS, REGISTRY, RESEARCH_CANCEL_ACK, RESEARCH_FIRST_REASONING, RESEARCH_POLL,
+                           RESEARCH_RENDER, RESEARCH_RUNS, RESEARCH_SECONDS_SAVED, start_metrics_server)
+from run_watchdog import (STOP_REASONS, TERMINAL_STATUSES, RunDurations, RunWatchdog, WatchdogSettings, cancel_run,
+                          estimate_saved_seconds)
+
 # Load environment variables from .env file if they're not already set
 load_dotenv()
 
+PDF_PROGRESS_INTERVAL_MS = 100  # how often the export button shows PDF progress
+REPORT_HTML_DIR = "./html"  # Report image src paths (./images/...) are relative to this folder
+REPORT_THUMBNAIL_WIDTH = 600  # pixels; the report panel shows thumbnails, the PDF and browser get more
+METRICS_PORT = 9102  # local Prometheus endpoint, http://localhost:9102/metrics
+METRICS_APP = "images"
+
+IMAGE_GENERATION = REGISTRY.histogram("image_generation_seconds", "Time to generate and save one report image",
+                                      ["status"], buckets=LONG_BUCKETS)
+
 
 class ImageGenerator:
     """Image generation tool using Azure OpenAI GPT-Image-1"""
@@ -57,6 +74,8 @@ class ImageGenerator:
     
     def generate_image(self, prompt: str) -> str:
         """Generate an image from a text prompt and save it to the images directory"""
+        started = time.perf_counter()
+        status = "error"
         try:
             # Generate filename based on prompt
             import hashlib
@@ -116,12 +135,16 @@ class ImageGenerator:
                 with open(filepath, "wb") as f:
                     f.write(image_data)
                 
+                status = "ok"
                 return filename
             else:
                 raise Exception(f"No image data returned from API. Response: {response}")
             
         except Exception as e:
             raise Exception(f"Image generation failed: {str(e)}")
+        
+        finally:
+            IMAGE_GENERATION.observe(time.perf_counter() - started, status=status)
 
 
 class ImageGenerationTool:
@@ -192,6 +215,13 @@ class DeepResearchAgentUI:
         self.current_run = None
         self.project_client_connection = None
         self.current_html_content = ""  # Store current HTML content
+        self.report_blocks = []  # Parsed report shared with the PDF export
+        self.pdf_job: Optional[PdfExportJob] = None  # Background PDF export, if one has run
+        self.image_cache = ImageCache()  # Downscaled images shared by the report panel and PDF export
+        self.metrics_server = start_metrics_server(METRICS_PORT)  # Live latency numbers without Azure
+        self.watchdog_settings = WatchdogSettings.from_env()  # Max run time and no-progress limits
+        self.run_durations = RunDurations()  # Typical run length, for the run time a cancellation saved
+        self.research_thread = None
         
         # Initialize image generator
         try:
@@ -448,9 +478,9 @@ class DeepResearchAgentUI:
         # Clear previous results
         self.clear_outputs()
         
-        research_thread = threading.Thread(target=self.run_research, args=(user_input,))
-        research_thread.daemon = True
-        research_thread.start()
+        self.research_thread = threading.Thread(target=self.run_research, args=(user_input,))
+        self.research_thread.daemon = True
+        self.research_thread.start()
     
     def run_research(self, user_input):
         """Run the research process (called in background thread)"""
@@ -511,22 +541,35 @@ Create a comprehensive, visually enhanced research report using HTML format with
             
             self.current_run = run
             last_message_id = None
+            run_start = time.perf_counter()
+            # Cancels the run server-side if it runs too long or stalls, and on a user stop
+            watchdog = RunWatchdog(self.watchdog_settings)
             
             # Poll for progress
-            while run.status in ("queued", "in_progress") and self.is_processing:
+            while run.status in ("queued", "in_progress") and self.is_processing and not watchdog.reason:
                 time.sleep(2)
-                run = self.agents_client.runs.get(thread_id=self.thread.id, run_id=run.id)
+                with RESEARCH_POLL.time(app=METRICS_APP, call="runs_get"):
+                    run = self.agents_client.runs.get(thread_id=self.thread.id, run_id=run.id)
                 
                 # Fetch and display intermediate responses
+                previous_message_id = last_message_id
                 last_message_id = self.fetch_and_display_progress(
                     self.thread.id, self.agents_client, last_message_id
                 )
+                if previous_message_id is None and last_message_id is not None:
+                    RESEARCH_FIRST_REASONING.observe(time.perf_counter() - run_start, app=METRICS_APP)
+                watchdog.observe(run.status, last_message_id != previous_message_id)
             
             # Handle completion or cancellation
             if not self.is_processing:
-                self.update_reasoning("\n⏹️ Research stopped by user.\n")
+                watchdog.stop("user")
+            if watchdog.reason and run.status not in TERMINAL_STATUSES:
+                self._cancel_run(run, watchdog)
                 return
             
+            RESEARCH_RUNS.inc(app=METRICS_APP, status=getattr(run.status, "value", run.status))
+            if run.status == "completed":
+                self.run_durations.record(watchdog.elapsed)
             if run.status == "failed":
                 error_msg = f"❌ Research failed: {run.last_error}"
                 self.update_reasoning(f"\n{error_msg}\n")
@@ -552,13 +595,44 @@ Create a comprehensive, visually enhanced research report using HTML format with
             self.root.after(0, self.hide_loading)
             self.root.after(0, self.update_button_states)
     
+    def _cancel_run(self, run, watchdog):
+        """Cancel the run on the service, wait for the acknowledgement and record the run time saved"""
+        reason = watchdog.reason
+        if reason == "user":
+            self.update_reasoning("\n⏹️ Research stopped by user. Cancelling the run on the service...\n")
+        else:
+            self.update_reasoning(f"\n⏱️ Run {STOP_REASONS[reason]} after {watchdog.elapsed / 60:.0f} min. "
+                                  f"Cancelling it on the service...\n")
+        
+        cancel_start = time.perf_counter()
+        run, acknowledged = cancel_run(self.agents_client, self.thread.id, run.id,
+                                       self.watchdog_settings.cancel_timeout)
+        ack_seconds = time.perf_counter() - cancel_start
+        status = getattr(run.status, "value", run.status)
+        RESEARCH_RUNS.inc(app=METRICS_APP, status="stopped" if reason == "user" else f"watchdog_{reason}")
+        
+        if not acknowledged:
+            self.update_reasoning(f"⚠️ The service had not confirmed the cancellation after {ack_seconds:.0f}s "
+                                  f"(status: {status}).\n")
+            return
+        RESEARCH_CANCEL_ACK.observe(ack_seconds, app=METRICS_APP)
+        if status != "cancelled":
+            self.update_reasoning(f"ℹ️ The run had already ended ({status}) before it could be cancelled.\n")
+            return
+        saved = estimate_saved_seconds(run, watchdog.elapsed,
+                                       self.run_durations.typical(self.watchdog_settings.max_run_seconds), reason)
+        RESEARCH_SECONDS_SAVED.inc(saved, app=METRICS_APP, reason=reason)
+        self.update_reasoning(f"✅ Run cancelled in {ack_seconds:.1f}s, "
+                              f"saving about {saved / 60:.0f} min of run time.\n")
+    
     def fetch_and_display_progress(self, thread_id, agents_client, last_message_id):
         """Fetch and display intermediate progress"""
         try:
-            response = agents_client.messages.get_last_message_by_role(
-                thread_id=thread_id,
-                role=MessageRole.AGENT,
-            )
+            with RESEARCH_POLL.time(app=METRICS_APP, call="messages"):
+                response = agents_client.messages.get_last_message_by_role(
+                    thread_id=thread_id,
+                    role=MessageRole.AGENT,
+                )
             
             if not response or response.id == last_message_id:
                 return last_message_id
@@ -725,12 +799,17 @@ Create a comprehensive, visually enhanced research report using HTML format with
     
     def update_report(self, html_text):
         """Update the research report panel with HTML rendering (thread-safe)"""
+        # Parse and build thumbnails on the calling thread; the PDF export reuses the blocks
+        blocks = parse_html(html_text)
+        # Fix image paths for Tkinter display and remove head element
+        display_html = self.fix_image_paths_for_tkinter(html_text)
+        display_html = self.remove_head_for_tkinter(display_html)
+        
         def _update():
             self.current_html_content = html_text  # Store original HTML content
-            # Fix image paths for Tkinter display and remove head element
-            display_html = self.fix_image_paths_for_tkinter(html_text)
-            display_html = self.remove_head_for_tkinter(display_html)
-            self.report_text.set_html(display_html)
+            self.report_blocks = blocks
+            with RESEARCH_RENDER.time(app=METRICS_APP):
+                self.report_text.set_html(display_html)
         
         self.root.after(0, _update)
     
@@ -753,10 +832,18 @@ Create a comprehensive, visually enhanced research report using HTML format with
             self.stop_button.configure(state='disabled')
     
     def stop_research(self):
-        """Stop the current research process"""
+        """Stop polling; the research thread then cancels the run on the service and waits for it to end"""
         self.is_processing = False
+        self.stop_button.configure(state='disabled')
         self.update_reasoning("\n🛑 Stopping research...\n")
     
+    def wait_for_research(self, timeout):
+        """Keep the window responsive while the research thread finishes, e.g. waiting for a cancel"""
+        deadline = time.monotonic() + timeout
+        while self.research_thread and self.research_thread.is_alive() and time.monotonic() < deadline:
+            self.root.update()
+            time.sleep(0.05)
+    
     def clear_all(self):
         """Clear all content areas"""
         # Clear reasoning panel
@@ -766,6 +853,7 @@ Create a comprehensive, visually enhanced research report using HTML format with
         
         # Clear report panel
         self.current_html_content = ""
+        self.report_blocks = []
         self.report_text.set_html("<p>Research report will appear here...</p>")
         
         # Reset input to default text
@@ -780,6 +868,7 @@ Create a comprehensive, visually enhanced research report using HTML format with
         
         # Clear report panel
         self.current_html_content = ""
+        self.report_blocks = []
         self.report_text.set_html("<p>Research report will appear here...</p>")
     
     def copy_report(self):
@@ -796,264 +885,60 @@ Create a comprehensive, visually enhanced research report using HTML format with
             messagebox.showwarning("Copy Error", f"Could not copy report: {str(e)}")
     
     def export_to_pdf(self):
-        """Export the research report to PDF"""
+        """Export the research report to PDF on a background worker"""
         from tkinter import filedialog
         
-        # Use the stored HTML content
-        try:
-            if not self.current_html_content or self.current_html_content.strip() == "<p>Research report will appear here...</p>":
-                messagebox.showwarning("No Content", "No research report to export.")
-                return
-            html_content = self.current_html_content
-        except Exception as e:
-            messagebox.showerror("Error", f"Could not get report content: {str(e)}")
+        if not self.report_blocks:
+            messagebox.showwarning("No Content", "No research report to export.")
             return
         
+        if self.pdf_job and not self.pdf_job.done:
+            return  # An export is already running
+        
         try:
-            # Import PDF libraries here to avoid import errors if not installed
-            from reportlab.lib.pagesizes import letter, A4
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-            from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-            from reportlab.lib import colors
-            from reportlab.lib.colors import HexColor
-            
-            # Try to import html2text, fallback to manual cleaning if not available
-            html2text_module = None
-            try:
-                import html2text as html2text_module
-                html2text_available = True
-            except ImportError:
-                html2text_available = False
-            
-            # Ask user for save location
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"research_report_{timestamp}.pdf"
-            
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")],
-                initialfile=default_filename,
-                title="Export Research Report to PDF"
-            )
-            
-            if not file_path:
-                return  # User cancelled
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(file_path, pagesize=letter,
-                                  rightMargin=72, leftMargin=72,
-                                  topMargin=72, bottomMargin=18)
-            
-            # Get styles
-            styles = getSampleStyleSheet()
-            
-            # Custom styles
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=20,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=HexColor('#2c3e50')
-            )
-            
-            heading1_style = ParagraphStyle(
-                'CustomHeading1',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=12,
-                spaceBefore=20,
-                textColor=HexColor('#34495e')
-            )
-            
-            heading2_style = ParagraphStyle(
-                'CustomHeading2', 
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=10,
-                spaceBefore=16,
-                textColor=HexColor('#34495e')
-            )
-            
-            heading3_style = ParagraphStyle(
-                'CustomHeading3',
-                parent=styles['Heading3'],
-                fontSize=12,
-                spaceAfter=8,
-                spaceBefore=12,
-                textColor=HexColor('#34495e')
-            )
-            
-            body_style = ParagraphStyle(
-                'CustomBody',
-                parent=styles['Normal'],
-                fontSize=11,
-                spaceAfter=6,
-                alignment=TA_JUSTIFY,
-                leftIndent=0,
-                rightIndent=0
-            )
-            
-            citation_style = ParagraphStyle(
-                'Citations',
-                parent=styles['Normal'],
-                fontSize=10,
-                spaceAfter=4,
-                leftIndent=20
-            )
-            
-            # Build story (content) for PDF
-            story = []
-            
-            # Convert HTML to markdown/text for PDF processing
-            if html2text_available and html2text_module:
-                try:
-                    h = html2text_module.HTML2Text()
-                    h.ignore_links = False
-                    h.ignore_images = True  # We'll handle images separately
-                    markdown_content = h.handle(html_content)
-                except:
-                    # Fallback: use the HTML content directly and clean it
-                    markdown_content = self.clean_html_for_pdf(html_content)
-            else:
-                # Fallback: use the HTML content directly and clean it
-                markdown_content = self.clean_html_for_pdf(html_content)
-            
-            # Process the content
-            lines = markdown_content.split('\n')
-            current_paragraph = ""
-            
-            for line in lines:
-                line = line.strip()
-                
-                if not line:
-                    # Empty line - finish current paragraph if any
-                    if current_paragraph.strip():
-                        # Clean up markdown formatting for PDF
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        story.append(Spacer(1, 6))
-                        current_paragraph = ""
-                    continue
-                
-                # Headers
-                if line.startswith('### '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 12))
-                    story.append(Paragraph(line[4:], heading3_style))
-                    
-                elif line.startswith('## '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 16))
-                    story.append(Paragraph(line[3:], heading2_style))
-                    
-                elif line.startswith('# '):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    story.append(Spacer(1, 20))
-                    story.append(Paragraph(line[2:], heading1_style))
-                
-                # List items
-                elif line.startswith('- ') or re.match(r'^\d+\.\s', line):
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    
-                    # Handle list items
-                    cleaned_line = self.clean_markdown_for_pdf(line)
-                    story.append(Paragraph(cleaned_line, citation_style))
-                
-                # Citation numbers (standalone)
-                elif re.match(r'^\d+\.\s.*', line) and '(' in line and ')' in line:
-                    if current_paragraph.strip():
-                        cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                        story.append(Paragraph(cleaned_text, body_style))
-                        current_paragraph = ""
-                    
-                    cleaned_line = self.clean_markdown_for_pdf(line)
-                    story.append(Paragraph(cleaned_line, citation_style))
-                
-                # Regular content
-                else:
-                    current_paragraph += line + " "
-            
-            # Handle any remaining paragraph
-            if current_paragraph.strip():
-                cleaned_text = self.clean_markdown_for_pdf(current_paragraph)
-                story.append(Paragraph(cleaned_text, body_style))
-            
-            # Build PDF
-            doc.build(story)
-            
-            messagebox.showinfo("Export Successful", f"Research report exported to:\n{file_path}")
-            
+            # Check for the PDF library up front so the user gets a clear message
+            import reportlab  # noqa: F401
         except ImportError:
             messagebox.showerror("Missing Dependency", 
                                "The reportlab library is required for PDF export.\n"
-                               "Please install it using: pip install reportlab\n"
-                               "Optional: pip install html2text for better HTML conversion")
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export PDF:\n{str(e)}")
-    
-    def clean_html_for_pdf(self, html_content):
-        """Clean HTML content for PDF processing when html2text is not available"""
-        # Remove HTML tags and convert to plain text
-        import re
-        
-        # Convert headers
-        html_content = re.sub(r'<h([1-6])[^>]*>(.*?)</h[1-6]>', r'\n# \2\n', html_content)
-        
-        # Convert paragraphs
-        html_content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', html_content)
-        
-        # Convert line breaks
-        html_content = re.sub(r'<br[^>]*>', '\n', html_content)
-        
-        # Convert lists
-        html_content = re.sub(r'<li[^>]*>(.*?)</li>', r'- \1\n', html_content)
-        html_content = re.sub(r'<[ou]l[^>]*>', '', html_content)
-        html_content = re.sub(r'</[ou]l>', '\n', html_content)
+                               "Please install it using: pip install reportlab")
+            return
         
-        # Convert links
-        html_content = re.sub(r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', r'\2 (\1)', html_content)
+        # Ask user for save location
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        default_filename = f"research_report_{timestamp}.pdf"
         
-        # Remove remaining HTML tags
-        html_content = re.sub(r'<[^>]+>', '', html_content)
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")],
+            initialfile=default_filename,
+            title="Export Research Report to PDF"
+        )
         
-        # Clean up extra whitespace
-        html_content = re.sub(r'\n\s*\n', '\n\n', html_content)
+        if not file_path:
+            return  # User cancelled
         
-        return html_content.strip()
+        # The report HTML was parsed once in update_report; lay it out off the Tk thread,
+        # embedding images through the same cache that made the panel's thumbnails
+        self.pdf_job = PdfExportJob(self.report_blocks, file_path, image_cache=self.image_cache,
+                                    base_dir=REPORT_HTML_DIR).start()
+        self.pdf_button.configure(state='disabled', text="📄 Exporting 0%")
+        self.root.after(PDF_PROGRESS_INTERVAL_MS, self._poll_pdf_export)
     
-    def clean_markdown_for_pdf(self, text):
-        """Clean markdown formatting for PDF rendering"""
-        # Convert markdown links [text](url) to just text with URL in parentheses
-        text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'\1 (\2)', text)
-        
-        # Convert bold **text** to <b>text</b>
-        text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-        
-        # Convert italic *text* to <i>text</i>
-        text = re.sub(r'\*(.*?)\*', r'<i>\1</i>', text)
-        
-        # Convert citations [n] to superscript
-        text = re.sub(r'\[(\d+)\]', r'<sup>\1</sup>', text)
-        
-        # Remove HTML superscript tags and convert to plain text
-        text = re.sub(r'<sup>(\d+)</sup>', r'[\1]', text)
+    def _poll_pdf_export(self):
+        """Show PDF export progress and report the result once the worker finishes"""
+        job = self.pdf_job
+        if not job.done:
+            self.pdf_button.configure(text=f"📄 Exporting {job.progress:.0%} ({job.pages} pages)")
+            self.root.after(PDF_PROGRESS_INTERVAL_MS, self._poll_pdf_export)
+            return
         
-        return text
+        self.pdf_button.configure(state='normal', text="📄 Export to PDF")
+        if job.error:
+            messagebox.showerror("Export Error", f"Failed to export PDF:\n{str(job.error)}")
+        elif not job.cancelled:
+            messagebox.showinfo("Export Successful",
+                                f"Research report exported to:\n{job.file_path}\n({job.pages} pages)")
     
     def fix_image_paths_for_browser(self, html_content):
         """Fix image paths in HTML content for browser viewing"""
@@ -1067,8 +952,12 @@ Create a comprehensive, visually enhanced research report using HTML format with
         # Convert relative paths to use html/images directory for Tkinter display
         def replace_relative_path(match):
             filename = match.group(1)
-            # For Tkinter, use the html/images path
-            return f'src="./html/images/{filename}"'
+            # For Tkinter, use a cached thumbnail of the html/images file
+            path = os.path.join(REPORT_HTML_DIR, "images", filename)
+            try:
+                return f'src="{self.image_cache.thumbnail_file(path, REPORT_THUMBNAIL_WIDTH)}"'
+            except OSError:
+                return f'src="./html/images/{filename}"'
         
         # Replace ./images/ paths with ./html/images/ paths for Tkinter
         html_content = re.sub(r'src="\.\/images\/([^"]+)"', replace_relative_path, html_content)
@@ -1266,7 +1155,8 @@ def main():
         if app.is_processing:
             if messagebox.askokcancel("Quit", "Research is in progress. Stop and quit?"):
                 app.stop_research()
-                time.sleep(1)  # Give time for cleanup
+                # Let the research thread cancel the run on the service before the process exits
+                app.wait_for_research(2 + app.watchdog_settings.cancel_timeout)
                 app.cleanup()
                 root.destroy()
         else: